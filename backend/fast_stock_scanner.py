@@ -5,7 +5,7 @@ High-speed stock scanner using yfinance only, with proxy rotation and retries.
 - Uses up to 10 threads (default) with per-request proxy sessions
 - Detects rate limiting (HTTP 429/blocked), rotates proxy immediately, tracks, and retries at end
 - Focuses on yfinance fast_info for sub-200ms per-ticker latency (avoids heavy endpoints)
-- Writes results into existing Django Stock model (update_or_create)
+- Writes results into existing Django Stock model (delta writer: only changed columns)
 
 Notes:
 - Only fields that exist in the current Stock model are persisted to DB
@@ -23,7 +23,8 @@ import math
 import glob
 import logging
 import random
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -33,6 +34,7 @@ try:
     from curl_cffi import requests as cf_requests  # yfinance prefers curl_cffi sessions
 except Exception:
     cf_requests = None  # type: ignore
+import numpy as np
 import pandas as pd
 import yfinance as yf
 try:
@@ -41,6 +43,10 @@ try:
 except Exception:
     yf_get_json = None  # type: ignore
 
+from stock_retrieval.columnar_transform import QUOTE_SPEC, transform_quotes
+from stock_retrieval.proxy_scoreboard import get_scoreboard
+from utils import metrics
+
 # Optional Django setup for DB writes (graceful fallback when unavailable)
 DJANGO_AVAILABLE = False
 try:
@@ -58,6 +64,9 @@ except Exception:
     def django_close_old_connections():  # type: ignore
         return None
 
+SCANNER_NAME = 'fast_stock_scanner'
+metrics.instrument_http()
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(
     level=logging.INFO,
@@ -110,6 +119,10 @@ class ProxyManager:
         except Exception:
             proxy_limit = None
         incoming = [p.strip() for p in proxies if p]
+        # Order by the shared persistent scoreboard so the cap keeps known-good proxies
+        self.scoreboard = get_scoreboard()
+        self.scoreboard.register(incoming)
+        incoming = self.scoreboard.rank(incoming, include_unavailable=True)
         if proxy_limit is not None and proxy_limit > 0:
             incoming = incoming[:proxy_limit]
         self.proxies = list(dict.fromkeys(incoming))
@@ -122,6 +135,7 @@ class ProxyManager:
             self._lock = None
         # Build and warm persistent sessions per proxy (or one no-proxy session)
         self._sessions: List[object] = []
+        self._session_proxy: Dict[int, str] = {}
         # We DO NOT share cookies across proxies to avoid identity coupling across IPs
         master_cookies = None
 
@@ -158,6 +172,8 @@ class ProxyManager:
                 except Exception:
                     pass
                 self._sessions.append(sess)
+                if proxy:
+                    self._session_proxy[id(sess)] = proxy
             except Exception:
                 continue
 
@@ -183,6 +199,19 @@ class ProxyManager:
     def rotate_and_get_session(self) -> Optional[requests.Session]:
         return self.get_session(rotate=True)
 
+    def record_result(self, session: Optional[object], ok: bool, latency: Optional[float] = None,
+                      rate_limited: bool = False) -> None:
+        """Report the outcome of a request made with ``session`` to the proxy scoreboard."""
+        proxy = self._session_proxy.get(id(session)) if session is not None else None
+        if not proxy:
+            return
+        if ok:
+            self.scoreboard.record_success(proxy, latency=latency)
+        elif rate_limited:
+            self.scoreboard.record_rate_limit(proxy)
+        else:
+            self.scoreboard.record_failure(proxy)
+
 
 ## Direct Yahoo quote client removed: we rely solely on yfinance interfaces.
 
@@ -207,6 +236,114 @@ def load_proxies(proxy_file: str) -> List[str]:
         return []
 
 
+# -------------------------- Tiered fetch planning -------------------------- #
+
+@dataclass
+class FetchTier:
+    """One way of obtaining payload fields.
+
+    ``cost`` is the estimated number of HTTP requests spent per routed symbol
+    (a 100-symbol batch quote costs 0.01); ``supplies`` lists the payload fields
+    the tier can fill and ``requires`` the fields that must already be present.
+    ``fetch(symbols, payloads)`` returns new partial payloads keyed by symbol.
+    """
+    name: str
+    cost: float
+    supplies: frozenset
+    fetch: Callable[[List[str], Dict[str, Dict[str, Any]]], Dict[str, Dict[str, Any]]]
+    requires: frozenset = frozenset()
+
+
+@dataclass
+class TierStats:
+    routed: int = 0
+    hits: int = 0
+    fields_filled: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self, cost: float) -> Dict[str, Any]:
+        return {
+            'cost_per_symbol': cost,
+            'routed': self.routed,
+            'hits': self.hits,
+            'hit_rate': round(self.hits / self.routed, 3) if self.routed else None,
+            'fields_filled': self.fields_filled,
+            'est_requests': round(cost * self.routed, 1),
+            'seconds': round(self.seconds, 2),
+        }
+
+
+def _fill_missing(dst: Dict[str, Any], src: Dict[str, Any]) -> None:
+    """Copy values from src into dst only where dst has nothing (None/blank)."""
+    for key, val in src.items():
+        if val is None or (isinstance(val, str) and val == ''):
+            continue
+        cur = dst.get(key)
+        if isinstance(cur, dict) and isinstance(val, dict):
+            _fill_missing(cur, val)
+        elif cur is None or (isinstance(cur, str) and cur == ''):
+            dst[key] = val
+
+
+class TieredFetchPlanner:
+    """Route each symbol to the cheapest tier that can fill its missing required fields.
+
+    Tiers run in ascending cost; after each one the remaining gaps are recomputed,
+    so a symbol only reaches an expensive tier when every cheaper tier that could
+    have supplied its missing fields came back empty.
+    """
+
+    def __init__(self, tiers: List[FetchTier], required_fields: Iterable[str], excluded: Optional[set] = None):
+        self.tiers = sorted(tiers, key=lambda t: t.cost)
+        self.required = frozenset(required_fields)
+        self.excluded = excluded if excluded is not None else set()
+        self.stats: Dict[str, TierStats] = {t.name: TierStats() for t in self.tiers}
+
+    def missing(self, payload: Optional[Dict[str, Any]]) -> set:
+        if not payload:
+            return set(self.required)
+        return {f for f in self.required if payload.get(f) is None or payload.get(f) == ''}
+
+    def run(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        payloads: Dict[str, Dict[str, Any]] = {}
+        for tier in self.tiers:
+            routed = []
+            for sym in symbols:
+                if sym in self.excluded:
+                    continue
+                gaps = self.missing(payloads.get(sym))
+                if gaps & tier.supplies and not (tier.requires & gaps):
+                    routed.append(sym)
+            if not routed:
+                continue
+            stats = self.stats[tier.name]
+            stats.routed += len(routed)
+            started = time.monotonic()
+            try:
+                results = tier.fetch(routed, payloads) or {}
+            except Exception as e:
+                logger.error(f"Fetch tier {tier.name} failed for {len(routed)} symbols: {e}")
+                results = {}
+            stats.seconds += time.monotonic() - started
+            for sym in routed:
+                fresh = results.get(sym)
+                if not fresh:
+                    continue
+                before = self.missing(payloads.get(sym))
+                if sym in payloads:
+                    _fill_missing(payloads[sym], fresh)
+                else:
+                    payloads[sym] = fresh
+                filled = len(before - self.missing(payloads[sym]))
+                if filled:
+                    stats.hits += 1
+                    stats.fields_filled += filled
+        return payloads
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        return {t.name: self.stats[t.name].as_dict(t.cost) for t in self.tiers}
+
+
 # --------------------------- Ticker universe load -------------------------- #
 
 def _import_list_from_latest_py(directory: str, pattern: str, var_name: str) -> List[str]:
@@ -391,6 +528,19 @@ def compute_vwap_1m(ticker: yf.Ticker) -> Optional[float]:
 # ------------------------------ Core scanning ------------------------------ #
 
 class StockScanner:
+    _PERSISTED_FIELDS = frozenset([
+        'symbol','company_name','name','exchange','current_price','days_low','days_high','days_range',
+        'volume','volume_today','avg_volume_3mon','dvav','market_cap','shares_available',
+        'pe_ratio','dividend_yield','one_year_target','week_52_low','week_52_high',
+        'earnings_per_share','book_value','price_to_book','bid_price','ask_price',
+        'bid_ask_spread','price_change_today','price_change_week','price_change_month',
+        'price_change_year','change_percent','market_cap_change_3mon','pe_change_3mon'
+    ])
+    # Fields a symbol must have before the tiered planner stops routing it to costlier tiers
+    _TIER_REQUIRED_FIELDS = frozenset(['current_price', 'volume', 'change_percent', 'market_cap', 'avg_volume_3mon'])
+    # The v7 quote endpoint answers all of them in one request per 100 symbols
+    _TIER_QUOTE_FIELDS = _TIER_REQUIRED_FIELDS
+
     def __init__(
         self,
         threads: int = 10,
@@ -404,6 +554,7 @@ class StockScanner:
         self.use_proxies = use_proxies
         self.proxy_mgr = ProxyManager(load_proxies(proxy_file) if use_proxies else [])
         self.rate_limited: List[str] = []
+        self._non_equity: set[str] = set()
         self.results: List[Dict[str, Any]] = []
         self._earnings_cache: Dict[str, Optional[datetime]] = {}
         self.db_enabled = db_enabled and DJANGO_AVAILABLE
@@ -461,144 +612,57 @@ class StockScanner:
             self._no_proxy_session = None
 
     # ------------------------- Batch quote (v7) pipeline ------------------------- #
+    _EQUITY_QUOTE_TYPES = ('EQUITY', 'COMMONSTOCK', 'COMMON_STOCK')
+
     def _map_quote_to_payload(self, q: Dict[str, Any], symbol_hint: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """Map Yahoo v7 quote JSON to our Stock payload shape (fast, yfinance-only)."""
         if not isinstance(q, dict):
             return None
-        try:
-            symbol = str(q.get('symbol') or symbol_hint or '').strip().upper()
-            if not symbol:
-                return None
-            # Filter non-equities if quoteType present
-            qtype = str(q.get('quoteType') or '').upper()
-            if qtype and qtype not in ('EQUITY', 'COMMONSTOCK', 'COMMON_STOCK'):
-                return None
-
-            # Core numerics
-            def _get_num(keys: List[str]) -> Optional[float]:
-                for k in keys:
-                    v = q.get(k)
-                    if v is not None:
-                        try:
-                            f = float(v)
-                            if math.isfinite(f):
-                                return f
-                        except Exception:
-                            continue
-                return None
-
-            current_price = _get_num(['regularMarketPrice', 'postMarketPrice', 'preMarketPrice'])
-            prev_close = _get_num(['regularMarketPreviousClose', 'previousClose'])
-            price_change_today = None
-            change_percent = None
-            if current_price is not None and prev_close not in (None, 0):
-                try:
-                    price_change_today = current_price - float(prev_close)
-                    change_percent = (price_change_today / float(prev_close)) * 100.0
-                except Exception:
-                    price_change_today = None
-                    change_percent = None
-
-            days_low = _get_num(['regularMarketDayLow'])
-            days_high = _get_num(['regularMarketDayHigh'])
-            days_range = None
-            if days_low is not None and days_high is not None:
-                try:
-                    days_range = f"{days_low:.2f} - {days_high:.2f}"
-                except Exception:
-                    days_range = None
-
-            volume = _get_num(['regularMarketVolume'])
-            avg_volume_3mon = _get_num(['threeMonthAverageVolume']) or _get_num(['tenDayAverageVolume'])
-            dvav = None
-            if volume is not None and avg_volume_3mon not in (None, 0):
-                try:
-                    dvav = float(volume) / float(avg_volume_3mon)
-                except Exception:
-                    dvav = None
-
-            market_cap = _get_num(['marketCap'])
-            shares_available = _get_num(['sharesOutstanding', 'shares'])
-            if market_cap is None and current_price is not None and shares_available is not None:
-                try:
-                    market_cap = float(current_price) * float(shares_available)
-                except Exception:
-                    pass
-
-            wk_low = _get_num(['fiftyTwoWeekLow', 'yearLow'])
-            wk_high = _get_num(['fiftyTwoWeekHigh', 'yearHigh'])
-            eps = _get_num(['epsTrailingTwelveMonths', 'trailingEps'])
-            pe_ratio = _get_num(['trailingPE'])
-            if pe_ratio is None and current_price is not None and eps not in (None, 0):
-                try:
-                    pe_ratio = float(current_price) / float(eps)
-                except Exception:
-                    pe_ratio = None
-
-            book_value = _get_num(['bookValue'])
-            price_to_book = _get_num(['priceToBook'])
-            if price_to_book is None and current_price is not None and book_value not in (None, 0):
-                try:
-                    price_to_book = float(current_price) / float(book_value)
-                except Exception:
-                    price_to_book = None
-
-            bid_price = _get_num(['bid'])
-            ask_price = _get_num(['ask'])
-            bid_ask_spread = None
-            if bid_price is not None and ask_price is not None:
-                try:
-                    bid_ask_spread = f"{bid_price:.2f} - {ask_price:.2f}"
-                except Exception:
-                    bid_ask_spread = None
-
-            # Dividend yield handling (ensure percentage)
-            dividend_yield = _get_num(['trailingAnnualDividendYield', 'dividendYield'])
-            if dividend_yield is not None and dividend_yield < 1.0:
-                dividend_yield = dividend_yield * 100.0
-
-            one_year_target = _get_num(['targetMeanPrice'])
+        if symbol_hint and not q.get('symbol'):
+            q = dict(q, symbol=symbol_hint)
+        payloads = self._map_quotes_to_payloads([q])
+        return payloads[0] if payloads else None
 
-            company_name = q.get('longName') or q.get('shortName') or symbol
-            exchange = q.get('fullExchangeName') or q.get('exchange') or 'NASDAQ'
+    def _map_quotes_to_payloads(self, quotes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Columnar version of _map_quote_to_payload for a whole quote response.
 
-            payload: Dict[str, Any] = {
-                'ticker': symbol,
-                'symbol': symbol,
-                'company_name': company_name,
-                'name': company_name,
-                'exchange': exchange,
-                'current_price': safe_decimal(current_price),
-                'days_low': safe_decimal(days_low),
-                'days_high': safe_decimal(days_high),
-                'days_range': days_range or '',
-                'volume': int(volume) if volume is not None else None,
-                'volume_today': int(volume) if volume is not None else None,
-                'avg_volume_3mon': int(avg_volume_3mon) if avg_volume_3mon is not None else None,
-                'dvav': safe_decimal(dvav),
-                'market_cap': int(market_cap) if market_cap is not None else None,
-                'shares_available': int(shares_available) if shares_available is not None else None,
-                'pe_ratio': safe_decimal(pe_ratio),
-                'dividend_yield': safe_decimal(dividend_yield),
-                'one_year_target': safe_decimal(one_year_target),
-                'week_52_low': safe_decimal(wk_low),
-                'week_52_high': safe_decimal(wk_high),
-                'earnings_per_share': safe_decimal(eps),
-                'book_value': safe_decimal(book_value),
-                'price_to_book': safe_decimal(price_to_book),
-                'bid_price': safe_decimal(bid_price),
-                'ask_price': safe_decimal(ask_price),
-                'bid_ask_spread': bid_ask_spread or '',
-                'price_change_today': safe_decimal(price_change_today),
-                'price_change_week': None,
-                'price_change_month': None,
-                'price_change_year': None,
-                'change_percent': safe_decimal(change_percent),
-                'market_cap_change_3mon': None,
-                'pe_change_3mon': None,
-                'last_updated': (django_timezone.now() if django_timezone else datetime.now(timezone.utc)),
-                'created_at': (django_timezone.now() if django_timezone else datetime.now(timezone.utc)),
-            }
+        Non-equities are dropped (and remembered in _non_equity); the numeric work
+        runs once per column via stock_retrieval.columnar_transform.
+        """
+        equities: List[Dict[str, Any]] = []
+        for q in quotes:
+            if not isinstance(q, dict):
+                continue
+            symbol = str(q.get('symbol') or '').strip().upper()
+            if not symbol:
+                continue
+            qtype = str(q.get('quoteType') or '').upper()
+            if qtype and qtype not in self._EQUITY_QUOTE_TYPES:
+                # Answered but not an equity: no deeper tier should spend requests on it
+                self._non_equity.add(symbol)
+                continue
+            equities.append(q)
+        if not equities:
+            return []
+        try:
+            table = transform_quotes(equities, spec=QUOTE_SPEC).finalize()
+            now = django_timezone.now() if django_timezone else datetime.now(timezone.utc)
+            rows = table.to_rows(now)
+        except Exception as e:
+            logger.error(f"Quote transform failed for {len(equities)} quotes: {e}")
+            return []
+
+        market_cap = table.column('market_cap')
+        dvav = table.column('dvav')
+        dollar_volume = table.column('current_price') * table.column('volume')
+        large_cap = (market_cap >= 10_000_000_000).tolist()
+        high_dvav = (dvav >= 2.0).tolist()
+        has_dvav = (~np.isnan(dvav)).tolist()
+        dollars = [None if math.isnan(v) else v for v in dollar_volume.tolist()]
+        for i, payload in enumerate(rows):
+            for key in ('price_change_week', 'price_change_month', 'price_change_year',
+                        'market_cap_change_3mon', 'pe_change_3mon'):
+                payload.setdefault(key, None)
             # Analytics (minimal, keep shape compatible)
             payload['_analytics'] = {
                 'rsi14': None,
@@ -619,17 +683,15 @@ class StockScanner:
                 'days_to_cover': None,
                 'liquidity_score': None,
                 'flags': {
-                    'large_cap': (market_cap is not None and float(market_cap) >= 10_000_000_000),
-                    'high_dvav': (dvav is not None and float(dvav) >= 2.0) if dvav is not None else None,
+                    'large_cap': large_cap[i],
+                    'high_dvav': high_dvav[i] if has_dvav[i] else None,
                     'rsi_overbought': None,
                     'rsi_oversold': None,
                 },
-                'dollar_volume': (float(current_price) * float(volume)) if (current_price is not None and volume is not None) else None,
+                'dollar_volume': dollars[i],
                 'momentum_1m': None,
             }
-            return payload
-        except Exception:
-            return None
+        return rows
 
     def _batch_quote(self, symbols: List[str], session: Optional[object]) -> Dict[str, Dict[str, Any]]:
         """Fetch quote data for many tickers at once via yfinance's crumbless quote endpoint.
@@ -639,6 +701,7 @@ class StockScanner:
         if not symbols:
             return out
         # Build symbols param (Yahoo limit is generous, but we cap to ~250 per call upstream)
+        fetch_started = time.monotonic()
         try:
             url = 'https://query2.finance.yahoo.com/v7/finance/quote'
             data = None
@@ -707,21 +770,54 @@ class StockScanner:
                 except Exception as http_exc:
                     logger.error(f"Quote batch HTTP fallback failed for {len(symbols)} tickers: {http_exc}")
                     data = None
+            metrics.SCANNER_STAGE_SECONDS.observe(time.monotonic() - fetch_started, SCANNER_NAME, 'fetch')
             if not isinstance(data, dict):
+                metrics.SCANNER_ITEMS.inc(SCANNER_NAME, 'fetch', 'failed', amount=len(symbols))
                 return out
             results = []
             try:
                 results = data.get('quoteResponse', {}).get('result', []) or []
             except Exception:
                 results = data.get('result', []) or []
-            for q in results:
-                payload = self._map_quote_to_payload(q)
-                if payload and payload.get('symbol'):
+            with metrics.SCANNER_STAGE_SECONDS.time(SCANNER_NAME, 'transform'):
+                for payload in self._map_quotes_to_payloads(results):
                     out[payload['symbol']] = payload
+            metrics.SCANNER_ITEMS.inc(SCANNER_NAME, 'fetch', 'ok', amount=len(out))
+            metrics.SCANNER_ITEMS.inc(SCANNER_NAME, 'fetch', 'missing', amount=len(symbols) - len(out))
         except Exception as e:
             logger.error(f"Quote batch failed for {len(symbols)} tickers: {e}")
         return out
 
+    def _quote_chunk(self, chunk: List[str], max_attempts: int, min_interval: float = 0.0) -> Tuple[Dict[str, Dict[str, Any]], List[str], int]:
+        """Batch-quote one chunk, rotating proxies between attempts. Returns (collected, pending, rotations)."""
+        pending = [s for s in chunk if s not in self._non_equity]
+        collected: Dict[str, Dict[str, Any]] = {}
+        local_rotations = 0
+        attempt = 0
+        if self.use_proxies and self.proxy_mgr.proxies:
+            session: Optional[object] = self.proxy_mgr.rotate_and_get_session()
+            local_rotations += 1
+        else:
+            session = self._no_proxy_session
+        while pending and attempt < max_attempts:
+            if min_interval > 0:
+                time.sleep(min_interval)
+            request_started = time.monotonic()
+            batch_payloads = self._batch_quote(pending, session)
+            self.proxy_mgr.record_result(session, bool(batch_payloads), time.monotonic() - request_started)
+            if batch_payloads:
+                collected.update(batch_payloads)
+            pending = [s for s in pending if s not in collected and s not in self._non_equity]
+            if pending:
+                attempt += 1
+                if self.use_proxies and self.proxy_mgr.proxies:
+                    session = self.proxy_mgr.rotate_and_get_session()
+                    local_rotations += 1
+                else:
+                    session = self._no_proxy_session
+                time.sleep(min(0.5 + random.random(), 1.5))
+        return collected, pending, local_rotations
+
     # ------------------------- Batch download pipeline ------------------------- #
     def _download_chunk(self, symbols: List[str], session: Optional[object], timeout: int,
                         period: str = '5d', interval: str = '1d', actions: bool = True) -> Optional[pd.DataFrame]:
@@ -936,31 +1032,7 @@ class StockScanner:
                 progress_symbol_interval = default_symbol_progress
 
         def process_chunk(chunk: List[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str], int]:
-            pending = list(chunk)
-            collected: Dict[str, Dict[str, Any]] = {}
-            local_rotations = 0
-            attempt = 0
-            if self.use_proxies and self.proxy_mgr.proxies:
-                session: Optional[object] = self.proxy_mgr.rotate_and_get_session()
-                local_rotations += 1
-            else:
-                session = self._no_proxy_session
-            while pending and attempt < max_attempts:
-                if min_interval > 0:
-                    time.sleep(min_interval)
-                batch_payloads = self._batch_quote(pending, session)
-                if batch_payloads:
-                    collected.update(batch_payloads)
-                pending = [s for s in pending if s not in collected]
-                if pending:
-                    attempt += 1
-                    if self.use_proxies and self.proxy_mgr.proxies:
-                        session = self.proxy_mgr.rotate_and_get_session()
-                        local_rotations += 1
-                    else:
-                        session = self._no_proxy_session
-                    time.sleep(min(0.5 + random.random(), 1.5))
-            return collected, pending, local_rotations
+            return self._quote_chunk(chunk, max_attempts, min_interval)
 
         with ThreadPoolExecutor(max_workers=max_workers_cap) as ex:
             future_map = {ex.submit(process_chunk, ch): len(ch) for ch in chunks}
@@ -1287,7 +1359,10 @@ class StockScanner:
             'runtime_target_sec': self.batch_runtime_target_sec,
             'skipped_from_denylist': skipped_from_denylist,
             'deep_dive': deep_dive,
+            'proxy_scoreboard': self.proxy_mgr.scoreboard.summary(),
         }
+        self.proxy_mgr.scoreboard.flush()
+        self._refresh_breadth()
         include_payloads_env = str(os.environ.get('SCANNER_INCLUDE_PAYLOADS', '0')).lower()
         if include_payloads_env in ('1', 'true', 'yes'):
             stats['payloads'] = payloads
@@ -1438,6 +1513,40 @@ class StockScanner:
                 with ThreadPoolExecutor(max_workers=min(8, len(chunk))) as ex:
                     list(ex.map(work_shares, chunk))
 
+    def _persist_changes(self, payloads: Dict[str, Dict[str, Any]]) -> None:
+        """Write payloads through the shared delta writer and add price points for moved prices."""
+        from stock_retrieval.delta_writer import get_delta_writer
+
+        with metrics.SCANNER_STAGE_SECONDS.time(SCANNER_NAME, 'write'):
+            # Missing (None/'') values never overwrite stored data, as before
+            change_set = get_delta_writer().write(
+                {sym: {k: v for k, v in p.items() if k in self._PERSISTED_FIELDS} for sym, p in payloads.items()},
+                skip_empty=True,
+            )
+            moved = {
+                c.ticker: c.fields['current_price']
+                for c in change_set.touching('current_price')
+                if c.fields['current_price'] is not None
+            }
+            if moved:
+                try:
+                    stock_ids = dict(Stock.objects.filter(ticker__in=list(moved)).values_list('ticker', 'id'))
+                    StockPrice.objects.bulk_create(
+                        [StockPrice(stock_id=stock_ids[t], price=p) for t, p in moved.items() if t in stock_ids],
+                        batch_size=500,
+                    )
+                except Exception:
+                    pass
+        metrics.SCANNER_ITEMS.inc(SCANNER_NAME, 'write', 'ok', amount=len(payloads))
+
+    def _refresh_breadth(self) -> None:
+        """Rebuild the market breadth document once the run's writes are done."""
+        if not (self.db_enabled and Stock is not None):
+            return
+        from stocks.market_breadth import refresh_if_changed
+
+        refresh_if_changed()
+
     def _get_earnings_date(self, ticker: yf.Ticker, symbol: str) -> Optional[datetime]:
         if symbol in self._earnings_cache:
             return self._earnings_cache[symbol]
@@ -1468,9 +1577,6 @@ class StockScanner:
 
     def _fetch_symbol(self, symbol: str, idx: int) -> Tuple[str, Optional[Dict[str, Any]], bool]:
         """Return (symbol, data_dict_or_none, rate_limited)."""
-        # Close old DB connections only if Django is available
-        if self.db_enabled:
-            django_close_old_connections()
         session = None
         if self.use_proxies and self.proxy_mgr.proxies:
             # Round-robin session (curl_cffi preferred, fall back to requests)
@@ -1532,6 +1638,7 @@ class StockScanner:
                             return symbol, None, True
                         return symbol, None, False
                 elif is_rate_limit_error(e):
+                    self.proxy_mgr.record_result(session, False, rate_limited=True)
                     # rotate proxy and retry once
                     if self.use_proxies:
                         session = self.proxy_mgr.rotate_and_get_session()
@@ -1792,41 +1899,12 @@ class StockScanner:
             # Persist only when DB is enabled and Django is available
             if self.db_enabled and Stock is not None and StockPrice is not None:
                 try:
-                    stock, created = Stock.objects.get_or_create(ticker=symbol, defaults={
-                        'symbol': symbol,
-                        'company_name': payload['company_name'],
-                        'name': payload['name'],
-                        'exchange': payload['exchange']
-                    })
-                    # Update only non-null and non-empty values
-                    updatable_fields = [
-                        'company_name','name','exchange','current_price','days_low','days_high','days_range',
-                        'volume','volume_today','avg_volume_3mon','dvav','market_cap','shares_available',
-                        'pe_ratio','dividend_yield','one_year_target','week_52_low','week_52_high',
-                        'earnings_per_share','book_value','price_to_book','bid_price','ask_price',
-                        'bid_ask_spread','price_change_today','price_change_week','price_change_month',
-                        'price_change_year','change_percent','market_cap_change_3mon','pe_change_3mon'
-                    ]
-                    changed = False
-                    for f in updatable_fields:
-                        val = payload.get(f)
-                        if val is None:
-                            continue
-                        if isinstance(val, str) and val == '':
-                            continue
-                        # Assign
-                        setattr(stock, f, val)
-                        changed = True
-                    if changed:
-                        stock.last_updated = payload['last_updated']
-                        stock.save()
-                    if payload.get('current_price') is not None:
-                        try:
-                            StockPrice.objects.create(stock=stock, price=payload['current_price'])
-                        except Exception:
-                            pass
+                    self._persist_changes({symbol: payload})
                 except Exception as e:
                     logger.error(f"DB write failed for {symbol}: {e}")
+                finally:
+                    # Hand this worker thread's connection back to the pool between symbols
+                    django_close_old_connections()
 
             # Light-weight analytics for second pass aggregation
             analytics = {
@@ -1906,8 +1984,6 @@ class StockScanner:
     def scan(self, symbols: List[str], csv_out: Optional[str] = None) -> Dict[str, Any]:
         start = time.time()
         successes: Dict[str, Dict[str, Any]] = {}
-        failed_symbols: List[str] = []
-        rate_limited_failures: List[str] = []
         proxy_rotations = 0
         rate_limited_chunks = 0
 
@@ -1940,25 +2016,81 @@ class StockScanner:
         except Exception:
             min_interval = 0.0
 
-        def work(sym_idx: Tuple[int, str]) -> Tuple[str, Optional[Dict[str, Any]], bool]:
-            i, s = sym_idx
-            if min_interval > 0:
-                time.sleep(min_interval)
-            return self._fetch_symbol(s, i)
-
-        indices = list(enumerate(symbols))
-        with ThreadPoolExecutor(max_workers=max_workers_cap) as ex:
-            futures = [ex.submit(work, pair) for pair in indices]
-            for fut in as_completed(futures):
-                sym, payload, rate_limited = fut.result()
-                if payload is not None:
-                    successes[sym] = payload
+        # Tiers, cheapest first; each symbol only reaches the next tier for fields still missing
+        def quote_tier(batch: List[str], payloads: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+            nonlocal proxy_rotations, rate_limited_chunks
+            chunks = [batch[i:i + 100] for i in range(0, len(batch), 100)]
+            found: Dict[str, Dict[str, Any]] = {}
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers_cap, len(chunks)))) as ex:
+                for collected, pending, rotations in ex.map(lambda c: self._quote_chunk(c, 2, min_interval), chunks):
+                    found.update(collected)
+                    proxy_rotations += rotations
+                    if pending and not collected:
+                        rate_limited_chunks += 1
+            return found
+
+        def download_tier(batch: List[str], payloads: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+            nonlocal proxy_rotations, rate_limited_chunks
+            found: Dict[str, Dict[str, Any]] = {}
+            for i in range(0, len(batch), 50):
+                sub = batch[i:i + 50]
+                if self.use_proxies and self.proxy_mgr.proxies:
+                    session = self.proxy_mgr.rotate_and_get_session()
+                    proxy_rotations += 1
+                else:
+                    session = self._no_proxy_session
+                rows = self._build_rows_from_download(
+                    self._download_chunk(sub, session=session, timeout=self.timeout, period='5d', interval='1d', actions=False),
+                    sub,
+                )
+                if rows:
+                    found.update(rows)
                 else:
-                    failed_symbols.append(sym)
-                    if rate_limited:
-                        rate_limited_failures.append(sym)
-                if rate_limited:
                     rate_limited_chunks += 1
+            return found
+
+        target_complete = math.ceil(self.completeness_threshold * len(symbols))
+
+        def info_tier(batch: List[str], payloads: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+            complete_now = sum(1 for p in payloads.values() if self._is_complete(p))
+            if complete_now >= target_complete:
+                return {}
+            logger.info(f"Completeness {complete_now}/{len(symbols)} below target {target_complete}; fetching info for {len(batch)}...")
+            work_copies = {s: dict(payloads[s]) for s in batch if s in payloads}
+            self._fill_market_cap_via_info(list(work_copies), work_copies, target_complete - complete_now)
+            return work_copies
+
+        rate_limited_failures: List[str] = []
+
+        def deep_tier(batch: List[str], payloads: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+            nonlocal rate_limited_chunks
+            found: Dict[str, Dict[str, Any]] = {}
+
+            def work(sym_idx: Tuple[int, str]) -> Tuple[str, Optional[Dict[str, Any]], bool]:
+                i, s = sym_idx
+                if min_interval > 0:
+                    time.sleep(min_interval)
+                return self._fetch_symbol(s, i)
+
+            with ThreadPoolExecutor(max_workers=max_workers_cap) as ex:
+                for sym, payload, rate_limited in ex.map(work, enumerate(batch)):
+                    if payload is not None:
+                        found[sym] = payload
+                    elif rate_limited:
+                        rate_limited_failures.append(sym)
+                    if rate_limited:
+                        rate_limited_chunks += 1
+            return found
+
+        tiers = [
+            FetchTier('batch_quote', 0.01, self._TIER_QUOTE_FIELDS, quote_tier),
+            FetchTier('download', 0.02, frozenset({'current_price', 'volume', 'change_percent'}), download_tier),
+            FetchTier('deep', 3.0, self._TIER_REQUIRED_FIELDS, deep_tier),
+        ]
+        if target_complete > 0:
+            tiers.append(FetchTier('info', 1.0, frozenset({'market_cap'}), info_tier, requires=frozenset({'current_price'})))
+        planner = TieredFetchPlanner(tiers, self._TIER_REQUIRED_FIELDS, excluded=self._non_equity)
+        successes.update(planner.run(symbols))
 
         # Retry wave for rate-limited symbols using per-symbol path with rotation
         retry_success = 0
@@ -1968,20 +2100,16 @@ class StockScanner:
                 time.sleep(0.2 + random.random()*0.3)
                 return self._fetch_symbol(sym, 0)
             with ThreadPoolExecutor(max_workers=max_workers_cap) as ex:
-                futures = [ex.submit(retry_work, s) for s in rate_limited_failures]
-                new_failed: List[str] = []
-                for fut in as_completed(futures):
-                    sym, payload, rate_limited = fut.result()
+                for sym, payload, rate_limited in ex.map(retry_work, rate_limited_failures):
                     if payload is not None:
-                        before = len(successes)
-                        successes[sym] = payload
-                        retry_success += (len(successes) - before)
-                    else:
-                        new_failed.append(sym)
-                        if rate_limited:
-                            rate_limited_chunks += 1
-                # Merge remaining failures back
-                failed_symbols = [s for s in failed_symbols if s not in rate_limited_failures] + new_failed
+                        if sym in successes:
+                            _fill_missing(successes[sym], payload)
+                        else:
+                            successes[sym] = payload
+                            retry_success += 1
+                    elif rate_limited:
+                        rate_limited_chunks += 1
+        failed_symbols = [s for s in symbols if s not in successes]
 
         # Optional batch fill disabled by default; per request recommends only last-resort download
         # If still missing essentials, perform limited per-symbol history salvage (already in _fetch_symbol)
@@ -2006,14 +2134,6 @@ class StockScanner:
                 except Exception:
                     pass
 
-        # Ensure completeness threshold via targeted info calls (disabled by default)
-        target_complete = math.ceil(self.completeness_threshold * len(symbols))
-        complete_now = sum(1 for p in successes.values() if self._is_complete(p))
-        if complete_now < target_complete and target_complete > 0:
-            remaining = [s for s, p in successes.items() if not self._is_complete(p)]
-            logger.info(f"Completeness {complete_now}/{len(symbols)} below target {target_complete}; fetching info for {len(remaining)}...")
-            self._fill_market_cap_via_info(remaining, successes, target_complete)
-
         # Recompute dvav with updated volume/avg
         for s, p in successes.items():
             try:
@@ -2162,46 +2282,13 @@ class StockScanner:
         except Exception as e:
             logger.error(f"Deep-dive analysis failed: {e}")
 
-        # Persist to DB (mirror prior behavior) - update_or_create and add price point
+        # Persist to DB: only changed columns are written, price points only when the price moved
         if self.db_enabled and Stock is not None and StockPrice is not None:
             try:
-                for symbol, payload in successes.items():
-                    try:
-                        stock, created = Stock.objects.get_or_create(ticker=symbol, defaults={
-                            'symbol': symbol,
-                            'company_name': payload.get('company_name') or symbol,
-                            'name': payload.get('name') or symbol,
-                            'exchange': payload.get('exchange') or 'NASDAQ',
-                        })
-                        updatable_fields = [
-                            'company_name','name','exchange','current_price','days_low','days_high','days_range',
-                            'volume','volume_today','avg_volume_3mon','dvav','market_cap','shares_available',
-                            'pe_ratio','dividend_yield','one_year_target','week_52_low','week_52_high',
-                            'earnings_per_share','book_value','price_to_book','bid_price','ask_price',
-                            'bid_ask_spread','price_change_today','price_change_week','price_change_month',
-                            'price_change_year','change_percent','market_cap_change_3mon','pe_change_3mon'
-                        ]
-                        changed = False
-                        for f in updatable_fields:
-                            val = payload.get(f)
-                            if val is None:
-                                continue
-                            if isinstance(val, str) and val == '':
-                                continue
-                            setattr(stock, f, val)
-                            changed = True
-                        if changed:
-                            stock.last_updated = payload.get('last_updated') or (django_timezone.now() if django_timezone else datetime.now(timezone.utc))
-                            stock.save()
-                        if payload.get('current_price') is not None:
-                            try:
-                                StockPrice.objects.create(stock=stock, price=payload['current_price'])
-                            except Exception:
-                                pass
-                    except Exception as e:
-                        logger.error(f"DB write failed for {symbol}: {e}")
+                self._persist_changes(successes)
             except Exception as e:
                 logger.error(f"DB bulk write error: {e}")
+            self._refresh_breadth()
 
         duration = time.time() - start
         # Persist updated auto denylist (merge newly detected delisted symbols)
@@ -2213,11 +2300,19 @@ class StockScanner:
                     json.dump({'tickers': merged, 'count': len(merged)}, f, indent=2)
         except Exception:
             pass
+        self.proxy_mgr.scoreboard.flush()
+        tier_report = planner.report()
+        for name, stats in tier_report.items():
+            logger.info(
+                f"Tier {name}: routed={stats['routed']} hits={stats['hits']} hit_rate={stats['hit_rate']} "
+                f"fields_filled={stats['fields_filled']} est_requests={stats['est_requests']} seconds={stats['seconds']}"
+            )
         return {
             'total': len(symbols),
             'success': len(successes),
             'failed': (len(symbols) - len(successes)),
             'failed_symbols': failed_symbols,
+            'tiers': tier_report,
             'retried_success': retry_success,
             'rate_limited_chunks': rate_limited_chunks,
             'proxies_available': len(self.proxy_mgr.proxies) if self.use_proxies else 0,
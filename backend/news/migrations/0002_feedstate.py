@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.CharField(max_length=500, unique=True)),
+                ('etag', models.CharField(blank=True, max_length=255)),
+                ('last_modified', models.CharField(blank=True, max_length=64)),
+                ('last_status', models.IntegerField(blank=True, null=True)),
+                ('last_fetched', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
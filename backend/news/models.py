@@ -24,3 +24,14 @@ class NewsArticle(models.Model):
     
     def __str__(self):
         return self.title[:100]
+
+class FeedState(models.Model):
+    """HTTP validators from the last fetch of an RSS feed, for conditional GETs."""
+    url = models.CharField(max_length=500, unique=True)
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)
+    last_status = models.IntegerField(null=True, blank=True)
+    last_fetched = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.url
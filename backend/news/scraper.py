@@ -10,15 +10,93 @@ import time
 import logging
 import re
 import decimal
-from typing import List, Dict, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timezone
 from bs4 import BeautifulSoup
 import urllib.parse
 
+from stocks.text_analytics import COMMON_WORDS, KeywordMatcher, TickerUniverse
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Concurrency for feed fetching: overall workers and requests in flight per host
+FEED_WORKERS = 12
+PER_HOST_LIMIT = 4
+FEED_TIMEOUT = 10
+SAVE_BATCH_SIZE = 500
+
+# NewsSource name -> id, shared by scraper instances in this process
+_source_ids: Dict[str, int] = {}
+
+# Keyword groups for sentiment grading and impact scoring. All groups are
+# compiled into one matcher so each article is scanned once.
+SENTIMENT_KEYWORDS = {
+    # Strong positive indicators (A grade)
+    'strong_positive': [
+        'beat', 'surge', 'soar', 'jump', 'rally', 'bullish', 'breakout', 'record high',
+        'earnings beat', 'revenue beat', 'guidance raise', 'upgrade', 'buy rating',
+        'positive outlook', 'strong growth', 'profit increase', 'dividend increase',
+        'stock split', 'buyback', 'acquisition', 'merger', 'partnership', 'positive',
+        'strong', 'solid', 'recovery', 'bounce', 'optimistic', 'favorable', 'support'
+    ],
+    # Moderate positive indicators (B grade)
+    'moderate_positive': [
+        'up', 'gain', 'rise', 'growth', 'profit', 'earnings', 'revenue',
+        'improve', 'better', 'stable', 'recovery', 'bounce', 'buy', 'hold', 'outperform',
+        'positive', 'strong', 'solid', 'stable', 'recovery', 'bounce', 'optimistic'
+    ],
+    # Neutral indicators (C grade)
+    'neutral': [
+        'maintain', 'stable', 'steady', 'unchanged', 'hold', 'neutral', 'mixed',
+        'balance', 'consistent', 'flat', 'sideways', 'maintain', 'report', 'announce'
+    ],
+    # Moderate negative indicators (D grade)
+    'moderate_negative': [
+        'down', 'fall', 'decline', 'drop', 'negative', 'weak', 'lower', 'reduce',
+        'decrease', 'loss', 'miss', 'disappoint', 'concern', 'risk', 'sell',
+        'underperform', 'downgrade', 'cut', 'reduce', 'negative', 'weak', 'lower'
+    ],
+    # Strong negative indicators (F grade)
+    'strong_negative': [
+        'crash', 'plunge', 'collapse', 'bearish', 'breakdown', 'record low',
+        'earnings miss', 'revenue miss', 'guidance cut', 'downgrade', 'sell rating',
+        'negative outlook', 'weak growth', 'loss increase', 'dividend cut',
+        'bankruptcy', 'delisting', 'fraud', 'scandal', 'investigation', 'crash',
+        'plunge', 'collapse', 'bearish', 'breakdown', 'record low'
+    ],
+}
+
+IMPACT_KEYWORDS = {
+    # High impact indicators
+    'high_impact': [
+        'breaking', 'urgent', 'exclusive', 'just in', 'live', 'developing',
+        'earnings', 'revenue', 'guidance', 'upgrade', 'downgrade', 'buy', 'sell',
+        'merger', 'acquisition', 'bankruptcy', 'fraud', 'investigation', 'lawsuit',
+        'federal', 'sec', 'regulatory', 'government', 'president', 'fed', 'federal reserve'
+    ],
+    # Medium impact indicators
+    'medium_impact': [
+        'report', 'announce', 'release', 'update', 'change', 'plan', 'strategy',
+        'expansion', 'restructuring', 'layoff', 'hire', 'appointment', 'resignation',
+        'partnership', 'deal', 'agreement', 'contract', 'launch', 'product', 'service'
+    ],
+}
+
+_TEXT_MATCHER = KeywordMatcher({**SENTIMENT_KEYWORDS, **IMPACT_KEYWORDS})
+_ticker_universe: Optional[TickerUniverse] = None
+
+
+def _shared_universe(fallback: List[str]) -> TickerUniverse:
+    global _ticker_universe
+    if _ticker_universe is None:
+        _ticker_universe = TickerUniverse(fallback=fallback)
+    return _ticker_universe
+
+
 class YahooFinanceNewsScraper:
     """Multi-source news scraper (still named for compatibility)"""
     
@@ -33,6 +111,13 @@ class YahooFinanceNewsScraper:
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
         })
+        # Conditional GET validators per feed URL: {'etag': ..., 'last_modified': ...}
+        self.feed_state: Dict[str, Dict[str, str]] = {}
+        self._feed_state_loaded = False
+        self._feed_state_dirty = set()
+        self._thread_local = threading.local()
+        self._host_limits: Dict[str, threading.Semaphore] = {}
+        self._host_lock = threading.Lock()
         
         # Yahoo Finance RSS feeds
         self.yahoo_feeds = [
@@ -75,100 +160,44 @@ class YahooFinanceNewsScraper:
             'AVGO', 'MRK', 'WMT', 'ACN', 'DHR', 'NEE', 'LLY', 'UNP', 'RTX', 'HON', 'QCOM',
             'LMT', 'BMY', 'TXN', 'AMGN', 'PM', 'ORCL', 'ADBE', 'CRM', 'PYPL', 'INTC', 'CSCO'
         ]
+        # Full ticker universe from Stock; major_tickers only when the DB is unavailable
+        self._universe = _shared_universe(self.major_tickers)
     
     def extract_tickers(self, text: str) -> List[str]:
-        """Enhanced ticker extraction with major stock focus"""
-        tickers = set()
-        
-        # Enhanced patterns
-        patterns = [
-            r'\$([A-Z]{1,5})',  # $AAPL
-            r'\b([A-Z]{1,5})\b',  # AAPL
-            r'\b([A-Z]{1,5})\.(?:TO|V|N|O|PK)\b',  # Canadian/International
-            r'\b([A-Z]{1,5})\.(?:NASDAQ|NYSE|AMEX)\b',  # Exchange specific
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text.upper())
-            for match in matches:
-                ticker = match if isinstance(match, str) else match[0]
-                if ticker and len(ticker) <= 5 and ticker.isalpha():
-                    # Filter out common words
-                    if ticker not in ['THE', 'AND', 'FOR', 'ARE', 'YOU', 'ALL', 'NEW', 'TOP', 'CEO', 'CFO', 'CTO', 'USA', 'FED', 'GDP']:
-                        tickers.add(ticker.upper())
-        
-        # Check for major tickers specifically
-        text_upper = text.upper()
-        for ticker in self.major_tickers:
-            if ticker in text_upper:
-                tickers.add(ticker)
-        
-        return list(tickers)
-    
-    def analyze_sentiment(self, text: str) -> Optional[float]:
-        """Enhanced sentiment analysis for stock price impact"""
-        text_lower = text.lower()
-        
-        # Strong positive indicators (A grade)
-        strong_positive = [
-            'beat', 'surge', 'soar', 'jump', 'rally', 'bullish', 'breakout', 'record high',
-            'earnings beat', 'revenue beat', 'guidance raise', 'upgrade', 'buy rating',
-            'positive outlook', 'strong growth', 'profit increase', 'dividend increase',
-            'stock split', 'buyback', 'acquisition', 'merger', 'partnership', 'positive',
-            'strong', 'solid', 'recovery', 'bounce', 'optimistic', 'favorable', 'support'
-        ]
-        
-        # Moderate positive indicators (B grade)
-        moderate_positive = [
-            'up', 'gain', 'rise', 'growth', 'profit', 'earnings', 'revenue',
-            'improve', 'better', 'stable', 'recovery', 'bounce', 'buy', 'hold', 'outperform',
-            'positive', 'strong', 'solid', 'stable', 'recovery', 'bounce', 'optimistic'
-        ]
-        
-        # Neutral indicators (C grade)
-        neutral_words = [
-            'maintain', 'stable', 'steady', 'unchanged', 'hold', 'neutral', 'mixed',
-            'balance', 'consistent', 'flat', 'sideways', 'maintain', 'report', 'announce'
-        ]
-        
-        # Moderate negative indicators (D grade)
-        moderate_negative = [
-            'down', 'fall', 'decline', 'drop', 'negative', 'weak', 'lower', 'reduce',
-            'decrease', 'loss', 'miss', 'disappoint', 'concern', 'risk', 'sell',
-            'underperform', 'downgrade', 'cut', 'reduce', 'negative', 'weak', 'lower'
-        ]
-        
-        # Strong negative indicators (F grade)
-        strong_negative = [
-            'crash', 'plunge', 'collapse', 'bearish', 'breakdown', 'record low',
-            'earnings miss', 'revenue miss', 'guidance cut', 'downgrade', 'sell rating',
-            'negative outlook', 'weak growth', 'loss increase', 'dividend cut',
-            'bankruptcy', 'delisting', 'fraud', 'scandal', 'investigation', 'crash',
-            'plunge', 'collapse', 'bearish', 'breakdown', 'record low'
-        ]
-        
-        # Count occurrences
-        strong_pos_count = sum(1 for word in strong_positive if word in text_lower)
-        moderate_pos_count = sum(1 for word in moderate_positive if word in text_lower)
-        neutral_count = sum(1 for word in neutral_words if word in text_lower)
-        moderate_neg_count = sum(1 for word in moderate_negative if word in text_lower)
-        strong_neg_count = sum(1 for word in strong_negative if word in text_lower)
-        
+        """Known tickers mentioned in the text (single regex pass, no DB queries)"""
+        return self._universe.extract(text, COMMON_WORDS)
+
+    def score_text(self, text: str) -> Dict:
+        """Sentiment score, grade and impact score from one keyword scan."""
+        counts = _TEXT_MATCHER.counts(text.lower())
+        sentiment = self._sentiment_from_counts(counts)
+        return {
+            'sentiment_score': sentiment,
+            'sentiment_grade': self._grade_for(sentiment),
+            'impact_score': self._impact_from_counts(counts),
+        }
+
+    @staticmethod
+    def _sentiment_from_counts(counts: Dict[str, int]) -> float:
+        strong_pos_count = counts['strong_positive']
+        moderate_pos_count = counts['moderate_positive']
+        neutral_count = counts['neutral']
+        moderate_neg_count = counts['moderate_negative']
+        strong_neg_count = counts['strong_negative']
+
         # Weighted scoring
         total_score = (strong_pos_count * 2) + moderate_pos_count - moderate_neg_count - (strong_neg_count * 2)
         total_words = strong_pos_count + moderate_pos_count + neutral_count + moderate_neg_count + strong_neg_count
-        
+
         if total_words == 0:
             return 0.0
-        
+
         # Normalize to -1 to 1 range
         sentiment = total_score / (total_words * 2)
         return round(max(-1.0, min(1.0, sentiment)), 4)
-    
-    def get_sentiment_grade(self, text: str) -> str:
-        """Get sentiment grade (A-F) based on stock price impact"""
-        sentiment = self.analyze_sentiment(text)
-        
+
+    @staticmethod
+    def _grade_for(sentiment: float) -> str:
         if sentiment >= 0.4:
             return 'A'  # Strong positive - likely to boost stock price
         elif sentiment >= 0.1:
@@ -179,30 +208,12 @@ class YahooFinanceNewsScraper:
             return 'D'  # Moderate negative - bad for stock price
         else:
             return 'F'  # Strong negative - likely to hurt stock price
-    
-    def get_impact_score(self, text: str) -> int:
-        """Get impact score (1-10) based on urgency and importance"""
-        text_lower = text.lower()
-        
-        # High impact indicators
-        high_impact = [
-            'breaking', 'urgent', 'exclusive', 'just in', 'live', 'developing',
-            'earnings', 'revenue', 'guidance', 'upgrade', 'downgrade', 'buy', 'sell',
-            'merger', 'acquisition', 'bankruptcy', 'fraud', 'investigation', 'lawsuit',
-            'federal', 'sec', 'regulatory', 'government', 'president', 'fed', 'federal reserve'
-        ]
-        
-        # Medium impact indicators
-        medium_impact = [
-            'report', 'announce', 'release', 'update', 'change', 'plan', 'strategy',
-            'expansion', 'restructuring', 'layoff', 'hire', 'appointment', 'resignation',
-            'partnership', 'deal', 'agreement', 'contract', 'launch', 'product', 'service'
-        ]
-        
-        # Count high impact words
-        high_count = sum(1 for word in high_impact if word in text_lower)
-        medium_count = sum(1 for word in medium_impact if word in text_lower)
-        
+
+    @staticmethod
+    def _impact_from_counts(counts: Dict[str, int]) -> int:
+        high_count = counts['high_impact']
+        medium_count = counts['medium_impact']
+
         # Calculate impact score (1-10)
         if high_count >= 3:
             return 10
@@ -218,185 +229,359 @@ class YahooFinanceNewsScraper:
             return 5
         else:
             return 4
+
+    def analyze_sentiment(self, text: str) -> Optional[float]:
+        """Enhanced sentiment analysis for stock price impact"""
+        return self._sentiment_from_counts(_TEXT_MATCHER.counts(text.lower()))
     
+    def get_sentiment_grade(self, text: str) -> str:
+        """Get sentiment grade (A-F) based on stock price impact"""
+        return self._grade_for(self.analyze_sentiment(text))
+    
+    def get_impact_score(self, text: str) -> int:
+        """Get impact score (1-10) based on urgency and importance"""
+        return self._impact_from_counts(_TEXT_MATCHER.counts(text.lower()))
+    
+    # ----- Feed fetching -----
+
+    def _http(self) -> requests.Session:
+        """Per-thread session sharing the scraper's headers."""
+        session = getattr(self._thread_local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.session.headers)
+            self._thread_local.session = session
+        return session
+
+    def _host_limit(self, feed_url: str) -> threading.Semaphore:
+        host = urllib.parse.urlsplit(feed_url).netloc
+        with self._host_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.Semaphore(PER_HOST_LIMIT)
+            return self._host_limits[host]
+
+    def _load_feed_state(self):
+        """Load stored ETag/Last-Modified validators (one query); scraper still works without Django."""
+        if self._feed_state_loaded:
+            return
+        self._feed_state_loaded = True
+        try:
+            from .models import FeedState
+            for row in FeedState.objects.values('url', 'etag', 'last_modified'):
+                self.feed_state.setdefault(row['url'], {'etag': row['etag'], 'last_modified': row['last_modified']})
+        except Exception as e:
+            logger.debug(f"Feed state unavailable, fetching feeds unconditionally: {e}")
+
+    def forget_feed_state(self, feed_urls):
+        """Drop pending validators so these feeds are fetched in full next run."""
+        for url in feed_urls:
+            if url in self._feed_state_dirty:
+                self._feed_state_dirty.discard(url)
+                self.feed_state.pop(url, None)
+
+    def save_feed_state(self):
+        """Persist validators changed since the last save.
+
+        Called once the fetched articles are stored: a validator saved
+        before its articles would turn the next fetch into a 304 and lose them.
+        """
+        if not self._feed_state_dirty:
+            return
+        try:
+            from django.utils import timezone as dj_timezone
+            from .models import FeedState
+            urls = list(self._feed_state_dirty)
+            existing = {f.url: f for f in FeedState.objects.filter(url__in=urls)}
+            now = dj_timezone.now()
+            to_create = []
+            for url in urls:
+                state = self.feed_state[url]
+                row = existing.get(url) or FeedState(url=url)
+                row.etag = state.get('etag', '')[:255]
+                row.last_modified = state.get('last_modified', '')[:64]
+                row.last_status = state.get('status')
+                row.last_fetched = now
+                if row.pk is None:
+                    to_create.append(row)
+            FeedState.objects.bulk_create(to_create, ignore_conflicts=True)
+            FeedState.objects.bulk_update(list(existing.values()), ['etag', 'last_modified', 'last_status', 'last_fetched'])
+            self._feed_state_dirty.clear()
+        except Exception as e:
+            logger.debug(f"Could not persist feed state: {e}")
+
+    def fetch_feed(self, feed_url: str) -> Tuple[int, Optional[bytes]]:
+        """Conditional GET of a feed. Returns (status, body); body is None on 304 or error."""
+        state = self.feed_state.get(feed_url, {})
+        headers = {}
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+        with self._host_limit(feed_url):
+            resp = self._http().get(feed_url, headers=headers, timeout=FEED_TIMEOUT)
+        new_state = {
+            'etag': resp.headers.get('ETag', state.get('etag', '')),
+            'last_modified': resp.headers.get('Last-Modified', state.get('last_modified', '')),
+            'status': resp.status_code,
+        }
+        if resp.status_code == 304:
+            self.feed_state[feed_url] = {**state, 'status': 304}
+            return 304, None
+        resp.raise_for_status()
+        self.feed_state[feed_url] = new_state
+        self._feed_state_dirty.add(feed_url)
+        return resp.status_code, resp.content
+
+    def parse_feed_entries(self, content, feed_url: str, source_label: str, limit: int = 50) -> List[Dict]:
+        """Turn raw feed XML into article dicts with tickers and sentiment."""
+        articles = []
+        feed = feedparser.parse(content)
+
+        for i, entry in enumerate(feed.entries[:limit]):
+            try:
+                # Extract basic info
+                title = entry.get('title', '').strip()
+                url = entry.get('link', '').strip()
+                summary = (entry.get('summary') or entry.get('description') or '').strip()
+
+                # Parse date
+                published_date = datetime.now(timezone.utc)
+                if hasattr(entry, 'published_parsed') and entry.published_parsed:
+                    published_date = datetime(*entry.published_parsed[:6], tzinfo=timezone.utc)
+
+                # Skip if missing essential info
+                if not title or not url:
+                    continue
+
+                # Analyze sentiment and extract tickers
+                full_text = f"{title} {summary}"
+                scores = self.score_text(full_text)
+                mentioned_tickers = self.extract_tickers(full_text)
+
+                article = {
+                    'title': title,
+                    'summary': summary,
+                    'url': url,
+                    'source': source_label,
+                    'published_date': published_date,
+                    'mentioned_tickers': ', '.join(mentioned_tickers),
+                    'sentiment_score': scores['sentiment_score'],
+                    'sentiment_grade': scores['sentiment_grade'],
+                    'impact_score': scores['impact_score'],
+                    'feed_url': feed_url
+                }
+
+                articles.append(article)
+
+            except Exception as e:
+                logger.error(f"Error processing RSS entry {i} from {feed_url}: {e}")
+                continue
+
+        return articles
+
     def scrape_generic_rss(self, feed_url: str, source_label: str, limit: int = 50) -> List[Dict]:
-        """Scrape a generic RSS feed and extract articles with tickers and sentiment."""
+        """Scrape a generic RSS feed and extract articles with tickers and sentiment.
+
+        Unchanged feeds (HTTP 304) return no articles.
+        """
         articles = []
-        
+        self._load_feed_state()
+
         try:
             logger.info(f"Scraping RSS feed: {feed_url}")
-            feed = feedparser.parse(feed_url)
-            
-            for i, entry in enumerate(feed.entries[:limit]):
-                try:
-                    # Extract basic info
-                    title = entry.get('title', '').strip()
-                    url = entry.get('link', '').strip()
-                    summary = (entry.get('summary') or entry.get('description') or '').strip()
-                    
-                    # Parse date
-                    published_date = datetime.now(timezone.utc)
-                    if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                        published_date = datetime(*entry.published_parsed[:6], tzinfo=timezone.utc)
-                    
-                    # Skip if missing essential info
-                    if not title or not url:
-                        continue
-                    
-                    # Analyze sentiment and extract tickers
-                    full_text = f"{title} {summary}"
-                    sentiment_score = self.analyze_sentiment(full_text)
-                    sentiment_grade = self.get_sentiment_grade(full_text)
-                    mentioned_tickers = self.extract_tickers(full_text)
-                    impact_score = self.get_impact_score(full_text)
-                    
-                    article = {
-                        'title': title,
-                        'summary': summary,
-                        'url': url,
-                        'source': source_label,
-                        'published_date': published_date,
-                        'mentioned_tickers': ', '.join(mentioned_tickers),
-                        'sentiment_score': sentiment_score,
-                        'sentiment_grade': sentiment_grade,
-                        'impact_score': impact_score,
-                        'feed_url': feed_url
-                    }
-                    
-                    articles.append(article)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing Yahoo Finance RSS entry {i}: {e}")
-                    continue
-            
+            status, content = self.fetch_feed(feed_url)
+            if content is None:
+                logger.info(f"Feed not modified since last fetch: {feed_url}")
+                return articles
+            articles = self.parse_feed_entries(content, feed_url, source_label, limit)
             logger.info(f"Successfully scraped {len(articles)} articles from feed: {feed_url}")
-            
+
         except Exception as e:
             logger.error(f"Error scraping RSS feed {feed_url}: {e}")
-        
+
         return articles
-    
+
+    def scrape_feeds(self, feeds: List[Tuple[str, str]], limit_per_feed: int = 50) -> List[Dict]:
+        """Fetch (feed_url, source_label) pairs concurrently; results keep feed order, deduped by URL."""
+        if not feeds:
+            return []
+        self._load_feed_state()
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=min(FEED_WORKERS, len(feeds))) as pool:
+            results = list(pool.map(lambda f: self.scrape_generic_rss(f[0], f[1], limit_per_feed), feeds))
+
+        unique_articles: List[Dict] = []
+        seen_urls = set()
+        for articles in results:
+            for article in articles:
+                if article['url'] not in seen_urls:
+                    unique_articles.append(article)
+                    seen_urls.add(article['url'])
+        not_modified = sum(1 for url, _ in feeds if self.feed_state.get(url, {}).get('status') == 304)
+        logger.info(
+            f"Fetched {len(feeds)} feeds in {time.monotonic() - started:.2f}s "
+            f"({not_modified} not modified), {len(unique_articles)} unique articles"
+        )
+        return unique_articles
+
+    @staticmethod
+    def source_label(feed_url: str) -> str:
+        if 'yahoo' in feed_url:
+            return 'Yahoo Finance'
+        if 'reuters' in feed_url:
+            return 'Reuters'
+        if 'cnbc' in feed_url:
+            return 'CNBC'
+        if 'marketwatch' in feed_url:
+            return 'MarketWatch'
+        if 'ft.com' in feed_url:
+            return 'Financial Times'
+        return 'News'
+
     def scrape_all_yahoo_feeds(self, limit_per_feed: int = 50) -> List[Dict]:
         """Scrape Yahoo Finance RSS feeds"""
-        all_articles = []
-        
         logger.info(f"Starting Yahoo Finance news scraping from {len(self.yahoo_feeds)} feeds...")
-        
-        for feed_url in self.yahoo_feeds:
-            try:
-                articles = self.scrape_generic_rss(feed_url, 'Yahoo Finance', limit_per_feed)
-                all_articles.extend(articles)
-                time.sleep(1)  # Be respectful to servers
-            except Exception as e:
-                logger.error(f"Error scraping Yahoo Finance feed {feed_url}: {e}")
-                continue
-        
-        # Remove duplicates based on URL
-        unique_articles = []
-        seen_urls = set()
-        
-        for article in all_articles:
-            if article['url'] not in seen_urls:
-                unique_articles.append(article)
-                seen_urls.add(article['url'])
-        
+        unique_articles = self.scrape_feeds([(url, 'Yahoo Finance') for url in self.yahoo_feeds], limit_per_feed)
         logger.info(f"Total unique Yahoo Finance articles scraped: {len(unique_articles)}")
         return unique_articles
 
     def scrape_all_sources(self, limit_per_feed: int = 50, min_total: int = 200) -> List[Dict]:
         """Scrape multiple sources and return at least min_total unique articles if available."""
-        combined: List[Dict] = []
-        # Yahoo first
-        combined.extend(self.scrape_all_yahoo_feeds(limit_per_feed))
-        # Then extra feeds
-        for feed_url in self.extra_feeds:
-            try:
-                combined.extend(self.scrape_generic_rss(feed_url, 'Reuters' if 'reuters' in feed_url else (
-                    'CNBC' if 'cnbc' in feed_url else ('MarketWatch' if 'marketwatch' in feed_url else ('Financial Times' if 'ft.com' in feed_url else 'News'))
-                ), limit_per_feed))
-                time.sleep(1)
-            except Exception as e:
-                logger.error(f"Error scraping extra feed {feed_url}: {e}")
-                continue
-        # Dedupe by URL
-        seen = set()
-        unique_articles: List[Dict] = []
-        for a in combined:
-            u = a.get('url')
-            if not u or u in seen:
-                continue
-            seen.add(u)
-            unique_articles.append(a)
+        # Yahoo first, then extra feeds - all fetched in one concurrent pass
+        feeds = [(url, 'Yahoo Finance') for url in self.yahoo_feeds]
+        feeds += [(url, self.source_label(url)) for url in self.extra_feeds]
+        unique_articles = self.scrape_feeds(feeds, limit_per_feed)
         logger.info(f"Combined unique articles: {len(unique_articles)}")
-        # Trim if massive
+        # Trim if massive; feeds that lost articles are refetched in full next run
         if len(unique_articles) > min_total:
-            return unique_articles[:max(min_total, 500)]
+            kept = unique_articles[:max(min_total, 500)]
+            self.forget_feed_state({a.get('feed_url') for a in unique_articles[len(kept):]})
+            return kept
         return unique_articles
     
+    def _source_ids_for(self, articles: List[Dict]) -> Dict[str, int]:
+        """NewsSource ids for the batch's source labels, cached per process."""
+        from .models import NewsSource
+
+        homepages = {}
+        for a in articles:
+            parts = urllib.parse.urlsplit(a.get('feed_url') or 'https://finance.yahoo.com')
+            homepages.setdefault(a['source'], f"{parts.scheme}://{parts.netloc}")
+        missing = [name for name in homepages if name not in _source_ids]
+        if missing:
+            NewsSource.objects.bulk_create(
+                [NewsSource(name=name, url=homepages[name], is_active=True) for name in missing],
+                ignore_conflicts=True,
+            )
+            _source_ids.update(NewsSource.objects.filter(name__in=missing).values_list('name', 'id'))
+        return _source_ids
+
+    @staticmethod
+    def _sentiment_decimal(value) -> Optional[decimal.Decimal]:
+        """sentiment_score as a Decimal that fits its column (5 digits, 4 places), else None."""
+        if value is None:
+            return None
+        try:
+            value = decimal.Decimal(str(value)).quantize(decimal.Decimal('0.0001'))
+        except (ValueError, TypeError, decimal.InvalidOperation) as e:
+            logger.debug(f"Failed to convert sentiment score to Decimal: {e}")
+            return None
+        return value if abs(value) < 10 else None
+
+    @staticmethod
+    def _insert_articles(rows) -> Tuple[int, List]:
+        """Bulk insert one chunk, falling back to row by row; returns (inserted, failed rows)."""
+        from django.db import transaction
+        from .models import NewsArticle
+
+        try:
+            with transaction.atomic():
+                # Rows inserted concurrently by another run are ignored by the unique url index
+                NewsArticle.objects.bulk_create(rows, ignore_conflicts=True)
+            return len(rows), []
+        except Exception as e:
+            logger.warning(f"Article batch of {len(rows)} failed ({e}); retrying row by row")
+        inserted, failed = 0, []
+        for row in rows:
+            try:
+                with transaction.atomic():
+                    NewsArticle.objects.bulk_create([row], ignore_conflicts=True)
+                inserted += 1
+            except Exception as e:
+                logger.warning(f"Could not save article {row.url}: {e}")
+                failed.append(row)
+        return inserted, failed
+
     def save_to_database(self, articles: List[Dict]) -> int:
-        """Save articles to Django database"""
-        from django.utils import timezone
-        from .models import NewsArticle, NewsSource
-        
+        """Save articles to Django database
+
+        Each batch costs one url__in query for dedup and one bulk insert
+        (row by row if the batch fails); sources are resolved once per
+        process. Fields are clipped to their columns, and URLs too long for
+        the url column are skipped. Afterwards feed validators are saved for
+        every feed whose articles were all stored.
+        """
+        from .models import NewsArticle
+
+        url_max = NewsArticle._meta.get_field('url').max_length
         saved_count = 0
         skipped_count = 0
-        error_count = 0
-        
-        logger.info(f"Attempting to save {len(articles)} Yahoo Finance articles to database...")
-        
+        failed_feeds = set()
+
+        logger.info(f"Attempting to save {len(articles)} articles to database...")
+
+        # Validate required fields and drop in-batch duplicates
+        valid: Dict[str, Dict] = {}
         for i, article_data in enumerate(articles):
-            try:
-                # Validate required fields
-                if not article_data.get('title') or not article_data.get('url'):
-                    logger.warning(f"Skipping Yahoo Finance article {i}: Missing title or URL")
-                    skipped_count += 1
-                    continue
-                
-                # Check if article already exists
-                if NewsArticle.objects.filter(url=article_data['url']).exists():
+            if not article_data.get('title') or not article_data.get('url'):
+                logger.warning(f"Skipping article {i}: Missing title or URL")
+                skipped_count += 1
+                continue
+            if len(article_data['url']) > url_max:
+                logger.warning(f"Skipping article {i}: URL longer than {url_max} characters")
+                skipped_count += 1
+                failed_feeds.add(article_data.get('feed_url'))
+                continue
+            if article_data['url'] in valid:
+                skipped_count += 1
+                continue
+            valid[article_data['url']] = article_data
+        if not valid:
+            self.forget_feed_state(failed_feeds)
+            self.save_feed_state()
+            return 0
+
+        source_ids = self._source_ids_for(list(valid.values()))
+        urls = list(valid)
+        for start in range(0, len(urls), SAVE_BATCH_SIZE):
+            batch_urls = urls[start:start + SAVE_BATCH_SIZE]
+            existing = set(NewsArticle.objects.filter(url__in=batch_urls).values_list('url', flat=True))
+            new_articles = []
+            for url in batch_urls:
+                if url in existing:
                     skipped_count += 1
                     continue
-                
-                # Get or create news source
-                source, created = NewsSource.objects.get_or_create(
-                    name=article_data['source'],
-                    defaults={'url': 'https://finance.yahoo.com', 'is_active': True}
-                )
-                
-                # Ensure sentiment_score is a valid Decimal
-                sentiment_score = article_data.get('sentiment_score')
-                if sentiment_score is not None:
-                    try:
-                        from decimal import Decimal
-                        sentiment_score = Decimal(str(sentiment_score))
-                    except (ValueError, TypeError, decimal.InvalidOperation) as e:
-                        logger.debug(f"Failed to convert sentiment score to Decimal: {e}")
-                        sentiment_score = None
-                
-                # Create article
-                article = NewsArticle.objects.create(
+                article_data = valid[url]
+                new_articles.append(NewsArticle(
                     title=article_data['title'][:500],
                     summary=article_data.get('summary', '')[:1000],
-                    url=article_data['url'],
-                    source=article_data['source'],
-                    news_source=source,
+                    url=url,
+                    source=article_data['source'][:100],
+                    news_source_id=source_ids.get(article_data['source']),
                     published_date=article_data['published_date'],
                     published_at=article_data['published_date'],
-                    sentiment_score=sentiment_score,
-                    sentiment_grade=article_data.get('sentiment_grade', 'C'),
+                    sentiment_score=self._sentiment_decimal(article_data.get('sentiment_score')),
+                    sentiment_grade=(article_data.get('sentiment_grade') or 'C')[:1],
                     mentioned_tickers=article_data.get('mentioned_tickers', '')[:500]
-                )
-                
-                saved_count += 1
-                if saved_count % 10 == 0:
-                    logger.info(f"Saved {saved_count} Yahoo Finance articles so far...")
-                
-            except Exception as e:
-                logger.error(f"Error saving Yahoo Finance article {i}: {e}")
-                error_count += 1
-                continue
-        
-        logger.info(f"Database save complete: {saved_count} saved, {skipped_count} skipped, {error_count} errors")
+                ))
+            inserted, failed = self._insert_articles(new_articles)
+            saved_count += inserted
+            skipped_count += len(failed)
+            failed_feeds.update(valid[row.url].get('feed_url') for row in failed)
+
+        self.forget_feed_state(failed_feeds)
+        self.save_feed_state()
+        logger.info(f"Database save complete: {saved_count} saved, {skipped_count} skipped")
         return saved_count
 
 def run_yahoo_news_scraper():
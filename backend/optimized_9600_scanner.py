@@ -43,6 +43,8 @@ try:
 except Exception:
     yf_get_json = None
 
+from stock_retrieval.proxy_scoreboard import get_scoreboard
+
 # Django setup
 DJANGO_AVAILABLE = False
 try:
@@ -330,7 +332,10 @@ class BatchQuoteFetcher:
     def __init__(self, session_pool: SessionPool, config: ScannerConfig, proxies: List[str] = None):
         self.session_pool = session_pool
         self.config = config
-        self.proxies = proxies or []
+        # Shared persistent scoreboard orders proxies best-first and remembers cooldowns across runs
+        self.scoreboard = get_scoreboard()
+        self.scoreboard.register(proxies or [])
+        self.proxies = self.scoreboard.rank(proxies or [], include_unavailable=True)
         self._proxy_index = 0
         import threading
         self._proxy_lock = threading.Lock()
@@ -353,7 +358,7 @@ class BatchQuoteFetcher:
             while attempts < len(self.proxies):
                 proxy = self.proxies[self._proxy_index % len(self.proxies)]
                 self._proxy_index += 1
-                if proxy not in self._failed_proxies:
+                if proxy not in self._failed_proxies and self.scoreboard.is_available(proxy):
                     return proxy
                 attempts += 1
             return None  # All proxies failed
@@ -361,6 +366,7 @@ class BatchQuoteFetcher:
     def _mark_proxy_failed(self, proxy: str):
         """Mark a proxy as failed"""
         if proxy:
+            self.scoreboard.record_rate_limit(proxy)
             with self._proxy_lock:
                 self._failed_proxies.add(proxy)
 
@@ -400,6 +406,7 @@ class BatchQuoteFetcher:
                 if proxy:
                     download_kwargs['proxy'] = proxy
 
+                request_started = time.monotonic()
                 df = yf.download(**download_kwargs)
 
                 # No delay for maximum speed
@@ -487,6 +494,7 @@ class BatchQuoteFetcher:
 
                 if results:
                     self.stats['batches_succeeded'] += 1
+                    self.scoreboard.record_success(proxy, latency=time.monotonic() - request_started)
                     return results
 
             except Exception as e:
@@ -494,6 +502,8 @@ class BatchQuoteFetcher:
                     self.stats['rate_limits_hit'] += 1
                     # Mark proxy as failed on rate limit
                     self._mark_proxy_failed(proxy)
+                else:
+                    self.scoreboard.record_failure(proxy, reason=str(e)[:80])
 
                 if attempt < self.config.MAX_RETRIES + 1:  # Include no-proxy fallback
                     self.stats['total_retries'] += 1
@@ -660,65 +670,77 @@ class IndividualFetcher:
 
 # ==================== Database Writer ====================
 
+# Payload keys that differ from Stock model column names
+PAYLOAD_FIELD_ALIASES = {
+    'day_low': 'days_low',
+    'day_high': 'days_high',
+    'bid': 'bid_price',
+    'ask': 'ask_price',
+}
+
+
 def write_to_database(payloads: Dict[str, Dict[str, Any]]) -> Tuple[int, int]:
-    """Write payloads to database using update_or_create"""
+    """Write only changed columns through the shared delta writer; returns (created, updated)"""
     if not DJANGO_AVAILABLE or not Stock:
         logger.warning("Django not available, skipping database write")
         return 0, 0
 
-    created_count = 0
-    updated_count = 0
+    from stock_retrieval.delta_writer import get_delta_writer
+    from stocks.market_breadth import refresh_if_changed
 
-    for symbol, payload in payloads.items():
-        try:
-            close_old_connections()
-
-            # Prepare fields for Stock model
-            defaults = {
-                'company_name': payload.get('company_name', symbol)[:200],
-                'current_price': payload.get('current_price'),
-                'volume': payload.get('volume') or 0,
-                'market_cap': payload.get('market_cap') or 0,
-                'pe_ratio': payload.get('pe_ratio'),
-                'week_52_low': payload.get('week_52_low'),
-                'week_52_high': payload.get('week_52_high'),
-                'dividend_yield': payload.get('dividend_yield'),
-                'last_updated': payload.get('last_updated'),
-            }
+    close_old_connections()
 
-            # Add optional fields if they exist in payload
-            optional_fields = [
-                'day_low', 'day_high', 'bid', 'ask', 'avg_volume_3mon',
-                'shares_available', 'exchange', 'dvav', 'volume_today'
-            ]
-            for field in optional_fields:
-                if field in payload:
-                    defaults[field] = payload[field]
-
-            stock, created = Stock.objects.update_or_create(
-                symbol=symbol,
-                defaults=defaults
-            )
+    rows = {}
+    for symbol, payload in payloads.items():
+        # Prepare fields for Stock model
+        row = {
+            'symbol': symbol,
+            'company_name': (payload.get('company_name') or symbol)[:200],
+            'current_price': payload.get('current_price'),
+            'volume': payload.get('volume') or 0,
+            'market_cap': payload.get('market_cap') or 0,
+            'pe_ratio': payload.get('pe_ratio'),
+            'week_52_low': payload.get('week_52_low'),
+            'week_52_high': payload.get('week_52_high'),
+            'dividend_yield': payload.get('dividend_yield'),
+        }
 
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
+        # Add optional fields if they exist in payload
+        optional_fields = [
+            'day_low', 'day_high', 'bid', 'ask', 'avg_volume_3mon',
+            'shares_available', 'exchange', 'dvav', 'volume_today'
+        ]
+        for field in optional_fields:
+            if field in payload:
+                row[PAYLOAD_FIELD_ALIASES.get(field, field)] = payload[field]
+        rows[symbol] = row
 
-            # Create StockPrice record
-            if StockPrice and payload.get('current_price'):
-                try:
-                    StockPrice.objects.create(
-                        stock=stock,
-                        price=payload['current_price']
-                    )
-                except Exception:
-                    pass
+    try:
+        change_set = get_delta_writer().write(rows)
+    except Exception as e:
+        logger.error(f"DB delta write failed: {e}")
+        return 0, 0
 
+    # Create StockPrice records only where the price moved
+    moved = {
+        change.ticker: change.fields['current_price']
+        for change in change_set.touching('current_price')
+        if change.fields['current_price'] is not None
+    }
+    if StockPrice and moved:
+        try:
+            stock_ids = dict(Stock.objects.filter(ticker__in=list(moved)).values_list('ticker', 'id'))
+            StockPrice.objects.bulk_create(
+                [StockPrice(stock_id=stock_ids[t], price=p) for t, p in moved.items() if t in stock_ids],
+                batch_size=500,
+            )
         except Exception as e:
-            logger.debug(f"DB error for {symbol}: {e}")
+            logger.debug(f"StockPrice bulk insert failed: {e}")
 
-    return created_count, updated_count
+    # One write per scan, so the breadth document is rebuilt before the process exits
+    refresh_if_changed()
+    logger.info(f"DB delta write: {change_set.unchanged} unchanged rows skipped")
+    return len(change_set.created), len(change_set.updated)
 
 
 # ==================== Main Scanner ====================
@@ -735,9 +757,11 @@ class OptimizedScanner:
             proxy_file = os.path.join(os.path.dirname(__file__), self.config.PROXY_FILE)
             all_proxies = load_proxies(proxy_file)
             if all_proxies:
-                # Limit number of proxies to use
+                # Limit number of proxies to use, keeping the healthiest per the shared scoreboard
                 max_proxies = getattr(self.config, 'MAX_PROXIES_TO_USE', 500)
-                proxies = all_proxies[:max_proxies]
+                scoreboard = get_scoreboard()
+                scoreboard.register(all_proxies)
+                proxies = scoreboard.rank(all_proxies, include_unavailable=True)[:max_proxies]
                 logger.info(f"Loaded {len(proxies)} proxies from {self.config.PROXY_FILE} (of {len(all_proxies)} total)")
             else:
                 logger.warning("No proxies loaded, proceeding without proxies")
@@ -843,6 +867,8 @@ class OptimizedScanner:
         quality_met = success_ratio >= self.config.MIN_SUCCESS_RATIO
         runtime_met = total_time <= self.config.MAX_RUNTIME_SECONDS
 
+        self.batch_fetcher.scoreboard.flush()
+
         result = {
             'total_symbols': total_symbols,
             'success_count': success_count,
@@ -859,6 +885,7 @@ class OptimizedScanner:
             'runtime_target_met': runtime_met,
             'all_targets_met': quality_met and runtime_met,
             'batch_stats': self.batch_fetcher.stats,
+            'proxy_scoreboard': self.batch_fetcher.scoreboard.summary(),
             'failed_symbols': [s for s in symbols if s not in all_payloads][:100],  # First 100
         }
 
@@ -14,6 +14,7 @@ from typing import Any, Dict, Optional
 from .config import StockRetrievalConfig, build_config_from_args
 from .logging_utils import get_logger, setup_logging
 from .pipeline import run_pipeline
+from .proxy_scoreboard import ProxyValidator, get_scoreboard
 from .reporting import write_csv_summary, write_json_summary
 
 
@@ -112,6 +113,14 @@ def run_scheduler(
         config.schedule_interval_minutes,
     )
 
+    validator: Optional[ProxyValidator] = None
+    if config.use_proxies and config.proxy_validate_interval_seconds > 0:
+        validator = ProxyValidator(
+            get_scoreboard(config.proxy_scoreboard_path),
+            interval_seconds=config.proxy_validate_interval_seconds,
+        )
+        validator.start()
+
     while not _stop_requested:
         start = time.monotonic()
         run_once(
@@ -129,6 +138,9 @@ def run_scheduler(
             logger.info("Sleeping %.2f seconds before next run.", sleep_seconds)
             time.sleep(sleep_seconds)
 
+    if validator is not None:
+        validator.stop()
+
 
 def main(argv: Optional[list[str]] = None) -> int:
     args = parse_args(argv)
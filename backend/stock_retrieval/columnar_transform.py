@@ -0,0 +1,377 @@
+"""Columnar quote -> ``Stock`` row transform.
+
+Converting quotes one dict at a time with ``safe_decimal`` and per-field
+branching dominates ingestion CPU once batches reach tens of thousands of
+symbols. This module pulls every field of a batch into a float64 column once,
+does finite checks, unit normalisation and derived fields with NumPy, and only
+materialises Python values (``Decimal``/``int``/``str``) when emitting
+DB-ready rows.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .logging_utils import get_logger
+
+
+logger = get_logger(__name__)
+
+# Stock model column -> (max_digits, decimal_places)
+DECIMAL_COLUMNS: Dict[str, Tuple[int, int]] = {
+    "current_price": (15, 4),
+    "price_change": (15, 4),
+    "price_change_percent": (8, 4),
+    "price_change_today": (15, 4),
+    "price_change_week": (15, 4),
+    "price_change_month": (15, 4),
+    "price_change_year": (15, 4),
+    "change_percent": (8, 4),
+    "bid_price": (15, 4),
+    "ask_price": (15, 4),
+    "days_low": (15, 4),
+    "days_high": (15, 4),
+    "dvav": (8, 4),
+    "pe_ratio": (15, 6),
+    "dividend_yield": (8, 6),
+    "one_year_target": (15, 4),
+    "week_52_low": (15, 4),
+    "week_52_high": (15, 4),
+    "earnings_per_share": (15, 4),
+    "book_value": (15, 4),
+    "price_to_book": (8, 4),
+}
+
+INTEGER_COLUMNS = ("volume", "volume_today", "avg_volume_3mon", "shares_available", "market_cap")
+
+# Largest magnitude a BigIntegerField accepts, kept below 2**63 after float rounding
+_BIGINT_LIMIT = 9.0e18
+
+HISTORY_OFFSETS: Dict[str, int] = {
+    "price_change_today": 1,
+    "price_change_week": 5,
+    "price_change_month": 21,
+    "price_change_year": 252,
+}
+
+
+@dataclass(frozen=True)
+class SourceSpec:
+    """Where each numeric column comes from in a raw quote mapping.
+
+    ``fields`` lists source keys in priority order; the first finite value wins
+    (and, for columns in ``nonzero``, the first finite non-zero value).
+    ``derive_ratios`` fills market cap, P/E and P/B from price when missing.
+    """
+
+    fields: Mapping[str, Tuple[str, ...]]
+    nonzero: frozenset = frozenset()
+    derive_ratios: bool = True
+    exchange_keys: Tuple[str, ...] = ("fullExchangeName", "exchange")
+    default_exchange: Optional[str] = None
+
+
+# Yahoo v7 ``/finance/quote`` results
+QUOTE_SPEC = SourceSpec(
+    fields={
+        "current_price": ("regularMarketPrice", "postMarketPrice", "preMarketPrice"),
+        "previous_close": ("regularMarketPreviousClose", "previousClose"),
+        "days_low": ("regularMarketDayLow",),
+        "days_high": ("regularMarketDayHigh",),
+        "volume": ("regularMarketVolume",),
+        "avg_volume_3mon": ("threeMonthAverageVolume", "tenDayAverageVolume"),
+        "market_cap": ("marketCap",),
+        "shares_available": ("sharesOutstanding", "shares"),
+        "week_52_low": ("fiftyTwoWeekLow", "yearLow"),
+        "week_52_high": ("fiftyTwoWeekHigh", "yearHigh"),
+        "earnings_per_share": ("epsTrailingTwelveMonths", "trailingEps"),
+        "pe_ratio": ("trailingPE",),
+        "book_value": ("bookValue",),
+        "price_to_book": ("priceToBook",),
+        "bid_price": ("bid",),
+        "ask_price": ("ask",),
+        "dividend_yield": ("trailingAnnualDividendYield", "dividendYield"),
+        "one_year_target": ("targetMeanPrice",),
+    },
+    nonzero=frozenset({"avg_volume_3mon"}),
+    default_exchange="NASDAQ",
+)
+
+# yfinance ``Ticker.info`` dictionaries
+INFO_SPEC = SourceSpec(
+    fields={
+        "days_low": ("dayLow",),
+        "days_high": ("dayHigh",),
+        "volume": ("volume",),
+        "avg_volume_3mon": ("averageVolume",),
+        "market_cap": ("marketCap",),
+        "pe_ratio": ("trailingPE", "forwardPE", "priceToBook", "priceToSalesTrailing12Months"),
+        "dividend_yield": ("dividendYield", "fiveYearAvgDividendYield", "trailingAnnualDividendYield"),
+        "one_year_target": ("targetMeanPrice",),
+        "week_52_low": ("fiftyTwoWeekLow",),
+        "week_52_high": ("fiftyTwoWeekHigh",),
+        "earnings_per_share": ("trailingEps",),
+        "book_value": ("bookValue",),
+        "price_to_book": ("priceToBook",),
+        "bid_price": ("bid",),
+        "ask_price": ("ask",),
+    },
+    nonzero=frozenset({"pe_ratio"}),
+    derive_ratios=False,
+    exchange_keys=("exchange",),
+)
+
+
+def _as_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _gather(records: Sequence[Mapping[str, Any]], key: str) -> np.ndarray:
+    values = [record.get(key) for record in records]
+    try:
+        # None becomes NaN; numeric strings parse; anything else falls back below
+        column = np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        column = np.fromiter((_as_float(v) for v in values), dtype=np.float64, count=len(values))
+    column[~np.isfinite(column)] = np.nan
+    return column
+
+
+def _coalesce(records: Sequence[Mapping[str, Any]], keys: Sequence[str], nonzero: bool) -> np.ndarray:
+    out = np.full(len(records), np.nan)
+    for key in keys:
+        missing = np.isnan(out)
+        if nonzero:
+            missing |= out == 0
+        if not missing.any():
+            break
+        candidate = _gather(records, key)
+        usable = ~np.isnan(candidate)
+        if nonzero:
+            usable &= candidate != 0
+        out = np.where(missing & usable, candidate, out)
+    return out
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = numerator / denominator
+    result[~np.isfinite(result)] = np.nan
+    return result
+
+
+def _pair_text(low: np.ndarray, high: np.ndarray) -> List[str]:
+    both = (~np.isnan(low) & ~np.isnan(high)).tolist()
+    return [
+        f"{lo:.2f} - {hi:.2f}" if ok else ""
+        for lo, hi, ok in zip(low.tolist(), high.tolist(), both)
+    ]
+
+
+def history_changes(histories: Sequence[Any]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """Latest close and close-to-close deltas for each history frame.
+
+    Only the handful of lagged closes are pulled out per frame; the
+    differences are then computed for the whole batch at once.
+    """
+
+    n = len(histories)
+    latest = np.full(n, np.nan)
+    lagged = np.full((n, len(HISTORY_OFFSETS)), np.nan)
+    steps = list(HISTORY_OFFSETS.values())
+    for row, history in enumerate(histories):
+        if history is None or getattr(history, "empty", True):
+            continue
+        close = history.get("Close")
+        if close is None or close.empty:
+            continue
+        values = close.to_numpy(dtype=np.float64, na_value=np.nan)
+        latest[row] = values[-1]
+        for col, step in enumerate(steps):
+            if len(values) > step:
+                lagged[row, col] = values[-(step + 1)]
+
+    deltas = latest[:, None] - lagged
+    deltas[~np.isfinite(deltas)] = np.nan
+    changes = {name: deltas[:, col] for col, name in enumerate(HISTORY_OFFSETS)}
+    changes["change_percent"] = np.where(
+        np.isnan(changes["price_change_today"]),
+        np.nan,
+        _ratio(changes["price_change_today"], lagged[:, 0]) * 100.0,
+    )
+    return latest, changes
+
+
+@dataclass
+class QuoteTable:
+    """A batch of quotes as typed columns (float64 with NaN for missing)."""
+
+    symbols: List[str]
+    numeric: Dict[str, np.ndarray] = field(default_factory=dict)
+    text: Dict[str, List[Optional[str]]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def column(self, name: str) -> np.ndarray:
+        return self.numeric.get(name, np.full(len(self.symbols), np.nan))
+
+    def set_many(self, columns: Mapping[str, np.ndarray], *, only_missing: bool = False) -> None:
+        for name, values in columns.items():
+            if only_missing and name in self.numeric:
+                current = self.numeric[name]
+                self.numeric[name] = np.where(np.isnan(current), values, current)
+            else:
+                self.numeric[name] = values
+
+    def finalize(self) -> "QuoteTable":
+        """Derive dvav, spread and range and drop values the DB columns can't hold."""
+
+        price = self.column("current_price")
+        if "previous_close" in self.numeric:
+            prev = self.numeric.pop("previous_close")
+            change = np.where(prev != 0, price - prev, np.nan)
+            self.set_many(
+                {"price_change_today": change, "change_percent": _ratio(change, prev) * 100.0},
+                only_missing=True,
+            )
+
+        volume = self.column("volume")
+        self.numeric["volume_today"] = volume
+        self.numeric["dvav"] = _ratio(volume, self.column("avg_volume_3mon"))
+
+        # Yahoo reports yields as fractions on some endpoints and percents on others
+        dividend = self.column("dividend_yield")
+        self.numeric["dividend_yield"] = np.where((dividend > 0) & (dividend < 1), dividend * 100.0, dividend)
+
+        for name, (max_digits, places) in DECIMAL_COLUMNS.items():
+            if name in self.numeric:
+                values = np.round(self.numeric[name], places)
+                values[np.abs(values) >= 10.0 ** (max_digits - places)] = np.nan
+                self.numeric[name] = values
+        for name in INTEGER_COLUMNS:
+            if name in self.numeric:
+                values = np.trunc(self.numeric[name])
+                values[np.abs(values) >= _BIGINT_LIMIT] = np.nan
+                self.numeric[name] = values
+
+        self.text["days_range"] = _pair_text(self.column("days_low"), self.column("days_high"))
+        self.text["bid_ask_spread"] = _pair_text(self.column("bid_price"), self.column("ask_price"))
+        return self
+
+    def to_rows(self, timestamp: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Emit one ``Stock``-shaped dict per symbol, with Decimal/int/None values."""
+
+        timestamp = timestamp or datetime.now(timezone.utc)
+        names: List[str] = ["ticker", "symbol"]
+        columns: List[List[Any]] = [self.symbols, self.symbols]
+
+        for name, values in self.text.items():
+            names.append(name)
+            columns.append(values)
+        for name, values in self.numeric.items():
+            finite = ~np.isnan(values)
+            flags = finite.tolist()
+            if name in DECIMAL_COLUMNS:
+                places = DECIMAL_COLUMNS[name][1]
+                texts = np.char.mod(f"%.{places}f", np.where(finite, values, 0.0)).tolist()
+                converted = [Decimal(t) if ok else None for t, ok in zip(texts, flags)]
+            elif name in INTEGER_COLUMNS:
+                ints = np.where(finite, values, 0.0).astype(np.int64).tolist()
+                converted = [v if ok else None for v, ok in zip(ints, flags)]
+            else:
+                converted = [v if ok else None for v, ok in zip(values.tolist(), flags)]
+            names.append(name)
+            columns.append(converted)
+
+        rows = [dict(zip(names, values)) for values in zip(*columns)]
+        for row in rows:
+            row["last_updated"] = timestamp
+            row["created_at"] = timestamp
+        return rows
+
+
+def transform_quotes(
+    records: Sequence[Mapping[str, Any]],
+    *,
+    spec: SourceSpec = QUOTE_SPEC,
+    symbols: Optional[Sequence[str]] = None,
+    given: Optional[Mapping[str, Sequence[Optional[float]]]] = None,
+) -> QuoteTable:
+    """Build a :class:`QuoteTable` from raw quote/info mappings.
+
+    ``symbols`` defaults to each record's ``symbol``; ``given`` supplies columns
+    the caller already has (e.g. a separately derived ``current_price``), which
+    take precedence over ``spec``. Call :meth:`QuoteTable.finalize` (done by
+    :func:`quotes_to_rows`) before emitting rows.
+    """
+
+    if symbols is None:
+        symbols = [str(record.get("symbol") or "").strip().upper() for record in records]
+    table = QuoteTable(symbols=list(symbols))
+
+    for name, values in (given or {}).items():
+        column = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        column[~np.isfinite(column)] = np.nan
+        table.numeric[name] = column
+    for name, keys in spec.fields.items():
+        if name not in table.numeric:
+            table.numeric[name] = _coalesce(records, keys, name in spec.nonzero)
+
+    if spec.derive_ratios:
+        price = table.column("current_price")
+        market_cap = table.column("market_cap")
+        table.numeric["market_cap"] = np.where(
+            np.isnan(market_cap), price * table.column("shares_available"), market_cap
+        )
+        eps = table.column("earnings_per_share")
+        pe = table.column("pe_ratio")
+        table.numeric["pe_ratio"] = np.where(np.isnan(pe) & (eps != 0), _ratio(price, eps), pe)
+        book = table.column("book_value")
+        ptb = table.column("price_to_book")
+        table.numeric["price_to_book"] = np.where(np.isnan(ptb) & (book != 0), _ratio(price, book), ptb)
+
+    names = []
+    exchanges = []
+    for record, symbol in zip(records, table.symbols):
+        names.append(record.get("longName") or record.get("shortName") or symbol)
+        exchange = next((record.get(key) for key in spec.exchange_keys if record.get(key)), None)
+        exchanges.append(exchange or spec.default_exchange)
+    table.text["company_name"] = names
+    table.text["name"] = names
+    table.text["exchange"] = exchanges
+    return table
+
+
+def quotes_to_rows(
+    records: Sequence[Mapping[str, Any]],
+    *,
+    spec: SourceSpec = QUOTE_SPEC,
+    timestamp: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """One-call convenience: raw quotes in, DB-ready ``Stock`` rows out."""
+
+    if not records:
+        return []
+    return transform_quotes(records, spec=spec).finalize().to_rows(timestamp)
+
+
+__all__ = [
+    "DECIMAL_COLUMNS",
+    "INFO_SPEC",
+    "INTEGER_COLUMNS",
+    "QUOTE_SPEC",
+    "QuoteTable",
+    "SourceSpec",
+    "history_changes",
+    "quotes_to_rows",
+    "transform_quotes",
+]
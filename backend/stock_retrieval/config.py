@@ -13,6 +13,9 @@ BACKEND_ROOT = PACKAGE_ROOT.parent
 DEFAULT_LOG_DIR = Path(
     os.getenv("STOCK_RETRIEVAL_LOG_DIR", BACKEND_ROOT / "logs")
 )
+DEFAULT_PROXY_SCOREBOARD = Path(
+    os.getenv("STOCK_RETRIEVAL_PROXY_DB", BACKEND_ROOT / "data" / "proxy_scoreboard.sqlite3")
+)
 
 
 def _env_flag(name: str, default: bool) -> bool:
@@ -28,6 +31,10 @@ class StockRetrievalConfig:
 
     combined_ticker_dir: Path = BACKEND_ROOT / "data" / "combined"
     proxy_file: Path = BACKEND_ROOT / "working_proxies.json"
+    proxy_scoreboard_path: Path = DEFAULT_PROXY_SCOREBOARD
+    proxy_validate_interval_seconds: int = int(
+        os.getenv("STOCK_RETRIEVAL_PROXY_VALIDATE_SECONDS", "600")
+    )
     log_dir: Path = DEFAULT_LOG_DIR
     request_timeout: float = float(os.getenv("STOCK_RETRIEVAL_TIMEOUT", "8.0"))
     per_symbol_timeout: float = float(os.getenv("STOCK_RETRIEVAL_SYMBOL_TIMEOUT", "12.0"))
@@ -6,10 +6,12 @@ import math
 from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
-from typing import Any, Dict, Mapping, Optional
+from typing import Any, Dict, List, Mapping, Optional, Sequence
 
 import pandas as pd
 
+from .columnar_transform import INFO_SPEC, history_changes, transform_quotes
+
 
 PE_RATIO_FIELDS = (
     "trailingPE",
@@ -163,6 +165,33 @@ class StockPayload:
     data: Dict[str, Any]
 
 
+def build_stock_payloads(
+    *,
+    symbols: Sequence[str],
+    infos: Sequence[Optional[Mapping[str, Any]]],
+    histories: Sequence[Optional[pd.DataFrame]],
+    current_prices: Sequence[Optional[float]],
+    timestamp: datetime,
+) -> List[StockPayload]:
+    """Transform a whole batch of fetch results in one columnar pass."""
+
+    if not symbols:
+        return []
+    infos = [info or {} for info in infos]
+    table = transform_quotes(
+        infos,
+        spec=INFO_SPEC,
+        symbols=symbols,
+        given={"current_price": current_prices},
+    )
+    _, changes = history_changes(histories)
+    table.set_many(changes)
+    table.numeric["price_change"] = changes["price_change_today"]
+    table.numeric["price_change_percent"] = changes["change_percent"]
+    rows = table.finalize().to_rows(timestamp)
+    return [StockPayload(symbol=symbol, data=row) for symbol, row in zip(symbols, rows)]
+
+
 def build_stock_payload(
     *,
     symbol: str,
@@ -171,56 +200,19 @@ def build_stock_payload(
     current_price: Optional[float],
     timestamp: datetime,
 ) -> StockPayload:
-    info = info or {}
-    payload: Dict[str, Any] = {
-        "ticker": symbol,
-        "symbol": symbol,
-        "company_name": info.get("longName") or info.get("shortName") or symbol,
-        "name": info.get("longName") or info.get("shortName") or symbol,
-        "current_price": safe_decimal(current_price),
-        "price_change": None,
-        "price_change_percent": None,
-        "bid_price": safe_decimal(info.get("bid")) if info else None,
-        "ask_price": safe_decimal(info.get("ask")) if info else None,
-        "bid_ask_spread": "",
-        "days_range": "",
-        "days_low": safe_decimal(info.get("dayLow")),
-        "days_high": safe_decimal(info.get("dayHigh")),
-        "volume": safe_decimal(info.get("volume")),
-        "volume_today": safe_decimal(info.get("volume")),
-        "avg_volume_3mon": safe_decimal(info.get("averageVolume")),
-        "market_cap": safe_decimal(info.get("marketCap")),
-        "pe_ratio": safe_decimal(extract_pe_ratio(info)),
-        "dividend_yield": safe_decimal(extract_dividend_yield(info)),
-        "one_year_target": safe_decimal(info.get("targetMeanPrice")),
-        "week_52_low": safe_decimal(info.get("fiftyTwoWeekLow")),
-        "week_52_high": safe_decimal(info.get("fiftyTwoWeekHigh")),
-        "earnings_per_share": safe_decimal(info.get("trailingEps")),
-        "book_value": safe_decimal(info.get("bookValue")),
-        "price_to_book": safe_decimal(info.get("priceToBook")),
-        "exchange": info.get("exchange"),
-        "last_updated": timestamp,
-        "created_at": timestamp,
-    }
-
-    price_changes = compute_price_changes(history)
-    payload.update(price_changes)
-
-    if price_changes["price_change_today"] is not None:
-        payload["price_change"] = price_changes["price_change_today"]
-
-    if price_changes["change_percent"] is not None:
-        payload["price_change_percent"] = price_changes["change_percent"]
-
-    volume_ratio = compute_volume_ratio(payload["volume"], payload["avg_volume_3mon"])
-    payload["dvav"] = volume_ratio
-
-    return StockPayload(symbol=symbol, data=payload)
+    return build_stock_payloads(
+        symbols=[symbol],
+        infos=[info],
+        histories=[history],
+        current_prices=[current_price],
+        timestamp=timestamp,
+    )[0]
 
 
 __all__ = [
     "StockPayload",
     "build_stock_payload",
+    "build_stock_payloads",
     "compute_price_changes",
     "compute_volume_ratio",
     "extract_dividend_yield",
@@ -5,13 +5,15 @@ from __future__ import annotations
 import os
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import Iterable, List
+from typing import TYPE_CHECKING, Iterable, List, Optional
 
 import django
-from django.db import transaction
 
 from .logging_utils import get_logger
 
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from .delta_writer import StockChangeSet
+
 
 logger = get_logger(__name__)
 
@@ -52,7 +54,10 @@ def _coerce_int(value):
 class PersistenceSummary:
     saved: int = 0
     price_records: int = 0
+    changed: int = 0
+    unchanged: int = 0
     errors: List[str] = None
+    change_set: Optional["StockChangeSet"] = None
 
     def __post_init__(self) -> None:
         if self.errors is None:
@@ -61,6 +66,7 @@ class PersistenceSummary:
 
 def persist_payloads(payloads: Iterable["StockPayload"]) -> PersistenceSummary:
     from .data_transformer import StockPayload  # local import to avoid circular refs
+    from .delta_writer import get_delta_writer
 
     _ensure_django_ready()
 
@@ -74,30 +80,51 @@ def persist_payloads(payloads: Iterable["StockPayload"]) -> PersistenceSummary:
         "market_cap",
     }
 
+    rows = {}
     for payload in payloads:
         data = dict(payload.data)
 
         for field in integer_fields:
             data[field] = _coerce_int(data.get(field))
 
+        rows[payload.symbol] = data
+
+    if not rows:
+        return summary
+
+    try:
+        change_set = get_delta_writer().write(rows)
+    except Exception as exc:  # pragma: no cover - database failure path
+        logger.error("Failed to persist %s payloads: %s", len(rows), exc)
+        summary.errors.append(f"batch:{exc}")
+        return summary
+
+    summary.saved = len(rows)
+    summary.changed = len(change_set)
+    summary.unchanged = change_set.unchanged
+    summary.change_set = change_set
+
+    # Price history only grows when the price actually moved
+    moved = {
+        change.ticker: change.fields["current_price"]
+        for change in change_set.touching("current_price")
+        if change.fields["current_price"] is not None
+    }
+    if moved:
         try:
-            with transaction.atomic():
-                stock_obj, _ = Stock.objects.update_or_create(
-                    ticker=payload.symbol,
-                    defaults=data,
-                )
-
-                if data.get("current_price") is not None:
-                    StockPrice.objects.create(
-                        stock=stock_obj,
-                        price=data["current_price"],
-                    )
-                    summary.price_records += 1
-
-                summary.saved += 1
+            stock_ids = dict(
+                Stock.objects.filter(ticker__in=list(moved)).values_list("ticker", "id")
+            )
+            price_rows = [
+                StockPrice(stock_id=stock_ids[ticker], price=price)
+                for ticker, price in moved.items()
+                if ticker in stock_ids
+            ]
+            StockPrice.objects.bulk_create(price_rows, batch_size=500)
+            summary.price_records = len(price_rows)
         except Exception as exc:  # pragma: no cover - database failure path
-            logger.error("Failed to persist payload for %s: %s", payload.symbol, exc)
-            summary.errors.append(f"{payload.symbol}:{exc}")
+            logger.error("Failed to record %s price points: %s", len(moved), exc)
+            summary.errors.append(f"prices:{exc}")
 
     return summary
 
@@ -0,0 +1,305 @@
+"""Change-detecting ``Stock`` writer that only touches columns whose values moved."""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .db_writer import _ensure_django_ready
+from .logging_utils import get_logger
+
+
+logger = get_logger(__name__)
+
+# Sent after a write with ``change_set=StockChangeSet``; alerts, caches and push
+# streams can subscribe instead of re-reading the whole table.
+stock_changes_applied = Signal()
+
+_UNTRACKED_FIELDS = {"id", "created_at", "last_updated"}
+
+
+@dataclass
+class StockChange:
+    ticker: str
+    created: bool
+    fields: Dict[str, Any]
+    previous: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class StockChangeSet:
+    changes: Dict[str, StockChange] = field(default_factory=dict)
+    unchanged: int = 0
+    statements: int = 0
+    timestamp: Optional[datetime] = None
+    # Tickers whose rows the database rejected even when written on their own
+    failed: List[str] = field(default_factory=list)
+
+    @property
+    def created(self) -> List[str]:
+        return [ticker for ticker, change in self.changes.items() if change.created]
+
+    @property
+    def updated(self) -> List[str]:
+        return [ticker for ticker, change in self.changes.items() if not change.created]
+
+    def touching(self, *field_names: str) -> List[StockChange]:
+        """Changes that modified any of ``field_names`` (e.g. ``current_price``)."""
+
+        wanted = set(field_names)
+        return [change for change in self.changes.values() if wanted & change.fields.keys()]
+
+    def __len__(self) -> int:
+        return len(self.changes)
+
+
+class StockDeltaWriter:
+    """Diff incoming rows against the stored ones and emit column-level deltas.
+
+    The stored values are read at the start of every ``write`` (one query per
+    ``batch_size`` tickers) and dropped when it returns, so edits made by other
+    processes between ingestion runs are never masked by a stale copy.
+    Unchanged rows are skipped entirely; changed rows are written in batches of
+    ``batch_size`` as one ``UPDATE ... SET col = CASE ticker WHEN ... END`` per
+    batch, so write volume follows market activity rather than universe size.
+    """
+
+    def __init__(self, *, batch_size: int = 500) -> None:
+        _ensure_django_ready()
+        from stocks.models import Stock  # type: ignore
+
+        self.model = Stock
+        self.batch_size = batch_size
+        self.fields: Dict[str, models.Field] = {
+            f.name: f for f in Stock._meta.concrete_fields if f.name not in _UNTRACKED_FIELDS
+        }
+        self._lock = threading.Lock()
+
+    def _normalize(self, name: str, value: Any) -> Any:
+        model_field = self.fields[name]
+        if value is None:
+            # NOT NULL text columns store "missing" as blank
+            return "" if isinstance(model_field, models.CharField) and not model_field.null else None
+        try:
+            value = model_field.to_python(value)
+        except (ValidationError, InvalidOperation, TypeError, ValueError):
+            return None
+        if isinstance(model_field, models.DecimalField) and isinstance(value, Decimal):
+            if not value.is_finite():
+                return None
+            return self._fit_decimal(model_field, value)
+        if isinstance(value, str) and model_field.max_length:
+            return value[: model_field.max_length]
+        return value
+
+    @staticmethod
+    def _fit_decimal(model_field: models.DecimalField, value: Decimal) -> Optional[Decimal]:
+        """Quantize to the column's scale; out-of-range values become NULL (or are clamped if NOT NULL)."""
+
+        places = model_field.decimal_places
+        limit = Decimal(10) ** (model_field.max_digits - places) - Decimal(1).scaleb(-places)
+        if abs(value) <= limit:
+            try:
+                return value.quantize(Decimal(1).scaleb(-places))
+            except InvalidOperation:
+                pass
+        if model_field.null:
+            return None
+        return limit.copy_sign(value)
+
+    def _prepare(self, data: Mapping[str, Any], skip_empty: bool) -> Dict[str, Any]:
+        prepared: Dict[str, Any] = {}
+        for name, value in data.items():
+            if name not in self.fields or name == "ticker":
+                continue
+            if skip_empty and (value is None or value == ""):
+                continue
+            prepared[name] = self._normalize(name, value)
+        return prepared
+
+    def _load(self, tickers: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored values (ticker -> normalized fields) of the given tickers."""
+
+        tickers = list(tickers)
+        names = list(self.fields)
+        stored: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(tickers), self.batch_size):
+            chunk = tickers[start : start + self.batch_size]
+            for row in self.model.objects.filter(ticker__in=chunk).values(*names):
+                stored[row["ticker"]] = {
+                    name: self._normalize(name, row[name]) for name in names if name != "ticker"
+                }
+        return stored
+
+    def diff(
+        self,
+        rows: Mapping[str, Mapping[str, Any]],
+        *,
+        skip_empty: bool = False,
+    ) -> StockChangeSet:
+        """Compare ``rows`` (ticker -> field values) with the stored rows without writing.
+
+        With ``skip_empty`` a ``None``/blank value means "unknown" and never
+        overwrites a stored value.
+        """
+
+        change_set = StockChangeSet()
+        stored = self._load(rows.keys())
+        for ticker, data in rows.items():
+            prepared = self._prepare(data, skip_empty)
+            previous = stored.get(ticker)
+            if previous is None:
+                change_set.changes[ticker] = StockChange(ticker=ticker, created=True, fields=prepared)
+                continue
+            delta = {name: value for name, value in prepared.items() if previous.get(name) != value}
+            if delta:
+                change_set.changes[ticker] = StockChange(
+                    ticker=ticker,
+                    created=False,
+                    fields=delta,
+                    previous={name: previous.get(name) for name in delta},
+                )
+            else:
+                change_set.unchanged += 1
+        return change_set
+
+    def _create(self, changes: List[StockChange], timestamp: datetime) -> Dict[str, Dict[str, Any]]:
+        """Insert new tickers; returns the stored rows (ticker -> values) actually written.
+
+        ``ignore_conflicts`` skips tickers another writer inserted since the
+        stored rows were read, so the rows are read back and only those holding
+        the values supplied here count as created.
+        """
+        for change in changes:
+            data = dict(change.fields)
+            data["symbol"] = data.get("symbol") or change.ticker
+            data["company_name"] = data.get("company_name") or change.ticker
+            data["name"] = data.get("name") or data["company_name"]
+            change.fields = data
+        objects = [self.model(ticker=change.ticker, last_updated=timestamp, **change.fields) for change in changes]
+        self.model.objects.bulk_create(objects, batch_size=self.batch_size, ignore_conflicts=True)
+        names = list(self.fields)
+        stored = {
+            row["ticker"]: {name: self._normalize(name, row[name]) for name in names if name != "ticker"}
+            for row in self.model.objects.filter(ticker__in=[c.ticker for c in changes]).values(*names)
+        }
+        return {
+            change.ticker: stored[change.ticker]
+            for change in changes
+            if change.ticker in stored
+            and all(stored[change.ticker].get(name) == value for name, value in change.fields.items())
+        }
+
+    def _update(self, changes: List[StockChange], timestamp: datetime) -> int:
+        statements = 0
+        for start in range(0, len(changes), self.batch_size):
+            chunk = changes[start : start + self.batch_size]
+            columns = sorted({name for change in chunk for name in change.fields})
+            assignments: Dict[str, Any] = {}
+            for name in columns:
+                model_field = self.fields[name]
+                whens = [
+                    When(ticker=change.ticker, then=Value(change.fields[name], output_field=model_field))
+                    for change in chunk
+                    if name in change.fields
+                ]
+                assignments[name] = Case(*whens, default=F(name), output_field=model_field)
+            assignments["last_updated"] = Value(timestamp)
+            self.model.objects.filter(ticker__in=[change.ticker for change in chunk]).update(**assignments)
+            statements += 1
+        return statements
+
+    def _apply(self, changes: List[StockChange], timestamp: datetime, change_set: StockChangeSet) -> List[StockChange]:
+        created = [change for change in changes if change.created]
+        updated = [change for change in changes if not change.created]
+        with transaction.atomic():
+            stored = self._create(created, timestamp) if created else {}
+            if created:
+                change_set.statements += (len(created) + self.batch_size - 1) // self.batch_size + 1
+            if updated:
+                change_set.statements += self._update(updated, timestamp)
+        return [change for change in created if change.ticker in stored] + updated
+
+    def _write_split(self, changes: List[StockChange], timestamp: datetime, change_set: StockChangeSet) -> List[StockChange]:
+        """Write ``changes`` in one transaction; on error retry each half so one bad row only costs itself."""
+
+        try:
+            return self._apply(changes, timestamp, change_set)
+        except Exception as e:
+            if len(changes) == 1:
+                logger.warning("Stock write rejected for %s: %s", changes[0].ticker, e)
+                change_set.failed.append(changes[0].ticker)
+                return []
+            middle = len(changes) // 2
+            return (
+                self._write_split(changes[:middle], timestamp, change_set)
+                + self._write_split(changes[middle:], timestamp, change_set)
+            )
+
+    def write(
+        self,
+        rows: Mapping[str, Mapping[str, Any]],
+        *,
+        timestamp: Optional[datetime] = None,
+        skip_empty: bool = False,
+    ) -> StockChangeSet:
+        """Persist only the changed columns of ``rows`` and return the change-set."""
+
+        timestamp = timestamp or timezone.now()
+        with self._lock:
+            change_set = self.diff(rows, skip_empty=skip_empty)
+            change_set.timestamp = timestamp
+            if not change_set.changes:
+                return change_set
+
+            written = self._write_split(list(change_set.changes.values()), timestamp, change_set)
+            written_tickers = {change.ticker for change in written}
+            for ticker in list(change_set.changes):
+                if ticker not in written_tickers:
+                    # Rejected, or inserted concurrently by another writer
+                    del change_set.changes[ticker]
+            created = [change for change in written if change.created]
+            updated = [change for change in written if not change.created]
+
+        log = logger.info if len(rows) > 1 else logger.debug
+        log(
+            "Stock delta write: %s created | %s updated | %s unchanged | %s statements",
+            len(created),
+            len(updated),
+            change_set.unchanged,
+            change_set.statements,
+        )
+        stock_changes_applied.send(sender=self.__class__, change_set=change_set)
+        return change_set
+
+
+_shared_writer: Optional[StockDeltaWriter] = None
+_shared_lock = threading.Lock()
+
+
+def get_delta_writer() -> StockDeltaWriter:
+    """Process-wide writer, so concurrent ingestion threads take turns writing."""
+
+    global _shared_writer
+    with _shared_lock:
+        if _shared_writer is None:
+            _shared_writer = StockDeltaWriter()
+        return _shared_writer
+
+
+__all__ = [
+    "StockChange",
+    "StockChangeSet",
+    "StockDeltaWriter",
+    "get_delta_writer",
+    "stock_changes_applied",
+]
@@ -8,8 +8,10 @@ from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Dict, Iterable, List, Optional
 
+from utils import metrics
+
 from .config import StockRetrievalConfig
-from .data_transformer import StockPayload, build_stock_payload
+from .data_transformer import StockPayload, build_stock_payloads
 from .logging_utils import get_logger
 from .session_factory import ProxyPool
 from .yfinance_client import FetchResult, YFinanceFetcher
@@ -17,14 +19,24 @@ from .yfinance_client import FetchResult, YFinanceFetcher
 
 logger = get_logger(__name__)
 
+SCANNER_NAME = "stock_retrieval"
+
 
 @dataclass
 class WorkerOutcome:
     symbol: str
-    payload: Optional[StockPayload]
     fetch_result: Optional[FetchResult]
     error: Optional[str] = None
 
+    @property
+    def usable(self) -> bool:
+        return (
+            self.error is None
+            and self.fetch_result is not None
+            and self.fetch_result.has_data
+            and self.fetch_result.current_price is not None
+        )
+
 
 @dataclass
 class ExecutionResult:
@@ -38,31 +50,38 @@ class ExecutionResult:
 def _worker(
     symbol: str,
     fetcher: YFinanceFetcher,
-    timestamp: datetime,
     proxy_pool: ProxyPool,
 ) -> WorkerOutcome:
+    started = time.monotonic()
     try:
         fetch_result = fetcher.fetch(symbol)
-        if fetch_result.has_data and fetch_result.current_price is not None:
-            payload = build_stock_payload(
-                symbol=symbol,
-                info=fetch_result.info,
-                history=fetch_result.history,
-                current_price=fetch_result.current_price,
-                timestamp=timestamp,
-            )
-            return WorkerOutcome(symbol=symbol, payload=payload, fetch_result=fetch_result)
-
-        return WorkerOutcome(
-            symbol=symbol,
-            payload=None,
-            fetch_result=fetch_result,
-            error="no_data",
-        )
+        outcome = WorkerOutcome(symbol=symbol, fetch_result=fetch_result)
+        if not outcome.usable:
+            outcome.error = "no_data"
     except Exception as exc:  # pragma: no cover - defensive catch
         logger.debug("Worker for %s raised exception: %s", symbol, exc)
         proxy_pool.rotate()
-        return WorkerOutcome(symbol=symbol, payload=None, fetch_result=None, error=str(exc))
+        outcome = WorkerOutcome(symbol=symbol, fetch_result=None, error=str(exc))
+    metrics.SCANNER_STAGE_SECONDS.observe(time.monotonic() - started, SCANNER_NAME, "fetch")
+    metrics.SCANNER_ITEMS.inc(SCANNER_NAME, "fetch", "ok" if outcome.error is None else "failed")
+    return outcome
+
+
+def _transform(outcomes: List[WorkerOutcome], timestamp: datetime) -> List[StockPayload]:
+    """Turn all usable fetch results into payloads in one columnar pass."""
+
+    started = time.monotonic()
+    payloads = build_stock_payloads(
+        symbols=[o.symbol for o in outcomes],
+        infos=[o.fetch_result.info for o in outcomes],
+        histories=[o.fetch_result.history for o in outcomes],
+        current_prices=[o.fetch_result.current_price for o in outcomes],
+        timestamp=timestamp,
+    )
+    elapsed = time.monotonic() - started
+    metrics.SCANNER_STAGE_SECONDS.observe(elapsed, SCANNER_NAME, "transform")
+    logger.info("Transformed %s payloads in %.1f ms", len(payloads), elapsed * 1000)
+    return payloads
 
 
 def run_executor(
@@ -77,6 +96,7 @@ def run_executor(
 
     tickers_list = list(tickers)
     result = ExecutionResult()
+    usable: List[WorkerOutcome] = []
 
     if not tickers_list:
         result.elapsed_seconds = 0.0
@@ -90,7 +110,7 @@ def run_executor(
 
     with ThreadPoolExecutor(max_workers=config.max_threads) as executor:
         future_map = {
-            executor.submit(_worker, symbol, fetcher, timestamp, proxy_pool): symbol
+            executor.submit(_worker, symbol, fetcher, proxy_pool): symbol
             for symbol in tickers_list
         }
 
@@ -124,8 +144,8 @@ def run_executor(
                 )
                 continue
 
-            if outcome.payload is not None:
-                result.successes.append(outcome.payload)
+            if outcome.usable:
+                usable.append(outcome)
             else:
                 attempts = outcome.fetch_result.attempts if outcome.fetch_result else 0
                 errors = outcome.fetch_result.errors if outcome.fetch_result else []
@@ -143,18 +163,21 @@ def run_executor(
             if index % 50 == 0 or index == len(tickers_list):
                 processed_pct = (index / len(tickers_list)) * 100 if tickers_list else 0.0
                 success_pct = (
-                    (len(result.successes) / index) * 100 if index else 0.0
+                    (len(usable) / index) * 100 if index else 0.0
                 )
                 logger.info(
                     "Progress %d/%d (%.1f%%) | success %d (%.1f%%) | failures %d",
                     index,
                     len(tickers_list),
                     processed_pct,
-                    len(result.successes),
+                    len(usable),
                     success_pct,
                     len(result.failures),
                 )
 
+    if usable:
+        result.successes = _transform(usable, timestamp)
+
     result.elapsed_seconds = time.monotonic() - start
     result.metrics = {
         "success_count": len(result.successes),
@@ -16,8 +16,9 @@ from .session_factory import (
     create_requests_session,
 )
 from .ticker_loader import load_combined_tickers
-from .executor import run_executor
+from .executor import SCANNER_NAME, run_executor
 from .yfinance_client import YFinanceFetcher
+from utils import metrics
 
 
 logger = get_logger(__name__)
@@ -27,6 +28,7 @@ def run_pipeline(config: StockRetrievalConfig) -> Dict[str, Any]:
     """Execute a single stock retrieval cycle (placeholder implementation)."""
 
     config.ensure_directories()
+    metrics.instrument_http()
     logger.info("Stock retrieval pipeline scaffolding initialized.")
     logger.info(
         "Configuration summary | threads=%s timeout=%s max_runtime=%s",
@@ -58,6 +60,9 @@ def run_pipeline(config: StockRetrievalConfig) -> Dict[str, Any]:
         proxy_pool=proxy_pool,
     )
 
+    if proxy_pool.scoreboard is not None:
+        proxy_pool.scoreboard.flush()
+
     quality_gate = QualityGate(config)
     quality_passed_payloads: List[StockPayload] = []
 
@@ -75,6 +80,8 @@ def run_pipeline(config: StockRetrievalConfig) -> Dict[str, Any]:
 
     persistence_summary = {
         "saved": 0,
+        "changed": 0,
+        "unchanged": 0,
         "price_records": 0,
         "errors": [],
     }
@@ -82,9 +89,17 @@ def run_pipeline(config: StockRetrievalConfig) -> Dict[str, Any]:
     if config.save_to_db and not config.dry_run and quality_passed_payloads:
         from .db_writer import persist_payloads
 
-        persistence = persist_payloads(quality_passed_payloads)
+        with metrics.SCANNER_STAGE_SECONDS.time(SCANNER_NAME, "write"):
+            persistence = persist_payloads(quality_passed_payloads)
+        from stocks.market_breadth import refresh_if_changed
+
+        refresh_if_changed()
+        metrics.SCANNER_ITEMS.inc(SCANNER_NAME, "write", "ok", amount=persistence.saved)
+        metrics.SCANNER_ITEMS.inc(SCANNER_NAME, "write", "failed", amount=len(persistence.errors))
         persistence_summary = {
             "saved": persistence.saved,
+            "changed": persistence.changed,
+            "unchanged": persistence.unchanged,
             "price_records": persistence.price_records,
             "errors": persistence.errors,
         }
@@ -135,6 +150,7 @@ def run_pipeline(config: StockRetrievalConfig) -> Dict[str, Any]:
         "max_runtime_seconds": config.max_runtime_seconds,
         "proxy_enabled": proxy_pool.enabled,
         "proxy_in_use": proxy,
+        "proxy_scoreboard": proxy_pool.scoreboard.summary() if proxy_pool.scoreboard else None,
         "executor_elapsed_seconds": exec_result.elapsed_seconds,
         "executor_aborted": exec_result.aborted,
         "success_count": len(exec_result.successes),
@@ -147,6 +163,8 @@ def run_pipeline(config: StockRetrievalConfig) -> Dict[str, Any]:
         "dry_run": config.dry_run,
         "ready_for_persistence": len(quality_passed_payloads),
         "persistence_saved": persistence_summary["saved"],
+        "persistence_changed": persistence_summary["changed"],
+        "persistence_unchanged": persistence_summary["unchanged"],
         "persistence_price_records": persistence_summary["price_records"],
         "persistence_errors": persistence_summary["errors"][:5],
         "sample_successes": [payload.symbol for payload in quality_passed_payloads[:5]],
@@ -158,6 +176,8 @@ def run_pipeline(config: StockRetrievalConfig) -> Dict[str, Any]:
         "top_failure_reasons": top_failure_causes,
     }
     logger.info("Pipeline summary: %s", summary)
+    # Publish this run's stage histograms now rather than on the next flush tick
+    metrics.REGISTRY.flush()
     return summary
 
 
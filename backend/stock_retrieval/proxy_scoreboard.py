@@ -0,0 +1,515 @@
+"""Persistent proxy health scoreboard shared across scanners."""
+
+from __future__ import annotations
+
+import math
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+import requests
+
+from .config import DEFAULT_PROXY_SCOREBOARD
+from .logging_utils import get_logger
+
+
+logger = get_logger(__name__)
+
+
+DEFAULT_LATENCY_SECONDS = 1.0
+DEFAULT_RATE_LIMIT_COOLDOWN = 900.0
+PROBE_URL = "https://query2.finance.yahoo.com/v8/finance/chart/{symbol}?range=1d&interval=1d"
+PROBE_SYMBOLS = ("AAPL", "MSFT", "GOOGL", "AMZN", "META")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS proxy_scores (
+    proxy TEXT PRIMARY KEY,
+    latency_ewma REAL,
+    successes INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    rate_limits INTEGER NOT NULL DEFAULT 0,
+    consecutive_failures INTEGER NOT NULL DEFAULT 0,
+    cooldown_until REAL NOT NULL DEFAULT 0,
+    last_seen REAL NOT NULL DEFAULT 0,
+    last_success REAL NOT NULL DEFAULT 0
+)
+"""
+_COLUMNS = (
+    "proxy",
+    "latency_ewma",
+    "successes",
+    "failures",
+    "rate_limits",
+    "consecutive_failures",
+    "cooldown_until",
+    "last_seen",
+    "last_success",
+)
+# Counters are added to the stored row and timestamps only move forward, so
+# scanners sharing the file merge their updates instead of overwriting them
+_UPSERT = f"""
+INSERT INTO proxy_scores ({', '.join(_COLUMNS)})
+VALUES ({', '.join(':' + column for column in _COLUMNS)})
+ON CONFLICT(proxy) DO UPDATE SET
+    latency_ewma = COALESCE(excluded.latency_ewma, latency_ewma),
+    successes = successes + excluded.successes,
+    failures = failures + excluded.failures,
+    rate_limits = rate_limits + excluded.rate_limits,
+    consecutive_failures = CASE WHEN :reset_consecutive
+        THEN excluded.consecutive_failures
+        ELSE consecutive_failures + excluded.consecutive_failures END,
+    cooldown_until = MAX(cooldown_until, excluded.cooldown_until),
+    last_seen = MAX(last_seen, excluded.last_seen),
+    last_success = MAX(last_success, excluded.last_success)
+"""
+
+
+@dataclass
+class ProxyScore:
+    proxy: str
+    latency_ewma: Optional[float] = None
+    successes: int = 0
+    failures: int = 0
+    rate_limits: int = 0
+    consecutive_failures: int = 0
+    cooldown_until: float = 0.0
+    last_seen: float = 0.0
+    last_success: float = 0.0
+
+    @property
+    def success_ratio(self) -> float:
+        # Laplace smoothing keeps brand-new proxies selectable without trusting them fully
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    def is_available(self, now: float) -> bool:
+        return self.cooldown_until <= now
+
+    def weight(self, now: float) -> float:
+        if not self.is_available(now):
+            return 0.0
+        latency = self.latency_ewma if self.latency_ewma is not None else DEFAULT_LATENCY_SECONDS
+        penalty = 0.5 ** min(self.consecutive_failures, 10)
+        return self.success_ratio * penalty / max(latency, 0.05)
+
+
+@dataclass
+class _PendingDelta:
+    """Changes to one proxy since the last flush."""
+
+    successes: int = 0
+    failures: int = 0
+    rate_limits: int = 0
+    consecutive_failures: int = 0
+    reset_consecutive: bool = False
+    latency_changed: bool = False
+
+    def apply_to(self, score: ProxyScore, local: ProxyScore) -> None:
+        """Layer these unflushed changes (and ``local``'s newer fields) over a stored row."""
+
+        score.successes += self.successes
+        score.failures += self.failures
+        score.rate_limits += self.rate_limits
+        if self.reset_consecutive:
+            score.consecutive_failures = self.consecutive_failures
+        else:
+            score.consecutive_failures += self.consecutive_failures
+        if self.latency_changed:
+            score.latency_ewma = local.latency_ewma
+        score.cooldown_until = max(score.cooldown_until, local.cooldown_until)
+        score.last_seen = max(score.last_seen, local.last_seen)
+        score.last_success = max(score.last_success, local.last_success)
+
+
+class ProxyScoreboard:
+    """Thread-safe proxy scores kept in memory and persisted to SQLite.
+
+    Updates are applied to the in-memory table immediately and written back in
+    batches (every ``flush_interval`` seconds or on :meth:`flush`), so hot paths
+    never wait on disk. Each flush writes only what changed since the last one,
+    as increments to the stored row, so processes sharing the file don't
+    overwrite each other's counts.
+    """
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_PROXY_SCOREBOARD,
+        *,
+        alpha: float = 0.3,
+        rate_limit_cooldown: float = DEFAULT_RATE_LIMIT_COOLDOWN,
+        failure_cooldown: float = 300.0,
+        failure_threshold: int = 5,
+        flush_interval: float = 5.0,
+    ) -> None:
+        self.path = Path(path)
+        self.alpha = alpha
+        self.rate_limit_cooldown = rate_limit_cooldown
+        self.failure_cooldown = failure_cooldown
+        self.failure_threshold = failure_threshold
+        self.flush_interval = flush_interval
+        self._scores: Dict[str, ProxyScore] = {}
+        self._pending: Dict[str, _PendingDelta] = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+        self._conn = self._connect()
+        self._load()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            conn.commit()
+            return conn
+        except sqlite3.Error as exc:
+            logger.warning("Proxy scoreboard unavailable at %s (%s); using memory only", self.path, exc)
+            return None
+
+    def _load(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            rows = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM proxy_scores").fetchall()
+        except sqlite3.Error as exc:
+            logger.warning("Failed to load proxy scoreboard: %s", exc)
+            return
+        for row in rows:
+            score = ProxyScore(*row)
+            self._scores[score.proxy] = score
+        logger.info("Loaded %s proxy scores from %s", len(self._scores), self.path.name)
+
+    def reload(self) -> None:
+        """Pick up scores written by other processes, keeping unflushed local updates."""
+
+        if self._conn is None:
+            return
+        with self._lock:
+            try:
+                rows = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM proxy_scores").fetchall()
+            except sqlite3.Error as exc:
+                logger.debug("Failed to reload proxy scoreboard: %s", exc)
+                return
+            for row in rows:
+                score = ProxyScore(*row)
+                pending = self._pending.get(score.proxy)
+                if pending is not None:
+                    pending.apply_to(score, self._scores[score.proxy])
+                self._scores[score.proxy] = score
+
+    def _touch(self, proxy: str) -> tuple[ProxyScore, _PendingDelta]:
+        score = self._scores.get(proxy)
+        if score is None:
+            score = ProxyScore(proxy=proxy)
+            self._scores[proxy] = score
+        pending = self._pending.setdefault(proxy, _PendingDelta())
+        return score, pending
+
+    def _maybe_flush(self) -> None:
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def register(self, proxies: Iterable[str]) -> None:
+        """Make sure every proxy has a row so it can be ranked and validated."""
+
+        with self._lock:
+            for proxy in proxies:
+                if proxy and proxy not in self._scores:
+                    self._touch(proxy)
+            self._maybe_flush()
+
+    def record_success(self, proxy: Optional[str], latency: Optional[float] = None) -> None:
+        if not proxy:
+            return
+        now = time.time()
+        with self._lock:
+            score, pending = self._touch(proxy)
+            score.successes += 1
+            score.consecutive_failures = 0
+            score.last_seen = now
+            score.last_success = now
+            pending.successes += 1
+            pending.consecutive_failures = 0
+            pending.reset_consecutive = True
+            if latency is not None and math.isfinite(latency) and latency >= 0:
+                if score.latency_ewma is None:
+                    score.latency_ewma = latency
+                else:
+                    score.latency_ewma = self.alpha * latency + (1 - self.alpha) * score.latency_ewma
+                pending.latency_changed = True
+            self._maybe_flush()
+
+    def record_failure(self, proxy: Optional[str], *, reason: Optional[str] = None) -> None:
+        if not proxy:
+            return
+        now = time.time()
+        with self._lock:
+            score, pending = self._touch(proxy)
+            score.failures += 1
+            score.consecutive_failures += 1
+            score.last_seen = now
+            pending.failures += 1
+            pending.consecutive_failures += 1
+            if score.consecutive_failures >= self.failure_threshold:
+                score.cooldown_until = max(score.cooldown_until, now + self.failure_cooldown)
+            self._maybe_flush()
+        logger.debug("Proxy %s failure recorded%s", proxy, f" ({reason})" if reason else "")
+
+    def record_rate_limit(self, proxy: Optional[str], *, cooldown: Optional[float] = None) -> None:
+        if not proxy:
+            return
+        now = time.time()
+        with self._lock:
+            score, pending = self._touch(proxy)
+            score.failures += 1
+            score.rate_limits += 1
+            score.consecutive_failures += 1
+            score.last_seen = now
+            pending.failures += 1
+            pending.rate_limits += 1
+            pending.consecutive_failures += 1
+            score.cooldown_until = max(
+                score.cooldown_until,
+                now + (self.rate_limit_cooldown if cooldown is None else cooldown),
+            )
+            self._maybe_flush()
+
+    def is_available(self, proxy: str) -> bool:
+        with self._lock:
+            score = self._scores.get(proxy)
+            return score is None or score.is_available(time.time())
+
+    def rank(
+        self,
+        proxies: Optional[Iterable[str]] = None,
+        *,
+        limit: Optional[int] = None,
+        include_unavailable: bool = False,
+    ) -> List[str]:
+        """Return proxies ordered best-first; cooling-down ones are dropped unless requested."""
+
+        now = time.time()
+        with self._lock:
+            candidates = list(self._scores) if proxies is None else list(dict.fromkeys(proxies))
+            scored = [
+                (self._scores.get(proxy) or ProxyScore(proxy=proxy)).weight(now)
+                for proxy in candidates
+            ]
+            cooling = {
+                proxy
+                for proxy in candidates
+                if proxy in self._scores and not self._scores[proxy].is_available(now)
+            }
+        ordered = [
+            proxy
+            for _, proxy in sorted(zip(scored, candidates), key=lambda item: item[0], reverse=True)
+            if proxy not in cooling
+        ]
+        if include_unavailable:
+            ordered.extend(proxy for proxy in candidates if proxy in cooling)
+        return ordered[:limit] if limit else ordered
+
+    def choose(self, proxies: Iterable[str]) -> Optional[str]:
+        """Weighted random pick favouring fast, healthy proxies."""
+
+        now = time.time()
+        with self._lock:
+            candidates = list(proxies)
+            weights = [
+                (self._scores.get(proxy) or ProxyScore(proxy=proxy)).weight(now)
+                for proxy in candidates
+            ]
+        if not candidates or not any(weights):
+            return None
+        return random.choices(candidates, weights=weights, k=1)[0]
+
+    def summary(self) -> Dict[str, object]:
+        now = time.time()
+        with self._lock:
+            scores = list(self._scores.values())
+        available = [s for s in scores if s.is_available(now)]
+        latencies = [s.latency_ewma for s in available if s.latency_ewma is not None]
+        return {
+            "tracked": len(scores),
+            "available": len(available),
+            "cooling_down": len(scores) - len(available),
+            "healthy": sum(1 for s in available if s.successes and s.success_ratio >= 0.5),
+            "median_latency": sorted(latencies)[len(latencies) // 2] if latencies else None,
+        }
+
+    def flush(self) -> None:
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if self._conn is None or not self._pending:
+                self._pending.clear()
+                return
+            rows = []
+            for proxy, pending in self._pending.items():
+                score = self._scores[proxy]
+                rows.append({
+                    "proxy": proxy,
+                    "latency_ewma": score.latency_ewma if pending.latency_changed else None,
+                    "successes": pending.successes,
+                    "failures": pending.failures,
+                    "rate_limits": pending.rate_limits,
+                    "consecutive_failures": pending.consecutive_failures,
+                    "reset_consecutive": pending.reset_consecutive,
+                    "cooldown_until": score.cooldown_until,
+                    "last_seen": score.last_seen,
+                    "last_success": score.last_success,
+                })
+            try:
+                self._conn.executemany(_UPSERT, rows)
+                self._conn.commit()
+            except sqlite3.Error as exc:
+                # Keep the deltas; the next flush retries them
+                self._conn.rollback()
+                logger.warning("Failed to persist %s proxy scores: %s", len(rows), exc)
+                return
+            self._pending.clear()
+
+
+_shared_scoreboards: Dict[Path, ProxyScoreboard] = {}
+_shared_lock = threading.Lock()
+
+
+def get_scoreboard(path: Optional[Path] = None) -> ProxyScoreboard:
+    """Return the process-wide scoreboard for ``path`` (default location if omitted)."""
+
+    resolved = Path(path or DEFAULT_PROXY_SCOREBOARD).resolve()
+    with _shared_lock:
+        board = _shared_scoreboards.get(resolved)
+        if board is None:
+            board = ProxyScoreboard(resolved)
+            _shared_scoreboards[resolved] = board
+        return board
+
+
+class RateLimitedProbe(Exception):
+    """Raised by :func:`probe_proxy` when Yahoo answers 429 through a proxy."""
+
+
+def probe_proxy(proxy: str, *, timeout: float = 5.0) -> Optional[float]:
+    """Fetch a small Yahoo chart through ``proxy``; return latency on success."""
+
+    url = PROBE_URL.format(symbol=random.choice(PROBE_SYMBOLS))
+    start = time.monotonic()
+    try:
+        response = requests.get(
+            url,
+            proxies={"http": proxy, "https": proxy},
+            headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"},
+            timeout=timeout,
+        )
+    except requests.RequestException:
+        return None
+    if response.status_code == 429:
+        raise RateLimitedProbe(proxy)
+    if response.status_code != 200:
+        return None
+    try:
+        result = response.json()["chart"]["result"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    return time.monotonic() - start if result else None
+
+
+class ProxyValidator:
+    """Validate proxies concurrently and feed the results into a scoreboard.
+
+    ``run_once`` performs a single sweep; ``start`` repeats sweeps on a daemon
+    thread so long-running schedulers keep scores fresh between cycles.
+    """
+
+    def __init__(
+        self,
+        scoreboard: ProxyScoreboard,
+        proxies: Optional[Iterable[str]] = None,
+        *,
+        probe: Callable[[str], Optional[float]] = probe_proxy,
+        max_workers: int = 50,
+        interval_seconds: float = 600.0,
+    ) -> None:
+        self.scoreboard = scoreboard
+        self.proxies = list(proxies) if proxies is not None else None
+        self.probe = probe
+        self.max_workers = max_workers
+        self.interval_seconds = interval_seconds
+        self.last_working: List[str] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> Dict[str, int]:
+        proxies = self.proxies if self.proxies is not None else self.scoreboard.rank(include_unavailable=True)
+        self.scoreboard.register(proxies)
+        counts = {"tested": 0, "working": 0, "rate_limited": 0}
+        working: List[str] = []
+        if not proxies:
+            self.last_working = working
+            return counts
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_map = {executor.submit(self.probe, proxy): proxy for proxy in proxies}
+            for future in as_completed(future_map):
+                proxy = future_map[future]
+                counts["tested"] += 1
+                try:
+                    latency = future.result()
+                except RateLimitedProbe:
+                    counts["rate_limited"] += 1
+                    self.scoreboard.record_rate_limit(proxy)
+                    continue
+                except Exception as exc:  # pragma: no cover - defensive
+                    self.scoreboard.record_failure(proxy, reason=str(exc))
+                    continue
+                if latency is None:
+                    self.scoreboard.record_failure(proxy, reason="probe_failed")
+                else:
+                    counts["working"] += 1
+                    working.append(proxy)
+                    self.scoreboard.record_success(proxy, latency=latency)
+
+        self.last_working = self.scoreboard.rank(working)
+        self.scoreboard.flush()
+        logger.info(
+            "Proxy validation sweep: %s tested | %s working | %s rate limited",
+            counts["tested"],
+            counts["working"],
+            counts["rate_limited"],
+        )
+        return counts
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as exc:  # pragma: no cover - keep background thread alive
+                logger.warning("Proxy validation sweep failed: %s", exc)
+            self._stop.wait(self.interval_seconds)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="proxy-validator", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+
+__all__ = [
+    "ProxyScore",
+    "ProxyScoreboard",
+    "ProxyValidator",
+    "RateLimitedProbe",
+    "get_scoreboard",
+    "probe_proxy",
+]
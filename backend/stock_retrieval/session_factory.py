@@ -15,6 +15,7 @@ from urllib3.util.retry import Retry
 
 from .config import StockRetrievalConfig
 from .logging_utils import get_logger
+from .proxy_scoreboard import ProxyScoreboard, get_scoreboard
 
 
 logger = get_logger(__name__)
@@ -52,6 +53,7 @@ class ProxyPool:
     enabled: bool = True
     failures: List[str] = field(default_factory=list)
     rotation_index: int = 0
+    scoreboard: Optional[ProxyScoreboard] = None
     _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
 
     @classmethod
@@ -126,8 +128,16 @@ class ProxyPool:
             return cls(proxies=[], enabled=False)
 
         unique = list(dict.fromkeys(proxy.strip() for proxy in proxies if proxy))
-        logger.info("Loaded %s proxies for rotation", len(unique))
-        return cls(proxies=unique, enabled=bool(unique))
+        scoreboard = get_scoreboard(config.proxy_scoreboard_path)
+        scoreboard.register(unique)
+        # Known-good proxies first; cooling-down ones stay at the tail as a last resort
+        unique = scoreboard.rank(unique, include_unavailable=True)
+        logger.info(
+            "Loaded %s proxies for rotation (%s available per scoreboard)",
+            len(unique),
+            len(scoreboard.rank(unique)),
+        )
+        return cls(proxies=unique, enabled=bool(unique), scoreboard=scoreboard)
 
     def get_proxy(self, worker_index: int) -> Optional[str]:
         if not self.enabled or not self.proxies:
@@ -139,6 +149,10 @@ class ProxyPool:
     def acquire(self) -> Optional[str]:
         if not self.enabled or not self.proxies:
             return None
+        if self.scoreboard is not None:
+            proxy = self.scoreboard.choose(self.proxies)
+            if proxy is not None:
+                return proxy
         with self._lock:
             proxy = self.proxies[self.rotation_index % len(self.proxies)]
             self.rotation_index = (self.rotation_index + 1) % len(self.proxies)
@@ -147,6 +161,11 @@ class ProxyPool:
     def mark_failure(self, proxy: Optional[str], *, reason: str | None = None) -> None:
         if proxy is None or not self.enabled or proxy not in self.proxies:
             return
+        if self.scoreboard is not None:
+            if reason == "rate_limited":
+                self.scoreboard.record_rate_limit(proxy)
+            else:
+                self.scoreboard.record_failure(proxy, reason=reason)
         with self._lock:
             self.failures.append(proxy)
             idx = self.proxies.index(proxy)
@@ -160,9 +179,11 @@ class ProxyPool:
                 f" ({reason})" if reason else "",
             )
 
-    def record_success(self, proxy: Optional[str]) -> None:
+    def record_success(self, proxy: Optional[str], *, latency: Optional[float] = None) -> None:
         if proxy is None:
             return
+        if self.scoreboard is not None:
+            self.scoreboard.record_success(proxy, latency=latency)
         with self._lock:
             if proxy in self.failures:
                 self.failures = [p for p in self.failures if p != proxy]
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional, Sequence
 
@@ -60,6 +61,7 @@ class YFinanceFetcher:
                 else None
             )
             ticker = yf.Ticker(symbol, session=session) if session else yf.Ticker(symbol)
+            attempt_started = time.monotonic()
             result.attempts = attempt
             result.proxy = proxy
 
@@ -88,7 +90,7 @@ class YFinanceFetcher:
                 result.current_price = self._derive_current_price(ticker, result)
 
             if result.has_data and result.current_price is not None:
-                self._record_success(proxy)
+                self._record_success(proxy, latency=time.monotonic() - attempt_started)
                 break
             else:
                 self._handle_failure(proxy, reason="no_data")
@@ -112,10 +114,10 @@ class YFinanceFetcher:
         self.proxy_pool.mark_failure(proxy, reason=reason)
         self.proxy_pool.rotate()
 
-    def _record_success(self, proxy: Optional[str]) -> None:
+    def _record_success(self, proxy: Optional[str], *, latency: Optional[float] = None) -> None:
         if self.proxy_pool is None or proxy is None:
             return
-        self.proxy_pool.record_success(proxy)
+        self.proxy_pool.record_success(proxy, latency=latency)
 
     def _fetch_history(self, ticker: yf.Ticker) -> Optional[pd.DataFrame]:
         for period in self.history_periods:
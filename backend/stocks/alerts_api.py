@@ -19,6 +19,7 @@ from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from django.core.cache import cache
 from django.conf import settings
+from django.db import transaction
 
 from decimal import Decimal, InvalidOperation
 import logging
@@ -29,6 +30,7 @@ import time
 from .models import Stock, StockAlert, UsageStats
 from .authentication import CsrfExemptSessionAuthentication, BearerSessionAuthentication
 from .plan_limits import get_limits_for_user, is_within_limit
+from . import badge_counters
 
 
 logger = logging.getLogger(__name__)
@@ -271,11 +273,6 @@ def alerts_toggle_api(request, alert_id: int):
     try:
         if not getattr(request, 'user', None) or not request.user.is_authenticated:
             return Response({'success': False, 'error_code': 'AUTH_REQUIRED', 'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
-        try:
-            alert = StockAlert.objects.select_related('stock').get(id=alert_id, user=request.user)
-        except StockAlert.DoesNotExist:
-            return Response({'message': 'not found'}, status=status.HTTP_404_NOT_FOUND)
-
         # Optional body: {"isActive": true|false}
         desired_state = None
         try:
@@ -287,11 +284,21 @@ def alerts_toggle_api(request, alert_id: int):
         except Exception:
             desired_state = None
 
-        if desired_state is None:
-            alert.is_active = not alert.is_active
-        else:
-            alert.is_active = desired_state
-        alert.save()
+        # Lock the row so the badge counter moves with the state actually replaced
+        with transaction.atomic():
+            try:
+                alert = StockAlert.objects.select_for_update().get(id=alert_id, user=request.user)
+            except StockAlert.DoesNotExist:
+                return Response({'message': 'not found'}, status=status.HTTP_404_NOT_FOUND)
+
+            was_active = alert.is_active
+            if desired_state is None:
+                alert.is_active = not alert.is_active
+            else:
+                alert.is_active = desired_state
+            alert.save(update_fields=['is_active'])
+            if alert.is_active != was_active:
+                badge_counters.adjust(request.user.id, active_alerts=1 if alert.is_active else -1)
 
         payload = {'success': True, 'alert': _serialize_alert(alert, request.user.email or '')}
         resp = Response(payload, status=status.HTTP_200_OK)
@@ -334,8 +341,8 @@ def alerts_unread_count_api(request):
     try:
         if not getattr(request, 'user', None) or not request.user.is_authenticated:
             return Response({'count': 0}, status=status.HTTP_200_OK)
-        # Define unread as currently active alerts for the user
-        count = StockAlert.objects.filter(user=request.user, is_active=True).count()
+        # Define unread as currently active alerts for the user (maintained counter)
+        count = badge_counters.get_badges(request.user.id)['alerts']
         return Response({'count': int(count)}, status=status.HTTP_200_OK)
     except Exception as e:
         logger.error(f"Alerts unread count error: {e}")
@@ -3,7 +3,7 @@ Django REST API Views for Stock Data Integration
 Provides comprehensive real-time stock data endpoints with full filtering capabilities
 """
 
-from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
@@ -22,8 +22,12 @@ import logging
 from decimal import Decimal
 from typing import List, Dict, Any, Optional
 import csv
+import io
 
-from .models import Stock, StockAlert, StockPrice, Screener
+from . import columnar, platform_metrics, streaming_export
+from .columnar import Column, decimal_column
+from .models import Stock, StockAlert, StockPrice, Screener, CustomIndicator
+from .market_breadth import get_breadth
 from emails.models import EmailSubscription
 from .api_utils import (
     sanitize_search_input, sanitize_sort_field, validate_positive_integer,
@@ -120,8 +124,71 @@ def _compute_rsi(values: List[Optional[float]], period: int = 14) -> List[Option
         prev = price
     return out
 
+def _stock_change_percent(row):
+    return format_decimal_safe(row['change_percent']) or calculate_change_percent(row['current_price'], row['price_change_today'])
+
+# Output fields of stock_list_api, in response order; shared by every output format
+STOCK_LIST_COLUMNS = columnar.ColumnSet([
+    # Basic info
+    Column('ticker'),
+    Column('symbol', lambda r: r['symbol'] or r['ticker'], ('symbol', 'ticker')),
+    Column('company_name', lambda r: r['company_name'] or r['name'], ('company_name', 'name')),
+    Column('name', lambda r: r['name'] or r['company_name'], ('name', 'company_name')),
+    Column('exchange'),
+    # Price data
+    decimal_column('current_price'),
+    decimal_column('price_change_today'),
+    decimal_column('price_change_week'),
+    decimal_column('price_change_month'),
+    decimal_column('price_change_year'),
+    Column('change_percent', _stock_change_percent, ('change_percent', 'current_price', 'price_change_today')),
+    # Bid/Ask and Range
+    decimal_column('bid_price'),
+    decimal_column('ask_price'),
+    Column('bid_ask_spread'),
+    Column('days_range'),
+    decimal_column('days_low'),
+    decimal_column('days_high'),
+    # Volume data
+    Column('volume'),
+    Column('volume_today', lambda r: r['volume_today'] or r['volume'], ('volume_today', 'volume')),
+    Column('avg_volume_3mon'),
+    decimal_column('dvav'),
+    Column('shares_available'),
+    # Market data
+    Column('market_cap'),
+    decimal_column('market_cap_change_3mon'),
+    Column('formatted_market_cap', lambda r: Stock.format_market_cap(r['market_cap']), ('market_cap',)),
+    # Financial ratios
+    decimal_column('pe_ratio'),
+    decimal_column('pe_change_3mon'),
+    decimal_column('dividend_yield'),
+    # 52-week range
+    decimal_column('week_52_low'),
+    decimal_column('week_52_high'),
+    # Additional metrics
+    decimal_column('one_year_target'),
+    decimal_column('earnings_per_share'),
+    decimal_column('book_value'),
+    decimal_column('price_to_book'),
+    # Formatted values
+    Column('formatted_price', lambda r: Stock.format_price(r['current_price']), ('current_price',)),
+    Column('formatted_change', lambda r: Stock.format_change(r['change_percent']), ('change_percent',)),
+    Column('formatted_volume', lambda r: Stock.format_volume(r['volume']), ('volume',)),
+    # Timestamps
+    Column('last_updated', lambda r: columnar.isoformat(r['last_updated'])),
+    Column('created_at', lambda r: columnar.isoformat(r['created_at'])),
+    # Calculated fields
+    Column('is_gaining', lambda r: (r['price_change_today'] or 0) > 0, ('price_change_today',)),
+    Column('is_losing', lambda r: (r['price_change_today'] or 0) < 0, ('price_change_today',)),
+    decimal_column('volume_ratio', 'dvav'),
+    # WordPress integration
+    Column('wordpress_url', lambda r: f"/stock/{r['ticker'].lower()}/", ('ticker',)),
+])
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])  # Security: Require authentication
+@renderer_classes(columnar.RENDERER_CLASSES)
 def stock_list_api(request):
     """
     Get comprehensive list of stocks with full data and filtering
@@ -143,8 +210,16 @@ def stock_list_api(request):
     - exchange: Filter by exchange (default: NASDAQ)
     - sort_by: Sort field (price, volume, market_cap, change_percent, pe_ratio)
     - sort_order: Sort order (asc, desc) default: desc
+    - fields: Comma-separated output fields (default: all)
+    - output: rows (default), columns, msgpack or csv; also negotiated from Accept
     """
     try:
+        output = columnar.negotiate(request)
+        try:
+            columns = STOCK_LIST_COLUMNS.select(columnar.requested_fields(request))
+        except columnar.UnknownFieldsError as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         # Parse parameters with validation
         limit = validate_positive_integer(
             request.GET.get('limit', 50),
@@ -195,12 +270,7 @@ def stock_list_api(request):
         sort_order = 'desc' if request.GET.get('sort_order', 'desc') == 'desc' else 'asc'
 
         # Base queryset with optimized query
-        queryset = Stock.objects.filter(exchange__iexact=exchange).only(
-            'ticker', 'symbol', 'company_name', 'name', 'current_price',
-            'volume', 'market_cap', 'change_percent', 'price_change_today',
-            'pe_ratio', 'last_updated', 'week_52_high', 'week_52_low',
-            'dividend_yield', 'one_year_target'
-        )
+        queryset = Stock.objects.filter(exchange__iexact=exchange)
 
         # Apply search filter
         if search:
@@ -307,81 +377,15 @@ def stock_list_api(request):
         except (ValueError, TypeError):
             offset = 0
 
-        stocks = queryset[offset:offset + limit]
-
-        # Format comprehensive data
-        stock_data = []
-        for stock in stocks:
-            change_percent = calculate_change_percent(stock.current_price, stock.price_change_today)
-            
-            stock_data.append({
-                # Basic info
-                'ticker': stock.ticker,
-                'symbol': stock.symbol or stock.ticker,
-                'company_name': stock.company_name or stock.name,
-                'name': stock.name or stock.company_name,
-                'exchange': stock.exchange,
-                
-                # Price data
-                'current_price': format_decimal_safe(stock.current_price),
-                'price_change_today': format_decimal_safe(stock.price_change_today),
-                'price_change_week': format_decimal_safe(stock.price_change_week),
-                'price_change_month': format_decimal_safe(stock.price_change_month),
-                'price_change_year': format_decimal_safe(stock.price_change_year),
-                'change_percent': format_decimal_safe(stock.change_percent) or change_percent,
-                
-                # Bid/Ask and Range
-                'bid_price': format_decimal_safe(stock.bid_price),
-                'ask_price': format_decimal_safe(stock.ask_price),
-                'bid_ask_spread': stock.bid_ask_spread,
-                'days_range': stock.days_range,
-                'days_low': format_decimal_safe(stock.days_low),
-                'days_high': format_decimal_safe(stock.days_high),
-                
-                # Volume data
-                'volume': stock.volume,
-                'volume_today': stock.volume_today or stock.volume,
-                'avg_volume_3mon': stock.avg_volume_3mon,
-                'dvav': format_decimal_safe(stock.dvav),
-                'shares_available': stock.shares_available,
-                
-                # Market data
-                'market_cap': stock.market_cap,
-                'market_cap_change_3mon': format_decimal_safe(stock.market_cap_change_3mon),
-                'formatted_market_cap': stock.formatted_market_cap,
-                
-                # Financial ratios
-                'pe_ratio': format_decimal_safe(stock.pe_ratio),
-                'pe_change_3mon': format_decimal_safe(stock.pe_change_3mon),
-                'dividend_yield': format_decimal_safe(stock.dividend_yield),
-                
-                # 52-week range
-                'week_52_low': format_decimal_safe(stock.week_52_low),
-                'week_52_high': format_decimal_safe(stock.week_52_high),
-                
-                # Additional metrics
-                'one_year_target': format_decimal_safe(stock.one_year_target),
-                'earnings_per_share': format_decimal_safe(stock.earnings_per_share),
-                'book_value': format_decimal_safe(stock.book_value),
-                'price_to_book': format_decimal_safe(stock.price_to_book),
-                
-                # Formatted values
-                'formatted_price': stock.formatted_price,
-                'formatted_change': stock.formatted_change,
-                'formatted_volume': stock.formatted_volume,
-                
-                # Timestamps
-                'last_updated': stock.last_updated.isoformat() if stock.last_updated else None,
-                'created_at': stock.created_at.isoformat() if stock.created_at else None,
-                
-                # Calculated fields
-                'is_gaining': (stock.price_change_today or 0) > 0,
-                'is_losing': (stock.price_change_today or 0) < 0,
-                'volume_ratio': format_decimal_safe(stock.dvav),
-                
-                # WordPress integration
-                'wordpress_url': f"/stock/{stock.ticker.lower()}/"
-            })
+        # Read only the columns the selected fields need, as plain rows
+        records = queryset.values(*STOCK_LIST_COLUMNS.sources(columns))[offset:offset + limit]
+        if output != columnar.ROWS:
+            return STOCK_LIST_COLUMNS.response(
+                output, records, columns,
+                meta={'success': True, 'total_available': queryset.count(), 'timestamp': timezone.now().isoformat()},
+                filename='stocks.csv',
+            )
+        stock_data = STOCK_LIST_COLUMNS.rows(records, columns)
 
         return Response({
             'success': True,
@@ -743,39 +747,33 @@ def stock_statistics_api(request):
     URL: /api/stats/
     """
     try:
-        # Cache key
-        cache_key = "stock_statistics"
-        cached_stats = cache.get(cache_key)
-
-        if cached_stats:
-            return Response(cached_stats)
-
-        # Calculate statistics
-        total_stocks = Stock.objects.count()
-        gainers = Stock.objects.filter(price_change_today__gt=0).count()
-        losers = Stock.objects.filter(price_change_today__lt=0).count()
-        unchanged = total_stocks - gainers - losers
-
-        # Recent updates
-        recent_updates = Stock.objects.filter(
-            last_updated__gte=timezone.now() - timedelta(hours=24)
-        ).count()
-
-        # Top performers
-        top_gainer = Stock.objects.filter(
-            price_change_today__gt=0
-        ).order_by('-price_change_today').first()
-
-        top_loser = Stock.objects.filter(
-            price_change_today__lt=0
-        ).order_by('price_change_today').first()
-
-        most_active = Stock.objects.filter(
-            volume__gt=0
-        ).order_by('-volume').first()
+        breadth = get_breadth()
+        counts = breadth['counts']
+        total_stocks = counts['total']
+        gainers = counts['gainers_today']
+        losers = counts['losers_today']
+
+        def performer(rows, value_field):
+            if not rows:
+                return None
+            row = rows[0]
+            item = {
+                'ticker': row['ticker'],
+                'company_name': row['company_name'] or row['name'],
+                'wordpress_url': f"/stock/{row['ticker'].lower()}/",
+            }
+            if value_field == 'volume':
+                item['volume_today'] = int(row['volume']) if row['volume'] else 0
+            else:
+                item['price_change_percent'] = row['change_percent'] or 0
+            return item
 
         # Email subscriptions
-        active_subscriptions = EmailSubscription.objects.filter(is_active=True).count()
+        active_subscriptions = cache.get_or_set(
+            'stock_statistics:active_subscriptions',
+            lambda: EmailSubscription.objects.filter(is_active=True).count(),
+            300,
+        )
 
         stats_data = {
             'success': True,
@@ -783,38 +781,22 @@ def stock_statistics_api(request):
                 'total_stocks': total_stocks,
                 'gainers': gainers,
                 'losers': losers,
-                'unchanged': unchanged,
+                'unchanged': total_stocks - gainers - losers,
                 'gainer_percentage': round((gainers / total_stocks * 100), 1) if total_stocks > 0 else 0,
-                'recent_updates': recent_updates
+                'recent_updates': counts['recent_updates']
             },
             'top_performers': {
-                'top_gainer': {
-                    'ticker': top_gainer.ticker if top_gainer else None,
-                    'company_name': top_gainer.company_name or top_gainer.name if top_gainer else None,
-                    'price_change_percent': format_decimal_safe(top_gainer.change_percent) if top_gainer else 0,
-                    'wordpress_url': f"/stock/{top_gainer.ticker.lower()}/" if top_gainer else None
-                } if top_gainer else None,
-                'top_loser': {
-                    'ticker': top_loser.ticker if top_loser else None,
-                    'company_name': top_loser.company_name or top_loser.name if top_loser else None,
-                    'price_change_percent': format_decimal_safe(top_loser.change_percent) if top_loser else 0,
-                    'wordpress_url': f"/stock/{top_loser.ticker.lower()}/" if top_loser else None
-                } if top_loser else None,
-                'most_active': {
-                    'ticker': most_active.ticker if most_active else None,
-                    'company_name': most_active.company_name or most_active.name if most_active else None,
-                    'volume_today': int(most_active.volume) if most_active and most_active.volume else 0,
-                    'wordpress_url': f"/stock/{most_active.ticker.lower()}/" if most_active else None
-                } if most_active else None
+                'top_gainer': performer(breadth['top_gainers_today'], 'change_percent'),
+                'top_loser': performer(breadth['top_losers_today'], 'change_percent'),
+                'most_active': performer(breadth['most_active_today'], 'volume'),
             },
             'subscriptions': {
                 'active_count': active_subscriptions
             },
-            'timestamp': timezone.now().isoformat()
+            'breadth_version': breadth['version'],
+            'timestamp': breadth['computed_at']
         }
 
-        # Cache for 5 minutes
-        cache.set(cache_key, stats_data, 300)
         return Response(stats_data)
 
     except Exception as e:
@@ -831,47 +813,23 @@ def market_stats_api(request):
     Get overall market statistics
     """
     try:
-        # Get market statistics from database
-        total_stocks = Stock.objects.count()
-        nasdaq_stocks = Stock.objects.filter(exchange='NASDAQ').count()
-        
-        # Calculate market trends
-        gainers = Stock.objects.filter(price_change__gt=0).count()
-        losers = Stock.objects.filter(price_change__lt=0).count()
-        unchanged = Stock.objects.filter(price_change=0).count()
-        
-        # Get top performers
-        top_gainers = Stock.objects.filter(
-            price_change__gt=0
-        ).order_by('-price_change_percent')[:5].values(
-            'ticker', 'name', 'current_price', 'price_change', 'price_change_percent'
-        )
-        
-        top_losers = Stock.objects.filter(
-            price_change__lt=0
-        ).order_by('price_change_percent')[:5].values(
-            'ticker', 'name', 'current_price', 'price_change', 'price_change_percent'
-        )
-        
-        # Most active by volume
-        most_active = Stock.objects.exclude(
-            volume__isnull=True
-        ).order_by('-volume')[:5].values(
-            'ticker', 'name', 'current_price', 'volume'
-        )
-        
+        breadth = get_breadth()
+        counts = breadth['counts']
+
         stats = {
             'market_overview': {
-                'total_stocks': total_stocks,
-                'nasdaq_stocks': nasdaq_stocks,
-                'gainers': gainers,
-                'losers': losers,
-                'unchanged': unchanged
+                'total_stocks': counts['total'],
+                'nasdaq_stocks': counts['nasdaq'],
+                'gainers': counts['gainers'],
+                'losers': counts['losers'],
+                'unchanged': counts['unchanged']
             },
-            'top_gainers': list(top_gainers),
-            'top_losers': list(top_losers),
-            'most_active': list(most_active),
-            'last_updated': timezone.now().isoformat()
+            'change_distribution': breadth['change_distribution'],
+            'top_gainers': breadth['top_gainers'],
+            'top_losers': breadth['top_losers'],
+            'most_active': breadth['most_active'],
+            'breadth_version': breadth['version'],
+            'last_updated': breadth['computed_at']
         }
         
         return Response(stats, status=status.HTTP_200_OK)
@@ -1160,8 +1118,11 @@ def trending_stocks_api(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+OHLC_COLUMNS = columnar.ColumnSet([Column(key) for key in ('t', 'o', 'h', 'l', 'c', 'v')])
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@renderer_classes(columnar.RENDERER_CLASSES)
 def stock_ohlc_api(request, ticker: str):
     """
     Get OHLC history and common indicators for a ticker.
@@ -1169,8 +1130,16 @@ def stock_ohlc_api(request, ticker: str):
       - period: yfinance period (1mo, 3mo, 6mo, 1y, 2y, 5y) default 6mo
       - interval: yfinance interval (1d, 1h, 30m, 15m) default 1d
       - indicators: comma list (sma20,sma50,ema20,ema50,rsi14)
+      - fields: comma list of OHLC keys (t,o,h,l,c,v) default all
+      - output: rows (default), columns, msgpack or csv; also negotiated from Accept
     """
     try:
+        output = columnar.negotiate(request)
+        try:
+            columns = OHLC_COLUMNS.select(columnar.requested_fields(request))
+        except columnar.UnknownFieldsError as e:
+            return Response({'success': False, 'error': str(e)}, status=400)
+
         period = request.GET.get('period', '6mo')
         interval = request.GET.get('interval', '1d')
         indicators_raw = request.GET.get('indicators', 'sma20,sma50,ema20,ema50,rsi14')
@@ -1215,11 +1184,19 @@ def stock_ohlc_api(request, ticker: str):
         if 'rsi14' in indicators or 'rsi' in indicators:
             ind['rsi14'] = _compute_rsi(closes, 14)
 
+        if output != columnar.ROWS:
+            # Indicators are already one array per series; CSV carries the bars only
+            return OHLC_COLUMNS.response(
+                output, records, columns,
+                meta={'success': True, 'ticker': ticker.upper(), 'indicators': ind},
+                filename=f'{ticker.upper()}_ohlc.csv',
+            )
+
         return Response({
             'success': True,
             'ticker': ticker.upper(),
             'count': len(records),
-            'ohlc': records,
+            'ohlc': OHLC_COLUMNS.rows(records, columns) if len(columns) < len(OHLC_COLUMNS.columns) else records,
             'indicators': ind,
         })
     except Exception as e:
@@ -1400,9 +1377,17 @@ def screeners_templates_api(request):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def screeners_results_api(request, screener_id: str):
-    # Minimal results: return latest 20 stocks as placeholder
+    # Criteria on custom indicators ({'field': 'indicator:<id>', 'op': '>', 'value': 0})
+    # run through the formula engine; otherwise return latest 20 stocks as placeholder
     try:
-        _ = Screener.objects.get(id=screener_id)  # ensure exists
+        screener = Screener.objects.get(id=screener_id)
+        criteria = screener.criteria if isinstance(screener.criteria, list) else []
+        indicator_criteria = [
+            c for c in criteria
+            if isinstance(c, dict) and str(c.get('field', '')).startswith('indicator:')
+        ]
+        if indicator_criteria:
+            return _screen_by_indicators(request, screener, indicator_criteria)
         qs = Stock.objects.order_by('-last_updated')[:20]
         data = [{'ticker': s.ticker, 'company_name': s.company_name or s.name, 'current_price': format_decimal_safe(s.current_price)} for s in qs]
         return Response({'success': True, 'count': len(data), 'data': data, 'generated_at': timezone.now().isoformat()})
@@ -1413,22 +1398,96 @@ def screeners_results_api(request, screener_id: str):
         return Response({'success': False, 'error': 'Failed to run screener'}, status=500)
 
 
+def _screen_by_indicators(request, screener, indicator_criteria):
+    """Intersect the matches of each custom-indicator criterion over the universe."""
+    from .indicator_engine import FormulaError, get_plan, screen
+
+    tickers = list(Stock.objects.order_by('-volume').values_list('ticker', flat=True)[:2000])
+    values = {}
+    for criterion in indicator_criteria:
+        indicator_id = criterion['field'].split(':', 1)[1]
+        indicator = CustomIndicator.objects.filter(
+            Q(user_id=screener.user_id) | Q(privacy__in=['public', 'unlisted']), id=indicator_id
+        ).first()
+        if indicator is None:
+            return Response({'success': False, 'error': f'Indicator {indicator_id} not found'}, status=400)
+        try:
+            matches, stats = screen(get_plan(indicator), tickers, op=criterion.get('op', '>'), value=criterion.get('value', 0))
+        except (FormulaError, TypeError, ValueError) as e:
+            return Response({'success': False, 'error': f'Indicator {indicator_id}: {e}'}, status=400)
+        if stats.get('status') == 'warming':
+            # Price history is being loaded in the background; retry shortly
+            return Response({
+                'success': True, 'status': 'warming', 'count': 0, 'data': [],
+                'missing': stats['missing'], 'generated_at': timezone.now().isoformat(),
+            }, status=202)
+        tickers = [m['ticker'] for m in matches]
+        for m in matches:
+            values.setdefault(m['ticker'], {})[indicator_id] = m['value']
+        if not tickers:
+            break
+    stocks = {s.ticker: s for s in Stock.objects.filter(ticker__in=tickers[:200])}
+    data = [
+        {
+            'ticker': t,
+            'company_name': stocks[t].company_name or stocks[t].name,
+            'current_price': format_decimal_safe(stocks[t].current_price),
+            'indicators': values.get(t, {}),
+        }
+        for t in tickers[:200] if t in stocks
+    ]
+    Screener.objects.filter(pk=screener.pk).update(last_run=timezone.now())
+    return Response({'success': True, 'count': len(data), 'data': data, 'generated_at': timezone.now().isoformat()})
+
+
+def _stock_export_columns(*base: Column) -> columnar.ColumnSet:
+    """Export columns: ``base`` by default, any stock list field through ``fields=``."""
+    names = [c.name for c in base]
+    return columnar.ColumnSet(
+        list(base) + [c for c in STOCK_LIST_COLUMNS.columns if c.name not in names],
+        default=names,
+    )
+
+
+def _company_column():
+    return Column('company_name', lambda r: r['company_name'] or r['name'], ('company_name', 'name'))
+
+
+SCREENER_EXPORT_COLUMNS = _stock_export_columns(
+    Column('ticker'), _company_column(), decimal_column('current_price', default=0),
+)
+
+
+def _export_response(request, column_set: columnar.ColumnSet, queryset, filename: str, limit: int):
+    """CSV by default; ``output=``/Accept select NDJSON, JSON rows, columnar JSON or MessagePack.
+
+    CSV and NDJSON stream the whole queryset in constant memory; ``limit``
+    caps the formats that are built in memory.
+    """
+    output = columnar.negotiate(request, default=columnar.CSV)
+    try:
+        columns = column_set.select(columnar.requested_fields(request))
+    except columnar.UnknownFieldsError as e:
+        return Response({'success': False, 'error': str(e)}, status=400)
+    if output in (columnar.CSV, columnar.NDJSON):
+        return streaming_export.stream_queryset(
+            request, output, queryset, columns, column_set.sources(columns), filename=filename,
+        )
+    records = queryset.values(*column_set.sources(columns))[:limit]
+    if output == columnar.ROWS:
+        data = column_set.rows(records, columns)
+        return Response({'success': True, 'count': len(data), 'data': data})
+    return column_set.response(output, records, columns, filename=filename)
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@renderer_classes(columnar.RENDERER_CLASSES)
 def screeners_export_csv_api(request, screener_id: str):
     try:
-        import io, csv
         _ = Screener.objects.get(id=screener_id)
-        qs = Stock.objects.order_by('-last_updated')[:100]
-        buf = io.StringIO()
-        w = csv.writer(buf)
-        w.writerow(['ticker', 'company_name', 'current_price'])
-        for s in qs:
-            w.writerow([s.ticker, s.company_name or s.name, format_decimal_safe(s.current_price) or 0])
-        from django.http import HttpResponse
-        resp = HttpResponse(buf.getvalue(), content_type='text/csv')
-        resp['Content-Disposition'] = f'attachment; filename="screener_{screener_id}.csv"'
-        return resp
+        qs = Stock.objects.order_by('-last_updated')
+        return _export_response(request, SCREENER_EXPORT_COLUMNS, qs, f'screener_{screener_id}.csv', 100)
     except Screener.DoesNotExist:
         return Response({'success': False, 'error': 'Not found'}, status=404)
     except Exception as e:
@@ -1466,28 +1525,40 @@ def stock_insiders_api(request, ticker: str):
         return Response({'success': False, 'error': 'Failed to load insiders'}, status=500)
 
 
+STOCK_EXPORT_COLUMNS = _stock_export_columns(
+    Column('ticker'),
+    _company_column(),
+    decimal_column('current_price'),
+    decimal_column('change_percent'),
+    Column('volume', lambda r: r['volume'] or 0),
+)
+
+PORTFOLIO_EXPORT_COLUMNS = columnar.ColumnSet([
+    Column('portfolio', sources=('portfolio__name',)),
+    Column('ticker', sources=('stock__ticker',)),
+    decimal_column('shares'),
+    decimal_column('avg_cost', 'average_cost'),
+    decimal_column('current_price'),
+    decimal_column('market_value'),
+    decimal_column('unrealized_pnl', 'unrealized_gain_loss'),
+])
+
+WATCHLIST_EXPORT_COLUMNS = columnar.ColumnSet([
+    Column('watchlist', sources=('watchlist__name',)),
+    Column('ticker', sources=('stock__ticker',)),
+    decimal_column('added_price'),
+    decimal_column('current_price'),
+    decimal_column('price_change_percent'),
+])
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@renderer_classes(columnar.RENDERER_CLASSES)
 def export_stocks_csv_api(request):
     try:
-        qs = Stock.objects.order_by('ticker')[:1000]
-        buf = []
-        writer = csv.writer(buf := [])  # type: ignore
-        # Build CSV in memory
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['ticker', 'company_name', 'current_price', 'change_percent', 'volume'])
-        for s in qs:
-            writer.writerow([
-                s.ticker,
-                s.company_name or s.name,
-                format_decimal_safe(s.current_price),
-                format_decimal_safe(s.change_percent),
-                s.volume or 0,
-            ])
-        resp = HttpResponse(output.getvalue(), content_type='text/csv')
-        resp['Content-Disposition'] = 'attachment; filename="stocks.csv"'
-        return resp
+        qs = Stock.objects.order_by('ticker')
+        return _export_response(request, STOCK_EXPORT_COLUMNS, qs, 'stocks.csv', 1000)
     except Exception as e:
         logger.error(f"export_stocks_csv_api error: {e}", exc_info=True)
         return Response({'success': False, 'error': 'Failed to export stocks CSV'}, status=500)
@@ -1495,27 +1566,13 @@ def export_stocks_csv_api(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@renderer_classes(columnar.RENDERER_CLASSES)
 def export_portfolio_csv_api(request):
     try:
         # Export aggregate holdings across all portfolios (placeholder)
         from .models import PortfolioHolding
-        holdings = PortfolioHolding.objects.select_related('portfolio', 'stock').all()[:5000]
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['portfolio', 'ticker', 'shares', 'avg_cost', 'current_price', 'market_value', 'unrealized_pnl'])
-        for h in holdings:
-            writer.writerow([
-                h.portfolio.name,
-                h.stock.ticker,
-                float(h.shares),
-                float(h.average_cost),
-                float(h.current_price),
-                float(h.market_value),
-                float(h.unrealized_gain_loss),
-            ])
-        resp = HttpResponse(output.getvalue(), content_type='text/csv')
-        resp['Content-Disposition'] = 'attachment; filename="portfolio_holdings.csv"'
-        return resp
+        holdings = PortfolioHolding.objects.all()
+        return _export_response(request, PORTFOLIO_EXPORT_COLUMNS, holdings, 'portfolio_holdings.csv', 5000)
     except Exception as e:
         logger.error(f"export_portfolio_csv_api error: {e}", exc_info=True)
         return Response({'success': False, 'error': 'Failed to export portfolio CSV'}, status=500)
@@ -1523,25 +1580,13 @@ def export_portfolio_csv_api(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@renderer_classes(columnar.RENDERER_CLASSES)
 def export_watchlist_csv_api(request):
     try:
         # Export all watchlist items (placeholder)
         from .models import WatchlistItem
-        items = WatchlistItem.objects.select_related('watchlist', 'stock').all()[:5000]
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['watchlist', 'ticker', 'added_price', 'current_price', 'price_change_percent'])
-        for it in items:
-            writer.writerow([
-                it.watchlist.name,
-                it.stock.ticker,
-                float(it.added_price),
-                float(it.current_price),
-                float(it.price_change_percent),
-            ])
-        resp = HttpResponse(output.getvalue(), content_type='text/csv')
-        resp['Content-Disposition'] = 'attachment; filename="watchlist_items.csv"'
-        return resp
+        items = WatchlistItem.objects.all()
+        return _export_response(request, WATCHLIST_EXPORT_COLUMNS, items, 'watchlist_items.csv', 5000)
     except Exception as e:
         logger.error(f"export_watchlist_csv_api error: {e}", exc_info=True)
         return Response({'success': False, 'error': 'Failed to export watchlist CSV'}, status=500)
@@ -1596,10 +1641,8 @@ def total_alerts_api(request):
 @permission_classes([AllowAny])
 def portfolio_value_api(request):
     try:
-        from .models import PortfolioHolding
-        agg = PortfolioHolding.objects.all()
-        total_value = sum((h.market_value or 0) for h in agg)
-        return Response({'success': True, 'total_portfolio_value': float(total_value)})
+        summary = platform_metrics.get_summary()
+        return Response({'success': True, 'total_portfolio_value': summary['total_value']})
     except Exception as e:
         logger.error(f"portfolio_value_api error: {e}", exc_info=True)
         return Response({'success': False, 'error': 'Failed to compute portfolio value'}, status=500)
@@ -1609,10 +1652,8 @@ def portfolio_value_api(request):
 @permission_classes([AllowAny])
 def portfolio_pnl_api(request):
     try:
-        from .models import PortfolioHolding
-        agg = PortfolioHolding.objects.all()
-        total_pnl = sum((h.unrealized_gain_loss or 0) for h in agg)
-        return Response({'success': True, 'unrealized_pnl': float(total_pnl)})
+        summary = platform_metrics.get_summary()
+        return Response({'success': True, 'unrealized_pnl': summary['unrealized_pnl']})
     except Exception as e:
         logger.error(f"portfolio_pnl_api error: {e}", exc_info=True)
         return Response({'success': False, 'error': 'Failed to compute PnL'}, status=500)
@@ -1622,13 +1663,13 @@ def portfolio_pnl_api(request):
 @permission_classes([AllowAny])
 def portfolio_return_api(request):
     try:
-        from .models import UserPortfolio
-        portfolios = UserPortfolio.objects.all()
-        # Weighted by total_cost if available
-        total_cost = sum((p.total_cost or 0) for p in portfolios)
-        total_return = sum((p.total_return or 0) for p in portfolios)
-        pct = float((total_return / total_cost) * 100) if total_cost else 0.0
-        return Response({'success': True, 'total_return_amount': float(total_return), 'total_return_percent': pct})
+        # Aggregate return weighted by total_cost
+        summary = platform_metrics.get_summary()
+        return Response({
+            'success': True,
+            'total_return_amount': summary['total_return'],
+            'total_return_percent': summary['total_return_percent'],
+        })
     except Exception as e:
         logger.error(f"portfolio_return_api error: {e}", exc_info=True)
         return Response({'success': False, 'error': 'Failed to compute portfolio return'}, status=500)
@@ -1638,9 +1679,8 @@ def portfolio_return_api(request):
 @permission_classes([AllowAny])
 def portfolio_holdings_count_api(request):
     try:
-        from .models import PortfolioHolding
-        count = PortfolioHolding.objects.count()
-        return Response({'success': True, 'holdings_count': count})
+        summary = platform_metrics.get_summary()
+        return Response({'success': True, 'holdings_count': summary['holdings_count']})
     except Exception as e:
         logger.error(f"portfolio_holdings_count_api error: {e}", exc_info=True)
         return Response({'success': False, 'error': 'Failed to compute holdings count'}, status=500)
@@ -3,3 +3,70 @@ from django.apps import AppConfig
 class StocksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'stocks'
+
+    def ready(self):
+        # Rebuild the shared market breadth document after each ingestion write
+        from stock_retrieval.delta_writer import stock_changes_applied
+        from .market_breadth import on_stock_changes
+        stock_changes_applied.connect(on_stock_changes, dispatch_uid='stocks.market_breadth')
+
+        # Keep the in-memory ticker universe used by news extraction current
+        from django.db.models.signals import post_delete, post_save
+        from .models import Stock
+        from .text_analytics import on_stock_created_or_deleted
+        post_save.connect(on_stock_created_or_deleted, sender=Stock, dispatch_uid='stocks.ticker_universe.save')
+        post_delete.connect(on_stock_created_or_deleted, sender=Stock, dispatch_uid='stocks.ticker_universe.delete')
+
+        # Maintain the ticker/category -> user index used for news fan-out
+        from .models import PortfolioHolding, UserInterests, WatchlistItem
+        from . import news_fanout
+        for signal in (post_save, post_delete):
+            signal.connect(news_fanout.on_interests_changed, sender=UserInterests, dispatch_uid=f'stocks.news_fanout.interests.{signal is post_save}')
+            signal.connect(news_fanout.on_holding_changed, sender=PortfolioHolding, dispatch_uid=f'stocks.news_fanout.holding.{signal is post_save}')
+            signal.connect(news_fanout.on_watchlist_item_changed, sender=WatchlistItem, dispatch_uid=f'stocks.news_fanout.watchlist.{signal is post_save}')
+
+        # Keep header badge counters in step with notification and alert rows
+        from .models import NotificationHistory, StockAlert
+        from . import badge_counters
+        post_save.connect(badge_counters.on_notification_saved, sender=NotificationHistory, dispatch_uid='stocks.badges.notification.save')
+        post_delete.connect(badge_counters.on_notification_deleted, sender=NotificationHistory, dispatch_uid='stocks.badges.notification.delete')
+        post_save.connect(badge_counters.on_alert_saved, sender=StockAlert, dispatch_uid='stocks.badges.alert.save')
+        post_delete.connect(badge_counters.on_alert_deleted, sender=StockAlert, dispatch_uid='stocks.badges.alert.delete')
+
+        # Drop cached auth principals when the user, their groups or plan change
+        from django.contrib.auth import get_user_model
+        from django.contrib.auth.signals import user_logged_out
+        from django.db.models.signals import m2m_changed
+        from .models import UserProfile
+        from . import auth_cache
+        User = get_user_model()
+        post_save.connect(auth_cache.on_user_changed, sender=User, dispatch_uid='stocks.auth_cache.user.save')
+        post_delete.connect(auth_cache.on_user_changed, sender=User, dispatch_uid='stocks.auth_cache.user.delete')
+        post_save.connect(auth_cache.on_profile_changed, sender=UserProfile, dispatch_uid='stocks.auth_cache.profile.save')
+        post_delete.connect(auth_cache.on_profile_changed, sender=UserProfile, dispatch_uid='stocks.auth_cache.profile.delete')
+        m2m_changed.connect(auth_cache.on_groups_changed, sender=User.groups.through, dispatch_uid='stocks.auth_cache.groups')
+        user_logged_out.connect(auth_cache.on_user_logged_out, dispatch_uid='stocks.auth_cache.logout')
+
+        # Drop cached NAV days from a changed transaction's date onward
+        from django.db.models.signals import pre_save
+        from .models import TradeTransaction
+        from . import portfolio_analytics
+        pre_save.connect(portfolio_analytics.on_transaction_pre_save, sender=TradeTransaction, dispatch_uid='stocks.portfolio_nav.pre_save')
+        post_save.connect(portfolio_analytics.on_transaction_changed, sender=TradeTransaction, dispatch_uid='stocks.portfolio_nav.save')
+        post_delete.connect(portfolio_analytics.on_transaction_changed, sender=TradeTransaction, dispatch_uid='stocks.portfolio_nav.delete')
+
+        # Rebuild the platform portfolio totals after holding and portfolio writes
+        from .models import UserPortfolio
+        from . import platform_metrics
+        for signal in (post_save, post_delete):
+            signal.connect(platform_metrics.on_portfolio_changed, sender=PortfolioHolding, dispatch_uid=f'stocks.platform_metrics.holding.{signal is post_save}')
+            signal.connect(platform_metrics.on_portfolio_changed, sender=UserPortfolio, dispatch_uid=f'stocks.platform_metrics.portfolio.{signal is post_save}')
+
+        # Fold referral trials and referral revenue into the partner rollups
+        from .models import ReferralTrialEvent, RevenueTracking
+        from . import referral_analytics
+        post_save.connect(referral_analytics.on_trial_saved, sender=ReferralTrialEvent, dispatch_uid='stocks.referral_rollups.trial.save')
+        post_delete.connect(referral_analytics.on_trial_deleted, sender=ReferralTrialEvent, dispatch_uid='stocks.referral_rollups.trial.delete')
+        pre_save.connect(referral_analytics.on_revenue_pre_save, sender=RevenueTracking, dispatch_uid='stocks.referral_rollups.revenue.pre_save')
+        post_save.connect(referral_analytics.on_revenue_saved, sender=RevenueTracking, dispatch_uid='stocks.referral_rollups.revenue.save')
+        post_delete.connect(referral_analytics.on_revenue_deleted, sender=RevenueTracking, dispatch_uid='stocks.referral_rollups.revenue.delete')
@@ -0,0 +1,166 @@
+"""
+Cached identity for authenticated requests.
+
+Sessions use the cached_db engine (a write-through cache over the session
+table), so reading one is a cache hit. This module caches what
+AuthenticationMiddleware and the plan middlewares load next: the User row,
+its profile and its group names, kept together as one principal per user.
+CachedAuthenticationMiddleware resolves ``request.user`` from it, so a
+steady-state authenticated request runs no auth queries.
+
+A principal is dropped after commit when the user, their groups or their
+profile (plan) change, and on logout. A session hash that doesn't match the
+cached user is re-checked against the database before anyone is logged out,
+and a cached principal is only served while its row is still active (one
+indexed lookup), so deactivation takes effect on the next request.
+
+Drops only reach other workers through a shared cache, so principals are
+cached only when settings.CACHE_SHARED is true; with the per-process
+LocMemCache every request loads the user as AuthenticationMiddleware does.
+"""
+import logging
+import os
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, _get_user_session_key, load_backend
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_TTL = int(os.environ.get('AUTH_PRINCIPAL_CACHE_TTL', '300'))
+
+
+def _key(user_id):
+    return f'auth:principal:{user_id}'
+
+
+def invalidate(user_id) -> None:
+    """Drop the cached principal once the current transaction commits."""
+    if user_id is not None:
+        key = _key(user_id)
+        transaction.on_commit(lambda: cache.delete(key))
+
+
+def _load(user_id, backend_path):
+    user = load_backend(backend_path).get_user(user_id)
+    if user is None:
+        return None
+    # Fill the relations read on every request so they travel with the cached user
+    user._principal_groups = frozenset(
+        name.strip().lower() for name in user.groups.values_list('name', flat=True)
+    )
+    getattr(user, 'profile', None)
+    return user
+
+
+def _enabled():
+    return getattr(settings, 'CACHE_SHARED', False)
+
+
+def _still_active(user):
+    return type(user)._default_manager.filter(pk=user.pk, is_active=True).exists()
+
+
+def get_principal(user_id, backend_path, refresh=False):
+    """The (possibly cached) user for ``user_id``, or None when it no longer authenticates."""
+    if not _enabled():
+        return _load(user_id, backend_path)
+    key = _key(user_id)
+    user = None if refresh else cache.get(key)
+    if user is not None and not _still_active(user):
+        # Deactivated since it was cached; reload so the backend decides
+        cache.delete(key)
+        user = None
+    if user is None:
+        user = _load(user_id, backend_path)
+        if user is not None:
+            try:
+                cache.set(key, user, PRINCIPAL_TTL)
+            except Exception as e:
+                logger.warning(f"Could not cache principal for user {user_id}: {e}")
+    return user
+
+
+def group_names(user):
+    """Lowercased group names, from the principal when it carries them."""
+    names = getattr(user, '_principal_groups', None)
+    if names is None:
+        names = frozenset(g.name.strip().lower() for g in user.groups.all())
+    return names
+
+
+def _hash_matches(user, session_hash):
+    return bool(session_hash) and constant_time_compare(session_hash, user.get_session_auth_hash())
+
+
+def get_user(request):
+    """django.contrib.auth.get_user, reading the user from the principal cache."""
+    try:
+        user_id = _get_user_session_key(request)
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+
+    user = get_principal(user_id, backend_path)
+    if user is None:
+        return AnonymousUser()
+    if not hasattr(user, 'get_session_auth_hash'):
+        return user
+    session_hash = request.session.get(HASH_SESSION_KEY)
+    if _hash_matches(user, session_hash):
+        return user
+
+    # The cached copy may predate a password change made through another worker
+    user = get_principal(user_id, backend_path, refresh=True)
+    if user is not None:
+        if _hash_matches(user, session_hash):
+            return user
+        fallbacks = getattr(user, 'get_session_auth_fallback_hash', lambda: ())()
+        if session_hash and any(constant_time_compare(session_hash, h) for h in fallbacks):
+            request.session.cycle_key()
+            request.session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            return user
+    request.session.flush()
+    return AnonymousUser()
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware backed by the principal cache."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
+
+
+# ----- invalidation receivers -----
+
+def on_user_changed(sender, instance, **kwargs):
+    invalidate(instance.pk)
+
+
+def on_profile_changed(sender, instance, **kwargs):
+    invalidate(instance.user_id)
+
+
+def on_user_logged_out(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate(user.pk)
+
+
+def on_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate(instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        for user_id in pk_set or ():
+            invalidate(user_id)
+    elif action == 'pre_clear':
+        for user_id in instance.user_set.values_list('pk', flat=True):
+            invalidate(user_id)
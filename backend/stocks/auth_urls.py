@@ -48,6 +48,7 @@ urlpatterns = [
     path('notifications/settings/', billing_api.notification_settings_api, name='notification_settings'),
     path('notifications/history/', notifications_api.notification_history_api, name='notification_history'),
     path('notifications/mark-read/', notifications_api.mark_notifications_read_api, name='mark_notifications_read'),
+    path('notifications/badges/', notifications_api.badge_counts_api, name='notification_badges'),
     
     # Usage statistics
     path('usage-stats/', billing_api.usage_stats_api, name='usage_stats'),
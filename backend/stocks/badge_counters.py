@@ -0,0 +1,163 @@
+"""
+Header badge counts: unread notifications, active alerts and unread news.
+
+Counts live in UserBadgeCounters (and NewsFeedCounters for news) and are
+adjusted with F() updates inside the transaction that changes the source
+rows, so reading them never runs COUNT queries. The combined document is
+cached per user under a version key; every change publishes a new version
+after commit, so readers never pick up a document built before the change
+and stale versions simply expire.
+
+The version only orders documents within one cache; HTTP validators come
+from etag_for(), a hash of the counts actually served, so they agree across
+workers that keep separate caches.
+"""
+import hashlib
+import logging
+import os
+import time
+from typing import Dict, Iterable
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import NotificationHistory, StockAlert, UserBadgeCounters
+
+logger = logging.getLogger(__name__)
+
+# Backstop for per-process caches, which don't see other workers' version bumps
+CACHE_TTL = int(os.environ.get('BADGE_CACHE_TTL', '30'))
+VERSION_TTL = 24 * 3600
+
+
+def _version_key(user_id):
+    return f'badges:ver:{user_id}'
+
+
+def _doc_key(user_id, version):
+    return f'badges:{user_id}:{version}'
+
+
+def _new_version():
+    return time.time_ns() // 1000
+
+
+def current_version(user_id: int) -> int:
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), _new_version(), VERSION_TTL)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def invalidate(user_ids: Iterable[int]) -> None:
+    """Publish a new version for each user once the current transaction commits."""
+    user_ids = {u for u in user_ids if u}
+    if not user_ids:
+        return
+
+    def publish():
+        version = _new_version()
+        cache.set_many({_version_key(u): version for u in user_ids}, VERSION_TTL)
+
+    transaction.on_commit(publish)
+
+
+def etag_for(doc: Dict[str, int]) -> str:
+    """Strong ETag for a badge document, from its counts alone."""
+    counts = ':'.join(str(doc[k]) for k in ('notifications', 'alerts', 'news'))
+    return '"badges-%s"' % hashlib.sha1(counts.encode()).hexdigest()[:16]
+
+
+def recount(user_id: int) -> Dict[str, int]:
+    """Rebuild a user's row from the source tables."""
+    values = {
+        'unread_notifications': NotificationHistory.objects.filter(user_id=user_id, is_read=False).count(),
+        'active_alerts': StockAlert.objects.filter(user_id=user_id, is_active=True).count(),
+    }
+    UserBadgeCounters.objects.update_or_create(user_id=user_id, defaults=values)
+    invalidate([user_id])
+    return values
+
+
+def adjust(user_id: int, **deltas) -> None:
+    """Apply deltas in the caller's transaction; missing rows are built by a recount on first read."""
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not user_id or not updates:
+        return
+    UserBadgeCounters.objects.filter(user_id=user_id).update(**updates)
+    invalidate([user_id])
+
+
+def _counters(user_id: int) -> Dict[str, int]:
+    row = UserBadgeCounters.objects.filter(user_id=user_id).values('unread_notifications', 'active_alerts').first()
+    if row is None:
+        row, _ = UserBadgeCounters.objects.get_or_create(
+            user_id=user_id,
+            defaults={
+                'unread_notifications': NotificationHistory.objects.filter(user_id=user_id, is_read=False).count(),
+                'active_alerts': StockAlert.objects.filter(user_id=user_id, is_active=True).count(),
+            }
+        )
+        row = {'unread_notifications': row.unread_notifications, 'active_alerts': row.active_alerts}
+    return row
+
+
+def current_counts(user_id: int) -> Dict[str, int]:
+    """Counters read straight from the row, for write views.
+
+    Inside a transaction the cached document still carries the old version
+    (invalidate() publishes on commit), so a view reporting counts it just
+    adjusted must read them here rather than from get_badges().
+    """
+    row = _counters(user_id)
+    return {
+        'notifications': max(0, row['unread_notifications']),
+        'alerts': max(0, row['active_alerts']),
+    }
+
+
+def get_badges(user_id: int) -> Dict[str, int]:
+    """Badge document for a user: one cache read when nothing changed (read views)."""
+    version = current_version(user_id)
+    doc = cache.get(_doc_key(user_id, version))
+    if doc is not None:
+        return doc
+
+    from .news_personalization_service import ensure_feed_counters
+    row = _counters(user_id)
+    news = ensure_feed_counters(user_id)
+    doc = {
+        'version': version,
+        'notifications': max(0, row['unread_notifications']),
+        'alerts': max(0, row['active_alerts']),
+        'news': max(0, news.total_news - news.read_news),
+    }
+    doc['total'] = doc['notifications'] + doc['alerts'] + doc['news']
+    cache.set(_doc_key(user_id, version), doc, CACHE_TTL)
+    return doc
+
+
+# ----- Signal receivers -----
+# Creates and deletes are tracked here; read/toggle paths adjust explicitly
+# because they go through queryset.update() or need the previous state.
+
+def on_notification_saved(sender, instance, created=False, **kwargs):
+    if created and not instance.is_read:
+        adjust(instance.user_id, unread_notifications=1)
+
+
+def on_notification_deleted(sender, instance, **kwargs):
+    if not instance.is_read:
+        adjust(instance.user_id, unread_notifications=-1)
+
+
+def on_alert_saved(sender, instance, created=False, **kwargs):
+    if created and instance.is_active:
+        adjust(instance.user_id, active_alerts=1)
+
+
+def on_alert_deleted(sender, instance, **kwargs):
+    if instance.is_active:
+        adjust(instance.user_id, active_alerts=-1)
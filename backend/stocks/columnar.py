@@ -0,0 +1,226 @@
+"""
+Columnar serialization for bulk data endpoints.
+
+A ColumnSet declares each output field once: the database fields it reads
+and how the value is rendered from a ``values()`` row. The same declaration
+produces the existing list-of-dicts JSON, column-oriented JSON, MessagePack
+and CSV, and a ``fields=`` projection trims both the output and the SELECT
+list.
+
+The output format comes from ``?output=`` or the Accept header:
+
+- ``rows`` / application/json: list of row objects (the default for JSON endpoints)
+- ``columns`` / application/vnd.stockscanner.columns+json:
+  ``{"fields": [...], "count": n, "columns": [[...], ...]}``, one array per field
+- ``msgpack`` / application/x-msgpack: the columnar document as MessagePack
+  (needs the optional ``msgpack`` package; falls back to ``columns``)
+- ``csv`` / text/csv: header row plus one line per record
+- ``ndjson`` / application/x-ndjson: one JSON row object per line
+
+Export endpoints stream ``csv`` and ``ndjson`` (see streaming_export).
+"""
+import csv
+import io
+import json
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+ROWS, COLUMNS, MSGPACK, CSV, NDJSON = 'rows', 'columns', 'msgpack', 'csv', 'ndjson'
+MEDIA_TYPES = {
+    ROWS: 'application/json',
+    COLUMNS: 'application/vnd.stockscanner.columns+json',
+    MSGPACK: 'application/x-msgpack',
+    CSV: 'text/csv',
+    NDJSON: 'application/x-ndjson',
+}
+_FORMAT_BY_MEDIA_TYPE = {media: fmt for fmt, media in MEDIA_TYPES.items()}
+_FORMAT_BY_MEDIA_TYPE['application/msgpack'] = MSGPACK
+
+
+class UnknownFieldsError(ValueError):
+    """Raised when ``fields=`` names columns the endpoint does not have."""
+
+
+def to_float(value) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def isoformat(value) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+class Column:
+    """One output field: its name, the ``values()`` keys it reads and a renderer."""
+
+    __slots__ = ('name', 'sources', 'render')
+
+    def __init__(self, name: str, render: Optional[Callable[[Dict], Any]] = None,
+                 sources: Optional[Sequence[str]] = None):
+        self.name = name
+        self.sources = tuple(sources) if sources is not None else (name,)
+        self.render = render or (lambda row, _key=self.sources[0]: row[_key])
+
+
+def decimal_column(name: str, source: Optional[str] = None, default=None) -> Column:
+    """Decimal field rendered as a float; ``default`` replaces null and zero, like the old ``or`` fallbacks."""
+    source = source or name
+    if default is None:
+        return Column(name, lambda row: to_float(row[source]), (source,))
+    return Column(name, lambda row: to_float(row[source]) or default, (source,))
+
+
+class ColumnSet:
+    """Ordered column declarations shared by every output format of an endpoint."""
+
+    def __init__(self, columns: Iterable[Column], default: Optional[Sequence[str]] = None):
+        self.columns = list(columns)
+        self.by_name = {c.name: c for c in self.columns}
+        # Columns returned when no projection is requested (all of them unless narrowed)
+        self.default = [self.by_name[name] for name in default] if default else self.columns
+
+    def select(self, fields: Optional[Sequence[str]] = None) -> List[Column]:
+        if not fields:
+            return self.default
+        unknown = [f for f in fields if f not in self.by_name]
+        if unknown:
+            raise UnknownFieldsError(f"Unknown fields: {', '.join(unknown)}")
+        return [self.by_name[f] for f in dict.fromkeys(fields)]
+
+    @staticmethod
+    def sources(columns: Sequence[Column], *extra: str) -> List[str]:
+        """Database fields to pass to ``values()`` for the selected columns."""
+        return list(dict.fromkeys([s for c in columns for s in c.sources] + list(extra)))
+
+    @staticmethod
+    def rows(records: Iterable[Dict], columns: Sequence[Column],
+             row_filter: Optional[Callable[[Dict, Dict], Dict]] = None) -> List[Dict]:
+        out = []
+        for record in records:
+            row = {c.name: c.render(record) for c in columns}
+            out.append(row_filter(row, record) if row_filter else row)
+        return out
+
+    @staticmethod
+    def column_arrays(records: Iterable[Dict], columns: Sequence[Column]) -> List[List]:
+        arrays = [[] for _ in columns]
+        renders = [(arrays[i].append, c.render) for i, c in enumerate(columns)]
+        for record in records:
+            for append, render in renders:
+                append(render(record))
+        return arrays
+
+    def response(self, fmt: str, records: Iterable[Dict], columns: Sequence[Column],
+                 meta: Optional[Dict] = None, filename: Optional[str] = None) -> HttpResponse:
+        """HttpResponse for the ``columns``, ``msgpack``, ``csv`` and ``ndjson`` formats."""
+        if fmt == CSV:
+            output = io.StringIO()
+            writer = csv.writer(output)
+            writer.writerow([c.name for c in columns])
+            renders = [c.render for c in columns]
+            for record in records:
+                writer.writerow(['' if v is None else v for v in (render(record) for render in renders)])
+            resp = HttpResponse(output.getvalue(), content_type=MEDIA_TYPES[CSV])
+            if filename:
+                resp['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return resp
+        if fmt == NDJSON:
+            body = ''.join(
+                json.dumps(row, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
+                for row in self.rows(records, columns)
+            )
+            return HttpResponse(body, content_type=MEDIA_TYPES[NDJSON])
+
+        arrays = self.column_arrays(records, columns)
+        doc = dict(meta or {})
+        doc.update({
+            'fields': [c.name for c in columns],
+            'count': len(arrays[0]) if arrays else 0,
+            'columns': arrays,
+        })
+        if fmt == MSGPACK and msgpack is not None:
+            body = msgpack.packb(doc, use_bin_type=True, default=str)
+            return HttpResponse(body, content_type=MEDIA_TYPES[MSGPACK])
+        return HttpResponse(
+            json.dumps(doc, cls=DjangoJSONEncoder, separators=(',', ':')),
+            content_type=MEDIA_TYPES[COLUMNS],
+        )
+
+
+def negotiate(request, default: str = ROWS) -> str:
+    """Output format from ``?output=`` or the first supported Accept media type."""
+    requested = (request.GET.get('output') or '').strip().lower()
+    fmt = requested if requested in MEDIA_TYPES else None
+    if fmt is None:
+        for media in request.META.get('HTTP_ACCEPT', '').split(','):
+            fmt = _FORMAT_BY_MEDIA_TYPE.get(media.split(';')[0].strip().lower())
+            # Most HTTP clients send application/json by default; it only selects
+            # rows where rows are already the default
+            if fmt == ROWS and default != ROWS:
+                fmt = None
+            if fmt:
+                break
+    fmt = fmt or default
+    if fmt == MSGPACK and msgpack is None:
+        fmt = COLUMNS
+    return fmt
+
+
+def requested_fields(request) -> Optional[List[str]]:
+    raw = request.GET.get('fields', '')
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    return fields or None
+
+
+# DRF picks a renderer before the view runs and answers 406 when the Accept
+# header matches none of them. These let the columnar media types through;
+# views return ready-made HttpResponses for them, so render() only sees
+# error payloads.
+
+class _PassthroughRenderer(BaseRenderer):
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder).encode('utf-8')
+
+
+class ColumnsJSONRenderer(_PassthroughRenderer):
+    media_type = MEDIA_TYPES[COLUMNS]
+    format = COLUMNS
+
+
+class MessagePackRenderer(_PassthroughRenderer):
+    media_type = MEDIA_TYPES[MSGPACK]
+    format = MSGPACK
+    charset = None
+
+
+class CSVRenderer(_PassthroughRenderer):
+    media_type = MEDIA_TYPES[CSV]
+    format = CSV
+
+
+class NDJSONRenderer(_PassthroughRenderer):
+    media_type = MEDIA_TYPES[NDJSON]
+    format = NDJSON
+
+
+RENDERER_CLASSES = list(api_settings.DEFAULT_RENDERER_CLASSES) + [
+    ColumnsJSONRenderer, MessagePackRenderer, CSVRenderer, NDJSONRenderer,
+]
@@ -0,0 +1,316 @@
+"""
+Buffered ingestion for visitor and checkout analytics events.
+
+Tracking endpoints append plain dicts to an in-process ring buffer and return
+immediately. A background thread drains the buffer when it reaches
+FLUSH_SIZE events or every FLUSH_INTERVAL seconds, writes raw rows with
+bulk_create and folds the batch into minute/hour/day AnalyticsRollup rows
+(by event type or checkout status, country and page). Dashboards read the
+rollups instead of aggregating raw events.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import AnalyticsRollup, CheckoutEvent, VisitorEvent, VisitorSessionDay
+
+logger = logging.getLogger(__name__)
+
+BUFFER_CAPACITY = int(os.environ.get('ANALYTICS_BUFFER_CAPACITY', '50000'))
+FLUSH_SIZE = int(os.environ.get('ANALYTICS_FLUSH_SIZE', '500'))
+FLUSH_INTERVAL = float(os.environ.get('ANALYTICS_FLUSH_INTERVAL', '2.0'))
+
+GRANULARITIES = ('minute', 'hour', 'day')
+OPEN_CHECKOUT_STATUSES = ('started', 'payment_info', 'processing')
+# How long each rollup granularity is kept by prune_rollups()
+RETENTION = {
+    'minute': timedelta(days=2),
+    'hour': timedelta(days=90),
+}
+
+
+def bucket_start(moment, granularity):
+    """Truncate an aware datetime to the start of its minute/hour/day bucket."""
+    moment = moment.astimezone(dt_timezone.utc).replace(second=0, microsecond=0)
+    if granularity in ('hour', 'day'):
+        moment = moment.replace(minute=0)
+    if granularity == 'day':
+        moment = moment.replace(hour=0)
+    return moment
+
+
+class EventBuffer:
+    """Bounded ring buffer drained by a daemon thread on size or time.
+
+    When the buffer is full the oldest events are dropped (and counted) rather
+    than blocking the request thread.
+    """
+
+    def __init__(self, name, flush_fn, capacity=BUFFER_CAPACITY, flush_size=FLUSH_SIZE, interval=FLUSH_INTERVAL):
+        self.name = name
+        self.flush_fn = flush_fn
+        self.flush_size = flush_size
+        self.interval = interval
+        self._events = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self.dropped = 0
+        self.flushed = 0
+        self.failed = 0
+
+    def _ensure_worker(self):
+        # Started lazily and restarted after fork so each worker process drains its own buffer
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            thread = threading.Thread(target=self._run, name=f'{self.name}-flusher', daemon=True)
+            thread.start()
+
+    def append(self, event):
+        self._ensure_worker()
+        with self._lock:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            size = len(self._events)
+        if size >= self.flush_size:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if not self._events:
+                    return 0
+                batch = list(self._events)
+                self._events.clear()
+            started = time.monotonic()
+            try:
+                self.flush_fn(batch)
+                self.flushed += len(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                logger.error(f"{self.name} flush of {len(batch)} events failed: {e}", exc_info=True)
+                return 0
+            finally:
+                from django.db import close_old_connections
+                close_old_connections()
+            logger.debug("%s flushed %s events in %.1f ms", self.name, len(batch), (time.monotonic() - started) * 1000)
+            return len(batch)
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._events)
+        return {'pending': pending, 'flushed': self.flushed, 'dropped': self.dropped, 'failed': self.failed}
+
+
+# ----- Rollups -----
+
+def _rollup_deltas(events, stream, kind_key):
+    """Fold events into {(granularity, bucket, stream, kind, country, page): [count, amount]}."""
+    deltas = defaultdict(lambda: [0, Decimal('0')])
+    for event in events:
+        for granularity in GRANULARITIES:
+            key = (
+                granularity,
+                bucket_start(event['at'], granularity),
+                stream,
+                event[kind_key],
+                event.get('country_code') or '',
+                (event.get('page_url') or '')[:255],
+            )
+            delta = deltas[key]
+            delta[0] += 1
+            if event.get('amount') is not None and event[kind_key] == 'completed':
+                delta[1] += Decimal(str(event['amount']))
+    return deltas
+
+
+def apply_rollups(deltas):
+    """Add deltas to rollup rows: insert missing keys, then lock and increment in bulk."""
+    if not deltas:
+        return
+    fields = ('granularity', 'bucket', 'stream', 'kind', 'country_code', 'page_url')
+    buckets = defaultdict(set)
+    for key in deltas:
+        buckets[key[0]].add(key[1])
+    scope = Q()
+    for granularity, starts in buckets.items():
+        scope |= Q(granularity=granularity, bucket__in=starts)
+    with transaction.atomic():
+        AnalyticsRollup.objects.bulk_create(
+            [AnalyticsRollup(**dict(zip(fields, key))) for key in deltas],
+            ignore_conflicts=True,
+            batch_size=500,
+        )
+        rows = AnalyticsRollup.objects.select_for_update().filter(
+            scope,
+            stream__in={key[2] for key in deltas},
+            kind__in={key[3] for key in deltas},
+            country_code__in={key[4] for key in deltas},
+        )
+        changed = []
+        for row in rows:
+            delta = deltas.get(tuple(getattr(row, f) for f in fields))
+            if delta is None:
+                continue
+            row.count += delta[0]
+            row.amount += delta[1]
+            changed.append(row)
+        AnalyticsRollup.objects.bulk_update(changed, ['count', 'amount'], batch_size=500)
+
+
+def flush_visitor_events(batch):
+    VisitorEvent.objects.bulk_create(
+        [
+            VisitorEvent(
+                session_id=e['session_id'],
+                ip_hash=e['ip_hash'],
+                country_code=e['country_code'],
+                event_type=e['event_type'],
+                page_url=e['page_url'],
+                user_agent=e['user_agent'],
+                user_id=e['user_id'],
+                occurred_at=e['at'],
+            )
+            for e in batch
+        ],
+        batch_size=500,
+    )
+    first_seen = {}
+    for e in batch:
+        if e['session_id']:
+            first_seen.setdefault((e['at'].date(), e['session_id']), e)
+    VisitorSessionDay.objects.bulk_create(
+        [
+            VisitorSessionDay(day=day, session_id=session_id, country_code=e['country_code'], first_seen=e['at'])
+            for (day, session_id), e in first_seen.items()
+        ],
+        ignore_conflicts=True,
+        batch_size=500,
+    )
+    apply_rollups(_rollup_deltas(batch, 'visitor', 'event_type'))
+
+
+def flush_checkout_events(batch):
+    """Replay checkout status updates in order against each session's open checkout."""
+    sessions = {e['session_id'] for e in batch}
+    open_by_session = {}
+    for checkout in CheckoutEvent.objects.filter(
+        session_id__in=sessions, status__in=OPEN_CHECKOUT_STATUSES
+    ).order_by('started_at'):
+        open_by_session[checkout.session_id] = checkout
+
+    created, updated = [], {}
+    transitions = []
+    for e in batch:
+        checkout = open_by_session.get(e['session_id'])
+        if checkout is None:
+            checkout = CheckoutEvent(
+                session_id=e['session_id'],
+                user_id=e['user_id'],
+                status=e['status'],
+                plan_name=e['plan_name'],
+                amount=e['amount'],
+                country_code=e['country_code'],
+                referral_code=e['referral_code'],
+                started_at=e['at'],
+            )
+            created.append(checkout)
+            # Every new checkout counts as a start, whatever step it was first reported at
+            transitions.append({**e, 'status': 'started'})
+            if e['status'] != 'started':
+                transitions.append(e)
+        else:
+            if checkout.status != e['status']:
+                transitions.append(e)
+            checkout.status = e['status']
+            checkout.plan_name = e['plan_name'] or checkout.plan_name
+            checkout.amount = e['amount'] if e['amount'] is not None else checkout.amount
+            checkout.referral_code = e['referral_code'] or checkout.referral_code
+            if checkout.pk:
+                updated[checkout.pk] = checkout
+        if e['status'] == 'completed' and not checkout.completed_at:
+            checkout.completed_at = e['at']
+        if e['status'] in OPEN_CHECKOUT_STATUSES:
+            open_by_session[e['session_id']] = checkout
+        else:
+            open_by_session.pop(e['session_id'], None)
+
+    with transaction.atomic():
+        CheckoutEvent.objects.bulk_create(created, batch_size=500)
+        CheckoutEvent.objects.bulk_update(
+            list(updated.values()),
+            ['status', 'plan_name', 'amount', 'referral_code', 'completed_at'],
+            batch_size=500,
+        )
+    apply_rollups(_rollup_deltas(transitions, 'checkout', 'status'))
+
+
+visitor_buffer = EventBuffer('visitor-events', flush_visitor_events)
+checkout_buffer = EventBuffer('checkout-events', flush_checkout_events)
+
+
+def flush_all():
+    checkout_buffer.flush()
+    visitor_buffer.flush()
+
+
+atexit.register(flush_all)
+
+
+def prune_rollups(now=None):
+    """Drop fine-grained rollups past their retention window."""
+    now = now or timezone.now()
+    deleted = {}
+    for granularity, keep in RETENTION.items():
+        deleted[granularity], _ = AnalyticsRollup.objects.filter(
+            granularity=granularity, bucket__lt=now - keep
+        ).delete()
+    return deleted
+
+
+def granularity_for(start, end, now=None):
+    """Finest useful granularity for the window whose rollups are still retained.
+
+    A short window picks minute or hour buckets, but only when its start is
+    younger than that granularity's RETENTION; older data survives only in
+    coarser rollups.
+    """
+    now = now or timezone.now()
+    span = end - start
+    age = now - start
+    if span <= timedelta(hours=6) and age <= RETENTION['minute']:
+        return 'minute'
+    if span <= timedelta(days=7) and age <= RETENTION['hour']:
+        return 'hour'
+    return 'day'
+
+
+def rollup_queryset(stream, start, end, granularity=None):
+    granularity = granularity or granularity_for(start, end)
+    return AnalyticsRollup.objects.filter(
+        granularity=granularity,
+        stream=stream,
+        bucket__gte=bucket_start(start, granularity),
+        bucket__lte=end,
+    )
@@ -0,0 +1,184 @@
+"""
+Background health sampling for the health endpoints.
+
+A daemon thread per process collects DB latency and row counts, ingestion
+freshness (newest Stock.last_updated), tunnel status, system resources and
+proxy pool health every HEALTH_SAMPLE_INTERVAL seconds into one snapshot.
+Probes read that snapshot, so they cost no DB queries, process scans or CPU
+sampling of their own; a snapshot older than HEALTH_STALE_AFTER is flagged
+stale.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+import psutil
+from django.db import connection, connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = float(os.environ.get('HEALTH_SAMPLE_INTERVAL', '15'))
+STALE_AFTER = float(os.environ.get('HEALTH_STALE_AFTER', str(SAMPLE_INTERVAL * 3)))
+# Ingestion is reported stale when no stock was updated for this long
+INGESTION_MAX_AGE = float(os.environ.get('HEALTH_INGESTION_MAX_AGE', '3600'))
+# How long the first probe in a process waits for the first sample
+FIRST_SAMPLE_WAIT = 2.0
+
+
+def _required_tables():
+    from .models import Stock, StockPrice
+
+    # Tables ingestion writes to; readiness fails while either is missing
+    return [Stock._meta.db_table, StockPrice._meta.db_table]
+
+
+def _sample_database():
+    from .models import Stock
+
+    try:
+        start = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        tables = set(connection.introspection.table_names())
+        if connection.vendor == 'mysql':
+            # Table statistics instead of a full COUNT(*) scan
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT TABLE_ROWS FROM information_schema.tables "
+                    "WHERE table_schema = DATABASE() AND table_name = 'stocks_stock'"
+                )
+                row = cursor.fetchone()
+            stock_count, estimated = (int(row[0] or 0) if row else 0), True
+        else:
+            stock_count, estimated = Stock.objects.count(), False
+
+        newest = Stock.objects.order_by('-last_updated').values_list('last_updated', flat=True).first()
+        age = (timezone.now() - newest).total_seconds() if newest else None
+        database = {
+            "status": "healthy",
+            "latency_ms": round(latency_ms, 2),
+            "stock_count": stock_count,
+            "stock_count_estimated": estimated,
+            "missing_tables": [t for t in _required_tables() if t not in tables],
+        }
+        ingestion = {
+            "status": "fresh" if age is not None and age <= INGESTION_MAX_AGE else "stale",
+            "newest_update": newest.isoformat() if newest else None,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "max_age_seconds": INGESTION_MAX_AGE,
+        }
+        return database, ingestion
+    except Exception as e:
+        return {"status": "unhealthy", "error": str(e)}, {"status": "unknown"}
+    finally:
+        # Return this thread's connections to the pool between samples
+        for conn in connections.all(initialized_only=True):
+            conn.close()
+
+
+def _sample_tunnel():
+    try:
+        for proc in psutil.process_iter(['name']):
+            if 'cloudflared' in (proc.info['name'] or ''):
+                return {"status": "running"}
+        return {"status": "not_running"}
+    except Exception:
+        return {"status": "unknown"}
+
+
+def _sample_system():
+    memory = psutil.virtual_memory()
+    disk = psutil.disk_usage('/')
+    network = psutil.net_io_counters()
+    return {
+        # Non-blocking: utilisation since the previous sample
+        "cpu_percent": psutil.cpu_percent(interval=None),
+        "memory_percent": memory.percent,
+        "memory_available_mb": memory.available / (1024 * 1024),
+        "disk_percent": disk.percent,
+        "disk_free_gb": disk.free / (1024 * 1024 * 1024),
+        "network_bytes_sent": network.bytes_sent,
+        "network_bytes_recv": network.bytes_recv,
+        "uptime_seconds": time.time() - psutil.boot_time(),
+    }
+
+
+def _sample_proxies():
+    try:
+        from stock_retrieval.proxy_scoreboard import get_scoreboard
+
+        board = get_scoreboard()
+        # Scanners write scores from their own processes
+        board.reload()
+        return board.summary()
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def collect():
+    """Take one sample of every component."""
+    started = time.perf_counter()
+    database, ingestion = _sample_database()
+    snapshot = {
+        "database": database,
+        "ingestion": ingestion,
+        "tunnel": _sample_tunnel(),
+        "system": _sample_system(),
+        "proxies": _sample_proxies(),
+    }
+    snapshot["sample_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return snapshot
+
+
+class HealthSampler:
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self._latest = (None, None)  # (snapshot, sampled_at), swapped as one reference
+        self._first = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            # A forked child inherits the parent's snapshot but not its thread
+            self._pid = pid
+        threading.Thread(target=self._run, name='health-sampler', daemon=True).start()
+
+    def _run(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            try:
+                self._latest = (collect(), time.time())
+            except Exception as e:
+                logger.error(f"Health sampling failed: {e}")
+            self._first.set()
+            time.sleep(self.interval)
+
+    def snapshot(self):
+        """(components, meta) from the latest sample; meta says how old and whether stale."""
+        self._ensure_started()
+        if self._latest[0] is None:
+            self._first.wait(FIRST_SAMPLE_WAIT)
+        snapshot, sampled_at = self._latest
+        age = time.time() - sampled_at if sampled_at else None
+        meta = {
+            "sampled_at": datetime.fromtimestamp(sampled_at).isoformat() if sampled_at else None,
+            "age_seconds": round(age, 2) if age is not None else None,
+            "stale": age is None or age > STALE_AFTER,
+        }
+        return snapshot or {}, meta
+
+
+sampler = HealthSampler()
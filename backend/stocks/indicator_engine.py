@@ -0,0 +1,651 @@
+"""
+Server-side evaluation of CustomIndicator formulas.
+
+A formula is parsed with Python's ``ast`` module, checked against a small
+whitelist (series names, indicator parameters, arithmetic/comparison operators
+and the functions in FUNCTIONS) and compiled into a flat evaluation plan of
+NumPy steps with common sub-expressions shared. Plans are cached per
+(indicator id, version, parameter values) and run on a single OHLC series or
+on a (tickers x bars) matrix for universe screening.
+
+Formula syntax, e.g.::
+
+    fast = ema(close, length); slow = ema(close, length * 2)
+    crossover(fast, slow) and rsi(close, 14) < 70
+"""
+import ast
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import yfinance as yf
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+MAX_FORMULA_LENGTH = 2000
+MAX_NODES = 400
+MAX_WINDOW = 1000
+OHLC_FETCH_CHUNK = 100
+OHLC_STORE_DIR = os.environ.get(
+    'OHLC_STORE_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'ohlc'))
+# How long a queued warm-up suppresses queueing another for the same period/interval
+OHLC_WARM_LOCK_TTL = 600
+# Screens missing at most this many tickers fetch them inline instead of warming
+OHLC_INLINE_FETCH = int(os.environ.get('OHLC_INLINE_FETCH', '20'))
+CELERY_ENABLED = os.environ.get('CELERY_ENABLED', 'false').lower() == 'true'
+# yfinance history ranges; anything else is rejected before it reaches a path
+PERIODS = ('1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max')
+INTERVALS = ('1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h', '1d', '5d', '1wk', '1mo', '3mo')
+_SERIES_KEYS = ('t', 'open', 'high', 'low', 'close', 'volume')
+
+
+class FormulaError(ValueError):
+    """Raised for formulas that fail to parse or use anything outside the whitelist."""
+
+
+# ----------------------------- Vector primitives ----------------------------- #
+# All primitives work along the last axis so a 1-D series and a 2-D
+# (tickers x bars) matrix go through the same code.
+
+def _arr(x):
+    return np.asarray(x, dtype=float)
+
+
+def _shift(x, n=1):
+    x = _arr(x)
+    if x.ndim == 0 or n == 0:
+        return x
+    out = np.full(x.shape, np.nan)
+    if n < x.shape[-1]:
+        out[..., n:] = x[..., :-n]
+    return out
+
+
+def _rolling_sum(x, n):
+    x = _arr(x)
+    valid = ~np.isnan(x)
+    pad = [(0, 0)] * (x.ndim - 1) + [(1, 0)]
+    sums = np.pad(np.cumsum(np.where(valid, x, 0.0), axis=-1), pad)
+    counts = np.pad(np.cumsum(valid, axis=-1), pad)
+    out = np.full(x.shape, np.nan)
+    if n <= x.shape[-1]:
+        window_sum = sums[..., n:] - sums[..., :-n]
+        window_count = counts[..., n:] - counts[..., :-n]
+        out[..., n - 1:] = np.where(window_count == n, window_sum, np.nan)
+    return out
+
+
+def _ewm(x, alpha):
+    """Exponential smoothing seeded with the first valid value; gaps carry forward."""
+    x = _arr(x)
+    out = np.empty(x.shape)
+    prev = np.full(x.shape[:-1], np.nan)
+    for t in range(x.shape[-1]):
+        xt = x[..., t]
+        blended = alpha * xt + (1.0 - alpha) * prev
+        prev = np.where(np.isnan(prev), xt, np.where(np.isnan(xt), prev, blended))
+        out[..., t] = prev
+    return out
+
+
+def _warmup(values, source, n):
+    """Blank values until ``n`` valid inputs have been seen."""
+    seen = np.cumsum(~np.isnan(_arr(source)), axis=-1)
+    return np.where(seen >= n, values, np.nan)
+
+
+def sma(x, n):
+    return _rolling_sum(x, n) / n
+
+
+def ema(x, n):
+    return _warmup(_ewm(x, 2.0 / (n + 1)), x, n)
+
+
+def stdev(x, n):
+    mean = sma(x, n)
+    mean_sq = _rolling_sum(_arr(x) ** 2, n) / n
+    return np.sqrt(np.maximum(mean_sq - mean ** 2, 0.0))
+
+
+def rsi(x, n=14):
+    delta = _arr(x) - _shift(x, 1)
+    missing = np.isnan(delta)
+    gain = np.where(missing, np.nan, np.where(delta > 0, delta, 0.0))
+    loss = np.where(missing, np.nan, np.where(delta < 0, -delta, 0.0))
+    avg_gain = _ewm(gain, 1.0 / n)
+    avg_loss = _ewm(loss, 1.0 / n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+    return _warmup(value, delta, n)
+
+
+def highest(x, n):
+    x = _arr(x)
+    out = np.full(x.shape, np.nan)
+    if n <= x.shape[-1]:
+        out[..., n - 1:] = np.lib.stride_tricks.sliding_window_view(x, n, axis=-1).max(axis=-1)
+    return out
+
+
+def lowest(x, n):
+    x = _arr(x)
+    out = np.full(x.shape, np.nan)
+    if n <= x.shape[-1]:
+        out[..., n - 1:] = np.lib.stride_tricks.sliding_window_view(x, n, axis=-1).min(axis=-1)
+    return out
+
+
+def change(x, n=1):
+    return _arr(x) - _shift(x, n)
+
+
+def roc(x, n=1):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (_arr(x) / _shift(x, n) - 1.0) * 100.0
+
+
+def crossover(a, b):
+    a, b = _arr(a), _arr(b)
+    return (a > b) & (_shift(a, 1) <= _shift(b, 1))
+
+
+def crossunder(a, b):
+    a, b = _arr(a), _arr(b)
+    return (a < b) & (_shift(a, 1) >= _shift(b, 1))
+
+
+def nz(x, value=0.0):
+    x = _arr(x)
+    return np.where(np.isnan(x), value, x)
+
+
+def _true_range(high, low, close):
+    prev_close = _shift(close, 1)
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+# name -> (callable, min args, max args, positions that must be constant windows,
+#          OHLC series injected before the user arguments)
+FUNCTIONS = {
+    'sma': (sma, 2, 2, (1,), ()),
+    'ema': (ema, 2, 2, (1,), ()),
+    'rsi': (rsi, 1, 2, (1,), ()),
+    'stdev': (stdev, 2, 2, (1,), ()),
+    'highest': (highest, 2, 2, (1,), ()),
+    'lowest': (lowest, 2, 2, (1,), ()),
+    'change': (change, 1, 2, (1,), ()),
+    'roc': (roc, 1, 2, (1,), ()),
+    'shift': (_shift, 2, 2, (1,), ()),
+    'crossover': (crossover, 2, 2, (), ()),
+    'crossunder': (crossunder, 2, 2, (), ()),
+    'atr': (lambda h, l, c, n=14: _warmup(_ewm(_true_range(h, l, c), 1.0 / n), c, n + 1), 0, 1, (0,), ('high', 'low', 'close')),
+    'nz': (nz, 1, 2, (), ()),
+    'abs': (np.abs, 1, 1, (), ()),
+    'sqrt': (lambda x: np.sqrt(np.where(_arr(x) < 0, np.nan, x)), 1, 1, (), ()),
+    'log': (lambda x: np.log(np.where(_arr(x) <= 0, np.nan, x)), 1, 1, (), ()),
+    'min': (np.minimum, 2, 2, (), ()),
+    'max': (np.maximum, 2, 2, (), ()),
+}
+
+SERIES = {
+    'open': 'open', 'o': 'open',
+    'high': 'high', 'h': 'high',
+    'low': 'low', 'l': 'low',
+    'close': 'close', 'c': 'close',
+    'volume': 'volume', 'v': 'volume',
+}
+
+_BINOPS = {
+    ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply,
+    ast.Div: np.true_divide, ast.Pow: np.power, ast.Mod: np.mod,
+}
+_CMPOPS = {
+    ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater,
+    ast.GtE: np.greater_equal, ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+
+
+# --------------------------------- Compiler ---------------------------------- #
+
+class Plan:
+    """Flat list of NumPy steps; operands are ('slot', i) or ('const', value)."""
+
+    def __init__(self, steps, output, lookback, inputs):
+        self.steps = steps
+        self.output = output
+        self.lookback = lookback
+        self.inputs = inputs
+
+    def run(self, series):
+        """Evaluate against a mapping of open/high/low/close/volume arrays."""
+        slots = []
+        for fn, operands in self.steps:
+            if fn is None:
+                slots.append(_arr(series[operands]))
+                continue
+            args = [slots[v] if kind == 'slot' else v for kind, v in operands]
+            with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+                slots.append(fn(*args))
+        kind, value = self.output
+        result = slots[value] if kind == 'slot' else value
+        shape = _arr(series['close']).shape
+        return np.broadcast_to(_arr(result), shape)
+
+
+class _Compiler:
+    def __init__(self, params):
+        self.params = params
+        self.steps = []
+        self.memo = {}
+        self.names = {}
+        self.lookbacks = []
+
+    def emit(self, key, fn, operands, lookback):
+        if key in self.memo:
+            return self.memo[key]
+        self.steps.append((fn, operands))
+        self.lookbacks.append(lookback)
+        ref = ('slot', len(self.steps) - 1)
+        self.memo[key] = ref
+        return ref
+
+    def lookback(self, ref):
+        return self.lookbacks[ref[1]] if ref[0] == 'slot' else 0
+
+    def const_int(self, node, what):
+        ref = self.expr(node)
+        if ref[0] != 'const':
+            raise FormulaError(f"{what} must be a number or parameter")
+        value = ref[1]
+        if value != int(value) or not 1 <= int(value) <= MAX_WINDOW:
+            raise FormulaError(f"{what} must be a whole number between 1 and {MAX_WINDOW}")
+        return int(value)
+
+    def expr(self, node):
+        if isinstance(node, ast.Constant):
+            if not isinstance(node.value, (int, float)):
+                raise FormulaError("Only numeric constants are allowed")
+            return ('const', float(node.value))
+
+        if isinstance(node, ast.Name):
+            name = node.id
+            if name in self.names:
+                return self.names[name]
+            if name in SERIES:
+                column = SERIES[name]
+                return self.emit(('series', column), None, column, 0)
+            if name in self.params:
+                return ('const', float(self.params[name]))
+            raise FormulaError(f"Unknown name '{name}'")
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINOPS:
+            return self.apply(_BINOPS[type(node.op)], [self.expr(node.left), self.expr(node.right)])
+
+        if isinstance(node, ast.UnaryOp):
+            operand = self.expr(node.operand)
+            if isinstance(node.op, ast.USub):
+                return self.apply(np.negative, [operand])
+            if isinstance(node.op, ast.UAdd):
+                return operand
+            if isinstance(node.op, ast.Not):
+                return self.apply(np.logical_not, [operand])
+
+        if isinstance(node, ast.Compare):
+            left = self.expr(node.left)
+            result = None
+            for op, comparator in zip(node.ops, node.comparators):
+                if type(op) not in _CMPOPS:
+                    raise FormulaError("Unsupported comparison")
+                right = self.expr(comparator)
+                term = self.apply(_CMPOPS[type(op)], [left, right])
+                result = term if result is None else self.apply(np.logical_and, [result, term])
+                left = right
+            return result
+
+        if isinstance(node, ast.BoolOp):
+            fn = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            result = self.expr(node.values[0])
+            for value in node.values[1:]:
+                result = self.apply(fn, [result, self.expr(value)])
+            return result
+
+        if isinstance(node, ast.IfExp):
+            return self.apply(np.where, [self.expr(node.test), self.expr(node.body), self.expr(node.orelse)])
+
+        if isinstance(node, ast.Call):
+            return self.call(node)
+
+        raise FormulaError(f"Unsupported syntax: {type(node).__name__}")
+
+    def apply(self, fn, operands, window=0):
+        if all(kind == 'const' for kind, _ in operands) and not window:
+            # Constant folding keeps parameter arithmetic out of the plan
+            with np.errstate(all='ignore'):
+                return ('const', float(fn(*[v for _, v in operands])))
+        key = (getattr(fn, '__name__', repr(fn)), tuple(operands))
+        lookback = max([self.lookback(op) for op in operands] or [0]) + window
+        return self.emit(key, fn, operands, lookback)
+
+    def call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            raise FormulaError(f"Unknown function '{getattr(node.func, 'id', '?')}'")
+        if node.keywords:
+            raise FormulaError("Keyword arguments are not supported")
+        name = node.func.id
+        fn, min_args, max_args, window_positions, injected = FUNCTIONS[name]
+        if not min_args <= len(node.args) <= max_args:
+            raise FormulaError(f"{name}() takes {min_args}-{max_args} arguments")
+        operands = []
+        window = 0
+        for position, arg in enumerate(node.args):
+            if position in window_positions:
+                value = self.const_int(arg, f"{name}() window")
+                window = max(window, value)
+                operands.append(('const', value))
+            else:
+                operands.append(self.expr(arg))
+        if not window and window_positions:
+            window = 14 if name in ('rsi', 'atr') else 1
+        series = [self.emit(('series', column), None, column, 0) for column in injected]
+        operands = series + operands
+        key = ('call', name, tuple(operands))
+        lookback = max([self.lookback(op) for op in operands] or [0]) + window
+        return self.emit(key, fn, operands, lookback)
+
+    def compile(self, formula):
+        if not formula or not formula.strip():
+            raise FormulaError("Formula is empty")
+        if len(formula) > MAX_FORMULA_LENGTH:
+            raise FormulaError(f"Formula longer than {MAX_FORMULA_LENGTH} characters")
+        try:
+            tree = ast.parse(formula.replace('\r', ''), mode='exec')
+        except SyntaxError as e:
+            raise FormulaError(f"Syntax error at line {e.lineno}: {e.msg}")
+        if sum(1 for _ in ast.walk(tree)) > MAX_NODES:
+            raise FormulaError("Formula is too complex")
+        body = tree.body
+        if not body or not isinstance(body[-1], ast.Expr):
+            raise FormulaError("Formula must end with an expression")
+        for statement in body[:-1]:
+            if not (isinstance(statement, ast.Assign) and len(statement.targets) == 1
+                    and isinstance(statement.targets[0], ast.Name)):
+                raise FormulaError("Only simple 'name = expression' assignments are allowed")
+            target = statement.targets[0].id
+            if target in SERIES or target in FUNCTIONS:
+                raise FormulaError(f"'{target}' is reserved")
+            self.names[target] = self.expr(statement.value)
+        output = self.expr(body[-1].value)
+        inputs = sorted({operands for fn, operands in self.steps if fn is None})
+        lookback = self.lookback(output)
+        return Plan(self.steps, output, lookback, inputs)
+
+
+def resolve_params(schema, overrides=None):
+    """Parameter values from the indicator's params schema plus numeric overrides."""
+    values = {}
+    for spec in schema or []:
+        if not isinstance(spec, dict) or not spec.get('name'):
+            continue
+        name = str(spec['name'])
+        value = spec.get('default', spec.get('value', 0))
+        if overrides and name in overrides:
+            value = overrides[name]
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise FormulaError(f"Parameter '{name}' must be numeric")
+        if spec.get('min') is not None:
+            value = max(value, float(spec['min']))
+        if spec.get('max') is not None:
+            value = min(value, float(spec['max']))
+        values[name] = value
+    return values
+
+
+def compile_formula(formula, params=None):
+    return _Compiler(params or {}).compile(formula)
+
+
+_plan_cache = OrderedDict()
+_plan_lock = threading.Lock()
+_PLAN_CACHE_SIZE = 256
+
+
+def get_plan(indicator, overrides=None):
+    """Compiled plan for a CustomIndicator, cached per (id, version, params)."""
+    if indicator.mode != 'formula':
+        raise FormulaError("Only formula-mode indicators can run on the server")
+    params = resolve_params(indicator.params, overrides)
+    key = (indicator.id, indicator.version, tuple(sorted(params.items())))
+    with _plan_lock:
+        plan = _plan_cache.get(key)
+        if plan is not None:
+            _plan_cache.move_to_end(key)
+            return plan
+    plan = compile_formula(indicator.formula, params)
+    with _plan_lock:
+        _plan_cache[key] = plan
+        while len(_plan_cache) > _PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+    return plan
+
+
+# ------------------------------- OHLC series -------------------------------- #
+#
+# Series live in an on-disk store (one .npz per ticker/period/interval) shared
+# by every worker. Screens only read the store: tickers it doesn't cover yet
+# are queued for the warm_ohlc_store background task and the screen reports
+# "warming" instead of downloading in the request. A single-ticker evaluate
+# may fetch its one ticker inline.
+
+def check_range(period, interval):
+    """Reject a period/interval yfinance doesn't support (they name store directories)."""
+    if period not in PERIODS:
+        raise FormulaError(f"Unsupported period '{period}'")
+    if interval not in INTERVALS:
+        raise FormulaError(f"Unsupported interval '{interval}'")
+
+
+def _store_path(ticker, period, interval):
+    check_range(period, interval)
+    safe = ''.join(c for c in ticker.upper() if c.isalnum() or c in '.-^=')
+    return os.path.join(OHLC_STORE_DIR, f"{period}_{interval}", f"{safe}.npz")
+
+
+def _frame_to_series(frame):
+    frame = frame.dropna(how='all')
+    if frame.empty or 'Close' not in frame:
+        return None
+    return {
+        't': (frame.index.asi8 // 1_000_000).astype(np.int64),
+        'open': frame['Open'].to_numpy(dtype=float),
+        'high': frame['High'].to_numpy(dtype=float),
+        'low': frame['Low'].to_numpy(dtype=float),
+        'close': frame['Close'].to_numpy(dtype=float),
+        'volume': frame['Volume'].to_numpy(dtype=float),
+    }
+
+
+def _write_series(ticker, period, interval, series):
+    """Store a series; ``None`` stores an empty marker so the ticker counts as covered."""
+    path = _store_path(ticker, period, interval)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if series is None:
+        series = {key: np.empty(0) for key in _SERIES_KEYS}
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as fh:
+        np.savez(fh, **series)
+    os.replace(tmp, path)
+
+
+def read_stored(tickers, period='1y', interval='1d'):
+    """(series by ticker, tickers the store doesn't cover yet); no network access."""
+    check_range(period, interval)
+    found, missing = {}, []
+    for ticker in tickers:
+        try:
+            with np.load(_store_path(ticker, period, interval)) as data:
+                if len(data['close']):
+                    found[ticker] = {key: data[key] for key in _SERIES_KEYS}
+        except FileNotFoundError:
+            missing.append(ticker)
+        except Exception as e:
+            logger.warning("Unreadable OHLC store entry for %s: %s", ticker, e)
+            missing.append(ticker)
+    return found, missing
+
+
+def fetch_and_store(tickers, period='1y', interval='1d'):
+    """Download tickers with chunked yf.download into the store; returns tickers written."""
+    check_range(period, interval)
+    written = 0
+    for start in range(0, len(tickers), OHLC_FETCH_CHUNK):
+        chunk = tickers[start:start + OHLC_FETCH_CHUNK]
+        try:
+            frame = yf.download(
+                tickers=chunk, period=period, interval=interval, group_by='ticker',
+                auto_adjust=False, progress=False, threads=True,
+            )
+        except Exception as e:
+            logger.warning("OHLC download failed for %s tickers: %s", len(chunk), e)
+            continue
+        if frame is None:
+            continue
+        for ticker in chunk:
+            series = None
+            if not frame.empty:
+                if frame.columns.nlevels > 1:
+                    if ticker in frame.columns.get_level_values(0):
+                        series = _frame_to_series(frame[ticker])
+                else:
+                    series = _frame_to_series(frame)
+            _write_series(ticker, period, interval, series)
+            written += 1
+    return written
+
+
+def _warm_in_process(tickers, period, interval, lock_key):
+    try:
+        fetch_and_store(tickers, period, interval)
+    except Exception as e:
+        logger.warning("OHLC warm-up failed for %s tickers: %s", len(tickers), e)
+    finally:
+        cache.delete(lock_key)
+
+
+def request_warm(tickers, period='1y', interval='1d'):
+    """Warm uncovered tickers off the request path, at most once per OHLC_WARM_LOCK_TTL.
+
+    Queues the warm_ohlc_store task when Celery is enabled; otherwise there
+    is no worker to pick it up, so a background thread in this process
+    fetches them.
+    """
+    check_range(period, interval)
+    lock_key = f"ohlc:warm:{period}:{interval}"
+    if not tickers or not cache.add(lock_key, 1, OHLC_WARM_LOCK_TTL):
+        return
+    tickers = list(tickers)
+    if CELERY_ENABLED:
+        try:
+            from .tasks import warm_ohlc_store
+            warm_ohlc_store.delay(tickers, period, interval)
+            return
+        except Exception as e:
+            logger.warning("Could not queue OHLC warm-up, warming in-process: %s", e)
+    threading.Thread(
+        target=_warm_in_process, args=(tickers, period, interval, lock_key),
+        name='ohlc-warm', daemon=True,
+    ).start()
+
+
+def load_ohlc(ticker, period='1y', interval='1d'):
+    """One ticker's OHLC arrays from the store, fetched inline when not stored yet."""
+    found, missing = read_stored([ticker], period, interval)
+    if missing:
+        fetch_and_store(missing, period, interval)
+        found, _ = read_stored([ticker], period, interval)
+    return found.get(ticker)
+
+
+def stack_series(series_by_ticker, bars):
+    """Right-align the last ``bars`` values of each ticker into (tickers x bars) matrices."""
+    tickers = list(series_by_ticker)
+    matrix = {}
+    for column in ('open', 'high', 'low', 'close', 'volume'):
+        out = np.full((len(tickers), bars), np.nan)
+        for row, ticker in enumerate(tickers):
+            values = series_by_ticker[ticker][column][-bars:]
+            if len(values):
+                out[row, bars - len(values):] = values
+        matrix[column] = out
+    return tickers, matrix
+
+
+# -------------------------------- Evaluation --------------------------------- #
+
+def evaluate(plan, series):
+    """Run a plan over one ticker's series; returns (values, elapsed_ms)."""
+    started = time.perf_counter()
+    values = plan.run(series)
+    return values, (time.perf_counter() - started) * 1000
+
+
+_SCREEN_OPS = {'<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal,
+               '==': np.equal, '!=': np.not_equal}
+
+
+def screen(plan, tickers, op=None, value=None, period='1y', interval='1d'):
+    """
+    Evaluate a plan across tickers in one vectorised pass and filter on the
+    latest value. Returns (matches, stats); without ``op`` every ticker with a
+    value is returned.
+
+    Only stored series are read. A few uncovered tickers (OHLC_INLINE_FETCH)
+    are fetched inline; when more are missing a warm-up is requested and
+    stats['status'] is 'warming' with no matches, so results never depend on
+    which tickers happened to be cached. Each
+    ticker's full stored history is used, as evaluate() does, so values match
+    the single-ticker endpoint.
+    """
+    if op is not None and op not in _SCREEN_OPS:
+        raise FormulaError(f"Unsupported operator '{op}'")
+    check_range(period, interval)
+    started = time.perf_counter()
+    series, missing = read_stored(tickers, period, interval)
+    if missing and len(missing) <= OHLC_INLINE_FETCH:
+        fetch_and_store(missing, period, interval)
+        series, missing = read_stored(tickers, period, interval)
+    if missing:
+        request_warm(missing, period, interval)
+        return [], {'status': 'warming', 'evaluated': 0, 'missing': len(missing), 'compute_ms': 0.0}
+    if not series:
+        return [], {'status': 'ready', 'evaluated': 0, 'missing': 0, 'compute_ms': 0.0}
+    bars = max(len(s['close']) for s in series.values())
+    names, matrix = stack_series(series, bars)
+    compute_started = time.perf_counter()
+    latest = _arr(plan.run(matrix))[:, -1]
+    compute_ms = (time.perf_counter() - compute_started) * 1000
+
+    has_value = ~np.isnan(latest)
+    keep = has_value
+    if op is not None:
+        with np.errstate(invalid='ignore'):
+            keep = has_value & _SCREEN_OPS[op](latest, float(value))
+    matches = [
+        {'ticker': names[i], 'value': float(latest[i]), 'close': float(matrix['close'][i, -1])}
+        for i in np.flatnonzero(keep)
+    ]
+    matches.sort(key=lambda m: m['value'], reverse=True)
+    return matches, {
+        'status': 'ready',
+        'evaluated': len(names),
+        'missing': 0,
+        'bars': bars,
+        'compute_ms': round(compute_ms, 2),
+        'total_ms': round((time.perf_counter() - started) * 1000, 2),
+    }
@@ -5,10 +5,14 @@ from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from django.forms.models import model_to_dict
 from django.core.paginator import Paginator
+from django.db.models import Q
+from stockscanner_django.db_access import read_only_view
 import json
 import uuid
 
-from .models import CustomIndicator
+from . import indicator_engine
+from .indicator_engine import FormulaError
+from .models import CustomIndicator, Stock
 
 
 def _uid() -> str:
@@ -22,6 +26,24 @@ def _safe_json(body):
         return {}
 
 
+def _check_formula(mode, formula, params):
+    """Compile formula-mode indicators up front so bad formulas are rejected on save."""
+    if mode != 'formula' or not formula:
+        return None
+    try:
+        indicator_engine.compile_formula(formula, indicator_engine.resolve_params(params))
+    except FormulaError as e:
+        return JsonResponse({ 'success': False, 'error': f'Invalid formula: {e}' }, status=400)
+    return None
+
+
+def _visible_indicator(request, indicator_id):
+    """Own indicators plus anything shared as public/unlisted."""
+    return CustomIndicator.objects.filter(
+        Q(user=request.user) | Q(privacy__in=['public', 'unlisted']), id=indicator_id
+    ).first()
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 @login_required
@@ -52,6 +74,9 @@ def create_indicator(request):
         privacy = 'private'
     if not name:
         return JsonResponse({ 'success': False, 'error': 'name required' }, status=400)
+    invalid = _check_formula(mode, formula, params)
+    if invalid:
+        return invalid
     cid = _uid()
     obj = CustomIndicator.objects.create(
         id=cid,
@@ -98,6 +123,9 @@ def update_indicator(request, indicator_id: str):
         if key_client in data:
             setattr(obj, field, data[key_client])
             changed = True
+    invalid = _check_formula(obj.mode, obj.formula, obj.params)
+    if invalid:
+        return invalid
     if changed:
         obj.version = int(obj.version or 1) + 1
         obj.updated_at = timezone.now()
@@ -116,3 +144,104 @@ def delete_indicator(request, indicator_id: str):
         return JsonResponse({ 'success': False, 'error': 'Not found' }, status=404)
     obj.delete()
     return JsonResponse({ 'success': True })
+
+
+@read_only_view
+@csrf_exempt
+@require_http_methods(["POST"])
+@login_required
+def validate_formula(request):
+    """Compile a formula without saving it; reports the inputs and lookback it needs."""
+    data = _safe_json(request.body)
+    try:
+        plan = indicator_engine.compile_formula(
+            data.get('formula') or '', indicator_engine.resolve_params(data.get('params') or [])
+        )
+    except FormulaError as e:
+        return JsonResponse({ 'success': False, 'error': str(e) }, status=400)
+    return JsonResponse({ 'success': True, 'data': { 'inputs': plan.inputs, 'lookback': plan.lookback, 'steps': len(plan.steps) } })
+
+
+def _param_overrides(source):
+    overrides = source.get('params') if isinstance(source, dict) else None
+    return overrides if isinstance(overrides, dict) else None
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@login_required
+def evaluate_indicator(request, indicator_id: str):
+    """Evaluate a formula indicator over one ticker's cached OHLC history."""
+    obj = _visible_indicator(request, indicator_id)
+    if obj is None:
+        return JsonResponse({ 'success': False, 'error': 'Not found' }, status=404)
+    ticker = (request.GET.get('ticker') or '').upper().strip()
+    if not ticker:
+        return JsonResponse({ 'success': False, 'error': 'ticker required' }, status=400)
+    period = request.GET.get('period', '1y')
+    interval = request.GET.get('interval', '1d')
+    try:
+        indicator_engine.check_range(period, interval)
+        plan = indicator_engine.get_plan(obj, _param_overrides(_safe_json(request.GET.get('params_json'))))
+    except FormulaError as e:
+        return JsonResponse({ 'success': False, 'error': str(e) }, status=400)
+    series = indicator_engine.load_ohlc(ticker, period, interval)
+    if series is None:
+        return JsonResponse({ 'success': False, 'error': 'No price data' }, status=404)
+    values, elapsed_ms = indicator_engine.evaluate(plan, series)
+    points = [
+        { 't': int(t), 'v': None if v != v else float(v) }
+        for t, v in zip(series['t'], values)
+    ]
+    return JsonResponse({
+        'success': True,
+        'data': {
+            'id': obj.id,
+            'version': obj.version,
+            'ticker': ticker,
+            'period': period,
+            'interval': interval,
+            'lookback': plan.lookback,
+            'points': points,
+            'compute_ms': round(elapsed_ms, 2),
+        }
+    })
+
+
+@read_only_view
+@csrf_exempt
+@require_http_methods(["POST"])
+@login_required
+def screen_indicator(request, indicator_id: str):
+    """Run a formula indicator across the universe (or given tickers) and filter on its latest value."""
+    obj = _visible_indicator(request, indicator_id)
+    if obj is None:
+        return JsonResponse({ 'success': False, 'error': 'Not found' }, status=404)
+    data = _safe_json(request.body)
+    op = data.get('op')
+    value = data.get('value')
+    if op is not None and value is None:
+        return JsonResponse({ 'success': False, 'error': 'value required with op' }, status=400)
+    tickers = [str(t).upper() for t in (data.get('tickers') or [])][:2000]
+    if tickers:
+        # Only known tickers, so screens can't queue downloads for arbitrary symbols
+        known = set(Stock.objects.filter(ticker__in=tickers).values_list('ticker', flat=True))
+        tickers = [t for t in tickers if t in known]
+    else:
+        tickers = list(Stock.objects.order_by('-volume').values_list('ticker', flat=True)[:2000])
+    try:
+        limit = max(1, min(int(data.get('limit', 100)), 500))
+        plan = indicator_engine.get_plan(obj, _param_overrides(data))
+        matches, stats = indicator_engine.screen(
+            plan, tickers, op=op, value=value,
+            period=data.get('period', '1y'), interval=data.get('interval', '1d'),
+        )
+    except (FormulaError, TypeError, ValueError) as e:
+        return JsonResponse({ 'success': False, 'error': str(e) }, status=400)
+    return JsonResponse({
+        'success': True,
+        'status': stats['status'],
+        'data': matches[:limit],
+        'total': len(matches),
+        'stats': stats,
+    }, status=202 if stats['status'] == 'warming' else 200)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from stocks.news_fanout import rebuild_index
+
+
+class Command(BaseCommand):
+    """Rebuild the ticker/category -> user index used for news fan-out"""
+    help = "Rebuild NewsSubscription rows from interests, portfolio holdings and watchlists"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Users reindexed per transaction (default: 500)')
+
+    def handle(self, *args, **options):
+        rows = rebuild_index(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f"News subscription index rebuilt: {rows} rows"))
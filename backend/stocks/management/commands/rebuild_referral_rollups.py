@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from stocks.referral_analytics import rebuild_rollups
+
+
+class Command(BaseCommand):
+    """Rebuild per-code daily referral rollups from raw clicks, trials and revenue"""
+    help = "Recompute ReferralDailyRollup rows for every referral code, or for the given codes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('codes', nargs='*', help='Referral codes to rebuild (default: all)')
+
+    def handle(self, *args, **options):
+        codes = [code.upper().strip() for code in options['codes']]
+        rows = rebuild_rollups(codes or None)
+        self.stdout.write(self.style.SUCCESS(f"Referral rollups rebuilt ({rows} code-days)"))
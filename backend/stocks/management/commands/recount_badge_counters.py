@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from stocks.badge_counters import recount
+from stocks.models import UserBadgeCounters
+
+
+class Command(BaseCommand):
+    """Rebuild header badge counters from notification and alert rows"""
+    help = "Recount UserBadgeCounters for existing rows, or for the given user ids"
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int, help='Users to recount (default: every user with a counters row)')
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids'] or list(UserBadgeCounters.objects.values_list('user_id', flat=True))
+        for user_id in user_ids:
+            recount(user_id)
+        self.stdout.write(self.style.SUCCESS(f"Badge counters recounted for {len(user_ids)} users"))
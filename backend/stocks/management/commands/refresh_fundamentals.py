@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from stocks.fundamentals_snapshot import refresh_universe
+
+
+class Command(BaseCommand):
+    """Precompute fundamentals snapshots for the stock universe"""
+    help = "Refresh stored fundamentals snapshots (only stale tickers unless --all)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickers', type=str, help='Comma-separated tickers (default: all stocks)')
+        parser.add_argument('--all', action='store_true', help='Recompute even fresh snapshots')
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent yfinance workers (default: 4)')
+        parser.add_argument('--limit', type=int, default=None, help='Maximum tickers to refresh this run')
+
+    def handle(self, *args, **options):
+        tickers = None
+        if options.get('tickers'):
+            tickers = [t.strip().upper() for t in options['tickers'].split(',') if t.strip()]
+        counts = refresh_universe(
+            tickers=tickers,
+            max_workers=max(1, options['workers']),
+            only_stale=not options['all'],
+            limit=options.get('limit'),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Fundamentals snapshots: {counts['refreshed']} refreshed, {counts['skipped']} fresh, "
+            f"{counts['empty']} empty, {counts['failed']} failed"
+        ))
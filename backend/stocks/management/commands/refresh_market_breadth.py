@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from stocks.market_breadth import refresh_breadth
+
+
+class Command(BaseCommand):
+    """Rebuild the market breadth document, e.g. from cron outside ingestion runs"""
+    help = "Recompute the stored market breadth document and publish it to the cache"
+
+    def handle(self, *args, **options):
+        doc = refresh_breadth()
+        self.stdout.write(self.style.SUCCESS(
+            f"Market breadth v{doc['version']} rebuilt over {doc['counts']['total']} stocks"
+        ))
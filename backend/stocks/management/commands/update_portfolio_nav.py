@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from stocks.models import TradeTransaction
+from stocks.portfolio_analytics import ensure_nav
+
+
+class Command(BaseCommand):
+    """Extend cached portfolio NAV series through today (e.g. nightly, after the close)"""
+    help = "Append daily NAV rows for every portfolio with transactions, or for the given portfolio ids"
+
+    def add_arguments(self, parser):
+        parser.add_argument('portfolio_ids', nargs='*', type=int, help='Portfolios to extend (default: all with transactions)')
+
+    def handle(self, *args, **options):
+        portfolio_ids = options['portfolio_ids'] or list(
+            TradeTransaction.objects.values_list('portfolio_id', flat=True).distinct()
+        )
+        failed = 0
+        for portfolio_id in portfolio_ids:
+            try:
+                ensure_nav(portfolio_id)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Portfolio {portfolio_id}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"NAV extended for {len(portfolio_ids) - failed} portfolios ({failed} failed)"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from stocks.indicator_engine import INTERVALS, PERIODS, fetch_and_store
+from stocks.models import Stock
+
+
+class Command(BaseCommand):
+    """Refresh the indicator OHLC store for the screened universe (e.g. nightly, after the close)"""
+    help = "Download OHLC history into the indicator store for the top tickers by volume, or the given tickers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tickers', nargs='*', help='Tickers to refresh (default: top --limit by volume)')
+        parser.add_argument('--limit', type=int, default=2000)
+        parser.add_argument('--period', default='1y', choices=PERIODS)
+        parser.add_argument('--interval', default='1d', choices=INTERVALS)
+
+    def handle(self, *args, **options):
+        tickers = [t.upper() for t in options['tickers']] or list(
+            Stock.objects.order_by('-volume').values_list('ticker', flat=True)[:options['limit']]
+        )
+        written = fetch_and_store(tickers, options['period'], options['interval'])
+        self.stdout.write(self.style.SUCCESS(f"OHLC store refreshed for {written} of {len(tickers)} tickers"))
@@ -0,0 +1,202 @@
+"""
+Market breadth document shared by the dashboard statistics endpoints.
+
+Counts and the change distribution come from one aggregate query over Stock,
+the top-N lists from one indexed ORDER BY ... LIMIT query each, and the result
+is stored as one versioned document. Every caller reads it with one cache or
+DB lookup, however many widgets ask for breadth.
+
+Rebuilds run synchronously, never on a background thread a short-lived
+process could exit under: ingestion runs call refresh_if_changed() once at
+the end (stock_changes_applied only marks the document dirty), the
+refresh_market_breadth command covers schedulers, and a read that finds the
+document older than MAX_AGE rebuilds it once per MIN_REFRESH_SECONDS (per
+cache) while other callers keep getting the stale version.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from stockscanner_django.db_access import read_only
+
+from .models import MarketBreadthSnapshot, Stock
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'market_breadth:doc'
+CACHE_TTL = 60
+REBUILD_LOCK_KEY = 'market_breadth:rebuilding'
+TOP_N = 5
+MIN_REFRESH_SECONDS = 30
+# Rebuild on read if no ingestion run has refreshed the document for this long
+MAX_AGE = timedelta(minutes=15)
+
+# (upper bound, label) buckets for change_percent
+CHANGE_BUCKETS = (
+    (-5.0, 'below_-5'),
+    (-2.0, '-5_to_-2'),
+    (0.0, '-2_to_0'),
+    (2.0, '0_to_2'),
+    (5.0, '2_to_5'),
+    (float('inf'), 'above_5'),
+)
+
+_refresh_lock = threading.Lock()
+# Set by stock_changes_applied in this process, cleared by the next rebuild
+_dirty = False
+
+
+def _num(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _bucket_filter(lower, upper):
+    """Q for change_percent in [lower, upper); an infinite bound is left open."""
+    q = Q(change_percent__isnull=False)
+    if lower is not None:
+        q &= Q(change_percent__gte=lower)
+    if upper != float('inf'):
+        q &= Q(change_percent__lt=upper)
+    return q
+
+
+def _top(filters, order, *fields):
+    rows = Stock.objects.filter(filters).order_by(order, 'ticker').values(*fields)[:TOP_N]
+    return [{field: _num(row[field]) for field in fields} for row in rows]
+
+
+def compute_breadth(now=None):
+    """Build the breadth document with one aggregate query and six top-N queries."""
+    now = now or timezone.now()
+    recent_cutoff = now - timedelta(hours=24)
+    aggregates = {
+        'total': Count('id'),
+        'nasdaq': Count('id', filter=Q(exchange='NASDAQ')),
+        'recent_updates': Count('id', filter=Q(last_updated__gte=recent_cutoff)),
+        'gainers': Count('id', filter=Q(price_change__gt=0)),
+        'losers': Count('id', filter=Q(price_change__lt=0)),
+        'unchanged': Count('id', filter=Q(price_change=0)),
+        'gainers_today': Count('id', filter=Q(price_change_today__gt=0)),
+        'losers_today': Count('id', filter=Q(price_change_today__lt=0)),
+    }
+    lower = None
+    for upper, label in CHANGE_BUCKETS:
+        aggregates[f'bucket:{label}'] = Count('id', filter=_bucket_filter(lower, upper))
+        lower = upper
+    totals = Stock.objects.aggregate(**aggregates)
+    counts = {name: totals[name] or 0 for name in aggregates if not name.startswith('bucket:')}
+    distribution = {label: totals[f'bucket:{label}'] or 0 for _, label in CHANGE_BUCKETS}
+
+    moved = ('ticker', 'name', 'current_price', 'price_change', 'price_change_percent')
+    today = ('ticker', 'name', 'company_name', 'change_percent', 'price_change_today')
+    return {
+        'counts': counts,
+        'change_distribution': distribution,
+        'top_gainers': _top(Q(price_change__gt=0, price_change_percent__isnull=False), '-price_change_percent', *moved),
+        'top_losers': _top(Q(price_change__lt=0, price_change_percent__isnull=False), 'price_change_percent', *moved),
+        'most_active': _top(Q(volume__isnull=False), '-volume', 'ticker', 'name', 'current_price', 'volume'),
+        'top_gainers_today': _top(Q(price_change_today__gt=0), '-price_change_today', *today),
+        'top_losers_today': _top(Q(price_change_today__lt=0), 'price_change_today', *today),
+        'most_active_today': _top(Q(volume__gt=0), '-volume', 'ticker', 'name', 'company_name', 'volume'),
+    }
+
+
+def _stored_doc():
+    """(doc, stale) from the snapshot row, or (None, True) if nothing is stored."""
+    row = MarketBreadthSnapshot.objects.filter(pk=1).values('version', 'data', 'computed_at').first()
+    if row is None:
+        return None, True
+    doc = {'version': row['version'], 'computed_at': row['computed_at'].isoformat(), **row['data']}
+    return doc, timezone.now() - row['computed_at'] > MAX_AGE
+
+
+def _rebuild():
+    """Compute, store and publish a new document version; caller holds _refresh_lock."""
+    global _dirty
+    now = timezone.now()
+    started = time.monotonic()
+    # Clear first so changes applied while computing mark the next run dirty
+    _dirty = False
+    # On the primary even from read views: the snapshot row is written
+    with read_only(False):
+        data = compute_breadth(now)
+        version = int(now.timestamp() * 1000)
+        MarketBreadthSnapshot.objects.update_or_create(
+            pk=1, defaults={'version': version, 'data': data, 'computed_at': now}
+        )
+    doc = {'version': version, 'computed_at': now.isoformat(), **data}
+    cache.set(CACHE_KEY, doc, CACHE_TTL)
+    logger.info(
+        "Market breadth v%s computed over %s stocks in %.0f ms",
+        version, data['counts']['total'], (time.monotonic() - started) * 1000,
+    )
+    return doc
+
+
+def refresh_breadth():
+    """Recompute, store and publish a new document version."""
+    with _refresh_lock:
+        return _rebuild()
+
+
+def refresh_if_changed():
+    """Rebuild if this process applied stock changes since the last rebuild.
+
+    Ingestion runs call this once after their final write, so the document
+    reflects the whole run before the process exits.
+    """
+    global _dirty
+    if not _dirty:
+        return None
+    try:
+        return refresh_breadth()
+    except Exception as e:
+        _dirty = True
+        logger.warning("Market breadth refresh failed: %s", e)
+        return None
+
+
+def _first_build():
+    """Build the very first document; callers that queued behind the build reuse it."""
+    with _refresh_lock:
+        doc = cache.get(CACHE_KEY)
+        if doc is None:
+            doc, _ = _stored_doc()
+        return doc if doc is not None else _rebuild()
+
+
+def get_breadth():
+    """Return the current breadth document with one cache (or DB) read.
+
+    A document older than MAX_AGE is rebuilt by the one caller that wins the
+    rebuild lock; everyone else keeps getting the stale version meanwhile.
+    """
+    doc = cache.get(CACHE_KEY)
+    if doc is not None:
+        return doc
+    doc, stale = _stored_doc()
+    if doc is None:
+        return _first_build()
+    cache.set(CACHE_KEY, doc, CACHE_TTL)
+    if stale and cache.add(REBUILD_LOCK_KEY, 1, MIN_REFRESH_SECONDS):
+        try:
+            return refresh_breadth()
+        except Exception as e:
+            logger.warning("Market breadth refresh failed: %s", e)
+    return doc
+
+
+def on_stock_changes(sender, change_set=None, **kwargs):
+    """stock_changes_applied receiver: mark the document for the end-of-run rebuild."""
+    global _dirty
+    if change_set is not None and not len(change_set):
+        return
+    _dirty = True
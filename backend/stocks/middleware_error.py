@@ -5,10 +5,14 @@ import logging
 import traceback
 import json
 from datetime import datetime
+from collections import OrderedDict, deque
 from django.http import JsonResponse
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import DatabaseError, OperationalError
+from django.urls import Resolver404, resolve
+import threading
 import time
 
 logger = logging.getLogger(__name__)
@@ -171,85 +175,247 @@ class EnhancedErrorHandlingMiddleware:
         return ip
 
 
+class CircuitState:
+    """
+    Rolling outcome window and open/half-open/closed state for one route
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    __slots__ = ('outcomes', 'state', 'opened_at', 'open_for', 'probes', 'last_sync', 'reason')
+
+    def __init__(self, window_size):
+        self.outcomes = deque(maxlen=window_size)  # (timestamp, failed, latency)
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.open_for = 0.0
+        self.probes = 0
+        self.last_sync = 0.0
+        self.reason = ''
+
+    def prune(self, now, window_seconds):
+        while self.outcomes and now - self.outcomes[0][0] > window_seconds:
+            self.outcomes.popleft()
+
+    def failures(self):
+        return sum(1 for _, failed, _ in self.outcomes if failed)
+
+    def p95(self):
+        latencies = sorted(latency for _, _, latency in self.outcomes)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+
 class CircuitBreakerMiddleware:
     """
     Circuit breaker pattern to prevent cascading failures
+
+    State is keyed by resolved URL route (view name), not raw path, so
+    /api/stocks/AAPL/ and /api/stocks/MSFT/ share one breaker, and is held in
+    a bounded LRU. A route trips on repeated 5xx/exceptions or when its p95
+    latency exceeds the limit; after the open period a limited number of
+    half-open probes decide whether it closes again. With SHARED enabled the
+    open state is published through the cache so every worker sheds load.
+
+    Tunables come from settings.CIRCUIT_BREAKER (see DEFAULTS).
     """
-    
+
+    DEFAULTS = {
+        'FAILURE_THRESHOLD': 5,      # failures within the window before opening
+        'OPEN_SECONDS': 60,          # seconds before attempting half-open probes
+        'LATENCY_P95_MS': 8000,      # trip when p95 latency exceeds this (0 disables)
+        'MIN_SAMPLES': 20,           # samples required before the latency rule applies
+        'WINDOW_SECONDS': 60,
+        'WINDOW_SIZE': 100,
+        'HALF_OPEN_PROBES': 1,
+        'MAX_ROUTES': 512,
+        'SHARED': False,             # sync open state across workers via the cache
+        'SYNC_INTERVAL': 1.0,        # seconds between cache checks per route
+    }
+
     def __init__(self, get_response):
         self.get_response = get_response
-        self.failure_count = {}
-        self.circuit_open = {}
-        self.last_failure_time = {}
-        self.threshold = 5  # Number of failures before opening circuit
-        self.timeout = 60   # Seconds before attempting to close circuit
-        
+        config = dict(self.DEFAULTS)
+        config.update(getattr(settings, 'CIRCUIT_BREAKER', {}) or {})
+        self.threshold = int(config['FAILURE_THRESHOLD'])
+        self.timeout = float(config['OPEN_SECONDS'])
+        self.latency_limit = float(config['LATENCY_P95_MS']) / 1000.0
+        self.min_samples = int(config['MIN_SAMPLES'])
+        self.window_seconds = float(config['WINDOW_SECONDS'])
+        self.window_size = int(config['WINDOW_SIZE'])
+        self.half_open_probes = int(config['HALF_OPEN_PROBES'])
+        self.max_routes = int(config['MAX_ROUTES'])
+        self.shared = bool(config['SHARED'])
+        self.sync_interval = float(config['SYNC_INTERVAL'])
+        self.circuits = OrderedDict()
+        self.route_keys = OrderedDict()
+        self.lock = threading.Lock()
+
     def __call__(self, request):
-        endpoint = request.path
-        
+        endpoint = self.route_key(request)
+        if endpoint is None:
+            return self.get_response(request)
+
         # Check if circuit is open
-        if self.is_circuit_open(endpoint):
-            return JsonResponse({
-                'error': 'Service temporarily unavailable',
-                'message': 'This endpoint is experiencing issues. Please try again later.',
-                'retry_after': self.timeout
-            }, status=503, headers={'Retry-After': str(self.timeout)})
-        
+        if not self.allow_request(endpoint):
+            return self.open_response(endpoint)
+
+        started = time.monotonic()
         try:
             response = self.get_response(request)
-            
-            # Reset failure count on success
-            if response.status_code < 500:
-                self.reset_failure_count(endpoint)
-            else:
-                self.record_failure(endpoint)
-            
-            return response
-            
-        except Exception as e:
-            self.record_failure(endpoint)
+        except Exception:
+            self.record(endpoint, failed=True, latency=time.monotonic() - started)
             raise
-    
-    def is_circuit_open(self, endpoint):
+
+        self.record(endpoint, failed=response.status_code >= 500, latency=time.monotonic() - started)
+        return response
+
+    def route_key(self, request):
         """
-        Check if circuit is open for endpoint
+        Resolve the request path to a route name (cached, bounded)
         """
-        if endpoint not in self.circuit_open:
-            return False
-        
-        if not self.circuit_open[endpoint]:
-            return False
-        
-        # Check if timeout has passed
-        time_since_failure = time.time() - self.last_failure_time.get(endpoint, 0)
-        if time_since_failure > self.timeout:
-            logger.info(f"Circuit breaker closing for {endpoint}")
-            self.circuit_open[endpoint] = False
-            self.failure_count[endpoint] = 0
-            return False
-        
-        return True
-    
-    def record_failure(self, endpoint):
+        path = request.path_info
+        with self.lock:
+            key = self.route_keys.get(path)
+            if key is not None:
+                self.route_keys.move_to_end(path)
+                return key or None
+        try:
+            match = resolve(path)
+            key = match.view_name or match.route or ''
+        except Resolver404:
+            key = ''
+        with self.lock:
+            self.route_keys[path] = key
+            if len(self.route_keys) > self.max_routes * 8:
+                self.route_keys.popitem(last=False)
+        return key or None
+
+    def get_circuit(self, endpoint):
+        circuit = self.circuits.get(endpoint)
+        if circuit is None:
+            circuit = CircuitState(self.window_size)
+            self.circuits[endpoint] = circuit
+            if len(self.circuits) > self.max_routes:
+                self.circuits.popitem(last=False)
+        else:
+            self.circuits.move_to_end(endpoint)
+        return circuit
+
+    def allow_request(self, endpoint):
         """
-        Record a failure for an endpoint
+        Decide whether a request may pass; moves open circuits to half-open when due
         """
-        if endpoint not in self.failure_count:
-            self.failure_count[endpoint] = 0
-        
-        self.failure_count[endpoint] += 1
-        self.last_failure_time[endpoint] = time.time()
-        
-        if self.failure_count[endpoint] >= self.threshold:
-            if not self.circuit_open.get(endpoint, False):
-                logger.warning(f"Circuit breaker opening for {endpoint} after {self.failure_count[endpoint]} failures")
-                self.circuit_open[endpoint] = True
-    
-    def reset_failure_count(self, endpoint):
+        now = time.monotonic()
+        with self.lock:
+            circuit = self.get_circuit(endpoint)
+            if circuit.state == CircuitState.CLOSED and self.shared and now - circuit.last_sync >= self.sync_interval:
+                circuit.last_sync = now
+                remaining = self.shared_open_remaining(endpoint)
+                if remaining:
+                    circuit.state = CircuitState.OPEN
+                    circuit.opened_at = now
+                    circuit.open_for = remaining
+                    circuit.reason = 'shared'
+
+            if circuit.state == CircuitState.CLOSED:
+                return True
+            if circuit.state == CircuitState.OPEN:
+                if now - circuit.opened_at < circuit.open_for:
+                    return False
+                logger.info(f"Circuit breaker half-open for {endpoint}")
+                circuit.state = CircuitState.HALF_OPEN
+                circuit.probes = 0
+            if circuit.probes >= self.half_open_probes:
+                return False
+            circuit.probes += 1
+            return True
+
+    def record(self, endpoint, failed, latency):
         """
-        Reset failure count for successful request
+        Record an outcome; trips on failures or slow p95, closes after good probes
         """
-        if endpoint in self.failure_count:
-            self.failure_count[endpoint] = 0
-        if endpoint in self.circuit_open:
-            self.circuit_open[endpoint] = False
\ No newline at end of file
+        now = time.monotonic()
+        with self.lock:
+            circuit = self.get_circuit(endpoint)
+            slow = self.latency_limit > 0 and latency > self.latency_limit
+
+            if circuit.state == CircuitState.HALF_OPEN:
+                circuit.probes = max(0, circuit.probes - 1)
+                if failed or slow:
+                    self.open(endpoint, circuit, now, 'probe failed' if failed else f'probe took {latency:.2f}s')
+                else:
+                    logger.info(f"Circuit breaker closing for {endpoint}")
+                    circuit.state = CircuitState.CLOSED
+                    circuit.outcomes.clear()
+                    if self.shared:
+                        cache.delete(self.cache_key(endpoint))
+                return
+            if circuit.state == CircuitState.OPEN:
+                return
+
+            circuit.outcomes.append((now, failed, latency))
+            circuit.prune(now, self.window_seconds)
+            failures = circuit.failures() if failed else 0
+            if failures >= self.threshold:
+                self.open(endpoint, circuit, now, f'{failures} failures')
+            elif self.latency_limit > 0 and slow and len(circuit.outcomes) >= self.min_samples:
+                p95 = circuit.p95()
+                if p95 > self.latency_limit:
+                    self.open(endpoint, circuit, now, f'p95 latency {p95:.2f}s')
+
+    def open(self, endpoint, circuit, now, reason):
+        if circuit.state != CircuitState.OPEN:
+            logger.warning(f"Circuit breaker opening for {endpoint}: {reason}")
+        circuit.state = CircuitState.OPEN
+        circuit.opened_at = now
+        circuit.open_for = self.timeout
+        circuit.reason = reason
+        circuit.probes = 0
+        circuit.outcomes.clear()
+        if self.shared:
+            cache.set(self.cache_key(endpoint), time.time() + self.timeout, int(self.timeout) + 1)
+
+    def cache_key(self, endpoint):
+        return f"circuit_open:{endpoint}"
+
+    def shared_open_remaining(self, endpoint):
+        try:
+            until = cache.get(self.cache_key(endpoint))
+        except Exception:
+            return 0.0
+        if not until:
+            return 0.0
+        return max(0.0, float(until) - time.time())
+
+    def open_response(self, endpoint):
+        with self.lock:
+            circuit = self.circuits.get(endpoint)
+            retry_after = self.timeout
+            if circuit is not None and circuit.state == CircuitState.OPEN:
+                retry_after = max(1.0, circuit.open_for - (time.monotonic() - circuit.opened_at))
+        retry_after = int(round(retry_after))
+        return JsonResponse({
+            'error': 'Service temporarily unavailable',
+            'message': 'This endpoint is experiencing issues. Please try again later.',
+            'retry_after': retry_after
+        }, status=503, headers={'Retry-After': str(retry_after)})
+
+    def snapshot(self):
+        """
+        Current breaker states for diagnostics
+        """
+        with self.lock:
+            return {
+                endpoint: {
+                    'state': circuit.state,
+                    'reason': circuit.reason,
+                    'samples': len(circuit.outcomes),
+                    'failures': circuit.failures(),
+                    'p95_ms': round(circuit.p95() * 1000, 1),
+                }
+                for endpoint, circuit in self.circuits.items()
+            }
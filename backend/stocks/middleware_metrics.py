@@ -0,0 +1,64 @@
+"""
+Per-route request instrumentation.
+
+Records wall time, DB time and query count, outbound HTTP time and response
+size per resolved route name into the utils.metrics histograms that
+/metrics exposes. Routes are keyed by view name, so /api/stocks/AAPL/ and
+/api/stocks/MSFT/ share one series.
+
+Keep this middleware first so its timing covers the rest of the stack.
+"""
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from utils import metrics
+
+metrics.instrument_http()
+
+
+def _query_timer(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(time.perf_counter() - started)
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route or 'unmatched'
+
+
+class RequestMetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        status = 500
+        response = None
+        with metrics.scope() as scope, ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(_query_timer))
+            try:
+                response = self.get_response(request)
+                status = response.status_code
+            finally:
+                self._record(request, response, status, scope, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def _record(request, response, status, scope, elapsed):
+        route = _route(request)
+        metrics.REQUEST_SECONDS.observe(elapsed, route, request.method)
+        metrics.REQUEST_DB_SECONDS.observe(scope.db_seconds, route)
+        metrics.REQUEST_DB_QUERIES.observe(scope.db_queries, route)
+        metrics.REQUEST_OUTBOUND_SECONDS.observe(scope.outbound_seconds, route)
+        metrics.RESPONSES.inc(route, f'{status // 100}xx')
+        if response is not None and not getattr(response, 'streaming', False):
+            metrics.RESPONSE_BYTES.observe(len(response.content), route)
@@ -0,0 +1,96 @@
+"""
+Per-view transactions, replacing ATOMIC_REQUESTS.
+
+Write views run inside one atomic block per primary database alias, entered
+just before the view and closed after it, and rolled back when the view
+raised or answered 5xx. Read views run in autocommit with the read-only flag
+set (see stockscanner_django.db_access), so they hold no transaction
+snapshot while waiting on slow upstream calls and can be served by replicas.
+
+A response to a request that wrote carries a short-lived cookie; while the
+client sends it back, its reads stay on the primary so it sees its own
+writes even when replicas lag.
+
+Keep this middleware last so its process_view runs right before the view.
+"""
+import logging
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from stockscanner_django.db_access import (
+    READ, begin_routing, classify, end_routing, reset_read_only, set_read_only,
+)
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'db_pin'
+PIN_SECONDS = int(getattr(settings, 'DB_PRIMARY_PIN_SECONDS', 10))
+
+
+def _write_aliases():
+    """Primary aliases; replicas (REPLICA_OF set) never take writes."""
+    return [alias for alias in connections.settings if not connections.settings[alias].get('REPLICA_OF')]
+
+
+class TransactionRoutingMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._db_atomics = []
+        request._db_read_token = None
+        routing_token = begin_routing(pinned=PIN_COOKIE in request.COOKIES)
+        try:
+            try:
+                response = self.get_response(request)
+            except BaseException as exc:
+                self._finish(request, exc)
+                raise
+            if request._db_atomics and response.status_code >= 500:
+                for alias in [a for a, _ in request._db_atomics]:
+                    transaction.set_rollback(True, using=alias)
+            self._finish(request, None)
+        finally:
+            state = end_routing(routing_token)
+        if state.wrote and PIN_SECONDS > 0:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=PIN_SECONDS, httponly=True,
+                secure=settings.SESSION_COOKIE_SECURE, samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        access = classify(request, view_func)
+        request.db_access = access
+        if access == READ:
+            request._db_read_token = set_read_only(True)
+            return None
+        skipped = getattr(view_func, '_non_atomic_requests', set())
+        for alias in _write_aliases():
+            if alias in skipped:
+                continue
+            atomic = transaction.atomic(using=alias)
+            atomic.__enter__()
+            request._db_atomics.append((alias, atomic))
+        return None
+
+    @staticmethod
+    def _finish(request, exc):
+        # Innermost first, mirroring nested with-blocks
+        exc_info = (type(exc), exc, exc.__traceback__) if exc is not None else (None, None, None)
+        failure = None
+        while request._db_atomics:
+            alias, atomic = request._db_atomics.pop()
+            try:
+                atomic.__exit__(*exc_info)
+            except Exception as e:
+                logger.error(f"Closing request transaction on '{alias}' failed: {e}")
+                failure = failure or e
+        if request._db_read_token is not None:
+            reset_read_only(request._db_read_token)
+            request._db_read_token = None
+        # A failed commit must not look like a successful response
+        if failure is not None and exc is None:
+            raise failure
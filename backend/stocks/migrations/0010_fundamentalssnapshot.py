@@ -0,0 +1,22 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0009_alter_revenuetracking_commission_rate_visitorevent_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FundamentalsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=10, unique=True)),
+                ('data', models.JSONField(default=dict, help_text='Dividend, growth, profitability, balance sheet, cash flow and DCF blocks')),
+                ('market_time', models.BigIntegerField(blank=True, help_text='Yahoo regularMarketTime when computed', null=True)),
+                ('computed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0010_fundamentalssnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketBreadthSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+                ('data', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0011_marketbreadthsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour'), ('day', 'Day')], max_length=8)),
+                ('bucket', models.DateTimeField(help_text='Bucket start (UTC)')),
+                ('stream', models.CharField(choices=[('visitor', 'Visitor event'), ('checkout', 'Checkout status')], max_length=10)),
+                ('kind', models.CharField(help_text='Event type or checkout status', max_length=20)),
+                ('country_code', models.CharField(blank=True, max_length=2)),
+                ('page_url', models.CharField(blank=True, max_length=255)),
+                ('count', models.BigIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, help_text='Summed checkout amount', max_digits=14)),
+            ],
+            options={
+                'unique_together': {('granularity', 'bucket', 'stream', 'kind', 'country_code', 'page_url')},
+                'indexes': [models.Index(fields=['granularity', 'stream', 'bucket'], name='stocks_rollup_stream_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VisitorSessionDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('session_id', models.CharField(max_length=64)),
+                ('country_code', models.CharField(blank=True, max_length=2)),
+                ('first_seen', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'unique_together': {('day', 'session_id')},
+                'indexes': [models.Index(fields=['country_code', 'day'], name='stocks_sessday_country_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('stocks', '0012_analyticsrollup_visitorsessionday'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='personalizednews',
+            index=models.Index(fields=['url'], name='stocks_pnews_url_idx'),
+        ),
+        migrations.CreateModel(
+            name='NewsSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('ticker', 'Ticker'), ('category', 'Category')], max_length=10)),
+                ('key', models.CharField(help_text='Ticker symbol or news category', max_length=20)),
+                ('sources', models.PositiveSmallIntegerField(default=0, help_text='FOLLOWED/PORTFOLIO/WATCHLIST bit flags')),
+                ('has_interests', models.BooleanField(default=False, help_text='User has a UserInterests row')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='news_subscriptions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('kind', 'key', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('stocks', '0013_newssubscription_personalizednews_url_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='personalizednews',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='stocks_pnews_user_feed_idx'),
+        ),
+        migrations.CreateModel(
+            name='NewsFeedCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='news_counters', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_news', models.PositiveIntegerField(default=0)),
+                ('read_news', models.PositiveIntegerField(default=0)),
+                ('clicked_news', models.PositiveIntegerField(default=0)),
+                ('breakdown', models.JSONField(blank=True, default=dict)),
+                ('breakdown_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('stocks', '0014_newsfeedcounters_personalizednews_feed_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserBadgeCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='badge_counters', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_notifications', models.IntegerField(default=0)),
+                ('active_alerts', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0015_userbadgecounters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioNavDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('value', models.DecimalField(decimal_places=2, help_text='Market value of positions at the close', max_digits=20)),
+                ('net_flow', models.DecimalField(decimal_places=2, default=0, help_text='Buys minus sells (after fees) on this day', max_digits=20)),
+                ('daily_return', models.FloatField(default=0, help_text='Time-weighted return for the day')),
+                ('portfolio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nav_days', to='stocks.userportfolio')),
+            ],
+            options={
+                'ordering': ['date'],
+                'unique_together': {('portfolio', 'date')},
+            },
+        ),
+    ]
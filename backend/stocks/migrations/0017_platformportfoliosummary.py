@@ -0,0 +1,25 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0016_portfolionavday'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformPortfolioSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_value', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+                ('unrealized_pnl', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+                ('total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+                ('total_return', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+                ('holdings_count', models.PositiveIntegerField(default=0)),
+                ('portfolios_count', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
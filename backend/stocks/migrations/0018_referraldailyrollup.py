@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0017_platformportfoliosummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferralDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=50)),
+                ('day', models.DateField(help_text='UTC day')),
+                ('clicks', models.BigIntegerField(default=0)),
+                ('trials', models.BigIntegerField(default=0)),
+                ('purchases', models.BigIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('commission', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'unique_together': {('code', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0018_referraldailyrollup'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='personalizednews',
+            name='stocks_pnews_user_feed_idx',
+        ),
+        migrations.AddIndex(
+            model_name='personalizednews',
+            index=models.Index(fields=['user', 'relevance_score', 'published_at', 'id'], name='stocks_pnews_user_rank_idx'),
+        ),
+    ]
@@ -91,36 +91,53 @@ class Stock(models.Model):
     @property
     def formatted_price(self):
         """Return formatted price string"""
-        if self.current_price:
-            return f"${self.current_price:.2f}"
-        return "$0.00"
+        return self.format_price(self.current_price)
     
     @property
     def formatted_change(self):
         """Return formatted change percentage"""
-        if self.change_percent:
-            return f"{self.change_percent:+.2f}%"
-        return "0.00%"
+        return self.format_change(self.change_percent)
     
     @property
     def formatted_volume(self):
         """Return formatted volume string"""
-        if self.volume:
-            return f"{self.volume:,}"
-        return "0"
+        return self.format_volume(self.volume)
     
     @property
     def formatted_market_cap(self):
         """Return formatted market cap string"""
-        if self.market_cap:
-            if self.market_cap >= 1e12:
-                return f"${self.market_cap/1e12:.2f}T"
-            elif self.market_cap >= 1e9:
-                return f"${self.market_cap/1e9:.2f}B"
-            elif self.market_cap >= 1e6:
-                return f"${self.market_cap/1e6:.2f}M"
+        return self.format_market_cap(self.market_cap)
+    
+    # Value-level formatters, shared with serializers that read values() rows
+    @staticmethod
+    def format_price(value):
+        if value:
+            return f"${value:.2f}"
+        return "$0.00"
+    
+    @staticmethod
+    def format_change(value):
+        if value:
+            return f"{value:+.2f}%"
+        return "0.00%"
+    
+    @staticmethod
+    def format_volume(value):
+        if value:
+            return f"{value:,}"
+        return "0"
+    
+    @staticmethod
+    def format_market_cap(value):
+        if value:
+            if value >= 1e12:
+                return f"${value/1e12:.2f}T"
+            elif value >= 1e9:
+                return f"${value/1e9:.2f}B"
+            elif value >= 1e6:
+                return f"${value/1e6:.2f}M"
             else:
-                return f"${self.market_cap:,}"
+                return f"${value:,}"
         return "N/A"
 
 class StockPrice(models.Model):
@@ -343,6 +360,25 @@ class TradeTransaction(models.Model):
     def __str__(self):
         return f'{self.portfolio.name} - {self.transaction_type.upper()} {self.shares} {self.stock.ticker} @ ${self.price}'
 
+class PortfolioNavDay(models.Model):
+    """Cached end-of-day NAV per portfolio, appended by stocks.portfolio_analytics.
+
+    Rows from a transaction's date onward are dropped when it changes and
+    rebuilt on the next read.
+    """
+    portfolio = models.ForeignKey(UserPortfolio, on_delete=models.CASCADE, related_name='nav_days')
+    date = models.DateField()
+    value = models.DecimalField(max_digits=20, decimal_places=2, help_text="Market value of positions at the close")
+    net_flow = models.DecimalField(max_digits=20, decimal_places=2, default=0, help_text="Buys minus sells (after fees) on this day")
+    daily_return = models.FloatField(default=0, help_text="Time-weighted return for the day")
+
+    class Meta:
+        unique_together = ('portfolio', 'date')
+        ordering = ['date']
+
+    def __str__(self):
+        return f'{self.portfolio_id} {self.date}: {self.value}'
+
 # Watchlist Models
 
 class UserWatchlist(models.Model):
@@ -469,11 +505,57 @@ class PersonalizedNews(models.Model):
             models.Index(fields=['relevance_score']),
             models.Index(fields=['category', 'published_at']),
             models.Index(fields=['clicked', 'read_at']),
+            models.Index(fields=['url'], name='stocks_pnews_url_idx'),
+            models.Index(fields=['user', 'relevance_score', 'published_at', 'id'], name='stocks_pnews_user_rank_idx'),
         ]
     
     def __str__(self):
         return f'{self.user.username} - {self.title[:50]}...'
 
+
+class NewsFeedCounters(models.Model):
+    """Per-user personalized news counters, incremented on fan-out, read and click.
+
+    ``breakdown`` caches the category/source/recent-activity aggregates and is
+    recomputed when older than a few minutes.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='news_counters')
+    total_news = models.PositiveIntegerField(default=0)
+    read_news = models.PositiveIntegerField(default=0)
+    clicked_news = models.PositiveIntegerField(default=0)
+    breakdown = models.JSONField(default=dict, blank=True)
+    breakdown_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.total_news} news, {self.read_news} read'
+
+
+class NewsSubscription(models.Model):
+    """Inverted index for news fan-out: ticker or category -> subscribed user.
+
+    Rebuilt per user from interests, portfolio holdings and watchlist items.
+    """
+    KIND_CHOICES = [
+        ('ticker', 'Ticker'),
+        ('category', 'Category'),
+    ]
+    # Bit flags in ``sources`` for why a user follows a ticker
+    FOLLOWED = 1
+    PORTFOLIO = 2
+    WATCHLIST = 4
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.CharField(max_length=20, help_text="Ticker symbol or news category")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='news_subscriptions')
+    sources = models.PositiveSmallIntegerField(default=0, help_text="FOLLOWED/PORTFOLIO/WATCHLIST bit flags")
+    has_interests = models.BooleanField(default=False, help_text="User has a UserInterests row")
+
+    class Meta:
+        unique_together = ('kind', 'key', 'user')
+
+    def __str__(self):
+        return f'{self.kind}:{self.key} -> {self.user_id}'
+
 # Social Features
 
 class PortfolioFollowing(models.Model):
@@ -779,6 +861,21 @@ class NotificationHistory(models.Model):
         return f"{self.title} - {self.user.username}"
 
 
+class UserBadgeCounters(models.Model):
+    """Per-user header badge counts, adjusted in the same transaction as the change.
+
+    Rows are built from a recount on first read; unread news comes from
+    NewsFeedCounters.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='badge_counters')
+    unread_notifications = models.IntegerField(default=0)
+    active_alerts = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.unread_notifications} unread, {self.active_alerts} alerts'
+
+
 # Partner referral analytics
 class ReferralClickEvent(models.Model):
     """Tracks referral clicks for partner codes (e.g., ADAM50)."""
@@ -807,6 +904,130 @@ class ReferralTrialEvent(models.Model):
             models.Index(fields=['user', 'occurred_at']),
         ]
 
+class ReferralDailyRollup(models.Model):
+    """Per-code daily referral totals, maintained from clicks, trials and referral revenue."""
+    code = models.CharField(max_length=50)
+    day = models.DateField(help_text="UTC day")
+    clicks = models.BigIntegerField(default=0)
+    trials = models.BigIntegerField(default=0)
+    purchases = models.BigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    commission = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ['code', 'day']
+
+    def __str__(self):
+        return f"{self.code} {self.day}: {self.clicks} clicks, {self.trials} trials, {self.purchases} purchases"
+
+class VisitorEvent(models.Model):
+    """Visitor events (page views, checkout starts, purchases) for conversion analytics."""
+    EVENT_CHOICES = [
+        ('page_view', 'Page View'),
+        ('checkout_start', 'Checkout Started'),
+        ('purchase_complete', 'Purchase Completed'),
+    ]
+
+    session_id = models.CharField(max_length=64, db_index=True, help_text="Unique session identifier")
+    ip_hash = models.CharField(max_length=64, db_index=True, help_text="Hashed IP address for privacy")
+    country_code = models.CharField(max_length=2, blank=True, db_index=True, help_text="2-letter country code (US, UK, etc)")
+    event_type = models.CharField(max_length=20, choices=EVENT_CHOICES, default='page_view', db_index=True)
+    page_url = models.CharField(max_length=512, blank=True, help_text="Page URL visited")
+    user_agent = models.TextField(blank=True, help_text="Browser user agent")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, help_text="User if logged in")
+    occurred_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['-occurred_at']
+        indexes = [
+            models.Index(fields=['session_id', 'event_type'], name='stocks_visi_session_11b1b1_idx'),
+            models.Index(fields=['country_code', 'occurred_at'], name='stocks_visi_country_36d471_idx'),
+            models.Index(fields=['event_type', 'occurred_at'], name='stocks_visi_event_t_4e648f_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.session_id} @ {self.occurred_at:%Y-%m-%d %H:%M}"
+
+
+class CheckoutEvent(models.Model):
+    """One checkout attempt per session, moved through its status as the user progresses."""
+    STATUS_CHOICES = [
+        ('started', 'Checkout Started'),
+        ('payment_info', 'Payment Info Entered'),
+        ('processing', 'Processing Payment'),
+        ('completed', 'Purchase Completed'),
+        ('abandoned', 'Checkout Abandoned'),
+    ]
+
+    session_id = models.CharField(max_length=64, db_index=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='started', db_index=True)
+    plan_name = models.CharField(max_length=100, blank=True, help_text="Plan user is purchasing")
+    amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text="Checkout amount in USD")
+    country_code = models.CharField(max_length=2, blank=True, help_text="User's country")
+    referral_code = models.CharField(max_length=50, blank=True, db_index=True, help_text="Referral/discount code used")
+    started_at = models.DateTimeField(default=timezone.now, db_index=True)
+    completed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['status', 'started_at'], name='stocks_chec_status_9cfcb7_idx'),
+            models.Index(fields=['user', 'started_at'], name='stocks_chec_user_id_8e6359_idx'),
+            models.Index(fields=['country_code', 'started_at'], name='stocks_chec_country_f0eeec_idx'),
+            models.Index(fields=['referral_code', 'started_at'], name='stocks_chec_referra_c45abe_idx'),
+        ]
+
+    def __str__(self):
+        return f"Checkout {self.session_id} ({self.status})"
+
+
+class AnalyticsRollup(models.Model):
+    """Pre-aggregated visitor/checkout counts per time bucket, maintained by the event pipeline."""
+    GRANULARITY_CHOICES = [
+        ('minute', 'Minute'),
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+    STREAM_CHOICES = [
+        ('visitor', 'Visitor event'),
+        ('checkout', 'Checkout status'),
+    ]
+
+    granularity = models.CharField(max_length=8, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField(help_text="Bucket start (UTC)")
+    stream = models.CharField(max_length=10, choices=STREAM_CHOICES)
+    kind = models.CharField(max_length=20, help_text="Event type or checkout status")
+    country_code = models.CharField(max_length=2, blank=True)
+    page_url = models.CharField(max_length=255, blank=True)
+    count = models.BigIntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="Summed checkout amount")
+
+    class Meta:
+        unique_together = ['granularity', 'bucket', 'stream', 'kind', 'country_code', 'page_url']
+        indexes = [
+            models.Index(fields=['granularity', 'stream', 'bucket'], name='stocks_rollup_stream_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket:%Y-%m-%d %H:%M} {self.stream}:{self.kind} = {self.count}"
+
+
+class VisitorSessionDay(models.Model):
+    """First sighting of a session per day; distinct-visitor counts read this instead of raw events."""
+    day = models.DateField()
+    session_id = models.CharField(max_length=64)
+    country_code = models.CharField(max_length=2, blank=True)
+    first_seen = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        unique_together = ['day', 'session_id']
+        indexes = [
+            models.Index(fields=['country_code', 'day'], name='stocks_sessday_country_idx'),
+        ]
+
+
 class UsageStats(models.Model):
     """Daily user usage statistics"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='usage_stats')
@@ -825,3 +1046,38 @@ class UsageStats(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.date} - {self.api_calls} calls"
+
+
+class FundamentalsSnapshot(models.Model):
+    """Precomputed fundamentals blocks per ticker, refreshed by a background batch job."""
+    ticker = models.CharField(max_length=10, unique=True)
+    data = models.JSONField(default=dict, help_text="Dividend, growth, profitability, balance sheet, cash flow and DCF blocks")
+    market_time = models.BigIntegerField(null=True, blank=True, help_text="Yahoo regularMarketTime when computed")
+    computed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.ticker} fundamentals @ {self.computed_at:%Y-%m-%d %H:%M}"
+
+
+class PlatformPortfolioSummary(models.Model):
+    """Platform-wide portfolio totals (value, P&L, return), one row."""
+    total_value = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+    unrealized_pnl = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+    total_cost = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+    total_return = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+    holdings_count = models.PositiveIntegerField(default=0)
+    portfolios_count = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Platform portfolio summary @ {self.computed_at:%Y-%m-%d %H:%M:%S}"
+
+
+class MarketBreadthSnapshot(models.Model):
+    """Latest market breadth document (counts, distributions, top-N lists), one row."""
+    version = models.BigIntegerField(default=0)
+    data = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Market breadth v{self.version} @ {self.computed_at:%Y-%m-%d %H:%M:%S}"
@@ -0,0 +1,223 @@
+"""
+Fan-out-on-write for personalized news.
+
+NewsSubscription is an inverted index from ticker/category to the users who
+follow it (through interests, portfolio holdings or watchlist items). A user's
+rows are rebuilt after their interests, holdings or watchlist items change.
+Publishing an article is then one index lookup, one query for users who
+already have the URL, and chunked bulk inserts of PersonalizedNews rows,
+with relevance computed from the index flags in a single pass.
+"""
+import logging
+import threading
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, List
+
+from django.db import transaction
+from django.db.models import F, Q
+
+from . import badge_counters
+from .models import (
+    NewsFeedCounters, NewsSubscription, PersonalizedNews, PortfolioHolding, UserInterests,
+    UserPortfolio, UserWatchlist, WatchlistItem,
+)
+
+logger = logging.getLogger(__name__)
+
+INSERT_CHUNK = 1000
+RELEVANCE_THRESHOLD = Decimal('15')
+FOLLOWED, PORTFOLIO, WATCHLIST = NewsSubscription.FOLLOWED, NewsSubscription.PORTFOLIO, NewsSubscription.WATCHLIST
+
+
+# ----- Index maintenance -----
+
+def _subscription_rows(user_ids: Iterable[int]) -> List[NewsSubscription]:
+    """Index rows for the given users, computed with three queries."""
+    user_ids = list(user_ids)
+    tickers: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    categories: Dict[int, set] = defaultdict(set)
+    with_interests = set()
+
+    for user_id, followed, preferred in UserInterests.objects.filter(user_id__in=user_ids).values_list(
+        'user_id', 'followed_stocks', 'preferred_categories'
+    ):
+        with_interests.add(user_id)
+        for ticker in followed or []:
+            if ticker:
+                tickers[user_id][str(ticker).upper()[:20]] |= FOLLOWED
+        for category in preferred or []:
+            if category:
+                categories[user_id].add(str(category)[:20])
+    for user_id, ticker in PortfolioHolding.objects.filter(portfolio__user_id__in=user_ids).values_list(
+        'portfolio__user_id', 'stock__ticker'
+    ):
+        tickers[user_id][ticker] |= PORTFOLIO
+    for user_id, ticker in WatchlistItem.objects.filter(watchlist__user_id__in=user_ids).values_list(
+        'watchlist__user_id', 'stock__ticker'
+    ):
+        tickers[user_id][ticker] |= WATCHLIST
+
+    rows = []
+    for user_id, flags in tickers.items():
+        has_interests = user_id in with_interests
+        rows.extend(
+            NewsSubscription(kind='ticker', key=ticker, user_id=user_id, sources=bits, has_interests=has_interests)
+            for ticker, bits in flags.items()
+        )
+    for user_id, names in categories.items():
+        rows.extend(
+            NewsSubscription(kind='category', key=name, user_id=user_id, has_interests=True)
+            for name in names
+        )
+    return rows
+
+
+def reindex_users(user_ids: Iterable[int]) -> int:
+    """Replace the index rows of the given users."""
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return 0
+    rows = _subscription_rows(user_ids)
+    with transaction.atomic():
+        NewsSubscription.objects.filter(user_id__in=user_ids).delete()
+        NewsSubscription.objects.bulk_create(rows, batch_size=INSERT_CHUNK)
+    return len(rows)
+
+
+def rebuild_index(batch_size: int = 500) -> int:
+    """Rebuild the whole index, a batch of users at a time."""
+    user_ids = set(UserInterests.objects.values_list('user_id', flat=True))
+    user_ids.update(UserPortfolio.objects.filter(holdings__isnull=False).values_list('user_id', flat=True))
+    user_ids.update(UserWatchlist.objects.filter(items__isnull=False).values_list('user_id', flat=True))
+    NewsSubscription.objects.exclude(user_id__in=user_ids).delete()
+    ordered = sorted(user_ids)
+    total = 0
+    for start in range(0, len(ordered), batch_size):
+        total += reindex_users(ordered[start:start + batch_size])
+    logger.info(f"Rebuilt news subscription index: {total} rows for {len(ordered)} users")
+    return total
+
+
+_pending = threading.local()
+
+
+def _flush_reindex() -> None:
+    pending = getattr(_pending, 'users', None)
+    _pending.users = set()
+    if not pending:
+        return
+    try:
+        reindex_users(pending)
+    except Exception as e:
+        logger.error(f"Error reindexing news subscriptions for users {sorted(pending)}: {e}")
+
+
+def _schedule_reindex(user_id):
+    """Reindex once per user after the surrounding transaction commits."""
+    if not user_id:
+        return
+    pending = getattr(_pending, 'users', None)
+    if pending is None:
+        pending = _pending.users = set()
+    pending.add(user_id)
+    # Registered on every call so a rolled-back batch is picked up by the next
+    # commit; later callbacks of the same commit find the queue already flushed
+    transaction.on_commit(_flush_reindex)
+
+
+def on_interests_changed(sender, instance, **kwargs):
+    _schedule_reindex(instance.user_id)
+
+
+def on_holding_changed(sender, instance, created=None, **kwargs):
+    # Price refreshes re-save holdings constantly; only adds and removals matter
+    if created is False:
+        return
+    _schedule_reindex(UserPortfolio.objects.filter(pk=instance.portfolio_id).values_list('user_id', flat=True).first())
+
+
+def on_watchlist_item_changed(sender, instance, created=None, **kwargs):
+    if created is False:
+        return
+    _schedule_reindex(UserWatchlist.objects.filter(pk=instance.watchlist_id).values_list('user_id', flat=True).first())
+
+
+# ----- Fan-out -----
+
+def _relevance(followed: int, portfolio: int, watchlist: int, preferred: bool, category: str) -> Decimal:
+    """Same weights as NewsPersonalizationService.calculate_relevance_score."""
+    score = Decimal('0')
+    if followed:
+        score += min(Decimal('40'), Decimal(followed * 15))
+    if preferred:
+        score += Decimal('30')
+    elif category != 'general':
+        score += Decimal('10')
+    if portfolio:
+        score += min(Decimal('20'), Decimal(portfolio * 10))
+    if watchlist:
+        score += min(Decimal('10'), Decimal(watchlist * 5))
+    return max(Decimal('0'), min(Decimal('100'), score)).quantize(Decimal('0.01'))
+
+
+def _insert_chunk(rows: List[PersonalizedNews]) -> int:
+    with transaction.atomic():
+        PersonalizedNews.objects.bulk_create(rows)
+        user_ids = [r.user_id for r in rows]
+        NewsFeedCounters.objects.filter(user_id__in=user_ids).update(total_news=F('total_news') + 1)
+        badge_counters.invalidate(user_ids)
+    return len(rows)
+
+
+def fan_out(title: str, content: str, url: str, source: str, published_at,
+            related_stocks: List[str], category: str) -> Dict[str, int]:
+    """Write PersonalizedNews rows for every subscribed user above the relevance threshold."""
+    per_user = defaultdict(lambda: [0, 0, 0, False, False])  # followed, portfolio, watchlist, preferred, has_interests
+    lookup = Q(kind='category', key=category)
+    if related_stocks:
+        lookup |= Q(kind='ticker', key__in=related_stocks)
+    for user_id, kind, sources, has_interests in NewsSubscription.objects.filter(lookup).values_list(
+        'user_id', 'kind', 'sources', 'has_interests'
+    ).iterator(chunk_size=5000):
+        entry = per_user[user_id]
+        entry[4] = has_interests
+        if kind == 'category':
+            entry[3] = True
+            continue
+        if sources & FOLLOWED:
+            entry[0] += 1
+        if sources & PORTFOLIO:
+            entry[1] += 1
+        if sources & WATCHLIST:
+            entry[2] += 1
+
+    already = set(PersonalizedNews.objects.filter(url=url).values_list('user_id', flat=True)) if per_user else set()
+    rows = []
+    created = skipped = 0
+    for user_id, (followed, portfolio, watchlist, preferred, has_interests) in per_user.items():
+        if user_id in already:
+            skipped += 1
+            continue
+        # Users without interests score a flat 10, below the threshold
+        score = _relevance(followed, portfolio, watchlist, preferred, category) if has_interests else Decimal('10')
+        if score < RELEVANCE_THRESHOLD:
+            skipped += 1
+            continue
+        rows.append(PersonalizedNews(
+            user_id=user_id,
+            title=title,
+            content=content,
+            url=url,
+            source=source,
+            relevance_score=score,
+            related_stocks=related_stocks,
+            category=category,
+            published_at=published_at,
+        ))
+        if len(rows) >= INSERT_CHUNK:
+            created += _insert_chunk(rows)
+            rows = []
+    if rows:
+        created += _insert_chunk(rows)
+    return {'created': created, 'skipped': skipped, 'total_users': len(per_user)}
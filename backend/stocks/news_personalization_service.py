@@ -4,7 +4,7 @@ Handles automatic news categorization, stock ticker extraction, relevance scorin
 user preference management, and consumption analytics.
 """
 
-import re
+import base64
 import json
 import logging
 from datetime import datetime, timedelta
@@ -17,24 +17,17 @@ from django.utils import timezone
 from django.core.exceptions import ValidationError
 from .models import (
     Stock, UserInterests, PersonalizedNews, UserPortfolio, 
-    UserWatchlist, StockAlert
+    UserWatchlist, StockAlert, NewsFeedCounters
 )
 from news.models import NewsArticle
+from . import badge_counters
+from .text_analytics import COMMON_WORDS, KeywordMatcher, ticker_universe
 
 logger = logging.getLogger(__name__)
 
 class NewsPersonalizationService:
     """Intelligent news curation service"""
     
-    # Stock ticker regex patterns
-    TICKER_PATTERNS = [
-        r'\b([A-Z]{1,5})\b',  # Basic ticker pattern
-        r'\$([A-Z]{1,5})\b',  # Ticker with $ prefix
-        r'\b([A-Z]{1,5})\.(?:NYSE|NASDAQ|AMEX)\b',  # Ticker with exchange
-        r'NYSE:\s*([A-Z]{1,5})',  # NYSE: prefix
-        r'NASDAQ:\s*([A-Z]{1,5})',  # NASDAQ: prefix
-    ]
-    
     # News category keywords
     CATEGORY_KEYWORDS = {
         'earnings': [
@@ -81,19 +74,7 @@ class NewsPersonalizationService:
     }
     
     # Common non-ticker words to exclude
-    EXCLUDE_WORDS = {
-        'THE', 'AND', 'FOR', 'ARE', 'BUT', 'NOT', 'YOU', 'ALL', 'CAN',
-        'HER', 'WAS', 'ONE', 'OUR', 'OUT', 'DAY', 'GET', 'HAS', 'HIM',
-        'HOW', 'ITS', 'MAY', 'NEW', 'NOW', 'OLD', 'SEE', 'TWO', 'WHO',
-        'BOY', 'DID', 'HIS', 'LET', 'PUT', 'SAY', 'SHE', 'TOO', 'USE',
-        'WAY', 'WHY', 'ASK', 'BIG', 'EAR', 'END', 'FAR', 'FUN', 'GOT',
-        'LAW', 'MAN', 'OWN', 'RUN', 'SUN', 'TOP', 'TRY', 'WIN', 'YES',
-        'AGO', 'BAD', 'BAG', 'BED', 'BOX', 'BUY', 'CAR', 'CAT', 'CUP',
-        'DOG', 'EAT', 'EGG', 'EYE', 'FEW', 'FLY', 'GUN', 'HAD', 'HAT',
-        'JOB', 'LEG', 'LOT', 'MAP', 'RED', 'SEA', 'SIT', 'SIX', 'TEN',
-        'USA', 'CEO', 'CFO', 'CTO', 'COO', 'API', 'APP', 'WEB', 'NET',
-        'PAY', 'TAX', 'LAW', 'WAR', 'OIL', 'GAS', 'GDP', 'CPI', 'ETF'
-    }
+    EXCLUDE_WORDS = COMMON_WORDS
     
     @staticmethod
     def setup_user_interests(user: User, followed_stocks: List[str] = None,
@@ -205,22 +186,13 @@ class NewsPersonalizationService:
             str: Detected category
         """
         try:
-            # Combine title and content for analysis
-            text = f"{title} {content}".lower()
-            
-            # Score each category
-            category_scores = {}
-            
-            for category, keywords in NewsPersonalizationService.CATEGORY_KEYWORDS.items():
-                score = 0
-                for keyword in keywords:
-                    # Weight title matches higher
-                    if keyword in title.lower():
-                        score += 3
-                    if keyword in content.lower():
-                        score += 1
-                
-                category_scores[category] = score
+            # Title matches weigh 3, content matches 1; one keyword scan each
+            title_counts = _category_matcher().counts(title.lower())
+            content_counts = _category_matcher().counts(content.lower())
+            category_scores = {
+                category: title_counts[category] * 3 + content_counts[category]
+                for category in NewsPersonalizationService.CATEGORY_KEYWORDS
+            }
             
             # Return category with highest score, or 'general' if no matches
             if category_scores and max(category_scores.values()) > 0:
@@ -237,6 +209,9 @@ class NewsPersonalizationService:
         """
         Extract stock tickers from news content.
         
+        Candidates are checked against the in-memory ticker universe, so no
+        queries are issued per article.
+        
         Args:
             text: Text to extract tickers from
             
@@ -244,23 +219,7 @@ class NewsPersonalizationService:
             List[str]: List of detected stock tickers
         """
         try:
-            tickers = set()
-            
-            for pattern in NewsPersonalizationService.TICKER_PATTERNS:
-                matches = re.findall(pattern, text, re.IGNORECASE)
-                for match in matches:
-                    ticker = match.upper().strip()
-                    
-                    # Validate ticker format and exclude common words
-                    if (len(ticker) >= 1 and len(ticker) <= 5 and 
-                        ticker.isalpha() and 
-                        ticker not in NewsPersonalizationService.EXCLUDE_WORDS):
-                        
-                        # Verify ticker exists in our database
-                        if Stock.objects.filter(ticker=ticker).exists():
-                            tickers.add(ticker)
-            
-            return list(tickers)
+            return ticker_universe.extract(text, NewsPersonalizationService.EXCLUDE_WORDS)
             
         except Exception as e:
             logger.error(f"Error extracting stock tickers: {str(e)}")
@@ -388,6 +347,7 @@ class NewsPersonalizationService:
                 category=category,
                 published_at=published_at
             )
+            _bump_counters(user.id, total_news=1)
             
             logger.info(f"Created personalized news for {user.username}: {title[:50]}...")
             return news
@@ -400,7 +360,7 @@ class NewsPersonalizationService:
     def get_personalized_feed(user: User, limit: int = 20, 
                             category: str = None) -> List[Dict[str, Any]]:
         """
-        Get personalized news feed for a user.
+        Get personalized news feed for a user (most relevant first).
         
         Args:
             user: User to get feed for
@@ -410,6 +370,47 @@ class NewsPersonalizationService:
         Returns:
             List of news article dictionaries
         """
+        return NewsPersonalizationService.get_personalized_feed_page(user, limit, category)['items']
+    
+    @staticmethod
+    def get_feed_total(user: User, category: str = None) -> int:
+        """
+        Total personalized articles for a user, from the maintained counter.
+        
+        A category filter is counted over the user's rows instead, since the
+        counters are not kept per category.
+        """
+        if category:
+            return PersonalizedNews.objects.filter(user=user, category=category).count()
+        return ensure_feed_counters(user.id).total_news
+    
+    @staticmethod
+    def get_personalized_feed_page(user: User, limit: int = 20, category: str = None,
+                                   cursor: Optional[str] = None, offset: int = 0) -> Dict[str, Any]:
+        """
+        One page of the personalized feed with keyset pagination.
+        
+        Rows are ordered by (relevance_score, published_at, id) descending,
+        most relevant first as before, and read through the matching
+        (user, relevance_score, published_at, id) index; ``cursor`` is the
+        opaque ``next_cursor`` of the previous page, so cost does not grow
+        with history depth. Linked NewsArticle rows are resolved with one
+        url__in query.
+        
+        Args:
+            user: User to get feed for
+            limit: Page size
+            category: Filter by category (optional)
+            cursor: Continuation token from the previous page (optional)
+            offset: Row offset, only used when no cursor is given
+            
+        Returns:
+            Dict with 'items' and 'next_cursor' (None on the last page)
+        
+        Raises:
+            InvalidCursor: ``cursor`` is not a token this method returned
+        """
+        position = _decode_cursor(cursor) if cursor else None
         try:
             # Start with user's personalized news
             query = PersonalizedNews.objects.filter(user=user)
@@ -418,8 +419,24 @@ class NewsPersonalizationService:
             if category:
                 query = query.filter(category=category)
             
-            # Order by relevance score and recency
-            news_items = query.order_by('-relevance_score', '-published_at')[:limit]
+            if position:
+                score, published_at, last_id = position
+                query = query.filter(
+                    Q(relevance_score__lt=score)
+                    | Q(relevance_score=score, published_at__lt=published_at)
+                    | Q(relevance_score=score, published_at=published_at, id__lt=last_id)
+                )
+                offset = 0
+            
+            news_items = list(query.order_by('-relevance_score', '-published_at', '-id')[offset:offset + limit + 1])
+            has_more = len(news_items) > limit
+            news_items = news_items[:limit]
+            
+            linked_by_url = {
+                a['url']: a for a in NewsArticle.objects.filter(
+                    url__in={item.url for item in news_items}
+                ).values('url', 'sentiment_score', 'sentiment_grade')
+            }
             
             result = []
             # Lazy import to avoid heavy initialization if not needed
@@ -434,18 +451,18 @@ class NewsPersonalizationService:
                 sentiment_score = None
                 sentiment_grade = None
                 try:
-                    linked = NewsArticle.objects.filter(url=item.url).first()
+                    linked = linked_by_url.get(item.url)
                     if linked:
-                        if linked.sentiment_score is not None:
+                        if linked['sentiment_score'] is not None:
                             try:
-                                sentiment_score = float(linked.sentiment_score)
+                                sentiment_score = float(linked['sentiment_score'])
                             except Exception:
                                 sentiment_score = None
-                        sentiment_grade = linked.sentiment_grade or None
+                        sentiment_grade = linked['sentiment_grade'] or None
                     elif _analyzer is not None:
-                        text = f"{item.title} {item.content or ''}"
-                        sentiment_score = _analyzer.analyze_sentiment(text)
-                        sentiment_grade = _analyzer.get_sentiment_grade(text)
+                        scores = _analyzer.score_text(f"{item.title} {item.content or ''}")
+                        sentiment_score = scores['sentiment_score']
+                        sentiment_grade = scores['sentiment_grade']
                 except Exception:
                     pass
 
@@ -469,11 +486,12 @@ class NewsPersonalizationService:
                     'clicked': item.clicked
                 })
             
-            return result
+            next_cursor = _encode_cursor(news_items[-1]) if has_more and news_items else None
+            return {'items': result, 'next_cursor': next_cursor}
             
         except Exception as e:
             logger.error(f"Error getting personalized feed for {user.username}: {str(e)}")
-            return []
+            return {'items': [], 'next_cursor': None}
     
     @staticmethod
     def mark_news_read(user: User, news_id: int) -> bool:
@@ -488,10 +506,11 @@ class NewsPersonalizationService:
             bool: True if marked successfully
         """
         try:
-            news = PersonalizedNews.objects.filter(id=news_id, user=user).first()
-            if news and not news.read_at:
-                news.read_at = timezone.now()
-                news.save()
+            updated = PersonalizedNews.objects.filter(
+                id=news_id, user=user, read_at__isnull=True
+            ).update(read_at=timezone.now())
+            if updated:
+                _bump_counters(user.id, read_news=1)
                 
                 logger.info(f"Marked news {news_id} as read for {user.username}")
                 return True
@@ -517,10 +536,13 @@ class NewsPersonalizationService:
         try:
             news = PersonalizedNews.objects.filter(id=news_id, user=user).first()
             if news:
+                newly_clicked = not news.clicked
+                newly_read = not news.read_at
                 news.clicked = True
-                if not news.read_at:
+                if newly_read:
                     news.read_at = timezone.now()
-                news.save()
+                news.save(update_fields=['clicked', 'read_at'])
+                _bump_counters(user.id, clicked_news=int(newly_clicked), read_news=int(newly_read))
                 
                 logger.info(f"Marked news {news_id} as clicked for {user.username}")
                 return True
@@ -543,44 +565,26 @@ class NewsPersonalizationService:
             Dict with creation statistics
         """
         try:
+            from .news_fanout import fan_out
+
             title = news_data['title']
             content = news_data['content']
-            url = news_data['url']
-            source = news_data['source']
-            published_at = news_data['published_at']
             
-            # Extract stocks and category once
+            # Extract stocks and category once, then fan out through the subscription index
             related_stocks = NewsPersonalizationService.extract_stock_tickers(f"{title} {content}")
             category = NewsPersonalizationService.categorize_news(title, content)
+            stats = fan_out(
+                title=title,
+                content=content,
+                url=news_data['url'],
+                source=news_data['source'],
+                published_at=news_data['published_at'],
+                related_stocks=related_stocks,
+                category=category,
+            )
             
-            # Get users who might be interested
-            interested_users = User.objects.filter(
-                Q(interests__followed_stocks__overlap=related_stocks) |
-                Q(interests__preferred_categories__contains=category) |
-                Q(portfolios__holdings__stock__ticker__in=related_stocks) |
-                Q(watchlists__items__stock__ticker__in=related_stocks)
-            ).distinct()
-            
-            created_count = 0
-            skipped_count = 0
-            
-            for user in interested_users:
-                news = NewsPersonalizationService.create_personalized_news(
-                    user, title, content, url, source, published_at
-                )
-                
-                if news:
-                    created_count += 1
-                else:
-                    skipped_count += 1
-            
-            logger.info(f"Bulk created news: {created_count} created, {skipped_count} skipped")
-            
-            return {
-                'created': created_count,
-                'skipped': skipped_count,
-                'total_users': interested_users.count()
-            }
+            logger.info(f"Bulk created news: {stats['created']} created, {stats['skipped']} skipped")
+            return stats
             
         except Exception as e:
             logger.error(f"Error bulk creating news: {str(e)}")
@@ -642,9 +646,14 @@ class NewsPersonalizationService:
         """
         try:
             cutoff_date = timezone.now() - timedelta(days=days_to_keep)
-            deleted_count = PersonalizedNews.objects.filter(
-                created_at__lt=cutoff_date
-            ).delete()[0]
+            old_news = PersonalizedNews.objects.filter(created_at__lt=cutoff_date)
+            with transaction.atomic():
+                user_ids = list(old_news.values_list('user_id', flat=True).distinct())
+                deleted_count = old_news.delete()[0]
+                if deleted_count:
+                    # Affected users' totals are rebuilt from the table on their next read
+                    NewsFeedCounters.objects.filter(user_id__in=user_ids).delete()
+                    badge_counters.invalidate(user_ids)
             
             logger.info(f"Cleaned up {deleted_count} old news articles")
             return deleted_count
@@ -665,30 +674,11 @@ class NewsPersonalizationService:
             Dict with analytics data
         """
         try:
-            # Total news stats
-            total_news = PersonalizedNews.objects.filter(user=user).count()
-            read_news = PersonalizedNews.objects.filter(user=user, read_at__isnull=False).count()
-            clicked_news = PersonalizedNews.objects.filter(user=user, clicked=True).count()
-            
-            # Category breakdown
-            category_stats = PersonalizedNews.objects.filter(user=user).values('category').annotate(
-                count=Count('id'),
-                avg_relevance=Avg('relevance_score')
-            ).order_by('-count')
-            
-            # Recent activity (last 7 days)
-            week_ago = timezone.now() - timedelta(days=7)
-            recent_news = PersonalizedNews.objects.filter(
-                user=user, created_at__gte=week_ago
-            ).count()
-            recent_read = PersonalizedNews.objects.filter(
-                user=user, read_at__gte=week_ago
-            ).count()
-            
-            # Top sources
-            source_stats = PersonalizedNews.objects.filter(user=user).values('source').annotate(
-                count=Count('id')
-            ).order_by('-count')[:10]
+            counters = _load_counters(user)
+            total_news = counters.total_news
+            read_news = counters.read_news
+            clicked_news = counters.clicked_news
+            breakdown = counters.breakdown or {}
             
             return {
                 'total_news': total_news,
@@ -696,12 +686,112 @@ class NewsPersonalizationService:
                 'clicked_news': clicked_news,
                 'read_rate': (read_news / total_news * 100) if total_news > 0 else 0,
                 'click_rate': (clicked_news / total_news * 100) if total_news > 0 else 0,
-                'recent_news_count': recent_news,
-                'recent_read_count': recent_read,
-                'category_breakdown': list(category_stats),
-                'top_sources': list(source_stats)
+                'recent_news_count': breakdown.get('recent_news_count', 0),
+                'recent_read_count': breakdown.get('recent_read_count', 0),
+                'category_breakdown': breakdown.get('category_breakdown', []),
+                'top_sources': breakdown.get('top_sources', [])
             }
             
         except Exception as e:
             logger.error(f"Error getting news analytics for {user.username}: {str(e)}")
-            return {}
\ No newline at end of file
+            return {}
+
+
+_matcher = None
+
+
+def _category_matcher() -> KeywordMatcher:
+    global _matcher
+    if _matcher is None:
+        _matcher = KeywordMatcher(NewsPersonalizationService.CATEGORY_KEYWORDS)
+    return _matcher
+
+
+# ----- Feed cursors and per-user counters -----
+
+# How long the cached category/source/recent breakdown is served before recomputing
+BREAKDOWN_TTL = timedelta(minutes=10)
+
+
+class InvalidCursor(ValueError):
+    """A feed cursor that was not produced by ``_encode_cursor``."""
+
+
+def _encode_cursor(item: PersonalizedNews) -> str:
+    raw = f"{item.relevance_score}|{item.published_at.isoformat()}|{item.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor: str) -> Tuple[Decimal, datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        score, published_at, last_id = raw.split('|')
+        score = Decimal(score)
+        if not score.is_finite():
+            raise ValueError(score)
+        return score, datetime.fromisoformat(published_at), int(last_id)
+    except Exception as e:
+        raise InvalidCursor(f"Invalid feed cursor: {cursor!r}") from e
+
+
+def _bump_counters(user_id: int, **deltas) -> None:
+    """Increment counters if the user's row exists; a missing row is built by a full count on first read."""
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if updates:
+        NewsFeedCounters.objects.filter(user_id=user_id).update(**updates)
+        badge_counters.invalidate([user_id])
+
+
+def _compute_breakdown(user: User) -> Dict[str, Any]:
+    news = PersonalizedNews.objects.filter(user=user)
+    week_ago = timezone.now() - timedelta(days=7)
+    category_stats = news.values('category').annotate(
+        count=Count('id'),
+        avg_relevance=Avg('relevance_score')
+    ).order_by('-count')
+    source_stats = news.values('source').annotate(count=Count('id')).order_by('-count')[:10]
+    return {
+        'recent_news_count': news.filter(created_at__gte=week_ago).count(),
+        'recent_read_count': news.filter(read_at__gte=week_ago).count(),
+        'category_breakdown': [
+            {
+                'category': row['category'],
+                'count': row['count'],
+                'avg_relevance': float(row['avg_relevance']) if row['avg_relevance'] is not None else None,
+            }
+            for row in category_stats
+        ],
+        'top_sources': list(source_stats),
+    }
+
+
+def ensure_feed_counters(user_id: int) -> NewsFeedCounters:
+    """The user's counters row, created from a one-off recount if missing."""
+    counters = NewsFeedCounters.objects.filter(user_id=user_id).first()
+    if counters is None:
+        news = PersonalizedNews.objects.filter(user_id=user_id)
+        totals = news.aggregate(
+            total=Count('id'),
+            read=Count('id', filter=Q(read_at__isnull=False)),
+            clicked=Count('id', filter=Q(clicked=True)),
+        )
+        counters, _ = NewsFeedCounters.objects.get_or_create(
+            user_id=user_id,
+            defaults={
+                'total_news': totals['total'],
+                'read_news': totals['read'],
+                'clicked_news': totals['clicked'],
+            }
+        )
+    return counters
+
+
+def _load_counters(user: User) -> NewsFeedCounters:
+    """The user's counters row with a fresh breakdown."""
+    counters = ensure_feed_counters(user.id)
+    now = timezone.now()
+    if counters.breakdown_at is None or now - counters.breakdown_at > BREAKDOWN_TTL:
+        counters.breakdown = _compute_breakdown(user)
+        counters.breakdown_at = now
+        NewsFeedCounters.objects.filter(pk=counters.pk).update(breakdown=counters.breakdown, breakdown_at=now)
+    return counters
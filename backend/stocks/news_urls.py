@@ -47,25 +47,37 @@ def get_personalized_feed(request):
         # Try personalized feed first unless mode forces all
         feed = []
         total_count = 0
-        if mode != 'all':
-            pf_limit = (limit if limit is not None else 1000)
-            feed = news_personalization_service.NewsPersonalizationService.get_personalized_feed(
-                user=request.user,
-                limit=pf_limit,
-                category=category
-            ) or []
-            total_count = len(feed)
+        if mode != 'all' and request.user.is_authenticated:
+            # Keyset pagination: pass back ?cursor=<next_cursor>; ?page= still works via offset
+            try:
+                feed_page = news_personalization_service.NewsPersonalizationService.get_personalized_feed_page(
+                    user=request.user,
+                    limit=(limit if limit is not None else 1000),
+                    category=category,
+                    cursor=request.GET.get('cursor'),
+                    offset=offset,
+                )
+            except news_personalization_service.InvalidCursor:
+                return JsonResponse({
+                    'success': False,
+                    'error': 'Invalid cursor',
+                    'error_code': 'INVALID_CURSOR'
+                }, status=400)
+            feed = feed_page['items']
             if feed:
-                sliced = feed if limit is None else feed[offset: offset + limit]
+                total_count = news_personalization_service.NewsPersonalizationService.get_feed_total(
+                    request.user, category
+                )
                 return JsonResponse({
                     'success': True,
                     'data': {
-                        'news_items': sliced,
-                        'count': len(sliced)
+                        'news_items': feed,
+                        'count': len(feed)
                     },
                     'page': page,
-                    'limit': limit or total_count,
+                    'limit': limit or len(feed),
                     'total_count': total_count,
+                    'next_cursor': feed_page['next_cursor'],
                     'message': 'News feed retrieved successfully'
                 })
 
@@ -7,16 +7,18 @@ from rest_framework.decorators import api_view, permission_classes, authenticati
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
-from django.http import JsonResponse
+from django.http import HttpResponseNotModified, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 from django.core.paginator import Paginator
+from django.db import transaction
 from django.db.models import Q
 import json
 import logging
 from datetime import datetime, timedelta
 
 from .models import NotificationHistory, NotificationSettings
+from . import badge_counters
 from .security_utils import secure_api_endpoint
 from .authentication import CsrfExemptSessionAuthentication, BearerSessionAuthentication
 
@@ -78,7 +80,7 @@ def notification_history_api(request):
                 'has_previous': page_obj.has_previous()
             },
             'summary': {
-                'total_unread': NotificationHistory.objects.filter(user=user, is_read=False).count() if hasattr(NotificationHistory, 'objects') else 0
+                'total_unread': badge_counters.get_badges(user.id)['notifications']
             }
         })
         
@@ -106,38 +108,29 @@ def mark_notifications_read_api(request):
         notification_ids = data.get('notification_ids', [])
         mark_all = data.get('mark_all', False)
         
-        if mark_all:
-            # Mark all unread notifications as read
-            updated_count = NotificationHistory.objects.filter(
-                user=user, 
-                is_read=False
-            ).update(
-                is_read=True, 
-                read_at=timezone.now()
-            )
-        elif notification_ids:
-            # Mark specific notifications as read
-            updated_count = NotificationHistory.objects.filter(
-                user=user,
-                id__in=notification_ids,
-                is_read=False
-            ).update(
-                is_read=True,
-                read_at=timezone.now()
-            )
-        else:
+        if not mark_all and not notification_ids:
             return JsonResponse({
                 'success': False,
                 'error': 'No notification IDs provided and mark_all not specified',
                 'error_code': 'MISSING_NOTIFICATION_IDS'
             }, status=400)
         
+        unread = NotificationHistory.objects.filter(user=user, is_read=False)
+        if not mark_all:
+            # Mark specific notifications as read
+            unread = unread.filter(id__in=notification_ids)
+        
+        # The update and the counter move together; only rows that were unread are counted
+        with transaction.atomic():
+            updated_count = unread.update(is_read=True, read_at=timezone.now())
+            badge_counters.adjust(user.id, unread_notifications=-updated_count)
+        
         return JsonResponse({
             'success': True,
             'message': f'Marked {updated_count} notifications as read',
             'data': {
                 'updated_count': updated_count,
-                'remaining_unread': NotificationHistory.objects.filter(user=user, is_read=False).count() if hasattr(NotificationHistory, 'objects') else 0
+                'remaining_unread': badge_counters.current_counts(user.id)['notifications']
             }
         })
         
@@ -214,4 +207,43 @@ def create_notification_api(request):
             'success': False,
             'error': 'Failed to create notification',
             'error_code': 'CREATE_NOTIFICATION_ERROR'
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+
+@csrf_exempt
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@authentication_classes([BearerSessionAuthentication, CsrfExemptSessionAuthentication])
+def badge_counts_api(request):
+    """
+    Combined header badge counts (unread notifications, active alerts, unread news)
+    GET /api/notifications/badges
+    
+    Served from maintained counters; the ETag hashes the counts served, so
+    polling clients get 304 until a count changes, whichever worker answers.
+    """
+    try:
+        user = request.user
+        if not getattr(user, 'is_authenticated', False):
+            return JsonResponse({
+                'success': True,
+                'data': {'notifications': 0, 'alerts': 0, 'news': 0, 'total': 0, 'version': 0}
+            })
+        
+        badges = badge_counters.get_badges(user.id)
+        etag = badge_counters.etag_for(badges)
+        if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = JsonResponse({'success': True, 'data': badges})
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+        
+    except Exception as e:
+        logger.error(f"Badge counts error: {str(e)}")
+        return JsonResponse({
+            'success': False,
+            'error': 'Failed to retrieve badge counts',
+            'error_code': 'BADGE_COUNTS_ERROR'
+        }, status=500)
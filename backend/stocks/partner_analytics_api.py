@@ -6,12 +6,11 @@ Partner analytics endpoints and referral redirect.
 """
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from decimal import Decimal
 from typing import Dict, Any, List, Tuple
 
 from django.conf import settings
-from django.db.models import Sum
 from django.http import JsonResponse, HttpResponse
 from django.shortcuts import redirect
 from django.utils import timezone
@@ -22,7 +21,8 @@ from rest_framework.decorators import api_view, permission_classes, authenticati
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 
-from .models import ReferralClickEvent, ReferralTrialEvent, RevenueTracking, DiscountCode
+from . import referral_analytics
+from .models import ReferralTrialEvent, RevenueTracking, DiscountCode
 
 
 # ----- Utilities -----
@@ -40,6 +40,10 @@ def _parse_dt(s: str | None, default: datetime) -> datetime:
             return default
 
 
+def _utc_day(moment: datetime):
+    return moment.astimezone(dt_timezone.utc).date()
+
+
 def _enforce_partner_access(request, code: str) -> tuple[bool, str | None]:
     """Check that the authenticated user's email is mapped to the partner code.
     Staff users are allowed for convenience.
@@ -131,14 +135,14 @@ def referral_redirect(request, code: str):
         except Exception:
             pass
         session_id = str(getattr(request, 'session', None) and request.session.session_key or '')
-        # Persist click
+        # Queue click; the row and daily rollup are written off the redirect path
         try:
-            ReferralClickEvent.objects.create(
+            referral_analytics.record_click(
                 code=code,
                 session_id=session_id,
                 ip_hash=ip_hash,
                 user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                occurred_at=timezone.now(),
+                at=timezone.now(),
             )
         except Exception:
             pass
@@ -175,41 +179,22 @@ def partner_analytics_summary_api(request):
             start = timezone.make_aware(start, timezone.utc)
         if timezone.is_naive(end):
             end = timezone.make_aware(end, timezone.utc)
-        # Clicks
-        clicks = ReferralClickEvent.objects.filter(code=code, occurred_at__gte=start, occurred_at__lte=end).count()
-        # Trials (unique users)
-        trials_qs = ReferralTrialEvent.objects.filter(code=code, occurred_at__gte=start, occurred_at__lte=end)
-        trials = trials_qs.count()
-        unique_trial_users = trials_qs.exclude(user__isnull=True).values('user').distinct().count()
-        # Purchases via discount code
+        # Windowed and lifetime totals from the daily rollups (UTC days)
+        window, lifetime = referral_analytics.window_totals(code, _utc_day(start), _utc_day(end))
+        clicks, trials, purchases = window['clicks'], window['trials'], window['purchases']
+        # Unique trial users can't be summed across days
+        unique_trial_users = ReferralTrialEvent.objects.filter(
+            code=code, occurred_at__gte=start, occurred_at__lte=end, user__isnull=False,
+        ).values('user').distinct().count()
         purchases_qs = RevenueTracking.objects.filter(
             discount_code__code=code,
             payment_date__gte=start,
             payment_date__lte=end,
         )
-        purchases = purchases_qs.count()
         # Conversion rates
         trial_conv = (trials / clicks) * 100 if clicks else 0.0
         purchase_conv = (purchases / clicks) * 100 if clicks else 0.0
 
-        # Revenue aggregates for window
-        window_revenue_totals = purchases_qs.aggregate(
-            total_revenue=Sum('final_amount'),
-            total_commission=Sum('commission_amount'),
-            total_discount=Sum('discount_amount'),
-        )
-
-        # Lifetime aggregates
-        lifetime_clicks = ReferralClickEvent.objects.filter(code=code).count()
-        lifetime_trials = ReferralTrialEvent.objects.filter(code=code).count()
-        lifetime_purchases_qs = RevenueTracking.objects.filter(discount_code__code=code)
-        lifetime_purchases = lifetime_purchases_qs.count()
-        lifetime_revenue_totals = lifetime_purchases_qs.aggregate(
-            total_revenue=Sum('final_amount'),
-            total_commission=Sum('commission_amount'),
-            total_discount=Sum('discount_amount'),
-        )
-
         # Recent referral purchases (most recent 10)
         recent_purchases = []
         for entry in purchases_qs.select_related('user').order_by('-payment_date')[:10]:
@@ -266,21 +251,21 @@ def partner_analytics_summary_api(request):
             },
             'revenue': {
                 'window': {
-                    'total_revenue': _dec_to_float(window_revenue_totals.get('total_revenue')),
-                    'total_commission': _dec_to_float(window_revenue_totals.get('total_commission')),
-                    'total_discount': _dec_to_float(window_revenue_totals.get('total_discount')),
+                    'total_revenue': _dec_to_float(window['revenue']),
+                    'total_commission': _dec_to_float(window['commission']),
+                    'total_discount': _dec_to_float(window['discount']),
                 },
                 'lifetime': {
-                    'total_revenue': _dec_to_float(lifetime_revenue_totals.get('total_revenue')),
-                    'total_commission': _dec_to_float(lifetime_revenue_totals.get('total_commission')),
-                    'total_discount': _dec_to_float(lifetime_revenue_totals.get('total_discount')),
+                    'total_revenue': _dec_to_float(lifetime['revenue']),
+                    'total_commission': _dec_to_float(lifetime['commission']),
+                    'total_discount': _dec_to_float(lifetime['discount']),
                 },
-                'pending_commission': _dec_to_float(window_revenue_totals.get('total_commission')),
+                'pending_commission': _dec_to_float(window['commission']),
             },
             'lifetime': {
-                'clicks': lifetime_clicks,
-                'trials': lifetime_trials,
-                'purchases': lifetime_purchases,
+                'clicks': lifetime['clicks'],
+                'trials': lifetime['trials'],
+                'purchases': lifetime['purchases'],
             },
             'recent_referrals': recent_purchases,
             'discount': discount_meta,
@@ -316,23 +301,16 @@ def partner_analytics_timeseries_api(request):
         while cursor <= end:
             buckets.append(cursor)
             cursor = cursor + step
-        # Preload events
-        clicks = ReferralClickEvent.objects.filter(code=code, occurred_at__gte=start, occurred_at__lte=end)
-        trials = ReferralTrialEvent.objects.filter(code=code, occurred_at__gte=start, occurred_at__lte=end)
-        purchases = RevenueTracking.objects.filter(discount_code__code=code, payment_date__gte=start, payment_date__lte=end)
-        # Aggregate per bucket
-        series = []
-        for i, b in enumerate(buckets):
-            b_end = buckets[i + 1] if i + 1 < len(buckets) else end
-            c = clicks.filter(occurred_at__gte=b, occurred_at__lt=b_end).count()
-            t = trials.filter(occurred_at__gte=b, occurred_at__lt=b_end).count()
-            p = purchases.filter(payment_date__gte=b, payment_date__lt=b_end).count()
-            series.append({
-                't': b.isoformat(),
-                'clicks': c,
-                'trials': t,
-                'purchases': p,
-            })
+        # Aggregate per bucket from the daily rollups
+        series = [{'t': b.isoformat(), 'clicks': 0, 'trials': 0, 'purchases': 0} for b in buckets]
+        if not buckets:
+            # from after to: nothing to aggregate
+            return Response({'success': True, 'code': code, 'interval': interval, 'series': series, 'from': start.isoformat(), 'to': end.isoformat()})
+        first_day = _utc_day(start)
+        for row in referral_analytics.daily_rows(code, first_day, _utc_day(end)):
+            i = min((row['day'] - first_day).days // step.days, len(series) - 1)
+            for field in ('clicks', 'trials', 'purchases'):
+                series[i][field] += row[field]
         return Response({'success': True, 'code': code, 'interval': interval, 'series': series, 'from': start.isoformat(), 'to': end.isoformat()})
     except Exception as e:
         return Response({'success': False, 'error': str(e)}, status=500)
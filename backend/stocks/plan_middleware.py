@@ -16,6 +16,8 @@ from typing import Callable, Dict
 
 from django.conf import settings
 
+from . import auth_cache
+
 
 def _determine_user_plan(request) -> str:
     """
@@ -34,7 +36,7 @@ def _determine_user_plan(request) -> str:
 
             # Derive from Django groups if available
             try:
-                group_names = {g.name.strip().lower() for g in request.user.groups.all()}
+                group_names = auth_cache.group_names(request.user)
                 for candidate in ("enterprise", "gold", "pro", "premium", "silver", "bronze"):
                     if candidate in group_names:
                         return candidate
@@ -0,0 +1,163 @@
+"""
+Platform-wide portfolio totals for the public summary endpoints.
+
+Total market value, unrealized P&L and aggregate return are computed with one
+SUM/COUNT query per table and stored as a single PlatformPortfolioSummary row.
+Holding and portfolio writes schedule a rebuild (at most every
+MIN_REFRESH_SECONDS, after commit), and every caller reads the totals with one
+cache or DB lookup instead of loading every row in the system.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from stockscanner_django.db_access import read_only
+
+from .models import PlatformPortfolioSummary, PortfolioHolding, UserPortfolio
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'platform_metrics:portfolio_summary'
+CACHE_TTL = 60
+MIN_REFRESH_SECONDS = 30
+# Rebuild on read if no write has refreshed the summary for this long
+# (price updates reach holdings without passing through the signals below)
+MAX_AGE = timedelta(minutes=15)
+
+_refresh_lock = threading.Lock()
+_pending_timer = None
+_last_refresh = 0.0
+
+
+def _as_doc(row):
+    return {
+        'total_value': float(row['total_value']),
+        'unrealized_pnl': float(row['unrealized_pnl']),
+        'total_cost': float(row['total_cost']),
+        'total_return': float(row['total_return']),
+        'total_return_percent': (
+            float(row['total_return'] / row['total_cost'] * 100) if row['total_cost'] else 0.0
+        ),
+        'holdings_count': row['holdings_count'],
+        'portfolios_count': row['portfolios_count'],
+        'computed_at': row['computed_at'].isoformat(),
+    }
+
+
+def compute_summary():
+    """Aggregate holding and portfolio totals in the database."""
+    holdings = PortfolioHolding.objects.aggregate(
+        total_value=Sum('market_value'),
+        unrealized_pnl=Sum('unrealized_gain_loss'),
+        holdings_count=Count('id'),
+    )
+    portfolios = UserPortfolio.objects.aggregate(
+        total_cost=Sum('total_cost'),
+        total_return=Sum('total_return'),
+        portfolios_count=Count('id'),
+    )
+    return {
+        'total_value': holdings['total_value'] or Decimal('0'),
+        'unrealized_pnl': holdings['unrealized_pnl'] or Decimal('0'),
+        'holdings_count': holdings['holdings_count'],
+        'total_cost': portfolios['total_cost'] or Decimal('0'),
+        'total_return': portfolios['total_return'] or Decimal('0'),
+        'portfolios_count': portfolios['portfolios_count'],
+    }
+
+
+def _stored_row():
+    return PlatformPortfolioSummary.objects.filter(pk=1).values(
+        'total_value', 'unrealized_pnl', 'total_cost', 'total_return',
+        'holdings_count', 'portfolios_count', 'computed_at',
+    ).first()
+
+
+def _is_stale(row):
+    return row is None or timezone.now() - row['computed_at'] > MAX_AGE
+
+
+def _rebuild():
+    """Compute, store and publish the totals; caller holds _refresh_lock."""
+    global _last_refresh
+    started = time.monotonic()
+    # On the primary even from read views: the summary row is written
+    with read_only(False):
+        row = compute_summary()
+        row['computed_at'] = timezone.now()
+        PlatformPortfolioSummary.objects.update_or_create(pk=1, defaults=row)
+    doc = _as_doc(row)
+    cache.set(CACHE_KEY, doc, CACHE_TTL)
+    _last_refresh = time.monotonic()
+    logger.info(
+        "Platform portfolio summary computed over %s holdings in %.0f ms",
+        row['holdings_count'], (time.monotonic() - started) * 1000,
+    )
+    return doc
+
+
+def refresh_summary():
+    """Recompute, store and publish the platform totals."""
+    with _refresh_lock:
+        return _rebuild()
+
+
+def get_summary():
+    """Return the platform totals with one cache (or DB) read."""
+    doc = cache.get(CACHE_KEY)
+    if doc is not None:
+        return doc
+    row = _stored_row()
+    if _is_stale(row):
+        with _refresh_lock:
+            # Callers queued behind a rebuild reuse it instead of repeating it
+            doc = cache.get(CACHE_KEY)
+            if doc is not None:
+                return doc
+            with read_only(False):
+                row = _stored_row()
+            if _is_stale(row):
+                return _rebuild()
+    doc = _as_doc(row)
+    cache.set(CACHE_KEY, doc, CACHE_TTL)
+    return doc
+
+
+def _deferred_refresh():
+    global _pending_timer
+    _pending_timer = None
+    try:
+        refresh_summary()
+    except Exception as e:
+        logger.warning("Platform portfolio summary refresh failed: %s", e)
+    finally:
+        # Timer threads don't pass through request_finished
+        for conn in connections.all(initialized_only=True):
+            conn.close()
+
+
+def _schedule_refresh():
+    global _pending_timer
+    if _pending_timer is not None:
+        return
+    wait = max(0.0, MIN_REFRESH_SECONDS - (time.monotonic() - _last_refresh))
+    # Off the request thread even when due, so the write path stays one save
+    _pending_timer = threading.Timer(wait, _deferred_refresh)
+    _pending_timer.daemon = True
+    _pending_timer.start()
+
+
+def on_portfolio_changed(sender, instance=None, **kwargs):
+    """post_save/post_delete receiver for holdings and portfolios.
+
+    Writes inside the interval share one trailing rebuild, which runs after
+    the writing transaction commits so it sees the new rows.
+    """
+    transaction.on_commit(_schedule_refresh)
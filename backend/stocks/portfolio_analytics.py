@@ -0,0 +1,403 @@
+"""
+Portfolio NAV history and return analytics.
+
+A portfolio's end-of-day value is rebuilt by replaying its TradeTransaction
+history against daily closes (the last StockPrice of each day, falling back
+to trade prices) as days x positions matrices. The resulting series is cached
+in PortfolioNavDay and extended incrementally: each read recomputes only from
+the last cached day (which may have been cached mid-session) to today.
+Changing a transaction drops the cached days from its date onward once the
+transaction commits, with one DELETE per portfolio however many trades the
+transaction touched.
+
+Returns are time-weighted: each day's return excludes that day's net flow
+(buys minus sells, after fees), so deposits don't count as performance.
+"""
+import logging
+import math
+import os
+import threading
+from datetime import date as date_cls, datetime, time as time_cls, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from stockscanner_django.db_access import read_only
+
+from .models import PortfolioNavDay, Stock, StockPrice, TradeTransaction, UserPortfolio
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BENCHMARK = os.environ.get('PORTFOLIO_BENCHMARK', 'SPY')
+TRADING_DAYS = 252
+BENCHMARK_CACHE_TTL = 3600
+# Reads within this many seconds of the last extension skip it entirely
+NAV_FRESH_SECONDS = int(os.environ.get('PORTFOLIO_NAV_FRESH_SECONDS', '60'))
+PRICE_LOOKUP_BATCH = 1000
+
+# {portfolio_id: earliest changed day} waiting for the current transaction to commit
+_pending = threading.local()
+
+
+def _fresh_key(portfolio_id):
+    return f'portfolio:nav:fresh:{portfolio_id}'
+
+
+# ----- price history -----
+
+def _day_bounds(start: date_cls, end: date_cls) -> Tuple[datetime, datetime]:
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start, time_cls.min), tz),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time_cls.min), tz),
+    )
+
+
+def _prices_at(stock_ids, last_by_key) -> Dict:
+    """Resolve {key: (stock_id, timestamp)} to {key: price}, a bounded IN list per query."""
+    timestamps = sorted({ts for _, ts in last_by_key.values()})
+    price = {}
+    for i in range(0, len(timestamps), PRICE_LOOKUP_BATCH):
+        rows = StockPrice.objects.filter(
+            stock_id__in=stock_ids, timestamp__in=timestamps[i:i + PRICE_LOOKUP_BATCH],
+        ).values_list('stock_id', 'timestamp', 'price')
+        price.update(((sid, ts), float(p)) for sid, ts, p in rows)
+    return {key: price[ref] for key, ref in last_by_key.items() if ref in price}
+
+
+def daily_closes(stock_ids: Iterable[int], start: date_cls, end: date_cls) -> Dict[Tuple[date_cls, int], float]:
+    """{(day, stock_id): close} where close is the day's last stored price."""
+    stock_ids = list(stock_ids)
+    if not stock_ids:
+        return {}
+    lo, hi = _day_bounds(start, end)
+    lasts = (
+        StockPrice.objects
+        .filter(stock_id__in=stock_ids, timestamp__gte=lo, timestamp__lt=hi)
+        .annotate(day=TruncDate('timestamp'))
+        .values('stock_id', 'day')
+        .annotate(last=Max('timestamp'))
+        .values_list('stock_id', 'day', 'last')
+    )
+    return _prices_at(stock_ids, {(day, sid): (sid, last) for sid, day, last in lasts})
+
+
+def closes_before(stock_ids: Iterable[int], day: date_cls) -> Dict[int, float]:
+    """{stock_id: last stored price before ``day``}."""
+    stock_ids = list(stock_ids)
+    if not stock_ids:
+        return {}
+    lo, _ = _day_bounds(day, day)
+    lasts = (
+        StockPrice.objects
+        .filter(stock_id__in=stock_ids, timestamp__lt=lo)
+        .values('stock_id')
+        .annotate(last=Max('timestamp'))
+        .values_list('stock_id', 'last')
+    )
+    return _prices_at(stock_ids, {sid: (sid, last) for sid, last in lasts})
+
+
+# ----- replay -----
+
+def _trading_days(start: date_cls, end: date_cls, extra: Iterable[date_cls] = ()) -> List[date_cls]:
+    days = set(d for d in extra if start <= d <= end)
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            days.add(day)
+        day += timedelta(days=1)
+    return sorted(days)
+
+
+def replay(trades, days, closes, opening_positions, opening_prices, opening_value):
+    """
+    Value a portfolio over ``days``.
+
+    trades: [(day, stock_id, signed_shares, price, flow)] inside ``days``
+    closes: {(day, stock_id): close}
+    opening_*: positions, last prices and total value at the end of the day before days[0]
+
+    Returns (values, flows, returns) arrays aligned with ``days``.
+    """
+    stock_ids = sorted({sid for sid, qty in opening_positions.items() if qty} | {t[1] for t in trades})
+    n_days, n_stocks = len(days), len(stock_ids)
+    row = {d: i for i, d in enumerate(days)}
+    col = {sid: j for j, sid in enumerate(stock_ids)}
+
+    traded = np.zeros((n_days, n_stocks))
+    trade_prices = np.full((n_days, n_stocks), np.nan)
+    flows = np.zeros(n_days)
+    for day, sid, qty, price, flow in trades:
+        i, j = row[day], col[sid]
+        traded[i, j] += qty
+        trade_prices[i, j] = price
+        flows[i] += flow
+    positions = np.array([opening_positions.get(sid, 0.0) for sid in stock_ids]) + np.cumsum(traded, axis=0)
+
+    # Row 0 holds the opening prices so the forward fill starts from them
+    prices = np.full((n_days + 1, n_stocks), np.nan)
+    prices[0] = [opening_prices.get(sid, np.nan) for sid in stock_ids]
+    for (day, sid), close in closes.items():
+        if day in row and sid in col:
+            prices[row[day] + 1, col[sid]] = close
+    # A trade price stands in for a missing close
+    body = prices[1:]
+    np.copyto(body, trade_prices, where=np.isnan(body))
+    seen = np.where(~np.isnan(prices), np.arange(n_days + 1)[:, None], 0)
+    np.maximum.accumulate(seen, axis=0, out=seen)
+    filled = prices[seen, np.arange(n_stocks)][1:]
+
+    values = np.where(np.isnan(filled), 0.0, positions * filled).sum(axis=1) if n_stocks else np.zeros(n_days)
+    previous = np.concatenate(([opening_value], values[:-1]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.where(
+            previous > 0,
+            (values - flows) / previous - 1.0,
+            # Money arriving into an empty portfolio starts its track record
+            np.where(flows > 0, values / flows - 1.0, 0.0),
+        )
+    returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+    return values, flows, returns
+
+
+def _trade_rows(portfolio_id):
+    """All transactions as (day, stock_id, signed_shares, price, flow), oldest first."""
+    rows = []
+    for day_dt, sid, kind, shares, price, fees in (
+        TradeTransaction.objects.filter(portfolio_id=portfolio_id)
+        .order_by('transaction_date', 'id')
+        .values_list('transaction_date', 'stock_id', 'transaction_type', 'shares', 'price', 'fees')
+    ):
+        shares, price, fees = float(shares), float(price), float(fees or 0)
+        if kind == 'sell':
+            rows.append((timezone.localdate(day_dt), sid, -shares, price, -(shares * price - fees)))
+        else:
+            rows.append((timezone.localdate(day_dt), sid, shares, price, shares * price + fees))
+    return rows
+
+
+def ensure_nav(portfolio_id: int, today: Optional[date_cls] = None) -> None:
+    """Extend the cached NAV series of one portfolio through ``today``."""
+    today = today or timezone.localdate()
+    if cache.get(_fresh_key(portfolio_id)) == today.isoformat():
+        return
+    # Runs on the primary even from read views: it appends rows it just read
+    with read_only(False):
+        trades = _trade_rows(portfolio_id)
+        if not trades:
+            return
+        cached = list(
+            PortfolioNavDay.objects.filter(portfolio_id=portfolio_id)
+            .order_by('-date').values_list('date', 'value')[:2]
+        )
+        if cached and cached[0][0] > today:
+            return
+        # The last cached day may have been valued before its close; redo it
+        start = cached[0][0] if cached else trades[0][0]
+        opening_value = float(cached[1][1]) if len(cached) > 1 else 0.0
+        if len(cached) == 1:
+            # Only one cached day: rebuild from the first trade
+            start = trades[0][0]
+
+        opening_positions: Dict[int, float] = {}
+        opening_prices: Dict[int, float] = {}
+        in_range = []
+        for trade in trades:
+            if trade[0] < start:
+                opening_positions[trade[1]] = opening_positions.get(trade[1], 0.0) + trade[2]
+                opening_prices[trade[1]] = trade[3]
+            elif trade[0] <= today:
+                in_range.append(trade)
+        held = [sid for sid, qty in opening_positions.items() if abs(qty) > 1e-9]
+        opening_prices.update(closes_before(held, start))
+
+        days = _trading_days(start, today, (t[0] for t in in_range))
+        if not days:
+            return
+        stock_ids = set(held) | {t[1] for t in in_range}
+        values, flows, returns = replay(
+            in_range, days, daily_closes(stock_ids, start, today),
+            opening_positions, opening_prices, opening_value,
+        )
+        rows = [
+            PortfolioNavDay(
+                portfolio_id=portfolio_id,
+                date=day,
+                value=Decimal(str(round(float(values[i]), 2))),
+                net_flow=Decimal(str(round(float(flows[i]), 2))),
+                daily_return=float(returns[i]),
+            )
+            for i, day in enumerate(days)
+        ]
+        # The replay ran unlocked; only the swap holds the portfolio row lock
+        with transaction.atomic():
+            if not UserPortfolio.objects.select_for_update().filter(pk=portfolio_id).exists():
+                return
+            if _trade_rows(portfolio_id) != trades:
+                # A trade changed mid-replay; its invalidation follows, the next read rebuilds
+                return
+            PortfolioNavDay.objects.filter(portfolio_id=portfolio_id, date__gte=start).delete()
+            PortfolioNavDay.objects.bulk_create(rows, batch_size=1000)
+    cache.set(_fresh_key(portfolio_id), today.isoformat(), NAV_FRESH_SECONDS)
+
+
+def invalidate_from(portfolio_id: int, day: date_cls) -> None:
+    """Drop cached NAV days from ``day`` on, under the same row lock ensure_nav writes with."""
+    with read_only(False), transaction.atomic():
+        UserPortfolio.objects.select_for_update().filter(pk=portfolio_id).exists()
+        PortfolioNavDay.objects.filter(portfolio_id=portfolio_id, date__gte=day).delete()
+    cache.delete(_fresh_key(portfolio_id))
+
+
+def _flush_invalidations() -> None:
+    pending = getattr(_pending, 'days', None)
+    _pending.days = {}
+    for portfolio_id, day in (pending or {}).items():
+        try:
+            invalidate_from(portfolio_id, day)
+        except Exception as e:
+            logger.warning(f"Could not invalidate NAV of portfolio {portfolio_id} from {day}: {e}")
+
+
+def invalidate_on_commit(portfolio_id: int, day: date_cls) -> None:
+    """Queue an invalidation; each portfolio is cleared once, from its earliest day, after commit."""
+    pending = getattr(_pending, 'days', None)
+    if pending is None:
+        pending = _pending.days = {}
+    if portfolio_id not in pending or day < pending[portfolio_id]:
+        pending[portfolio_id] = day
+    # Later callbacks of the same commit find the queue already flushed
+    transaction.on_commit(_flush_invalidations)
+
+
+# ----- statistics -----
+
+def _benchmark_returns(ticker: str, start: date_cls, end: date_cls) -> Dict[date_cls, float]:
+    key = f'portfolio:benchmark:{ticker}:{start.isoformat()}:{end.isoformat()}'
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    stock_id = Stock.objects.filter(ticker=ticker).values_list('id', flat=True).first()
+    returns: Dict[date_cls, float] = {}
+    if stock_id is not None:
+        closes = sorted((day, close) for (day, _), close in daily_closes([stock_id], start, end).items())
+        for (_, prev), (day, close) in zip(closes, closes[1:]):
+            if prev:
+                returns[day] = close / prev - 1.0
+    cache.set(key, returns, BENCHMARK_CACHE_TTL)
+    return returns
+
+
+def _money_weighted_return(days, flows, final_value) -> Optional[float]:
+    """Annualised internal rate of return of the flows, ending at ``final_value``."""
+    if not len(days) or final_value <= 0 or not np.any(flows):
+        return None
+    years = np.array([(days[-1] - d).days / 365.25 for d in days])
+    rate = 0.1
+    for _ in range(50):
+        growth = (1.0 + rate) ** years
+        npv = np.sum(flows * growth) - final_value
+        slope = np.sum(flows * years * (1.0 + rate) ** (years - 1.0))
+        if not slope:
+            return None
+        step = npv / slope
+        rate -= step
+        if rate <= -0.999:
+            return None
+        if abs(step) < 1e-9:
+            return float(rate)
+    return None
+
+
+def summarize(days, values, flows, returns, benchmark: Optional[Dict[date_cls, float]] = None) -> Dict:
+    """Equity curve and return statistics from a NAV series."""
+    growth = np.cumprod(1.0 + returns)
+    peak = np.maximum.accumulate(growth)
+    drawdown = growth / peak - 1.0
+    trough = int(np.argmin(drawdown))
+    peak_at = int(np.argmax(growth[:trough + 1]))
+    twr = float(growth[-1] - 1.0)
+    years = max((days[-1] - days[0]).days / 365.25, 1 / 365.25)
+    daily = returns[1:]
+
+    beta = None
+    if benchmark:
+        pairs = [(returns[i], benchmark[d]) for i, d in enumerate(days) if i and d in benchmark]
+        if len(pairs) > 2:
+            port, bench = np.array(pairs).T
+            variance = np.var(bench, ddof=1)
+            if variance > 0:
+                beta = float(np.cov(port, bench, ddof=1)[0, 1] / variance)
+
+    def _num(value, digits=6):
+        return None if value is None or math.isnan(value) or math.isinf(value) else round(value, digits)
+
+    return {
+        'as_of': days[-1].isoformat(),
+        'start': days[0].isoformat(),
+        'equity_curve': [
+            {
+                'date': d.isoformat(),
+                'value': round(float(values[i]), 2),
+                'net_flow': round(float(flows[i]), 2),
+                'twr_index': round(float(growth[i]), 6),
+            }
+            for i, d in enumerate(days)
+        ],
+        'metrics': {
+            'days': len(days),
+            'value': round(float(values[-1]), 2),
+            'twr': _num(twr),
+            'twr_annualized': _num((1.0 + twr) ** (1.0 / years) - 1.0) if twr > -1 else None,
+            'mwr_annualized': _num(_money_weighted_return(days, flows, float(values[-1]))),
+            'max_drawdown': _num(float(drawdown[trough])),
+            'max_drawdown_peak': days[peak_at].isoformat(),
+            'max_drawdown_trough': days[trough].isoformat(),
+            'volatility_annualized': _num(float(np.std(daily, ddof=1) * math.sqrt(TRADING_DAYS))) if len(daily) > 1 else None,
+            'beta': _num(beta),
+        },
+    }
+
+
+def portfolio_analytics(portfolio_id: int, benchmark: str = DEFAULT_BENCHMARK) -> Optional[Dict]:
+    """Extend the cached NAV series and summarise it; None when the portfolio has no trades."""
+    ensure_nav(portfolio_id)
+    rows = list(
+        PortfolioNavDay.objects.filter(portfolio_id=portfolio_id)
+        .order_by('date').values_list('date', 'value', 'net_flow', 'daily_return')
+    )
+    if not rows:
+        return None
+    days = [r[0] for r in rows]
+    values = np.array([float(r[1]) for r in rows])
+    flows = np.array([float(r[2]) for r in rows])
+    returns = np.array([r[3] for r in rows])
+    result = summarize(days, values, flows, returns, _benchmark_returns(benchmark, days[0], days[-1]) if benchmark else None)
+    result['benchmark'] = benchmark or None
+    return result
+
+
+# ----- invalidation receivers -----
+
+def on_transaction_pre_save(sender, instance, **kwargs):
+    if instance.pk:
+        instance._nav_previous = (
+            TradeTransaction.objects.filter(pk=instance.pk).values_list('portfolio_id', 'transaction_date').first()
+        )
+
+
+def on_transaction_changed(sender, instance, **kwargs):
+    changed = [(instance.portfolio_id, instance.transaction_date)]
+    previous = getattr(instance, '_nav_previous', None)
+    if previous:
+        changed.append(previous)
+    for portfolio_id, when in changed:
+        if when is not None:
+            invalidate_on_commit(portfolio_id, timezone.localdate(when) if isinstance(when, datetime) else when)
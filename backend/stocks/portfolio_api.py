@@ -17,6 +17,7 @@ from .security_utils import (
     PORTFOLIO_SCHEMA, HOLDING_SCHEMA, TRANSACTION_SCHEMA
 )
 from .portfolio_service import PortfolioService
+from .portfolio_analytics import DEFAULT_BENCHMARK, portfolio_analytics
 from .plan_limits import get_limits_for_user, is_within_limit
 from .models import UserPortfolio, PortfolioHolding, Stock, StockAlert
 
@@ -327,6 +328,46 @@ def portfolio_performance(request, portfolio_id):
             'error_code': 'PERFORMANCE_ERROR'
         }, status=500)
 
+@csrf_exempt
+@secure_api_endpoint(methods=['GET'])
+def portfolio_analytics_api(request, portfolio_id):
+    """
+    Equity curve, TWR, money-weighted return, max drawdown, volatility and
+    beta vs. a benchmark, served from the cached daily NAV series.
+    
+    GET /api/portfolio/{portfolio_id}/analytics/?benchmark=SPY
+    """
+    try:
+        if not UserPortfolio.objects.filter(id=portfolio_id, user=request.user).exists():
+            return JsonResponse({
+                'success': False,
+                'error': 'Portfolio not found',
+                'error_code': 'PORTFOLIO_NOT_FOUND'
+            }, status=404)
+        
+        benchmark = (request.GET.get('benchmark') or DEFAULT_BENCHMARK).strip().upper()[:10]
+        analytics = portfolio_analytics(int(portfolio_id), benchmark=benchmark)
+        if analytics is None:
+            return JsonResponse({
+                'success': True,
+                'data': None,
+                'message': 'Portfolio has no transactions yet'
+            })
+        
+        return JsonResponse({
+            'success': True,
+            'data': analytics,
+            'message': 'Portfolio analytics retrieved successfully'
+        })
+        
+    except Exception as e:
+        logger.error(f"Error in portfolio_analytics_api: {str(e)}")
+        return JsonResponse({
+            'success': False,
+            'error': 'Failed to retrieve portfolio analytics',
+            'error_code': 'ANALYTICS_ERROR'
+        }, status=500)
+
 @csrf_exempt
 @secure_api_endpoint(methods=['POST'])
 def import_csv(request):
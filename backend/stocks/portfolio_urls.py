@@ -20,6 +20,7 @@ urlpatterns = [
     path('<int:portfolio_id>/delete/', portfolio_api.delete_portfolio, name='delete_legacy'),
     path('<int:portfolio_id>/update/', portfolio_api.update_portfolio, name='update'),
     path('<int:portfolio_id>/performance/', portfolio_api.portfolio_performance, name='performance'),
+    path('<int:portfolio_id>/analytics/', portfolio_api.portfolio_analytics_api, name='analytics'),
     
     # Portfolio holdings management
     path('add-holding/', portfolio_api.add_holding, name='add_holding'),
@@ -0,0 +1,238 @@
+"""
+Referral analytics store for partner dashboards.
+
+The referral redirect appends clicks to an EventBuffer (see event_pipeline)
+and returns immediately; the flusher bulk-inserts the raw ReferralClickEvent
+rows and adds the batch to per-code daily ReferralDailyRollup rows. Trial
+and referral revenue rows fold themselves into the same rollups from model
+signals, inside the transaction that writes them, so the partner summary and
+timeseries endpoints read a few rollup rows instead of counting raw events.
+
+rebuild_rollups() recomputes the rollups from the raw tables (backfill or
+repair); see the rebuild_referral_rollups command.
+"""
+import atexit
+import logging
+from collections import defaultdict
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+
+from .event_pipeline import EventBuffer
+from .models import ReferralClickEvent, ReferralDailyRollup, ReferralTrialEvent, RevenueTracking
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ('clicks', 'trials', 'purchases')
+CODE_MAX_LENGTH = ReferralClickEvent._meta.get_field('code').max_length
+AMOUNTS = ('revenue', 'commission', 'discount')
+
+
+def _day(moment):
+    return moment.astimezone(dt_timezone.utc).date()
+
+
+def _zero():
+    return dict.fromkeys(COUNTERS, 0) | dict.fromkeys(AMOUNTS, Decimal('0'))
+
+
+def apply_deltas(deltas):
+    """Add {(code, day): {field: delta}} to the rollups with in-place increments."""
+    deltas = {key: delta for key, delta in deltas.items() if key[0] and any(delta.values())}
+    if not deltas:
+        return
+    with transaction.atomic():
+        ReferralDailyRollup.objects.bulk_create(
+            [ReferralDailyRollup(code=code, day=day) for code, day in deltas],
+            ignore_conflicts=True,
+            batch_size=500,
+        )
+        for (code, day), delta in deltas.items():
+            ReferralDailyRollup.objects.filter(code=code, day=day).update(
+                **{field: F(field) + value for field, value in delta.items() if value}
+            )
+
+
+# ----- Clicks -----
+
+def _click_row(e):
+    return ReferralClickEvent(
+        code=e['code'],
+        session_id=e['session_id'],
+        ip_hash=e['ip_hash'],
+        user_agent=e['user_agent'],
+        occurred_at=e['at'],
+    )
+
+
+def _write_clicks(events):
+    """Insert raw clicks and their rollup increments in one transaction."""
+    deltas = defaultdict(lambda: {'clicks': 0})
+    for e in events:
+        deltas[(e['code'], _day(e['at']))]['clicks'] += 1
+    with transaction.atomic():
+        ReferralClickEvent.objects.bulk_create([_click_row(e) for e in events], batch_size=500)
+        apply_deltas(deltas)
+
+
+def flush_clicks(batch):
+    try:
+        _write_clicks(batch)
+    except Exception as e:
+        # One bad row must not cost every partner the whole batch
+        logger.warning(f"Referral click batch of {len(batch)} failed ({e}); retrying row by row")
+        dropped = 0
+        for event in batch:
+            try:
+                _write_clicks([event])
+            except Exception:
+                dropped += 1
+        if dropped:
+            logger.error(f"Dropped {dropped} referral clicks that could not be written")
+
+
+click_buffer = EventBuffer('referral-clicks', flush_clicks)
+atexit.register(click_buffer.flush)
+
+
+def _valid_code(code):
+    return bool(code) and len(code) <= CODE_MAX_LENGTH and all(c.isalnum() or c in '-_' for c in code)
+
+
+def record_click(code, session_id, ip_hash, user_agent, at):
+    """Queue a referral click; the raw row and rollup are written by the flusher.
+
+    Clicks on codes that can't be a partner code (too long, odd characters)
+    are dropped; the other fields are clipped to their column sizes.
+    """
+    if not _valid_code(code):
+        return False
+    click_buffer.append({
+        'code': code,
+        'session_id': (session_id or '')[:64],
+        'ip_hash': (ip_hash or '')[:64],
+        'user_agent': user_agent or '',
+        'at': at,
+    })
+    return True
+
+
+# ----- Trials and referral revenue (model signals) -----
+
+def _revenue_key(instance):
+    code = instance.discount_code.code if instance.discount_code_id else None
+    if not code or not instance.payment_date:
+        return None
+    return code, _day(instance.payment_date)
+
+
+def _revenue_delta(instance, sign):
+    return {
+        'purchases': sign,
+        'revenue': sign * (instance.final_amount or 0),
+        'commission': sign * (instance.commission_amount or 0),
+        'discount': sign * (instance.discount_amount or 0),
+    }
+
+
+def on_trial_saved(sender, instance, created, **kwargs):
+    if created and instance.code:
+        apply_deltas({(instance.code, _day(instance.occurred_at)): {'trials': 1}})
+
+
+def on_trial_deleted(sender, instance, **kwargs):
+    if instance.code:
+        apply_deltas({(instance.code, _day(instance.occurred_at)): {'trials': -1}})
+
+
+def on_revenue_pre_save(sender, instance, **kwargs):
+    """Remember the stored row so an edit moves its amounts rather than adding them twice."""
+    instance._referral_previous = None
+    if instance.pk:
+        instance._referral_previous = RevenueTracking.objects.select_related('discount_code').filter(pk=instance.pk).first()
+
+
+def on_revenue_saved(sender, instance, **kwargs):
+    deltas = defaultdict(_zero)
+    previous = getattr(instance, '_referral_previous', None)
+    if previous is not None and _revenue_key(previous):
+        for field, value in _revenue_delta(previous, -1).items():
+            deltas[_revenue_key(previous)][field] += value
+    if _revenue_key(instance):
+        for field, value in _revenue_delta(instance, 1).items():
+            deltas[_revenue_key(instance)][field] += value
+    apply_deltas(deltas)
+
+
+def on_revenue_deleted(sender, instance, **kwargs):
+    key = _revenue_key(instance)
+    if key:
+        apply_deltas({key: _revenue_delta(instance, -1)})
+
+
+# ----- Reads -----
+
+def window_totals(code, start_day, end_day):
+    """(window, lifetime) totals for a code in one aggregate over its rollups."""
+    window_q = Q(day__gte=start_day, day__lte=end_day)
+    aggregates = {}
+    for field in COUNTERS + AMOUNTS:
+        aggregates[f'window_{field}'] = Sum(field, filter=window_q)
+        aggregates[f'lifetime_{field}'] = Sum(field)
+    row = ReferralDailyRollup.objects.filter(code=code).aggregate(**aggregates)
+    window, lifetime = _zero(), _zero()
+    for field in COUNTERS + AMOUNTS:
+        window[field] = row[f'window_{field}'] or window[field]
+        lifetime[field] = row[f'lifetime_{field}'] or lifetime[field]
+    return window, lifetime
+
+
+def daily_rows(code, start_day, end_day):
+    return ReferralDailyRollup.objects.filter(code=code, day__gte=start_day, day__lte=end_day).values(
+        'day', *COUNTERS, *AMOUNTS
+    ).order_by('day')
+
+
+# ----- Rebuild -----
+
+def rebuild_rollups(codes=None):
+    """Recompute rollups from raw clicks, trials and revenue; returns rows written."""
+    click_buffer.flush()
+    totals = defaultdict(_zero)
+
+    def fold(queryset, code_field, at_field, **aggregates):
+        if codes:
+            queryset = queryset.filter(**{f'{code_field}__in': codes})
+        rows = (
+            queryset.exclude(**{f'{code_field}__isnull': True})
+            .annotate(day=TruncDate(at_field, tzinfo=dt_timezone.utc))
+            .values(code_field, 'day')
+            .annotate(**aggregates)
+        )
+        for row in rows:
+            target = totals[(row[code_field], row['day'])]
+            for field in aggregates:
+                target[field] = row[field] or target[field]
+
+    fold(ReferralClickEvent.objects.all(), 'code', 'occurred_at', clicks=Count('id'))
+    fold(ReferralTrialEvent.objects.all(), 'code', 'occurred_at', trials=Count('id'))
+    fold(
+        RevenueTracking.objects.all(), 'discount_code__code', 'payment_date',
+        purchases=Count('id'), revenue=Sum('final_amount'),
+        commission=Sum('commission_amount'), discount=Sum('discount_amount'),
+    )
+
+    with transaction.atomic():
+        existing = ReferralDailyRollup.objects.all()
+        if codes:
+            existing = existing.filter(code__in=codes)
+        existing.delete()
+        ReferralDailyRollup.objects.bulk_create(
+            [ReferralDailyRollup(code=code, day=day, **values) for (code, day), values in totals.items() if code],
+            batch_size=1000,
+        )
+    logger.info(f"Rebuilt {len(totals)} referral rollup rows")
+    return len(totals)
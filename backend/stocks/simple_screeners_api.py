@@ -7,17 +7,16 @@ Provides minimal implementations:
 """
 from __future__ import annotations
 
-import csv
-import io
 import json
 from typing import Any
 
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
 
 from .models import Screener, Stock
+from .streaming_export import CSV, ExportColumn, keyset_rows, streaming_response
 
 
 def _fmt_decimal(v: Any):
@@ -150,20 +149,21 @@ def screeners_results_api(request, screener_id: str):
         return JsonResponse({"success": False, "error": str(e)}, status=500)
 
 
+_EXPORT_COLUMNS = [
+    ExportColumn("ticker", lambda r: r["ticker"]),
+    ExportColumn("company_name", lambda r: r["company_name"] or r["name"]),
+    ExportColumn("current_price", lambda r: _fmt_decimal(r["current_price"]) or 0),
+]
+
+
 @csrf_exempt
 @require_http_methods(["GET"])  # type: ignore
 def screeners_export_csv_api(request, screener_id: str):
     try:
         _ = Screener.objects.get(id=screener_id)
-        qs = Stock.objects.order_by("-last_updated")[:100]
-        buf = io.StringIO()
-        w = csv.writer(buf)
-        w.writerow(["ticker", "company_name", "current_price"])
-        for s in qs:
-            w.writerow([s.ticker, s.company_name or s.name, _fmt_decimal(s.current_price) or 0])
-        resp = HttpResponse(buf.getvalue(), content_type="text/csv")
-        resp["Content-Disposition"] = f'attachment; filename="screener_{screener_id}.csv"'
-        return resp
+        qs = Stock.objects.order_by("-last_updated")
+        rows = keyset_rows(qs, ["ticker", "company_name", "name", "current_price"])
+        return streaming_response(request, CSV, rows, _EXPORT_COLUMNS, filename=f"screener_{screener_id}.csv")
     except Screener.DoesNotExist:
         return JsonResponse({"success": False, "error": "Not found"}, status=404)
     except Exception as e:
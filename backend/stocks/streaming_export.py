@@ -0,0 +1,186 @@
+"""
+Streaming CSV / NDJSON exports.
+
+Rows are read in keyset-paginated pages (``WHERE (key, pk) > last ORDER BY
+key, pk LIMIT n``) rather than one big result set: the MySQL driver buffers
+a whole result client-side even under ``iterator()``, while each page here
+is a short indexed query, so memory stays at one page however large the
+export. Pages are rendered through an incremental CSV or NDJSON writer into
+a StreamingHttpResponse, coalesced into ~FLUSH_BYTES chunks and gzipped on
+the fly when the client accepts it. The header goes out before the first
+page is read.
+"""
+import csv
+import logging
+import os
+import zlib
+from collections import namedtuple
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = int(os.environ.get('EXPORT_PAGE_SIZE', '2000'))
+FLUSH_BYTES = 64 * 1024
+GZIP_LEVEL = 6
+
+CSV, NDJSON = 'csv', 'ndjson'
+CONTENT_TYPES = {CSV: 'text/csv', NDJSON: 'application/x-ndjson'}
+
+# Writers take any column objects with ``name`` and ``render(row)``, such as
+# columnar.Column; this is the minimal one for modules that don't use columnar
+ExportColumn = namedtuple('ExportColumn', 'name render')
+
+
+def _order_key(queryset):
+    """(field, descending) the export pages by: the queryset's first ordering, else pk."""
+    ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering or ())
+    field = next((f for f in ordering if isinstance(f, str) and f.lstrip('-') != '?'), 'pk')
+    descending = field.startswith('-')
+    field = field.lstrip('-')
+    if field in ('id', queryset.model._meta.pk.name):
+        field = 'pk'
+    return field, descending
+
+
+def keyset_rows(queryset, sources: Sequence[str], page_size: int = PAGE_SIZE,
+                limit: Optional[int] = None) -> Iterator[Dict]:
+    """``values(*sources)`` rows of ``queryset`` in its own order, one page at a time.
+
+    Pages on the queryset's leading (non-null) ordering field with pk as the
+    tie-breaker.
+    """
+    field, descending = _order_key(queryset)
+    sign = '-' if descending else ''
+    after = 'lt' if descending else 'gt'
+    keys = ['pk'] if field == 'pk' else [field, 'pk']
+    base = queryset.order_by(*[f'{sign}{k}' for k in keys]).values(*dict.fromkeys(list(sources) + keys))
+
+    remaining = limit
+    last = None
+    while remaining is None or remaining > 0:
+        page_qs = base
+        if last is not None:
+            if field == 'pk':
+                page_qs = page_qs.filter(**{f'pk__{after}': last['pk']})
+            else:
+                page_qs = page_qs.filter(
+                    Q(**{f'{field}__{after}': last[field]}) | Q(**{field: last[field], f'pk__{after}': last['pk']})
+                )
+        size = page_size if remaining is None else min(page_size, remaining)
+        page = list(page_qs[:size])
+        yield from page
+        if len(page) < size:
+            return
+        last = page[-1]
+        if remaining is not None:
+            remaining -= len(page)
+
+
+class _Buffer:
+    """File-like sink for csv.writer that hands back what was written."""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, value):
+        self.parts.append(value)
+        self.size += len(value)
+
+    def take(self) -> bytes:
+        data = ''.join(self.parts).encode('utf-8')
+        self.parts, self.size = [], 0
+        return data
+
+
+def csv_chunks(records: Iterable[Dict], columns: Sequence) -> Iterator[bytes]:
+    buffer = _Buffer()
+    writer = csv.writer(buffer)
+    writer.writerow([c.name for c in columns])
+    yield buffer.take()
+    renders = [c.render for c in columns]
+    for record in records:
+        writer.writerow(['' if v is None else v for v in (render(record) for render in renders)])
+        if buffer.size >= FLUSH_BYTES:
+            yield buffer.take()
+    if buffer.size:
+        yield buffer.take()
+
+
+def ndjson_chunks(records: Iterable[Dict], columns: Sequence) -> Iterator[bytes]:
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    buffer = _Buffer()
+    for record in records:
+        buffer.write(encoder.encode({c.name: c.render(record) for c in columns}))
+        buffer.write('\n')
+        if buffer.size >= FLUSH_BYTES:
+            yield buffer.take()
+    if buffer.size:
+        yield buffer.take()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Gzip a chunk stream; the first chunk is sync-flushed so the client sees bytes immediately."""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    first = True
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if first:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            first = False
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def accepts_gzip(request) -> bool:
+    encodings = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    return any(e.split(';')[0].strip().lower() == 'gzip' for e in encodings.split(','))
+
+
+def _logged(chunks: Iterator[bytes], filename: Optional[str]) -> Iterator[bytes]:
+    # Errors after the headers are sent can only end the stream
+    try:
+        yield from chunks
+    except Exception as e:
+        logger.error(f"Export {filename or ''} aborted mid-stream: {e}", exc_info=True)
+        raise
+
+
+def chunked_response(request, chunks: Iterable[bytes], fmt: str = CSV,
+                     filename: Optional[str] = None) -> StreamingHttpResponse:
+    """StreamingHttpResponse over encoded chunks, gzipped when the client accepts it."""
+    chunks = _logged(chunks, filename)
+    compress = accepts_gzip(request)
+    if compress:
+        chunks = gzip_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[fmt])
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if filename:
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def streaming_response(request, fmt: str, records: Iterable[Dict], columns: Sequence,
+                       filename: Optional[str] = None) -> StreamingHttpResponse:
+    """Render ``records`` as streamed CSV or NDJSON."""
+    if fmt == NDJSON:
+        chunks = ndjson_chunks(records, columns)
+        if filename and filename.endswith('.csv'):
+            filename = filename[:-4] + '.ndjson'
+    else:
+        chunks = csv_chunks(records, columns)
+    return chunked_response(request, chunks, fmt, filename)
+
+
+def stream_queryset(request, fmt: str, queryset, columns: Sequence, sources: Sequence[str],
+                    filename: Optional[str] = None, limit: Optional[int] = None) -> StreamingHttpResponse:
+    """Stream ``queryset`` (ordered on a non-null field) in constant memory."""
+    return streaming_response(request, fmt, keyset_rows(queryset, sources, limit=limit), columns, filename)
@@ -9,6 +9,29 @@ from .billing_api import _paypal_get_access_token, _paypal_base_url
 def run_stock_import():
     call_command('import_stock_data')
 
+@shared_task
+def refresh_fundamentals_snapshots(limit=None):
+    """Batch refresh of stale fundamentals snapshots (run nightly)."""
+    from .fundamentals_snapshot import refresh_universe
+    return refresh_universe(limit=limit)
+
+@shared_task
+def warm_ohlc_store(tickers=None, period='1y', interval='1d'):
+    """Fill the indicator OHLC store (given tickers, or the screened universe) off the request path."""
+    from .indicator_engine import fetch_and_store, read_stored
+    from .models import Stock
+    if tickers is None:
+        tickers = list(Stock.objects.order_by('-volume').values_list('ticker', flat=True)[:2000])
+        return fetch_and_store(tickers, period, interval)
+    _, missing = read_stored(tickers, period, interval)
+    return fetch_and_store(missing, period, interval)
+
+@shared_task
+def prune_analytics_rollups():
+    """Drop minute/hour analytics rollups past their retention window."""
+    from .event_pipeline import prune_rollups
+    return prune_rollups()
+
 @shared_task
 def retry_paypal_capture(order_id: str):
 	"""Retry a failed PayPal order capture (idempotent via PayPal-Request-Id)."""
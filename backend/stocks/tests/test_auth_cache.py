@@ -0,0 +1,86 @@
+from django.contrib.auth import login
+from django.contrib.auth.models import AnonymousUser, Group, User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+
+from stocks import auth_cache
+
+BACKEND = 'django.contrib.auth.backends.ModelBackend'
+
+
+@override_settings(CACHE_SHARED=True)
+class PrincipalCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='pw-1')
+        self.user.groups.add(Group.objects.create(name=' Premium '))
+
+    def principal(self):
+        return auth_cache.get_principal(self.user.pk, BACKEND)
+
+    def test_cached_principal_carries_groups_and_only_checks_activity(self):
+        self.assertEqual(auth_cache.group_names(self.principal()), frozenset({'premium'}))
+        with self.assertNumQueries(1):
+            user = self.principal()
+        with self.assertNumQueries(0):
+            self.assertEqual(auth_cache.group_names(user), frozenset({'premium'}))
+            getattr(user, 'profile', None)
+
+    def test_changes_drop_the_principal_after_commit(self):
+        self.principal()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(Group.objects.create(name='Staff'))
+        self.assertEqual(auth_cache.group_names(self.principal()), frozenset({'premium', 'staff'}))
+
+    def test_rolled_back_changes_keep_the_principal(self):
+        self.principal()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.user.first_name = 'Changed'
+            self.user.save()
+        self.assertEqual(len(callbacks), 1)
+        self.assertIsNotNone(cache.get(auth_cache._key(self.user.pk)))
+
+    def test_deactivated_users_are_not_served_from_cache(self):
+        self.principal()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNone(self.principal())
+
+    @override_settings(CACHE_SHARED=False)
+    def test_nothing_is_cached_without_a_shared_cache(self):
+        self.principal()
+        self.assertIsNone(cache.get(auth_cache._key(self.user.pk)))
+
+
+@override_settings(CACHE_SHARED=True, AUTHENTICATION_BACKENDS=[BACKEND])
+class GetUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('bob', password='pw-1')
+
+    def logged_in_request(self):
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        login(request, self.user, backend=BACKEND)
+        return request
+
+    def test_session_resolves_to_the_cached_user(self):
+        request = self.logged_in_request()
+        self.assertEqual(auth_cache.get_user(request).pk, self.user.pk)
+        self.assertIsNotNone(cache.get(auth_cache._key(self.user.pk)))
+
+    def test_stale_cached_hash_is_rechecked_before_logging_out(self):
+        request = self.logged_in_request()
+        auth_cache.get_user(request)
+        stale = cache.get(auth_cache._key(self.user.pk))
+        stale.password = 'changed-elsewhere'
+        cache.set(auth_cache._key(self.user.pk), stale)
+        self.assertEqual(auth_cache.get_user(request).pk, self.user.pk)
+
+    def test_password_change_logs_the_session_out(self):
+        request = self.logged_in_request()
+        auth_cache.get_user(request)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('pw-2')
+            self.user.save()
+        self.assertIsInstance(auth_cache.get_user(request), AnonymousUser)
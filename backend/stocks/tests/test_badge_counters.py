@@ -0,0 +1,93 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from stocks import badge_counters
+from stocks.models import NotificationHistory, Stock, StockAlert
+from stocks.notifications_api import mark_notifications_read_api
+
+
+class BadgeCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('reader', password='x')
+
+    def notify(self, n=1):
+        for i in range(n):
+            NotificationHistory.objects.create(user=self.user, title=f'n{i}', message='m')
+
+    def test_first_read_recounts_and_signals_keep_it_in_step(self):
+        self.notify(2)
+        self.assertEqual(badge_counters.get_badges(self.user.id)['notifications'], 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify(1)
+        self.assertEqual(badge_counters.get_badges(self.user.id)['notifications'], 3)
+
+    def test_alert_counter_follows_creates_and_deletes(self):
+        stock = Stock.objects.create(ticker='AAPL', symbol='AAPL', company_name='Apple', name='Apple')
+        badge_counters.get_badges(self.user.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            alert = StockAlert.objects.create(user=self.user, stock=stock, alert_type='price_above', target_value=1)
+        self.assertEqual(badge_counters.get_badges(self.user.id)['alerts'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            alert.delete()
+        self.assertEqual(badge_counters.get_badges(self.user.id)['alerts'], 0)
+
+    def test_cached_document_is_kept_until_commit(self):
+        self.notify(2)
+        badge_counters.get_badges(self.user.id)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            badge_counters.adjust(self.user.id, unread_notifications=-2)
+        # Not committed yet: readers still get the published version
+        self.assertEqual(badge_counters.get_badges(self.user.id)['notifications'], 2)
+        self.assertEqual(badge_counters.current_counts(self.user.id)['notifications'], 0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(badge_counters.get_badges(self.user.id)['notifications'], 0)
+
+    def test_etag_depends_only_on_counts(self):
+        doc = {'notifications': 1, 'alerts': 2, 'news': 3, 'version': 1}
+        self.assertEqual(badge_counters.etag_for(doc), badge_counters.etag_for(dict(doc, version=99)))
+        self.assertNotEqual(badge_counters.etag_for(doc), badge_counters.etag_for(dict(doc, alerts=0)))
+
+
+class MarkReadViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('reader', password='x')
+        for i in range(3):
+            NotificationHistory.objects.create(user=self.user, title=f'n{i}', message='m')
+        # Warm the cached document, as the header poll would
+        self.assertEqual(badge_counters.get_badges(self.user.id)['notifications'], 3)
+
+    def mark_all(self):
+        request = APIRequestFactory().post(
+            '/api/notifications/mark-read', data=json.dumps({'mark_all': True}), content_type='application/json'
+        )
+        force_authenticate(request, user=self.user)
+        return json.loads(mark_notifications_read_api(request).content)
+
+    def test_remaining_unread_reflects_the_write_before_commit(self):
+        # The test transaction never commits, like a request still inside its atomic block
+        data = self.mark_all()['data']
+        self.assertEqual(data['updated_count'], 3)
+        self.assertEqual(data['remaining_unread'], 0)
+
+    def test_badges_update_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mark_all()
+        self.assertEqual(badge_counters.get_badges(self.user.id)['notifications'], 0)
+
+    def test_rolled_back_write_leaves_counts(self):
+        from django.db import transaction
+        try:
+            with transaction.atomic():
+                self.mark_all()
+                raise RuntimeError('rollback')
+        except RuntimeError:
+            pass
+        self.assertEqual(badge_counters.current_counts(self.user.id)['notifications'], 3)
+        self.assertEqual(badge_counters.get_badges(self.user.id)['notifications'], 3)
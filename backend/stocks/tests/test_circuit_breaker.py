@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from stocks import middleware_error
+from stocks.middleware_error import CircuitBreakerMiddleware, CircuitState
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.clock = FakeClock()
+        patcher = mock.patch.object(middleware_error, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.status = 200
+        self.latency = 0.0
+        self.factory = RequestFactory()
+
+    def respond(self, request):
+        self.clock.now += self.latency
+        return HttpResponse(status=self.status)
+
+    def breaker(self, **config):
+        settings = dict({'FAILURE_THRESHOLD': 3, 'OPEN_SECONDS': 30, 'MIN_SAMPLES': 5, 'LATENCY_P95_MS': 1000}, **config)
+        with override_settings(CIRCUIT_BREAKER=settings):
+            return CircuitBreakerMiddleware(self.respond)
+
+    def get(self, breaker, path='/api/stocks/AAPL/'):
+        return breaker(self.factory.get(path)).status_code
+
+    def test_paths_of_one_route_share_a_breaker(self):
+        breaker = self.breaker()
+        self.status = 500
+        for ticker in ('AAPL', 'MSFT', 'NVDA'):
+            self.assertEqual(self.get(breaker, f'/api/stocks/{ticker}/'), 500)
+        self.status = 200
+        self.assertEqual(self.get(breaker, '/api/stocks/TSLA/'), 503)
+        # Other routes keep flowing
+        self.assertEqual(self.get(breaker, '/api/stock/AAPL/'), 200)
+        self.assertEqual(list(breaker.snapshot()), ['stock_detail_alias', 'stock_detail'])
+
+    def test_half_open_probe_closes_or_reopens(self):
+        breaker = self.breaker()
+        self.status = 500
+        for _ in range(3):
+            self.get(breaker)
+        self.clock.now += 31
+        # The probe fails: open again for another period
+        self.assertEqual(self.get(breaker), 500)
+        self.status = 200
+        self.assertEqual(self.get(breaker), 503)
+        self.clock.now += 31
+        self.assertEqual(self.get(breaker), 200)
+        self.assertEqual(breaker.snapshot()['stock_detail_alias']['state'], CircuitState.CLOSED)
+
+    def test_slow_p95_trips_after_min_samples(self):
+        breaker = self.breaker()
+        self.latency = 2.0
+        for _ in range(4):
+            self.assertEqual(self.get(breaker), 200)
+        self.assertEqual(self.get(breaker), 200)
+        self.assertEqual(breaker.snapshot()['stock_detail_alias']['state'], CircuitState.OPEN)
+        self.assertEqual(self.get(breaker), 503)
+
+    def test_unresolved_paths_are_not_tracked(self):
+        breaker = self.breaker()
+        self.status = 500
+        for _ in range(5):
+            self.assertEqual(self.get(breaker, '/nope/'), 500)
+        self.assertEqual(breaker.snapshot(), {})
+
+    def test_route_table_is_bounded(self):
+        breaker = self.breaker(MAX_ROUTES=1)
+        self.get(breaker, '/api/stocks/AAPL/')
+        self.get(breaker, '/api/stock/AAPL/')
+        self.assertEqual(list(breaker.snapshot()), ['stock_detail'])
+
+    def test_shared_open_state_reaches_other_workers(self):
+        first, second = self.breaker(SHARED=True), self.breaker(SHARED=True)
+        self.status = 500
+        for _ in range(3):
+            self.get(first)
+        self.status = 200
+        self.assertEqual(self.get(second), 503)
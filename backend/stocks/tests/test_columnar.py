@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from stocks import columnar
+from stocks.api_views import STOCK_LIST_COLUMNS, stock_list_api
+from stocks.columnar import Column, ColumnSet, decimal_column
+from stocks.models import Stock
+
+COLUMNS = ColumnSet([
+    Column('ticker'),
+    decimal_column('price', 'current_price', default=0.0),
+    Column('label', lambda r: f"{r['ticker']}:{r['name']}", ('ticker', 'name')),
+])
+RECORDS = [
+    {'ticker': 'AAPL', 'current_price': Decimal('190.5'), 'name': 'Apple'},
+    {'ticker': 'XYZ', 'current_price': None, 'name': 'X, Y & Z'},
+]
+
+
+class ColumnSetTests(SimpleTestCase):
+    def test_projection_keeps_order_and_narrows_sources(self):
+        columns = COLUMNS.select(['label', 'ticker', 'label'])
+        self.assertEqual([c.name for c in columns], ['label', 'ticker'])
+        self.assertEqual(ColumnSet.sources(columns, 'id'), ['ticker', 'name', 'id'])
+        with self.assertRaises(columnar.UnknownFieldsError):
+            COLUMNS.select(['ticker', 'nope'])
+
+    def test_columns_and_rows_carry_the_same_values(self):
+        columns = COLUMNS.select()
+        rows = ColumnSet.rows(RECORDS, columns)
+        doc = json.loads(COLUMNS.response(columnar.COLUMNS, RECORDS, columns, meta={'success': True}).content)
+        self.assertEqual(doc['fields'], ['ticker', 'price', 'label'])
+        self.assertEqual(doc['count'], 2)
+        self.assertTrue(doc['success'])
+        self.assertEqual([dict(zip(doc['fields'], values)) for values in zip(*doc['columns'])], rows)
+        self.assertEqual(rows[1], {'ticker': 'XYZ', 'price': 0.0, 'label': 'XYZ:X, Y & Z'})
+
+    def test_csv_and_ndjson(self):
+        columns = COLUMNS.select(['ticker', 'label'])
+        resp = COLUMNS.response(columnar.CSV, RECORDS, columns, filename='s.csv')
+        self.assertEqual(resp['Content-Disposition'], 'attachment; filename="s.csv"')
+        self.assertEqual(list(csv.reader(io.StringIO(resp.content.decode()))),
+                         [['ticker', 'label'], ['AAPL', 'AAPL:Apple'], ['XYZ', 'XYZ:X, Y & Z']])
+        resp = COLUMNS.response(columnar.NDJSON, RECORDS, columns)
+        self.assertEqual([json.loads(line) for line in resp.content.decode().splitlines()],
+                         ColumnSet.rows(RECORDS, columns))
+
+    def test_negotiation(self):
+        factory = APIRequestFactory()
+        self.assertEqual(columnar.negotiate(factory.get('/', {'output': 'csv'})), columnar.CSV)
+        self.assertEqual(columnar.negotiate(factory.get('/', HTTP_ACCEPT='application/json')), columnar.ROWS)
+        request = factory.get('/', HTTP_ACCEPT='application/json, application/vnd.stockscanner.columns+json')
+        self.assertEqual(columnar.negotiate(request, default=columnar.CSV), columnar.COLUMNS)
+        if columnar.msgpack is None:
+            self.assertEqual(columnar.negotiate(factory.get('/', {'output': 'msgpack'})), columnar.COLUMNS)
+
+
+@override_settings(API_CONFIG={'MAX_PAGE_SIZE': 100})
+class StockListFormatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='x')
+        for ticker, price in (('AAPL', '190.50'), ('MSFT', '410.00')):
+            Stock.objects.create(ticker=ticker, symbol=ticker, company_name=ticker, name=ticker,
+                                 exchange='NASDAQ', current_price=Decimal(price))
+
+    def get(self, params=None, **extra):
+        request = APIRequestFactory().get('/api/stocks/', params or {}, **extra)
+        force_authenticate(request, user=self.user)
+        return stock_list_api(request)
+
+    def test_default_rows_are_unchanged(self):
+        resp = self.get({'sort_by': 'ticker', 'sort_order': 'asc'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(list(resp.data['data'][0]), [c.name for c in STOCK_LIST_COLUMNS.columns])
+
+    def test_fields_projection_in_rows_and_columns(self):
+        resp = self.get({'fields': 'ticker,current_price'})
+        self.assertEqual(sorted(row['ticker'] for row in resp.data['data']), ['AAPL', 'MSFT'])
+        self.assertEqual({tuple(row) for row in resp.data['data']}, {('ticker', 'current_price')})
+        resp = self.get({'fields': 'ticker,current_price'},
+                        HTTP_ACCEPT='application/vnd.stockscanner.columns+json')
+        self.assertEqual(resp['Content-Type'], 'application/vnd.stockscanner.columns+json')
+        doc = json.loads(resp.content)
+        self.assertEqual(doc['fields'], ['ticker', 'current_price'])
+        self.assertEqual(doc['total_available'], 2)
+        self.assertEqual(sorted(doc['columns'][1]), [190.5, 410.0])
+
+    def test_unknown_field_is_a_bad_request(self):
+        resp = self.get({'fields': 'ticker,secret'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('secret', resp.data['error'])
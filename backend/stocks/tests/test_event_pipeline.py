@@ -0,0 +1,97 @@
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+
+from stocks import event_pipeline
+from stocks.models import AnalyticsRollup, CheckoutEvent, VisitorEvent, VisitorSessionDay
+
+AT = datetime(2026, 3, 2, 14, 35, 20, tzinfo=dt_timezone.utc)
+
+
+def visit(session='s1', event_type='page_view', at=AT, page='/pricing'):
+    return {
+        'session_id': session, 'ip_hash': 'h', 'country_code': 'US', 'event_type': event_type,
+        'page_url': page, 'user_agent': 'ua', 'user_id': None, 'at': at,
+    }
+
+
+def checkout(status, session='s1', amount=None, at=AT):
+    return {
+        'session_id': session, 'user_id': None, 'status': status, 'plan_name': 'pro', 'amount': amount,
+        'country_code': 'US', 'referral_code': '', 'at': at,
+    }
+
+
+class EventBufferTests(SimpleTestCase):
+    def buffer(self, flush_fn, **kwargs):
+        buffer = event_pipeline.EventBuffer('test', flush_fn, **kwargs)
+        # Flushed by hand here instead of by the worker thread
+        buffer._pid = os.getpid()
+        return buffer
+
+    def test_full_buffer_drops_the_oldest(self):
+        batches = []
+        buffer = self.buffer(batches.append, capacity=2, flush_size=10)
+        for i in range(3):
+            buffer.append(i)
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(batches, [[1, 2]])
+        self.assertEqual(buffer.stats(), {'pending': 0, 'flushed': 2, 'dropped': 1, 'failed': 0})
+
+    def test_reaching_flush_size_wakes_the_worker(self):
+        buffer = self.buffer(lambda batch: None, flush_size=2)
+        buffer.append(1)
+        self.assertFalse(buffer._wake.is_set())
+        buffer.append(2)
+        self.assertTrue(buffer._wake.is_set())
+
+    def test_failed_flush_is_counted(self):
+        def broken(batch):
+            raise RuntimeError('db down')
+        buffer = self.buffer(broken)
+        buffer.append(1)
+        with self.assertLogs('stocks.event_pipeline', 'ERROR'):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(buffer.stats()['failed'], 1)
+
+    def test_bucket_start_and_granularity(self):
+        self.assertEqual(event_pipeline.bucket_start(AT, 'hour'), AT.replace(minute=0, second=0))
+        self.assertEqual(event_pipeline.bucket_start(AT, 'day'), AT.replace(hour=0, minute=0, second=0))
+        now = AT
+        self.assertEqual(event_pipeline.granularity_for(now - timedelta(hours=1), now, now), 'minute')
+        self.assertEqual(event_pipeline.granularity_for(now - timedelta(days=3), now, now), 'hour')
+        # A short window older than minute retention only exists in hour rollups
+        old = now - timedelta(days=5)
+        self.assertEqual(event_pipeline.granularity_for(old, old + timedelta(hours=1), now), 'hour')
+
+
+class FlushTests(TestCase):
+    def counts(self, stream, granularity='day'):
+        return {
+            (row.kind, row.page_url): (row.count, row.amount)
+            for row in AnalyticsRollup.objects.filter(stream=stream, granularity=granularity)
+        }
+
+    def test_visitor_events_write_rows_sessions_and_rollups(self):
+        event_pipeline.flush_visitor_events([visit(), visit(at=AT + timedelta(minutes=1)), visit('s2')])
+        event_pipeline.flush_visitor_events([visit('s3', page='/')])
+        self.assertEqual(VisitorEvent.objects.count(), 4)
+        self.assertEqual(VisitorSessionDay.objects.count(), 3)
+        self.assertEqual(self.counts('visitor'), {
+            ('page_view', '/pricing'): (3, Decimal('0')), ('page_view', '/'): (1, Decimal('0')),
+        })
+        self.assertEqual(AnalyticsRollup.objects.filter(stream='visitor', granularity='minute').count(), 3)
+
+    def test_checkout_updates_replay_against_the_open_checkout(self):
+        event_pipeline.flush_checkout_events([checkout('started'), checkout('payment_info')])
+        event_pipeline.flush_checkout_events([checkout('completed', amount=Decimal('9.99')), checkout('payment_info', 's2')])
+        one = CheckoutEvent.objects.get(session_id='s1')
+        self.assertEqual((one.status, one.amount, one.completed_at), ('completed', Decimal('9.99'), AT))
+        self.assertEqual(CheckoutEvent.objects.count(), 2)
+        self.assertEqual(self.counts('checkout'), {
+            ('started', ''): (2, Decimal('0')),
+            ('payment_info', ''): (2, Decimal('0')),
+            ('completed', ''): (1, Decimal('9.99')),
+        })
@@ -0,0 +1,75 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from stocks import fundamentals_snapshot
+from stocks.fundamentals_api import get_stock_fundamentals
+from stocks.models import FundamentalsSnapshot, Stock
+
+
+class GetSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Stock.objects.create(ticker='AAPL', symbol='AAPL', company_name='Apple', name='Apple')
+        patcher = mock.patch.object(fundamentals_snapshot, 'schedule_refresh', return_value=True)
+        self.schedule = patcher.start()
+        self.addCleanup(patcher.stop)
+        compute = mock.patch.object(fundamentals_snapshot, 'compute_fundamentals')
+        self.compute = compute.start()
+        self.addCleanup(compute.stop)
+
+    def store(self, age):
+        FundamentalsSnapshot.objects.create(
+            ticker='AAPL', data={'dcf': {}}, market_time=1, computed_at=timezone.now() - age,
+        )
+
+    def test_unknown_ticker_is_rejected_without_fetching(self):
+        self.assertEqual(fundamentals_snapshot.get_snapshot('NOPE'), (None, False, 'unknown'))
+        self.schedule.assert_not_called()
+        self.compute.assert_not_called()
+
+    def test_miss_queues_a_refresh_instead_of_computing_inline(self):
+        self.assertEqual(fundamentals_snapshot.get_snapshot('AAPL'), (None, True, 'pending'))
+        self.schedule.assert_called_once_with('AAPL')
+        self.compute.assert_not_called()
+
+    def test_fresh_snapshot_is_served_then_cached(self):
+        self.store(timedelta(hours=1))
+        entry, stale, source = fundamentals_snapshot.get_snapshot('AAPL')
+        self.assertEqual((entry['data'], stale, source), ({'dcf': {}}, False, 'snapshot'))
+        self.assertEqual(fundamentals_snapshot.get_snapshot('AAPL')[2], 'cache')
+        self.schedule.assert_not_called()
+
+    def test_stale_snapshot_is_served_while_refreshing(self):
+        self.store(fundamentals_snapshot.FRESH_FOR + timedelta(hours=1))
+        entry, stale, source = fundamentals_snapshot.get_snapshot('AAPL')
+        self.assertIsNotNone(entry)
+        self.assertTrue(stale)
+        self.schedule.assert_called_once_with('AAPL')
+
+
+class FundamentalsViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('investor', password='x')
+        Stock.objects.create(ticker='AAPL', symbol='AAPL', company_name='Apple', name='Apple')
+
+    def get(self, ticker):
+        request = APIRequestFactory().get(f'/api/stocks/{ticker}/fundamentals/')
+        force_authenticate(request, user=self.user)
+        return get_stock_fundamentals(request, ticker)
+
+    def test_unknown_ticker_is_404(self):
+        self.assertEqual(self.get('nope').status_code, 404)
+
+    def test_missing_snapshot_is_202_pending(self):
+        with mock.patch.object(fundamentals_snapshot, 'schedule_refresh') as schedule:
+            response = self.get('aapl')
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response.data['pending'])
+        schedule.assert_called_once_with('AAPL')
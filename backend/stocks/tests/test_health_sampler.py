@@ -0,0 +1,101 @@
+import json
+import os
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.utils import timezone
+
+from stocks import health_sampler, views_health
+from stocks.health_sampler import HealthSampler
+from stocks.models import Stock
+
+HEALTHY = {
+    'database': {'status': 'healthy', 'missing_tables': []},
+    'ingestion': {'status': 'fresh'},
+    'system': {'cpu_percent': 5.0, 'memory_percent': 40.0},
+}
+
+
+def sampler_with(snapshot, age):
+    sampler = HealthSampler(interval=3600)
+    # Already "started" in this process, so no background thread
+    sampler._pid = os.getpid()
+    sampler._latest = (snapshot, time.time() - age) if snapshot is not None else (None, None)
+    sampler._first.set()
+    return sampler
+
+
+class SampleDatabaseTests(TestCase):
+    def setUp(self):
+        # The sampler closes its thread's connections; keep the test connection open
+        patcher = mock.patch.object(health_sampler, 'connections', mock.Mock(**{'all.return_value': []}))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add_stock(self, ticker, age):
+        stock = Stock.objects.create(ticker=ticker, symbol=ticker, company_name=ticker, name=ticker)
+        Stock.objects.filter(pk=stock.pk).update(last_updated=timezone.now() - age)
+
+    def test_reports_counts_and_fresh_ingestion(self):
+        self.add_stock('AAPL', timedelta(hours=5))
+        self.add_stock('MSFT', timedelta(minutes=5))
+        database, ingestion = health_sampler._sample_database()
+        self.assertEqual(database['status'], 'healthy')
+        self.assertEqual(database['stock_count'], 2)
+        self.assertEqual(database['missing_tables'], [])
+        self.assertEqual(ingestion['status'], 'fresh')
+        self.assertLess(ingestion['age_seconds'], 600)
+
+    def test_old_or_missing_updates_are_stale(self):
+        self.assertEqual(health_sampler._sample_database()[1]['status'], 'stale')
+        self.add_stock('AAPL', timedelta(seconds=health_sampler.INGESTION_MAX_AGE + 60))
+        self.assertEqual(health_sampler._sample_database()[1]['status'], 'stale')
+
+
+class HealthSamplerTests(SimpleTestCase):
+    def test_snapshot_reports_age_and_staleness(self):
+        components, meta = sampler_with(HEALTHY, age=1).snapshot()
+        self.assertEqual(components, HEALTHY)
+        self.assertFalse(meta['stale'])
+        _, meta = sampler_with(HEALTHY, age=health_sampler.STALE_AFTER + 1).snapshot()
+        self.assertTrue(meta['stale'])
+        components, meta = sampler_with(None, age=0).snapshot()
+        self.assertEqual(components, {})
+        self.assertTrue(meta['stale'])
+
+    def test_run_stores_samples_until_the_process_changes(self):
+        sampler = HealthSampler(interval=0)
+        sampler._pid = os.getpid()
+
+        def stop(_):
+            sampler._pid = None
+
+        with mock.patch.object(health_sampler, 'collect', return_value=HEALTHY), \
+                mock.patch.object(health_sampler.time, 'sleep', side_effect=stop):
+            sampler._run()
+        self.assertIs(sampler._latest[0], HEALTHY)
+        self.assertTrue(sampler._first.is_set())
+
+
+class HealthViewTests(SimpleTestCase):
+    def ready(self, sampler):
+        with mock.patch.object(views_health, 'sampler', sampler):
+            return views_health.readiness_check(RequestFactory().get('/ready'))
+
+    def test_readiness_follows_the_snapshot_without_querying(self):
+        response = self.ready(sampler_with(HEALTHY, age=1))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(json.loads(response.content)['ready'])
+
+    def test_stale_snapshot_is_not_ready(self):
+        response = self.ready(sampler_with(HEALTHY, age=health_sampler.STALE_AFTER + 1))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(json.loads(response.content)['reason'], 'Health snapshot is stale')
+
+    def test_unhealthy_database_is_not_ready(self):
+        snapshot = dict(HEALTHY, database={'status': 'unhealthy', 'error': 'gone'})
+        response = self.ready(sampler_with(snapshot, age=1))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(json.loads(response.content)['reason'], 'gone')
@@ -0,0 +1,90 @@
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from stocks import indicator_engine, indicators_api
+from stocks.indicator_engine import FormulaError
+from stocks.models import CustomIndicator, Stock
+
+
+def _series(n=30):
+    close = np.arange(1.0, n + 1)
+    return {'t': np.arange(n, dtype=np.int64), 'open': close, 'high': close, 'low': close,
+            'close': close, 'volume': np.ones(n)}
+
+
+class OhlcStoreTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        patcher = mock.patch.object(indicator_engine, 'OHLC_STORE_DIR', self.dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+        self.plan = indicator_engine.compile_formula('sma(close, 3)')
+
+    def test_path_traversal_is_rejected(self):
+        for period, interval in (('../../etc', '1d'), ('1y', '../x'), ('1y/..', '1d')):
+            with self.assertRaises(FormulaError):
+                indicator_engine._store_path('AAPL', period, interval)
+        with self.assertRaises(FormulaError):
+            indicator_engine.screen(self.plan, ['AAPL'], period='../../tmp')
+
+    def test_small_screens_fetch_missing_tickers_inline(self):
+        def fake_fetch(tickers, period, interval):
+            for t in tickers:
+                indicator_engine._write_series(t, period, interval, _series())
+            return len(tickers)
+
+        with mock.patch.object(indicator_engine, 'fetch_and_store', side_effect=fake_fetch) as fetch:
+            matches, stats = indicator_engine.screen(self.plan, ['AAPL', 'MSFT'], op='>', value=0)
+        fetch.assert_called_once()
+        self.assertEqual(stats['status'], 'ready')
+        self.assertEqual({m['ticker'] for m in matches}, {'AAPL', 'MSFT'})
+
+    def test_large_screens_warm_in_process_without_celery(self):
+        tickers = [f'T{i}' for i in range(indicator_engine.OHLC_INLINE_FETCH + 1)]
+        with mock.patch.object(indicator_engine, 'CELERY_ENABLED', False), \
+                mock.patch.object(indicator_engine.threading, 'Thread') as thread:
+            matches, stats = indicator_engine.screen(self.plan, tickers)
+            # A second screen while warming doesn't start another thread
+            indicator_engine.screen(self.plan, tickers)
+        self.assertEqual(stats['status'], 'warming')
+        self.assertEqual(matches, [])
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once()
+
+    def test_in_process_warm_releases_its_lock(self):
+        with mock.patch.object(indicator_engine, 'fetch_and_store') as fetch:
+            indicator_engine._warm_in_process(['AAPL'], '1y', '1d', 'ohlc:warm:1y:1d')
+        fetch.assert_called_once_with(['AAPL'], '1y', '1d')
+        self.assertTrue(cache.add('ohlc:warm:1y:1d', 1, 60))
+
+
+class ScreenIndicatorViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('screener', password='x')
+        self.indicator = CustomIndicator.objects.create(
+            id='ind-1', user=self.user, name='SMA', formula='sma(close, 3)',
+        )
+        self.factory = RequestFactory()
+
+    def post(self, body):
+        request = self.factory.post('/', data=json.dumps(body), content_type='application/json')
+        request.user = self.user
+        return indicators_api.screen_indicator(request, self.indicator.id)
+
+    def test_non_numeric_limit_is_400(self):
+        Stock.objects.create(ticker='AAPL', symbol='AAPL', company_name='Apple', name='Apple')
+        response = self.post({'tickers': ['AAPL'], 'limit': 'lots'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bad_period_is_400(self):
+        response = self.post({'tickers': [], 'period': '../../x'})
+        self.assertEqual(response.status_code, 400)
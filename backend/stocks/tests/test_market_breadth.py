@@ -0,0 +1,92 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from stock_retrieval.delta_writer import StockChangeSet, StockChange, stock_changes_applied
+from stocks import market_breadth
+from stocks.models import MarketBreadthSnapshot, Stock
+
+
+def make_stock(ticker, **fields):
+    return Stock.objects.create(ticker=ticker, symbol=ticker, company_name=ticker, name=ticker, **fields)
+
+
+class ComputeBreadthTests(TestCase):
+    def setUp(self):
+        make_stock('UP', exchange='NASDAQ', price_change=Decimal('2'), price_change_percent=Decimal('6'),
+                   change_percent=Decimal('6'), price_change_today=Decimal('1'), volume=100)
+        make_stock('DOWN', exchange='NYSE', price_change=Decimal('-1'), price_change_percent=Decimal('-3'),
+                   change_percent=Decimal('-3'), price_change_today=Decimal('-1'), volume=300)
+        make_stock('FLAT', exchange='NASDAQ', price_change=Decimal('0'), change_percent=Decimal('0'), volume=0)
+        make_stock('BARE')
+
+    def test_counts_and_distribution(self):
+        doc = market_breadth.compute_breadth()
+        self.assertEqual(doc['counts'], {
+            'total': 4, 'nasdaq': 3, 'recent_updates': 4,
+            'gainers': 1, 'losers': 1, 'unchanged': 1,
+            'gainers_today': 1, 'losers_today': 1,
+        })
+        self.assertEqual(doc['change_distribution'], {
+            'below_-5': 0, '-5_to_-2': 1, '-2_to_0': 0, '0_to_2': 1, '2_to_5': 0, 'above_5': 1,
+        })
+
+    def test_top_lists(self):
+        doc = market_breadth.compute_breadth()
+        self.assertEqual([r['ticker'] for r in doc['top_gainers']], ['UP'])
+        self.assertEqual(doc['top_gainers'][0]['price_change_percent'], 6.0)
+        self.assertEqual([r['ticker'] for r in doc['top_losers']], ['DOWN'])
+        self.assertEqual([r['ticker'] for r in doc['most_active']], ['DOWN', 'UP', 'FLAT'])
+        self.assertEqual([r['ticker'] for r in doc['most_active_today']], ['DOWN', 'UP'])
+        self.assertEqual([r['ticker'] for r in doc['top_losers_today']], ['DOWN'])
+
+    def test_uses_a_fixed_number_of_queries(self):
+        for i in range(20):
+            make_stock(f'T{i}', volume=i)
+        with self.assertNumQueries(7):
+            market_breadth.compute_breadth()
+
+
+class RebuildTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        market_breadth._dirty = False
+        make_stock('AAPL', volume=1)
+
+    def changes(self):
+        return StockChangeSet(changes={'AAPL': StockChange(ticker='AAPL', created=False, fields={'volume': 2})})
+
+    def test_changes_are_rebuilt_at_the_end_of_the_run(self):
+        stock_changes_applied.send(sender=None, change_set=self.changes())
+        self.assertFalse(MarketBreadthSnapshot.objects.exists())
+        doc = market_breadth.refresh_if_changed()
+        self.assertEqual(doc['counts']['total'], 1)
+        self.assertTrue(MarketBreadthSnapshot.objects.exists())
+        # Nothing new since: no second rebuild
+        self.assertIsNone(market_breadth.refresh_if_changed())
+
+    def test_empty_change_set_does_not_mark_dirty(self):
+        stock_changes_applied.send(sender=None, change_set=StockChangeSet())
+        self.assertIsNone(market_breadth.refresh_if_changed())
+
+    def test_stale_document_is_rebuilt_once_by_a_reader(self):
+        market_breadth.refresh_breadth()
+        MarketBreadthSnapshot.objects.filter(pk=1).update(
+            computed_at=timezone.now() - market_breadth.MAX_AGE - timedelta(minutes=1)
+        )
+        make_stock('MSFT')
+        cache.clear()
+        self.assertEqual(market_breadth.get_breadth()['counts']['total'], 2)
+        # Stale again, but the rebuild lock is held: the stored version is served
+        MarketBreadthSnapshot.objects.filter(pk=1).update(
+            computed_at=timezone.now() - market_breadth.MAX_AGE - timedelta(minutes=1)
+        )
+        make_stock('NVDA')
+        cache.delete(market_breadth.CACHE_KEY)
+        self.assertEqual(market_breadth.get_breadth()['counts']['total'], 2)
+
+    def test_first_read_builds_inline(self):
+        self.assertEqual(market_breadth.get_breadth()['counts']['total'], 1)
@@ -0,0 +1,48 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from stocks.views_health import metrics_view
+from utils import metrics
+
+
+@override_settings(METRICS_TOKEN='', METRICS_ALLOWED_IPS=[],
+                   SECURE_PROXY_SSL_HEADER=('HTTP_X_FORWARDED_PROTO', 'https'))
+class MetricsViewAccessTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        patcher = mock.patch.object(metrics, 'METRICS_DIR', '')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, remote='203.0.113.7', user=None, **headers):
+        request = self.factory.get('/metrics', REMOTE_ADDR=remote, **headers)
+        if user is not None:
+            request.user = user
+        return metrics_view(request)
+
+    def test_anonymous_gets_404_without_token(self):
+        self.assertEqual(self.get().status_code, 404)
+
+    def test_loopback_is_not_trusted_behind_proxy(self):
+        with self.settings(METRICS_ALLOWED_IPS=['127.0.0.1', '::1']):
+            self.assertEqual(self.get(remote='127.0.0.1').status_code, 404)
+
+    def test_loopback_allowlist_without_proxy(self):
+        with self.settings(METRICS_ALLOWED_IPS=['127.0.0.1'], SECURE_PROXY_SSL_HEADER=None):
+            self.assertEqual(self.get(remote='127.0.0.1').status_code, 200)
+
+    def test_allowlisted_address(self):
+        with self.settings(METRICS_ALLOWED_IPS=['10.0.0.5']):
+            self.assertEqual(self.get(remote='10.0.0.5').status_code, 200)
+
+    def test_staff_session(self):
+        self.assertEqual(self.get(user=User(username='ops', is_staff=True)).status_code, 200)
+        self.assertEqual(self.get(user=User(username='member')).status_code, 404)
+
+    def test_bearer_token(self):
+        with self.settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.get().status_code, 401)
+            self.assertEqual(self.get(HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+            self.assertEqual(self.get(HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
@@ -0,0 +1,63 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from stocks import news_fanout
+from stocks.models import NewsSubscription, PersonalizedNews, UserInterests
+
+
+class ReindexScheduleTests(TestCase):
+    def setUp(self):
+        news_fanout._pending.users = set()
+        self.user = User.objects.create_user('follower', password='x')
+
+    def keys(self):
+        return set(NewsSubscription.objects.filter(user=self.user).values_list('kind', 'key'))
+
+    def test_commit_rebuilds_the_users_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            UserInterests.objects.create(user=self.user, followed_stocks=['aapl'], preferred_categories=['earnings'])
+        self.assertEqual(self.keys(), {('ticker', 'AAPL'), ('category', 'earnings')})
+
+    def test_rollback_does_not_block_later_reindexes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    UserInterests.objects.create(user=self.user, followed_stocks=['AAPL'])
+                    raise RuntimeError('abort')
+            except RuntimeError:
+                pass
+        self.assertEqual(self.keys(), set())
+        with self.captureOnCommitCallbacks(execute=True):
+            UserInterests.objects.create(user=self.user, followed_stocks=['MSFT'])
+        self.assertEqual(self.keys(), {('ticker', 'MSFT')})
+
+    def test_one_reindex_per_commit(self):
+        interests = UserInterests.objects.create(user=self.user, followed_stocks=['AAPL'])
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            interests.followed_stocks = ['MSFT']
+            interests.save()
+            interests.followed_stocks = ['NVDA']
+            interests.save()
+        with self.assertNumQueries(7):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(self.keys(), {('ticker', 'NVDA')})
+
+
+class FanOutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('follower', password='x')
+        self.other = User.objects.create_user('bystander', password='x')
+        UserInterests.objects.create(user=self.user, followed_stocks=['AAPL'])
+        news_fanout.rebuild_index()
+
+    def publish(self):
+        return news_fanout.fan_out('Apple beats', 'body', 'https://example.com/a', 'wire',
+                                   timezone.now(), ['AAPL'], 'earnings')
+
+    def test_writes_rows_for_subscribers_only_once(self):
+        self.assertEqual(self.publish()['created'], 1)
+        self.assertEqual(self.publish()['created'], 0)
+        self.assertEqual(list(PersonalizedNews.objects.values_list('user_id', flat=True)), [self.user.id])
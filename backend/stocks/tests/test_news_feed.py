@@ -0,0 +1,70 @@
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from stocks.models import PersonalizedNews
+from stocks.news_personalization_service import InvalidCursor, NewsPersonalizationService
+from stocks.news_urls import get_personalized_feed
+
+
+class FeedPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='x')
+        now = timezone.now()
+        # (relevance, hours ago): ties on relevance fall back to published_at, then id
+        for i, (score, hours) in enumerate([(50, 1), (90, 5), (50, 3), (70, 2), (50, 1), (90, 4)]):
+            PersonalizedNews.objects.create(
+                user=self.user, title=f'n{i}', content='c', url=f'https://example.com/{i}', source='wire',
+                relevance_score=Decimal(score), category='general', published_at=now - timedelta(hours=hours),
+            )
+        self.expected = list(PersonalizedNews.objects.order_by('-relevance_score', '-published_at', '-id')
+                             .values_list('id', flat=True))
+
+    def walk(self, limit):
+        seen, cursor = [], None
+        while True:
+            page = NewsPersonalizationService.get_personalized_feed_page(self.user, limit=limit, cursor=cursor)
+            seen.extend(item['id'] for item in page['items'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                return seen
+
+    def test_pages_follow_relevance_then_recency(self):
+        self.assertEqual(self.expected[:2], list(
+            PersonalizedNews.objects.filter(relevance_score=90).order_by('-published_at').values_list('id', flat=True)
+        ))
+        for limit in (1, 2, 4, 10):
+            self.assertEqual(self.walk(limit), self.expected)
+
+    def test_invalid_cursor_raises(self):
+        for cursor in ('garbage', 'bm90fGF8Y3Vyc29y', 'TmFOfDIwMjQtMDEtMDFUMDA6MDA6MDArMDA6MDB8MQ'):
+            with self.assertRaises(InvalidCursor):
+                NewsPersonalizationService.get_personalized_feed_page(self.user, cursor=cursor)
+
+
+class FeedViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='x')
+        PersonalizedNews.objects.create(
+            user=self.user, title='t', content='c', url='https://example.com/x', source='wire',
+            relevance_score=Decimal('40'), category='general', published_at=timezone.now(),
+        )
+
+    def get(self, **params):
+        request = RequestFactory().get('/api/news/feed/', params)
+        request.user = self.user
+        return get_personalized_feed(request)
+
+    def test_invalid_cursor_is_400(self):
+        response = self.get(limit='5', cursor='not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content)['error_code'], 'INVALID_CURSOR')
+
+    def test_first_page(self):
+        body = json.loads(self.get(limit='5').content)
+        self.assertEqual(body['data']['count'], 1)
+        self.assertIsNone(body['next_cursor'])
@@ -0,0 +1,89 @@
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from stocks import platform_metrics
+from stocks.models import PlatformPortfolioSummary, UserPortfolio
+from stockscanner_django.db_access import is_read_only, read_only
+
+
+class SummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='x')
+        UserPortfolio.objects.create(user=self.user, name='p', total_cost=Decimal('100'), total_return=Decimal('10'))
+
+    def test_cold_read_builds_and_later_reads_hit_the_cache(self):
+        summary = platform_metrics.get_summary()
+        self.assertEqual((summary['portfolios_count'], summary['total_return_percent']), (1, 10.0))
+        self.assertTrue(PlatformPortfolioSummary.objects.filter(pk=1).exists())
+        with self.assertNumQueries(0):
+            platform_metrics.get_summary()
+
+    def test_stored_row_is_served_until_max_age(self):
+        platform_metrics.refresh_summary()
+        cache.clear()
+        with mock.patch.object(platform_metrics, 'compute_summary') as compute:
+            platform_metrics.get_summary()
+        compute.assert_not_called()
+        old = timezone.now() - platform_metrics.MAX_AGE - timedelta(minutes=1)
+        PlatformPortfolioSummary.objects.filter(pk=1).update(computed_at=old)
+        cache.clear()
+        platform_metrics.get_summary()
+        self.assertGreater(PlatformPortfolioSummary.objects.get(pk=1).computed_at, old)
+
+    def test_callers_queued_behind_a_rebuild_reuse_it(self):
+        published = {'portfolios_count': 99}
+
+        @contextmanager
+        def rebuilt_while_waiting():
+            # Another caller finishes its rebuild while this one waits for the lock
+            cache.set(platform_metrics.CACHE_KEY, published, 60)
+            yield
+
+        with mock.patch.object(platform_metrics, '_refresh_lock', rebuilt_while_waiting()), \
+                mock.patch.object(platform_metrics, 'compute_summary') as compute:
+            self.assertEqual(platform_metrics.get_summary(), published)
+        compute.assert_not_called()
+
+    def test_rebuild_runs_on_the_primary_from_read_views(self):
+        seen = []
+        compute = platform_metrics.compute_summary
+
+        def spy():
+            seen.append(is_read_only())
+            return compute()
+
+        with read_only(), mock.patch.object(platform_metrics, 'compute_summary', side_effect=spy):
+            platform_metrics.get_summary()
+        self.assertEqual(seen, [False])
+
+
+class ScheduleTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='x')
+
+    def test_rebuild_is_scheduled_after_commit(self):
+        with mock.patch.object(platform_metrics, '_schedule_refresh') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                UserPortfolio.objects.create(user=self.user, name='p')
+                schedule.assert_not_called()
+            schedule.assert_called()
+
+    def test_rolled_back_writes_schedule_nothing(self):
+        with mock.patch.object(platform_metrics, '_schedule_refresh') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        UserPortfolio.objects.create(user=self.user, name='p')
+                        raise RuntimeError('abort')
+                except RuntimeError:
+                    pass
+            schedule.assert_not_called()
@@ -0,0 +1,105 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from stocks import portfolio_analytics
+from stocks.models import PortfolioNavDay, Stock, StockPrice, TradeTransaction, UserPortfolio
+
+MON, TUE, WED, THU, FRI = (date(2024, 1, 8) + timedelta(days=i) for i in range(5))
+
+
+def at_close(day):
+    return timezone.make_aware(datetime.combine(day, time(16)))
+
+
+class ReplayTests(SimpleTestCase):
+    def test_flows_are_excluded_from_returns(self):
+        days = [MON, TUE, WED]
+        trades = [(MON, 1, 10.0, 100.0, 1000.0), (WED, 1, 10.0, 110.0, 1100.0)]
+        closes = {(MON, 1): 100.0, (TUE, 1): 110.0, (WED, 1): 110.0}
+        values, flows, returns = portfolio_analytics.replay(trades, days, closes, {}, {}, 0.0)
+        np.testing.assert_allclose(values, [1000.0, 1100.0, 2200.0])
+        np.testing.assert_allclose(flows, [1000.0, 0.0, 1100.0])
+        np.testing.assert_allclose(returns, [0.0, 0.1, 0.0])
+
+    def test_missing_closes_fall_back_to_trade_and_opening_prices(self):
+        days = [TUE, WED]
+        trades = [(WED, 2, 5.0, 20.0, 100.0)]
+        values, _, returns = portfolio_analytics.replay(trades, days, {}, {1: 10.0}, {1: 50.0}, 500.0)
+        np.testing.assert_allclose(values, [500.0, 600.0])
+        np.testing.assert_allclose(returns, [0.0, 0.0])
+
+
+class NavCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user('trader')
+        self.portfolio = UserPortfolio.objects.create(user=user, name='Main')
+        self.stock = Stock.objects.create(ticker='AAPL', symbol='AAPL', company_name='Apple', name='Apple')
+        for day, close in ((MON, 100), (TUE, 110), (WED, 99), (THU, 121), (FRI, 121)):
+            price = StockPrice.objects.create(stock=self.stock, price=Decimal(close))
+            StockPrice.objects.filter(pk=price.pk).update(timestamp=at_close(day))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trade(MON, 10, 100)
+
+    def trade(self, day, shares, price, kind='buy'):
+        return TradeTransaction.objects.create(
+            portfolio=self.portfolio, stock=self.stock, transaction_type=kind,
+            shares=Decimal(shares), price=Decimal(price), total_amount=Decimal(shares * price),
+            transaction_date=at_close(day) - timedelta(hours=3),
+        )
+
+    def nav(self):
+        return list(
+            PortfolioNavDay.objects.filter(portfolio=self.portfolio)
+            .order_by('date').values_list('date', 'value', 'daily_return')
+        )
+
+    def test_extending_matches_a_full_rebuild(self):
+        portfolio_analytics.ensure_nav(self.portfolio.pk, today=WED)
+        cache.clear()
+        portfolio_analytics.ensure_nav(self.portfolio.pk, today=FRI)
+        extended = self.nav()
+        self.assertEqual([v for _, v, _ in extended], [Decimal('1000'), Decimal('1100'), Decimal('990'),
+                                                      Decimal('1210'), Decimal('1210')])
+        PortfolioNavDay.objects.all().delete()
+        cache.clear()
+        portfolio_analytics.ensure_nav(self.portfolio.pk, today=FRI)
+        self.assertEqual(self.nav(), extended)
+
+    def test_fresh_series_is_not_recomputed(self):
+        portfolio_analytics.ensure_nav(self.portfolio.pk, today=FRI)
+        with self.assertNumQueries(0):
+            portfolio_analytics.ensure_nav(self.portfolio.pk, today=FRI)
+
+    def test_committed_trade_drops_days_from_its_date_once(self):
+        portfolio_analytics.ensure_nav(self.portfolio.pk, today=FRI)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trade(THU, 5, 121)
+            self.trade(WED, 5, 99)
+        self.assertEqual([d for d, _, _ in self.nav()], [MON, TUE])
+        self.assertEqual(portfolio_analytics._pending.days, {})
+        portfolio_analytics.ensure_nav(self.portfolio.pk, today=FRI)
+        self.assertEqual(self.nav()[-1][1], Decimal('2420'))
+        # The buys are flows, not performance
+        self.assertAlmostEqual(self.nav()[2][2], -0.1, places=6)
+
+    def test_rolled_back_trade_keeps_the_cached_days(self):
+        portfolio_analytics.ensure_nav(self.portfolio.pk, today=FRI)
+        with self.captureOnCommitCallbacks(execute=False):
+            self.trade(TUE, 5, 110)
+        # The flush never ran; don't leave its queue to the next test
+        portfolio_analytics._pending.days = {}
+        self.assertEqual(len(self.nav()), 5)
+
+    def test_analytics_summary(self):
+        result = portfolio_analytics.portfolio_analytics(self.portfolio.pk, benchmark=None)
+        metrics = result['metrics']
+        self.assertAlmostEqual(metrics['twr'], 0.21, places=6)
+        self.assertAlmostEqual(metrics['max_drawdown'], 0.99 / 1.1 - 1.0, places=6)
+        self.assertEqual(metrics['max_drawdown_trough'], WED.isoformat())
@@ -0,0 +1,143 @@
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from stocks import referral_analytics
+from stocks.event_pipeline import EventBuffer
+from stocks.models import (
+    DiscountCode, ReferralClickEvent, ReferralDailyRollup, ReferralTrialEvent, RevenueTracking,
+)
+from stocks.partner_analytics_api import partner_analytics_summary_api, partner_analytics_timeseries_api
+
+DAY1 = datetime(2024, 3, 4, 12, tzinfo=dt_timezone.utc)
+DAY2 = DAY1 + timedelta(days=1)
+
+
+def rollups():
+    return {
+        (row['code'], row['day']): row
+        for row in ReferralDailyRollup.objects.values('code', 'day', *referral_analytics.COUNTERS,
+                                                      *referral_analytics.AMOUNTS)
+    }
+
+
+class ReferralRollupTests(TestCase):
+    def setUp(self):
+        buffer = EventBuffer('test-referral-clicks', referral_analytics.flush_clicks)
+        # No background flusher; the tests flush explicitly
+        buffer._pid = os.getpid()
+        patcher = mock.patch.object(referral_analytics, 'click_buffer', buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.buffer = buffer
+        self.user = User.objects.create_user('buyer')
+        self.discount = DiscountCode.objects.create(code='PARTNER1')
+
+    def click(self, code='PARTNER1', at=DAY1):
+        return referral_analytics.record_click(code, 's' * 80, 'h', 'agent', at)
+
+    def pay(self, amount, at=DAY1):
+        return RevenueTracking.objects.create(
+            user=self.user, discount_code=self.discount, revenue_type='discount_generated',
+            original_amount=Decimal(amount), final_amount=Decimal(amount), commission_rate=Decimal('20'),
+            payment_date=at,
+        )
+
+    def test_clicks_are_buffered_then_written_with_their_rollup(self):
+        self.assertTrue(self.click())
+        self.assertTrue(self.click())
+        self.assertTrue(self.click(at=DAY2))
+        self.assertFalse(self.click(code='BAD CODE!'))
+        self.assertFalse(ReferralClickEvent.objects.exists())
+        self.buffer.flush()
+        self.assertEqual(ReferralClickEvent.objects.count(), 3)
+        self.assertEqual(len(ReferralClickEvent.objects.first().session_id), 64)
+        self.assertEqual(rollups()[('PARTNER1', DAY1.date())]['clicks'], 2)
+        self.assertEqual(rollups()[('PARTNER1', DAY2.date())]['clicks'], 1)
+
+    def test_a_bad_click_does_not_drop_the_batch(self):
+        self.click()
+        self.click(at=None)
+        with self.assertLogs('stocks.referral_analytics', 'WARNING') as logs:
+            self.buffer.flush()
+        self.assertIn('Dropped 1', logs.output[-1])
+        self.assertEqual(rollups()[('PARTNER1', DAY1.date())]['clicks'], 1)
+
+    def test_trials_and_revenue_fold_in_and_out(self):
+        trial = ReferralTrialEvent.objects.create(code='PARTNER1', user=self.user, occurred_at=DAY1)
+        payment = self.pay('50.00')
+        row = rollups()[('PARTNER1', DAY1.date())]
+        self.assertEqual((row['trials'], row['purchases']), (1, 1))
+        self.assertEqual((row['revenue'], row['commission']), (Decimal('50'), Decimal('10')))
+
+        # Moving a payment moves its amounts rather than adding them twice
+        payment.payment_date = DAY2
+        payment.save()
+        self.assertEqual(rollups()[('PARTNER1', DAY1.date())]['purchases'], 0)
+        self.assertEqual(rollups()[('PARTNER1', DAY2.date())]['revenue'], Decimal('50'))
+
+        payment.delete()
+        trial.delete()
+        self.assertTrue(all(
+            not any(row[f] for f in referral_analytics.COUNTERS + referral_analytics.AMOUNTS)
+            for row in rollups().values()
+        ))
+
+    def test_rolled_back_payment_leaves_the_rollup_alone(self):
+        self.pay('20.00')
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.pay('30.00')
+            raise RuntimeError('payment failed')
+        row = rollups()[('PARTNER1', DAY1.date())]
+        self.assertEqual((row['purchases'], row['revenue']), (1, Decimal('20')))
+
+    def test_rebuild_matches_incremental_rollups(self):
+        self.click()
+        self.click(at=DAY2)
+        self.buffer.flush()
+        ReferralTrialEvent.objects.create(code='PARTNER1', occurred_at=DAY2)
+        self.pay('40.00', at=DAY2)
+        incremental = rollups()
+        ReferralDailyRollup.objects.update(clicks=99)
+        self.assertEqual(referral_analytics.rebuild_rollups(), 2)
+        self.assertEqual(rollups(), incremental)
+
+    def test_window_and_lifetime_totals(self):
+        self.pay('10.00', at=DAY1)
+        self.pay('20.00', at=DAY2)
+        window, lifetime = referral_analytics.window_totals('PARTNER1', DAY2.date(), DAY2.date())
+        self.assertEqual((window['purchases'], window['revenue']), (1, Decimal('20')))
+        self.assertEqual((lifetime['purchases'], lifetime['revenue']), (2, Decimal('30')))
+        self.assertEqual(referral_analytics.window_totals('NONE', DAY1.date(), DAY2.date())[0]['clicks'], 0)
+
+
+class PartnerAnalyticsApiTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('ops', is_staff=True)
+        ReferralDailyRollup.objects.create(code='PARTNER1', day=DAY1.date(), clicks=10, trials=2, purchases=1,
+                                           revenue=Decimal('50'), commission=Decimal('10'))
+        ReferralDailyRollup.objects.create(code='PARTNER1', day=DAY2.date(), clicks=5)
+
+    def get(self, view, **params):
+        request = APIRequestFactory().get('/', dict(code='partner1', **params))
+        force_authenticate(request, user=self.staff)
+        return view(request)
+
+    def test_summary_reads_the_rollups(self):
+        resp = self.get(partner_analytics_summary_api, **{'from': '2024-03-04', 'to': '2024-03-04T23:59:59'})
+        self.assertEqual(resp.status_code, 200)
+        totals = resp.data['totals']
+        self.assertEqual((totals['clicks'], totals['trials'], totals['purchases']), (10, 2, 1))
+        self.assertEqual(totals['trial_conversion_percent'], 20.0)
+        self.assertEqual(resp.data['lifetime']['clicks'], 15)
+        self.assertEqual(resp.data['revenue']['window']['total_commission'], 10.0)
+
+    def test_timeseries_buckets_by_day(self):
+        resp = self.get(partner_analytics_timeseries_api, **{'from': '2024-03-04', 'to': '2024-03-06'})
+        self.assertEqual([p['clicks'] for p in resp.data['series']], [10, 5, 0])
@@ -0,0 +1,89 @@
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from rest_framework.decorators import api_view
+
+from stocks.middleware_transactions import PIN_COOKIE, TransactionRoutingMiddleware
+from stocks.models import Stock
+from stockscanner_django.db_access import (
+    READ, WRITE, classify, is_read_only, read_only_view, write_view,
+)
+
+
+def plain_view(request):
+    return HttpResponse()
+
+
+@read_only_view
+@api_view(['POST'])
+def screen_view(request):
+    return HttpResponse()
+
+
+class ClassifyTests(SimpleTestCase):
+    def test_method_decides_by_default(self):
+        factory = RequestFactory()
+        self.assertEqual(classify(factory.get('/'), plain_view), READ)
+        self.assertEqual(classify(factory.head('/'), plain_view), READ)
+        self.assertEqual(classify(factory.post('/'), plain_view), WRITE)
+
+    def test_decorators_override_the_method(self):
+        factory = RequestFactory()
+        self.assertEqual(classify(factory.post('/'), screen_view), READ)
+        self.assertEqual(classify(factory.get('/'), write_view(lambda request: None)), WRITE)
+
+
+class TransactionRoutingMiddlewareTests(TestCase):
+    def dispatch(self, request, view):
+        """Run ``view`` through the middleware the way the handler does."""
+        seen = {}
+
+        def get_response(req):
+            middleware.process_view(req, view, (), {})
+            # Blocks opened by the middleware, on top of the test case's own
+            seen['atomics'] = len(connection.atomic_blocks) - outer
+            seen['read_only'] = is_read_only()
+            return view(req)
+
+        middleware = TransactionRoutingMiddleware(get_response)
+        outer = len(connection.atomic_blocks)
+        response = middleware(request)
+        self.assertEqual(len(connection.atomic_blocks), outer)
+        self.assertFalse(is_read_only())
+        return response, seen
+
+    @staticmethod
+    def creating(status=200, error=None):
+        def view(request):
+            Stock.objects.create(ticker='NEW', symbol='NEW', company_name='New', name='New')
+            if error:
+                raise error
+            return HttpResponse(status=status)
+        return view
+
+    def test_write_view_commits_and_pins_the_client(self):
+        response, seen = self.dispatch(RequestFactory().post('/'), self.creating())
+        self.assertEqual(seen['atomics'], 1)
+        self.assertFalse(seen['read_only'])
+        self.assertTrue(Stock.objects.filter(ticker='NEW').exists())
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_write_view_rolls_back_on_server_error(self):
+        response, _ = self.dispatch(RequestFactory().post('/'), self.creating(status=503))
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(Stock.objects.filter(ticker='NEW').exists())
+
+    def test_write_view_rolls_back_when_the_view_raises(self):
+        with self.assertRaises(RuntimeError):
+            self.dispatch(RequestFactory().post('/'), self.creating(error=RuntimeError('boom')))
+        self.assertFalse(Stock.objects.filter(ticker='NEW').exists())
+
+    def test_client_error_still_commits(self):
+        self.dispatch(RequestFactory().post('/'), self.creating(status=400))
+        self.assertTrue(Stock.objects.filter(ticker='NEW').exists())
+
+    def test_read_view_runs_in_autocommit_with_the_read_only_flag(self):
+        response, seen = self.dispatch(RequestFactory().post('/'), screen_view)
+        self.assertEqual(seen['atomics'], 0)
+        self.assertTrue(seen['read_only'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
@@ -0,0 +1,84 @@
+import csv
+import gzip
+import io
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+from stocks import streaming_export
+from stocks.models import Stock
+from stocks.streaming_export import ExportColumn
+
+COLUMNS = [ExportColumn('ticker', lambda r: r['ticker']),
+           ExportColumn('price', lambda r: r['current_price'])]
+
+
+class KeysetRowsTests(TestCase):
+    def setUp(self):
+        # Repeated prices so pages split inside runs of equal keys
+        for i, price in enumerate([5, 3, 5, 1, 5, 3, 2]):
+            ticker = f'T{i}'
+            Stock.objects.create(ticker=ticker, symbol=ticker, company_name=ticker, name=ticker,
+                                 current_price=Decimal(price))
+
+    def tickers(self, queryset, **kwargs):
+        return [r['ticker'] for r in streaming_export.keyset_rows(queryset, ['ticker'], page_size=2, **kwargs)]
+
+    def test_pages_follow_the_queryset_order_without_gaps_or_repeats(self):
+        for ordering in (('pk',), ('-current_price', '-pk'), ('current_price', 'pk')):
+            queryset = Stock.objects.order_by(*ordering)
+            self.assertEqual(self.tickers(queryset), [s.ticker for s in queryset], ordering)
+
+    def test_each_page_is_one_bounded_query(self):
+        with self.assertNumQueries(4):
+            self.assertEqual(len(self.tickers(Stock.objects.order_by('-current_price'))), 7)
+
+    def test_limit_stops_early(self):
+        queryset = Stock.objects.order_by('-current_price', '-pk')
+        expected = [s.ticker for s in queryset[:3]]
+        with self.assertNumQueries(2):
+            self.assertEqual(self.tickers(queryset, limit=3), expected)
+
+
+class ChunkWriterTests(SimpleTestCase):
+    ROWS = [{'ticker': f'T{i}', 'current_price': None if i == 2 else Decimal(i)} for i in range(50)]
+
+    def test_csv_is_flushed_in_chunks_after_an_early_header(self):
+        with mock.patch.object(streaming_export, 'FLUSH_BYTES', 64):
+            chunks = list(streaming_export.csv_chunks(self.ROWS, COLUMNS))
+        self.assertEqual(chunks[0], b'ticker,price\r\n')
+        self.assertGreater(len(chunks), 3)
+        rows = list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+        self.assertEqual(rows[3], ['T2', ''])
+        self.assertEqual(len(rows), 51)
+
+    def test_ndjson_lines(self):
+        body = b''.join(streaming_export.ndjson_chunks(self.ROWS[:3], COLUMNS)).decode()
+        self.assertEqual([json.loads(line) for line in body.splitlines()],
+                         [{'ticker': 'T0', 'price': '0'}, {'ticker': 'T1', 'price': '1'},
+                          {'ticker': 'T2', 'price': None}])
+
+    def test_gzip_stream_round_trips_and_flushes_the_first_chunk(self):
+        chunks = [b'header\n', b'a' * 1000, b'b' * 1000]
+        compressed = streaming_export.gzip_chunks(iter(chunks))
+        first = next(compressed)
+        self.assertEqual(gzip.GzipFile(fileobj=io.BytesIO(first)).read1(), b'header\n')
+        self.assertEqual(gzip.decompress(first + b''.join(compressed)), b''.join(chunks))
+
+
+class StreamingResponseTests(SimpleTestCase):
+    def test_gzip_is_negotiated(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='br, gzip;q=0.8')
+        resp = streaming_export.streaming_response(request, 'ndjson', ChunkWriterTests.ROWS, COLUMNS, 'stocks.csv')
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(resp['Content-Disposition'], 'attachment; filename="stocks.ndjson"')
+        self.assertIn('Accept-Encoding', resp['Vary'])
+        self.assertEqual(len(gzip.decompress(b''.join(resp.streaming_content)).splitlines()), 50)
+
+    def test_plain_csv(self):
+        resp = streaming_export.streaming_response(RequestFactory().get('/'), 'csv', [], COLUMNS)
+        self.assertFalse(resp.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(resp.streaming_content), b'ticker,price\r\n')
@@ -0,0 +1,45 @@
+import random
+
+from django.test import SimpleTestCase, TestCase
+
+from news.scraper import IMPACT_KEYWORDS, SENTIMENT_KEYWORDS
+from stocks.models import Stock
+from stocks.text_analytics import KeywordMatcher, TickerUniverse
+
+
+class KeywordMatcherTests(SimpleTestCase):
+    def test_counts_match_substring_loops(self):
+        groups = {'up': ['beat', 'beats', 'record high', 'high'], 'down': ['miss', 'missed', 'low', 'low']}
+        matcher = KeywordMatcher(groups)
+        for text in ('beats record highs', 'missed low', 'nothing here', '', 'lowbeatmissed'):
+            expected = {name: sum(k in text for k in words) for name, words in groups.items()}
+            self.assertEqual(matcher.counts(text), expected, text)
+
+    def test_agrees_with_the_scraper_keyword_lists(self):
+        groups = {**SENTIMENT_KEYWORDS, **IMPACT_KEYWORDS}
+        matcher = KeywordMatcher(groups)
+        vocabulary = sorted({k for words in groups.values() for k in words}) + ['the', 'shares', 'of']
+        rng = random.Random(7)
+        for _ in range(200):
+            text = ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(0, 12))).lower()
+            expected = {name: sum(k.lower() in text for k in words) for name, words in groups.items()}
+            self.assertEqual(matcher.counts(text), expected, text)
+
+
+class TickerUniverseTests(TestCase):
+    def setUp(self):
+        for ticker in ('AAPL', 'T', 'ALL', 'NVDA'):
+            Stock.objects.create(ticker=ticker, symbol=ticker, company_name=ticker, name=ticker)
+        self.universe = TickerUniverse(fallback=['MSFT'])
+
+    def test_extracts_known_tickers_in_order(self):
+        text = 'NVDA and AAPL rally; ALL of it; $t jumps, $aapl again, IBM unknown, NASDAQ: NVDA'
+        self.assertEqual(self.universe.extract(text), ['NVDA', 'AAPL', 'T'])
+
+    def test_loads_once_until_a_stock_is_added(self):
+        self.universe.extract('AAPL')
+        with self.assertNumQueries(0):
+            self.universe.extract('AAPL NVDA')
+        with self.captureOnCommitCallbacks(execute=True):
+            Stock.objects.create(ticker='IBM', symbol='IBM', company_name='IBM', name='IBM')
+        self.assertEqual(self.universe.extract('IBM'), ['IBM'])
@@ -0,0 +1,165 @@
+"""
+Single-pass text analytics for news: keyword scoring and ticker extraction.
+
+KeywordMatcher compiles every keyword of every group into one trie-shaped
+regular expression, so a text is scanned once no matter how many keyword
+lists are scored. Matching keeps the substring semantics of the old
+``keyword in text`` loops, including keywords that overlap or share a
+prefix.
+
+TickerUniverse holds the set of known tickers loaded once from Stock. It is
+refreshed when stocks are added or removed (and periodically as a backstop),
+so extraction needs no database queries per article.
+"""
+import logging
+import re
+import threading
+import time
+import weakref
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Uppercase words that look like tickers but almost never are in news copy
+COMMON_WORDS = frozenset({
+    'THE', 'AND', 'FOR', 'ARE', 'BUT', 'NOT', 'YOU', 'ALL', 'CAN',
+    'HER', 'WAS', 'ONE', 'OUR', 'OUT', 'DAY', 'GET', 'HAS', 'HIM',
+    'HOW', 'ITS', 'MAY', 'NEW', 'NOW', 'OLD', 'SEE', 'TWO', 'WHO',
+    'BOY', 'DID', 'HIS', 'LET', 'PUT', 'SAY', 'SHE', 'TOO', 'USE',
+    'WAY', 'WHY', 'ASK', 'BIG', 'EAR', 'END', 'FAR', 'FUN', 'GOT',
+    'LAW', 'MAN', 'OWN', 'RUN', 'SUN', 'TOP', 'TRY', 'WIN', 'YES',
+    'AGO', 'BAD', 'BAG', 'BED', 'BOX', 'BUY', 'CAR', 'CAT', 'CUP',
+    'DOG', 'EAT', 'EGG', 'EYE', 'FEW', 'FLY', 'GUN', 'HAD', 'HAT',
+    'JOB', 'LEG', 'LOT', 'MAP', 'RED', 'SEA', 'SIT', 'SIX', 'TEN',
+    'USA', 'CEO', 'CFO', 'CTO', 'COO', 'API', 'APP', 'WEB', 'NET',
+    'PAY', 'TAX', 'WAR', 'OIL', 'GAS', 'GDP', 'CPI', 'ETF', 'FED',
+    'A', 'I',
+})
+
+# Uppercase tokens of 1-5 letters, or $-prefixed tickers in any case ($aapl).
+# Exchange suffixes (AAPL.NYSE) and prefixes (NASDAQ: AAPL) fall out of the
+# word boundaries.
+_TICKER_TOKEN = re.compile(r'\$([A-Za-z]{1,5})\b|\b([A-Z]{1,5})\b')
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regex alternation shaped like a trie; greedy, so the longest keyword at a position wins."""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            body = '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Counts keyword hits for several named groups in one scan of the text."""
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        self.groups = list(groups)
+        # keyword -> [(group, multiplicity)]; duplicates inside a list count twice, as before
+        self._weights: Dict[str, List] = {}
+        for group, keywords in groups.items():
+            for keyword, times in Counter(k.lower() for k in keywords).items():
+                self._weights.setdefault(keyword, []).append((group, times))
+        keywords = sorted(self._weights)
+        # A scan reports the longest keyword starting at each position; shorter
+        # keywords sharing that start are implied by it.
+        self._implied = {
+            k: [p for p in keywords if p != k and k.startswith(p)] for k in keywords
+        }
+        self._pattern = re.compile('(?=(' + _trie_pattern(keywords) + '))') if keywords else None
+
+    def present(self, text: str) -> set:
+        """Keywords occurring anywhere in ``text`` (already lower-cased)."""
+        found = set()
+        if self._pattern is None or not text:
+            return found
+        for keyword in set(self._pattern.findall(text)):
+            found.add(keyword)
+            found.update(self._implied[keyword])
+        return found
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """Per-group count of keywords present, equal to ``sum(k in text for k in group)``."""
+        totals = dict.fromkeys(self.groups, 0)
+        for keyword in self.present(text):
+            for group, times in self._weights[keyword]:
+                totals[group] += times
+        return totals
+
+
+_universes = weakref.WeakSet()
+
+
+class TickerUniverse:
+    """Known tickers, loaded once from Stock and reloaded after invalidate() or REFRESH_SECONDS."""
+
+    REFRESH_SECONDS = 900
+    # Retry sooner when the database was unavailable (e.g. the scraper run standalone)
+    RETRY_SECONDS = 60
+
+    def __init__(self, fallback: Iterable[str] = ()):
+        self._fallback = frozenset(t.upper() for t in fallback)
+        self._tickers: Optional[frozenset] = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+        _universes.add(self)
+
+    def _load(self):
+        try:
+            from .models import Stock
+            tickers = frozenset(t.upper() for t in Stock.objects.values_list('ticker', flat=True) if t)
+            self._expires = time.monotonic() + self.REFRESH_SECONDS
+            logger.info(f"Loaded ticker universe: {len(tickers)} tickers")
+        except Exception as e:
+            logger.debug(f"Ticker universe unavailable, using fallback list: {e}")
+            tickers = self._fallback
+            self._expires = time.monotonic() + self.RETRY_SECONDS
+        self._tickers = tickers or self._fallback
+
+    def tickers(self) -> frozenset:
+        if self._tickers is None or time.monotonic() >= self._expires:
+            with self._lock:
+                if self._tickers is None or time.monotonic() >= self._expires:
+                    self._load()
+        return self._tickers
+
+    def invalidate(self):
+        self._expires = 0.0
+
+    def extract(self, text: str, exclude: Iterable[str] = COMMON_WORDS) -> List[str]:
+        """Known tickers mentioned in ``text``, in order of first mention."""
+        if not text:
+            return []
+        known = self.tickers()
+        found = {}
+        for dollar, bare in _TICKER_TOKEN.findall(text):
+            ticker = (dollar or bare).upper()
+            # $-prefixed mentions are explicit, so they skip the common-word filter
+            if ticker in known and (dollar or ticker not in exclude):
+                found.setdefault(ticker, None)
+        return list(found)
+
+
+ticker_universe = TickerUniverse()
+
+
+def on_stock_created_or_deleted(sender, instance=None, created=None, **kwargs):
+    """post_save/post_delete receiver for Stock; updates to existing rows don't change the universe."""
+    if created is False:
+        return
+    for universe in list(_universes):
+        universe.invalidate()
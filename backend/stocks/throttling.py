@@ -1,4 +1,4 @@
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
+from rest_framework.throttling import UserRateThrottle, AnonRateThrottle, SimpleRateThrottle
 
 
 class _SafeCacheMixin:
@@ -25,3 +25,15 @@ class SafeAnonRateThrottle(_SafeCacheMixin, AnonRateThrottle):
 class SafeUserRateThrottle(_SafeCacheMixin, UserRateThrottle):
     pass
 
+
+
+class AnalyticsTrackThrottle(_SafeCacheMixin, SimpleRateThrottle):
+    """Per-client limit for the public analytics tracking endpoints (users and anonymous alike)."""
+    scope = 'analytics_track'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -52,6 +52,7 @@ from django.utils import timezone
 import hashlib
 from django.shortcuts import redirect
 from . import partner_analytics_api
+from . import visitor_analytics_api
 
 
 
@@ -132,6 +133,7 @@ urlpatterns = [
     path('health/detailed/', views_health.health_check_detailed, name='health_check_detailed'),
     path('health/ready/', views_health.readiness_check, name='readiness_check'),
     path('health/live/', views_health.liveness_check, name='liveness_check'),
+    path('metrics/', views_health.metrics_view, name='metrics'),
     
     # Status endpoint (required by problem statement)  
     path('status/', simple_status_api, name='api_status'),
@@ -252,7 +254,10 @@ urlpatterns = [
     # Custom Indicators CRUD
     path('indicators/', indicators_api.list_indicators, name='indicators_list'),
     path('indicators/create/', indicators_api.create_indicator, name='indicators_create'),
+    path('indicators/validate/', indicators_api.validate_formula, name='indicators_validate'),
     path('indicators/<str:indicator_id>/', indicators_api.get_indicator, name='indicators_get'),
+    path('indicators/<str:indicator_id>/evaluate/', indicators_api.evaluate_indicator, name='indicators_evaluate'),
+    path('indicators/<str:indicator_id>/screen/', indicators_api.screen_indicator, name='indicators_screen'),
     path('indicators/<str:indicator_id>/update/', indicators_api.update_indicator, name='indicators_update'),
     path('indicators/<str:indicator_id>/delete/', indicators_api.delete_indicator, name='indicators_delete'),
 
@@ -276,4 +281,11 @@ urlpatterns = [
     # Partner analytics (auth required + gating)
     path('partner/analytics/summary', partner_analytics_api.partner_analytics_summary_api, name='partner_analytics_summary'),
     path('partner/analytics/timeseries', partner_analytics_api.partner_analytics_timeseries_api, name='partner_analytics_timeseries'),
+    # Visitor / checkout analytics: tracking is public but throttled and
+    # validated; summaries read rollups and are staff only
+    path('analytics/visitor/track', visitor_analytics_api.track_visitor_event, name='analytics_visitor_track'),
+    path('analytics/checkout/track', visitor_analytics_api.track_checkout_event, name='analytics_checkout_track'),
+    path('analytics/visitors/summary', visitor_analytics_api.get_visitor_analytics, name='analytics_visitors_summary'),
+    path('analytics/checkout/summary', visitor_analytics_api.get_checkout_analytics, name='analytics_checkout_summary'),
+    path('analytics/realtime', visitor_analytics_api.get_realtime_dashboard, name='analytics_realtime'),
 ]
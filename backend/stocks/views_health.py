@@ -1,15 +1,20 @@
 """
 Health check views for monitoring system status
 """
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
-from django.db import connection
 from django.core.cache import cache
-import psutil
-import os
-import time
-from datetime import datetime, timedelta
+from datetime import datetime
+import ipaddress
+
+from stockscanner_django.db_pool import pool_stats
+from stockscanner_django.db_router import router_stats
+from utils import metrics
+
+from .health_sampler import sampler
 
 
 @csrf_exempt
@@ -17,22 +22,14 @@ from datetime import datetime, timedelta
 def health_check(request):
     """
     Basic health check endpoint for monitoring
-    Returns 200 if service is up, with basic system info
+    Returns 200 if service is up, with basic system info from the latest
+    background sample (see stocks.health_sampler)
     """
     try:
-        # Get system metrics
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
-        
-        # Check database connection
-        db_status = "healthy"
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT 1")
-                cursor.fetchone()
-        except Exception as e:
-            db_status = f"unhealthy: {str(e)}"
+        components, snapshot = sampler.snapshot()
+        system = components.get('system', {})
+        database = components.get('database', {})
+        db_status = "healthy" if database.get('status') == "healthy" else f"unhealthy: {database.get('error', 'not sampled yet')}"
         
         # Check cache if available
         cache_status = "healthy"
@@ -53,12 +50,10 @@ def health_check(request):
                 "cache": cache_status,
             },
             "metrics": {
-                "cpu_percent": cpu_percent,
-                "memory_percent": memory.percent,
-                "memory_available_mb": memory.available / (1024 * 1024),
-                "disk_percent": disk.percent,
-                "disk_free_gb": disk.free / (1024 * 1024 * 1024),
-            }
+                key: system.get(key)
+                for key in ("cpu_percent", "memory_percent", "memory_available_mb", "disk_percent", "disk_free_gb")
+            },
+            "snapshot": snapshot,
         }
         
         # Return appropriate response for HEAD requests
@@ -81,42 +76,20 @@ def health_check(request):
 @require_http_methods(["GET"])
 def health_check_detailed(request):
     """
-    Detailed health check with component status
+    Detailed health check with component status, served from the latest
+    background sample plus this worker's live pool and routing counters
     """
     try:
-        components = {}
-        
-        # Check database
-        try:
-            start = time.time()
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT COUNT(*) FROM stocks_stock")
-                stock_count = cursor.fetchone()[0]
-            db_latency = (time.time() - start) * 1000  # ms
-            
-            components['database'] = {
-                "status": "healthy",
-                "latency_ms": round(db_latency, 2),
-                "stock_count": stock_count
-            }
-        except Exception as e:
-            components['database'] = {
-                "status": "unhealthy",
-                "error": str(e)
-            }
-        
-        # Check external connectivity (Cloudflare tunnel)
-        tunnel_status = "unknown"
-        try:
-            # Check if cloudflared process is running
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                if 'cloudflared' in proc.info['name']:
-                    tunnel_status = "running"
-                    break
-        except Exception:
-            pass
-        
-        components['tunnel'] = {"status": tunnel_status}
+        sampled, snapshot = sampler.snapshot()
+        components = {
+            'database': dict(sampled.get('database', {"status": "unknown"})),
+            'ingestion': sampled.get('ingestion', {"status": "unknown"}),
+            'tunnel': sampled.get('tunnel', {"status": "unknown"}),
+            'proxies': sampled.get('proxies', {}),
+            'system': sampled.get('system', {}),
+        }
+        components['database']['pools'] = pool_stats()
+        components['database']['aliases'] = router_stats()
         
         # Check API endpoints
         components['api_endpoints'] = {
@@ -126,29 +99,20 @@ def health_check_detailed(request):
             "emails": "available"
         }
         
-        # System resources
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        memory = psutil.virtual_memory()
-        network = psutil.net_io_counters()
-        
-        components['system'] = {
-            "cpu_percent": cpu_percent,
-            "memory_percent": memory.percent,
-            "network_bytes_sent": network.bytes_sent,
-            "network_bytes_recv": network.bytes_recv,
-            "uptime_seconds": time.time() - psutil.boot_time()
-        }
-        
         # Overall health determination
         overall_status = "healthy"
-        if components.get('database', {}).get('status') == 'unhealthy':
+        system = components['system']
+        if components['database'].get('status') != 'healthy':
+            overall_status = "degraded"
+        if (system.get('cpu_percent') or 0) > 90 or (system.get('memory_percent') or 0) > 90:
             overall_status = "degraded"
-        if cpu_percent > 90 or memory.percent > 90:
+        if components['ingestion'].get('status') == 'stale' or snapshot['stale']:
             overall_status = "degraded"
         
         return JsonResponse({
             "status": overall_status,
             "timestamp": datetime.now().isoformat(),
+            "snapshot": snapshot,
             "components": components
         })
         
@@ -164,41 +128,32 @@ def health_check_detailed(request):
 @require_http_methods(["GET"])
 def readiness_check(request):
     """
-    Readiness probe - checks if the service is ready to accept traffic
+    Readiness probe - checks if the service is ready to accept traffic,
+    using the latest background sample (not ready while it is stale)
     """
-    try:
-        # Check database is accessible
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
-        
-        # Check critical tables exist
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT COUNT(*) 
-                FROM information_schema.tables 
-                WHERE table_schema = DATABASE() 
-                AND table_name IN ('stocks_stock', 'stocks_stockdata')
-            """)
-            table_count = cursor.fetchone()[0]
-            
-            if table_count < 2:
-                return JsonResponse({
-                    "ready": False,
-                    "reason": "Required tables not found"
-                }, status=503)
-        
-        return JsonResponse({
-            "ready": True,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-    except Exception as e:
+    components, snapshot = sampler.snapshot()
+    database = components.get('database', {})
+    reason = None
+    if snapshot['stale']:
+        reason = "Health snapshot is stale"
+    elif database.get('status') != 'healthy':
+        reason = database.get('error', "Database unavailable")
+    elif database.get('missing_tables'):
+        reason = "Required tables not found"
+    
+    if reason:
         return JsonResponse({
             "ready": False,
-            "error": str(e),
+            "reason": reason,
+            "snapshot": snapshot,
             "timestamp": datetime.now().isoformat()
         }, status=503)
+    
+    return JsonResponse({
+        "ready": True,
+        "snapshot": snapshot,
+        "timestamp": datetime.now().isoformat()
+    })
 
 
 @csrf_exempt
@@ -210,4 +165,37 @@ def liveness_check(request):
     return JsonResponse({
         "alive": True,
         "timestamp": datetime.now().isoformat()
-    })
\ No newline at end of file
+    })
+
+
+def _metrics_allowed(request) -> bool:
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return True
+    if getattr(getattr(request, 'user', None), 'is_staff', False):
+        return True
+    remote = request.META.get('REMOTE_ADDR', '')
+    if remote not in getattr(settings, 'METRICS_ALLOWED_IPS', ()):
+        return False
+    try:
+        loopback = ipaddress.ip_address(remote).is_loopback
+    except ValueError:
+        return False
+    # Behind a proxy (the tunnel forwards to localhost) loopback is every client
+    return not (loopback and getattr(settings, 'SECURE_PROXY_SSL_HEADER', None))
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """
+    Prometheus text exposition of request and scanner metrics, summed over
+    every process publishing to METRICS_DIR (?scope=process for this worker only).
+    Answers "Authorization: Bearer <METRICS_TOKEN>", staff sessions and
+    addresses in METRICS_ALLOWED_IPS (empty by default); everyone else gets
+    401 when a token is configured, 404 otherwise.
+    """
+    if not _metrics_allowed(request):
+        return HttpResponse(status=401 if getattr(settings, 'METRICS_TOKEN', '') else 404)
+    body = metrics.REGISTRY.render(aggregate=request.GET.get('scope') != 'process')
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -9,6 +9,7 @@ Tracks:
 from __future__ import annotations
 
 from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
 from typing import Dict, Any
 import hashlib
 
@@ -18,11 +19,19 @@ from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import IsAdminUser, AllowAny
 from rest_framework.response import Response
 
-from .models import VisitorEvent, CheckoutEvent, User
+from .event_pipeline import (
+    OPEN_CHECKOUT_STATUSES, checkout_buffer, granularity_for, rollup_queryset, visitor_buffer,
+)
+from .models import VisitorEvent, CheckoutEvent, VisitorSessionDay, User
+from .throttling import AnalyticsTrackThrottle
+
+# Bounds on client-reported checkout data
+MAX_CHECKOUT_AMOUNT = Decimal('10000')
+MAX_PAGE_URL_LENGTH = 255
 
 
 def _get_country_from_ip(request) -> str:
@@ -66,11 +75,51 @@ def _hash_ip(request) -> str:
         return 'unknown'
 
 
+def _visitor_event(request, event_type, page_url, session_id=None, country_code=None) -> Dict[str, Any]:
+    """Plain event dict for the visitor buffer (no ORM objects in the request path)."""
+    return {
+        'session_id': session_id if session_id is not None else _get_session_id(request),
+        'ip_hash': _hash_ip(request),
+        'country_code': country_code if country_code is not None else _get_country_from_ip(request),
+        'event_type': event_type,
+        'page_url': page_url[:512],
+        'user_agent': request.META.get('HTTP_USER_AGENT', '')[:1000],
+        'user_id': request.user.pk if request.user.is_authenticated else None,
+        'at': timezone.now(),
+    }
+
+
+def _parse_range(request, default_days=30):
+    """(start, end) from ?from=&to= ISO dates, defaulting to the last ``default_days``."""
+    now = timezone.now()
+    start_default = now - timedelta(days=default_days)
+
+    start_str = request.GET.get('from')
+    end_str = request.GET.get('to')
+
+    try:
+        start = datetime.fromisoformat(start_str.replace('Z', '+00:00')) if start_str else start_default
+    except Exception:
+        start = start_default
+
+    try:
+        end = datetime.fromisoformat(end_str.replace('Z', '+00:00')) if end_str else now
+    except Exception:
+        end = now
+
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start, timezone.utc)
+    if timezone.is_naive(end):
+        end = timezone.make_aware(end, timezone.utc)
+    return start, end
+
+
 # ----- Tracking Endpoints -----
 
 @csrf_exempt
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([AnalyticsTrackThrottle])
 def track_visitor_event(request):
     """Track visitor event (page view, checkout start, purchase)
 
@@ -91,18 +140,13 @@ def track_visitor_event(request):
         valid_types = ['page_view', 'checkout_start', 'purchase_complete']
         if event_type not in valid_types:
             return Response({'success': False, 'error': 'Invalid event_type'}, status=400)
+        # Site-relative paths only
+        if (not isinstance(page_url, str) or len(page_url) > MAX_PAGE_URL_LENGTH
+                or (page_url and not page_url.startswith('/')) or page_url.startswith('//')):
+            return Response({'success': False, 'error': 'Invalid page_url'}, status=400)
 
-        # Create visitor event
-        VisitorEvent.objects.create(
-            session_id=_get_session_id(request),
-            ip_hash=_hash_ip(request),
-            country_code=_get_country_from_ip(request),
-            event_type=event_type,
-            page_url=page_url[:512],
-            user_agent=request.META.get('HTTP_USER_AGENT', '')[:1000],
-            user=request.user if request.user.is_authenticated else None,
-            occurred_at=timezone.now(),
-        )
+        # Buffered; written in bulk by the event pipeline
+        visitor_buffer.append(_visitor_event(request, event_type, page_url))
 
         return Response({'success': True, 'event_type': event_type})
     except Exception as e:
@@ -112,6 +156,7 @@ def track_visitor_event(request):
 @csrf_exempt
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([AnalyticsTrackThrottle])
 def track_checkout_event(request):
     """Track checkout progress
 
@@ -135,77 +180,58 @@ def track_checkout_event(request):
         valid_statuses = ['started', 'payment_info', 'processing', 'completed', 'abandoned']
         if status not in valid_statuses:
             return Response({'success': False, 'error': 'Invalid status'}, status=400)
+        if amount is not None:
+            try:
+                amount = Decimal(str(amount)).quantize(Decimal('0.01'))
+            except (InvalidOperation, ValueError):
+                return Response({'success': False, 'error': 'Invalid amount'}, status=400)
+            if not amount.is_finite() or amount < 0 or amount > MAX_CHECKOUT_AMOUNT:
+                return Response({'success': False, 'error': 'Invalid amount'}, status=400)
+        if not isinstance(plan_name or '', str) or not isinstance(referral_code or '', str):
+            return Response({'success': False, 'error': 'Invalid plan_name or referral_code'}, status=400)
 
         session_id = _get_session_id(request)
         country_code = _get_country_from_ip(request)
 
-        # Find existing checkout or create new one
-        checkout, created = CheckoutEvent.objects.get_or_create(
-            session_id=session_id,
-            status__in=['started', 'payment_info', 'processing'],  # Not completed/abandoned
-            defaults={
-                'user': request.user if request.user.is_authenticated else None,
-                'status': status,
-                'plan_name': plan_name[:100],
-                'amount': amount,
-                'country_code': country_code,
-                'referral_code': referral_code[:50],
-                'started_at': timezone.now(),
-            }
-        )
-
-        # Update existing checkout
-        if not created:
-            checkout.status = status
-            checkout.plan_name = plan_name[:100] if plan_name else checkout.plan_name
-            checkout.amount = amount if amount is not None else checkout.amount
-            checkout.referral_code = referral_code[:50] if referral_code else checkout.referral_code
-
-            # Set completed_at if status is completed
-            if status == 'completed' and not checkout.completed_at:
-                checkout.completed_at = timezone.now()
-
-            checkout.save()
+        # Status changes are replayed against the session's open checkout when the buffer flushes
+        checkout_buffer.append({
+            'session_id': session_id,
+            'user_id': request.user.pk if request.user.is_authenticated else None,
+            'status': status,
+            'plan_name': (plan_name or '')[:100],
+            'amount': amount,
+            'country_code': country_code,
+            'referral_code': (referral_code or '')[:50],
+            'at': timezone.now(),
+        })
 
         # Also track as visitor event
         if status == 'started':
-            VisitorEvent.objects.create(
-                session_id=session_id,
-                ip_hash=_hash_ip(request),
-                country_code=country_code,
-                event_type='checkout_start',
-                page_url='/checkout/',
-                user_agent=request.META.get('HTTP_USER_AGENT', '')[:1000],
-                user=request.user if request.user.is_authenticated else None,
-                occurred_at=timezone.now(),
-            )
+            visitor_buffer.append(_visitor_event(request, 'checkout_start', '/checkout/', session_id, country_code))
         elif status == 'completed':
-            VisitorEvent.objects.create(
-                session_id=session_id,
-                ip_hash=_hash_ip(request),
-                country_code=country_code,
-                event_type='purchase_complete',
-                page_url='/checkout/success/',
-                user_agent=request.META.get('HTTP_USER_AGENT', '')[:1000],
-                user=request.user if request.user.is_authenticated else None,
-                occurred_at=timezone.now(),
-            )
+            visitor_buffer.append(_visitor_event(request, 'purchase_complete', '/checkout/success/', session_id, country_code))
 
         return Response({
             'success': True,
-            'checkout_id': checkout.id,
-            'status': checkout.status,
-            'created': created,
+            'status': status,
+            'queued': True,
         })
     except Exception as e:
         return Response({'success': False, 'error': str(e)}, status=500)
 
 
 # ----- Analytics Endpoints -----
+# Counts come from AnalyticsRollup rows and distinct visitors from
+# VisitorSessionDay, so cost depends on the window, not on raw event volume.
+
+def _kind_totals(rollups, **filters):
+    rows = rollups.filter(**filters).values('kind').annotate(count=Sum('count'), amount=Sum('amount'))
+    return {row['kind']: row for row in rows}
+
 
 @csrf_exempt
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAdminUser])
 def get_visitor_analytics(request):
     """Get visitor analytics summary
 
@@ -220,51 +246,27 @@ def get_visitor_analytics(request):
     - Purchase completions
     """
     try:
-        # Date range (default: last 30 days)
-        now = timezone.now()
-        start_default = now - timedelta(days=30)
-
-        start_str = request.GET.get('from')
-        end_str = request.GET.get('to')
+        start, end = _parse_range(request)
         country_filter = request.GET.get('country', '').upper()
 
-        try:
-            start = datetime.fromisoformat(start_str.replace('Z', '+00:00')) if start_str else start_default
-        except Exception:
-            start = start_default
-
-        try:
-            end = datetime.fromisoformat(end_str.replace('Z', '+00:00')) if end_str else now
-        except Exception:
-            end = now
-
-        if timezone.is_naive(start):
-            start = timezone.make_aware(start, timezone.utc)
-        if timezone.is_naive(end):
-            end = timezone.make_aware(end, timezone.utc)
-
-        # Base queryset
-        visitors_qs = VisitorEvent.objects.filter(
-            occurred_at__gte=start,
-            occurred_at__lte=end
-        )
-
+        sessions_qs = VisitorSessionDay.objects.filter(day__gte=start.date(), day__lte=end.date())
+        rollups = rollup_queryset('visitor', start, end)
         if country_filter:
-            visitors_qs = visitors_qs.filter(country_code=country_filter)
+            sessions_qs = sessions_qs.filter(country_code=country_filter)
+            rollups = rollups.filter(country_code=country_filter)
 
-        # Total unique visitors (by session)
-        total_visitors = visitors_qs.values('session_id').distinct().count()
-
-        # US-based visitors
-        us_visitors = visitors_qs.filter(country_code='US').values('session_id').distinct().count()
+        # Unique visitors (by session)
+        total_visitors = sessions_qs.values('session_id').distinct().count()
+        us_visitors = sessions_qs.filter(country_code='US').values('session_id').distinct().count()
 
         # Event counts
-        page_views = visitors_qs.filter(event_type='page_view').count()
-        checkout_starts = visitors_qs.filter(event_type='checkout_start').count()
-        purchases = visitors_qs.filter(event_type='purchase_complete').count()
+        kinds = _kind_totals(rollups)
+        page_views = int((kinds.get('page_view') or {}).get('count') or 0)
+        checkout_starts = int((kinds.get('checkout_start') or {}).get('count') or 0)
+        purchases = int((kinds.get('purchase_complete') or {}).get('count') or 0)
 
         # Visitors by country
-        by_country = visitors_qs.values('country_code').annotate(
+        by_country = sessions_qs.values('country_code').annotate(
             count=Count('session_id', distinct=True)
         ).order_by('-count')[:20]
 
@@ -277,6 +279,7 @@ def get_visitor_analytics(request):
             'period': {
                 'from': start.isoformat(),
                 'to': end.isoformat(),
+                'granularity': granularity_for(start, end),
             },
             'totals': {
                 'total_visitors': total_visitors,
@@ -301,7 +304,7 @@ def get_visitor_analytics(request):
 
 @csrf_exempt
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAdminUser])
 def get_checkout_analytics(request):
     """Get checkout analytics
 
@@ -315,75 +318,45 @@ def get_checkout_analytics(request):
     - Revenue by country
     """
     try:
-        # Date range
         now = timezone.now()
-        start_default = now - timedelta(days=30)
-
-        start_str = request.GET.get('from')
-        end_str = request.GET.get('to')
-
-        try:
-            start = datetime.fromisoformat(start_str.replace('Z', '+00:00')) if start_str else start_default
-        except Exception:
-            start = start_default
-
-        try:
-            end = datetime.fromisoformat(end_str.replace('Z', '+00:00')) if end_str else now
-        except Exception:
-            end = now
+        start, end = _parse_range(request)
+        rollups = rollup_queryset('checkout', start, end)
 
-        if timezone.is_naive(start):
-            start = timezone.make_aware(start, timezone.utc)
-        if timezone.is_naive(end):
-            end = timezone.make_aware(end, timezone.utc)
-
-        # Base queryset
-        checkouts_qs = CheckoutEvent.objects.filter(started_at__gte=start, started_at__lte=end)
-
-        # Active checkouts (started/processing, not completed/abandoned, last 1 hour)
+        # Active checkouts (open, last 1 hour) - bounded by the index on (status, started_at)
         active_cutoff = now - timedelta(hours=1)
         active_checkouts = CheckoutEvent.objects.filter(
-            status__in=['started', 'payment_info', 'processing'],
+            status__in=OPEN_CHECKOUT_STATUSES,
             started_at__gte=active_cutoff
         ).count()
 
-        # Completed purchases
-        completed = checkouts_qs.filter(status='completed').count()
-
-        # Abandoned checkouts
-        abandoned = checkouts_qs.filter(status='abandoned').count()
-
-        # Total started
-        total_started = checkouts_qs.filter(status__in=['started', 'payment_info', 'processing', 'completed', 'abandoned']).count()
+        kinds = _kind_totals(rollups)
+        completed = int((kinds.get('completed') or {}).get('count') or 0)
+        abandoned = int((kinds.get('abandoned') or {}).get('count') or 0)
+        total_started = int((kinds.get('started') or {}).get('count') or 0)
 
         # Completion rate
         completion_rate = (completed / total_started * 100) if total_started else 0
 
         # Revenue
-        revenue_data = checkouts_qs.filter(status='completed').aggregate(
-            total_revenue=Sum('amount'),
-            avg_order_value=Sum('amount') / Count('id') if checkouts_qs.filter(status='completed').exists() else 0
-        )
-
-        total_revenue = float(revenue_data.get('total_revenue') or 0)
+        total_revenue = float((kinds.get('completed') or {}).get('amount') or 0)
 
         # Revenue by country
-        by_country = checkouts_qs.filter(status='completed').values('country_code').annotate(
+        by_country = rollups.filter(kind='completed').values('country_code').annotate(
             revenue=Sum('amount'),
-            count=Count('id')
+            count=Sum('count')
         ).order_by('-revenue')[:10]
 
         # US revenue
-        us_revenue = checkouts_qs.filter(status='completed', country_code='US').aggregate(
+        us_revenue = float(rollups.filter(kind='completed', country_code='US').aggregate(
             total=Sum('amount')
-        )['total'] or 0
-        us_revenue = float(us_revenue)
+        )['total'] or 0)
 
         return Response({
             'success': True,
             'period': {
                 'from': start.isoformat(),
                 'to': end.isoformat(),
+                'granularity': granularity_for(start, end),
             },
             'totals': {
                 'active_checkouts': active_checkouts,
@@ -396,6 +369,7 @@ def get_checkout_analytics(request):
                 'total': round(total_revenue, 2),
                 'us_revenue': round(us_revenue, 2),
                 'us_percentage': round((us_revenue / total_revenue * 100) if total_revenue else 0, 2),
+                'avg_order_value': round(total_revenue / completed, 2) if completed else 0,
             },
             'by_country': [
                 {
@@ -412,7 +386,7 @@ def get_checkout_analytics(request):
 
 @csrf_exempt
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAdminUser])
 def get_realtime_dashboard(request):
     """Get real-time dashboard metrics
 
@@ -430,28 +404,21 @@ def get_realtime_dashboard(request):
         # Active checkouts (last 30 minutes, not completed/abandoned)
         active_cutoff = now - timedelta(minutes=30)
         active_checkouts = CheckoutEvent.objects.filter(
-            status__in=['started', 'payment_info', 'processing'],
+            status__in=OPEN_CHECKOUT_STATUSES,
             started_at__gte=active_cutoff
         ).count()
 
-        # Recent purchases (last 24 hours)
+        # Recent purchases (last 24 hours) from hourly rollups
         recent_cutoff = now - timedelta(hours=24)
-        recent_purchases = CheckoutEvent.objects.filter(
-            status='completed',
-            completed_at__gte=recent_cutoff
-        ).count()
+        recent_purchases = rollup_queryset('checkout', recent_cutoff, now, 'hour').filter(
+            kind='completed'
+        ).aggregate(total=Sum('count'))['total'] or 0
 
-        # Active visitors (last 15 minutes)
+        # Active visitors (last 15 minutes); the occurred_at index keeps this to a 15 minute slice
         visitor_cutoff = now - timedelta(minutes=15)
-        active_visitors = VisitorEvent.objects.filter(
-            occurred_at__gte=visitor_cutoff
-        ).values('session_id').distinct().count()
-
-        # US visitors (last 15 minutes)
-        us_visitors = VisitorEvent.objects.filter(
-            occurred_at__gte=visitor_cutoff,
-            country_code='US'
-        ).values('session_id').distinct().count()
+        recent_sessions = VisitorEvent.objects.filter(occurred_at__gte=visitor_cutoff)
+        active_visitors = recent_sessions.values('session_id').distinct().count()
+        us_visitors = recent_sessions.filter(country_code='US').values('session_id').distinct().count()
 
         # US percentage
         us_percentage = (us_visitors / active_visitors * 100) if active_visitors else 0
@@ -475,9 +442,13 @@ def get_realtime_dashboard(request):
                 'us_percentage': round(us_percentage, 2),
             },
             'recent_24h': {
-                'purchases': recent_purchases,
+                'purchases': int(recent_purchases),
             },
             'recent_purchases': recent_purchases_list,
+            'pipeline': {
+                'visitor_events': visitor_buffer.stats(),
+                'checkout_events': checkout_buffer.stats(),
+            },
             'updated_at': now.isoformat(),
         })
     except Exception as e:
@@ -17,6 +17,7 @@ from .security_utils import (
     WATCHLIST_SCHEMA
 )
 from .watchlist_service import WatchlistService
+from .streaming_export import chunked_response
 from .plan_limits import get_limits_for_user, is_within_limit
 from .models import UserWatchlist, WatchlistItem, Stock
 
@@ -328,14 +329,12 @@ def export_csv(request, watchlist_id):
                 'error_code': 'WATCHLIST_NOT_FOUND'
             }, status=404)
         
-        # Export to CSV
-        csv_content = WatchlistService.export_watchlist_to_csv(watchlist)
-        
-        # Create HTTP response with CSV content
-        response = HttpResponse(csv_content, content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{watchlist.name}_watchlist.csv"'
-        
-        return response
+        # Stream the CSV a page of items at a time
+        return chunked_response(
+            request,
+            WatchlistService.iter_watchlist_csv(watchlist),
+            filename=f"{watchlist.name}_watchlist.csv",
+        )
         
     except Exception as e:
         logger.error(f"Error in export_csv: {str(e)}")
@@ -20,9 +20,32 @@ from django.http import HttpResponse
 from .models import Stock, UserWatchlist, WatchlistItem
 from .plan_limits import get_limits_for_user, is_within_limit
 from .portfolio_service import PortfolioService
+from .streaming_export import ExportColumn, csv_chunks, keyset_rows
 
 logger = logging.getLogger(__name__)
 
+# CSV export layout; rows come from values() over these fields
+WATCHLIST_CSV_COLUMNS = [
+    ExportColumn('ticker', lambda r: r['stock__ticker']),
+    ExportColumn('company_name', lambda r: r['stock__company_name']),
+    ExportColumn('added_at', lambda r: r['added_at'].strftime('%Y-%m-%d %H:%M:%S')),
+    ExportColumn('added_price', lambda r: float(r['added_price'])),
+    ExportColumn('current_price', lambda r: float(r['current_price'])),
+    ExportColumn('price_change', lambda r: float(r['price_change'])),
+    ExportColumn('price_change_percent', lambda r: float(r['price_change_percent'])),
+    ExportColumn('notes', lambda r: r['notes']),
+    ExportColumn('target_price', lambda r: float(r['target_price']) if r['target_price'] else ''),
+    ExportColumn('stop_loss', lambda r: float(r['stop_loss']) if r['stop_loss'] else ''),
+    ExportColumn('price_alert_enabled', lambda r: r['price_alert_enabled']),
+    ExportColumn('news_alert_enabled', lambda r: r['news_alert_enabled']),
+]
+WATCHLIST_CSV_SOURCES = [
+    'stock__ticker', 'stock__company_name', 'added_at', 'added_price', 'current_price',
+    'price_change', 'price_change_percent', 'notes', 'target_price', 'stop_loss',
+    'price_alert_enabled', 'news_alert_enabled',
+]
+
+
 class WatchlistService:
     """Enhanced watchlist management service"""
     
@@ -321,6 +344,21 @@ class WatchlistService:
             logger.error(f"Error getting watchlist performance for {watchlist.name}: {str(e)}")
             raise ValidationError(f"Failed to get watchlist performance: {str(e)}")
     
+    @staticmethod
+    def iter_watchlist_csv(watchlist: UserWatchlist):
+        """
+        Stream a watchlist as CSV, reading items a page at a time.
+        
+        Args:
+            watchlist: Watchlist to export
+            
+        Returns:
+            Iterator[bytes]: UTF-8 CSV chunks, header first
+        """
+        items = WatchlistItem.objects.filter(watchlist=watchlist).order_by('added_at')
+        rows = keyset_rows(items, WATCHLIST_CSV_SOURCES)
+        return csv_chunks(rows, WATCHLIST_CSV_COLUMNS)
+    
     @staticmethod
     def export_watchlist_to_csv(watchlist: UserWatchlist) -> str:
         """
@@ -333,36 +371,7 @@ class WatchlistService:
             str: CSV content
         """
         try:
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Write header
-            writer.writerow([
-                'ticker', 'company_name', 'added_at', 'added_price', 'current_price',
-                'price_change', 'price_change_percent', 'notes', 'target_price',
-                'stop_loss', 'price_alert_enabled', 'news_alert_enabled'
-            ])
-            
-            # Write data
-            items = watchlist.items.select_related('stock').order_by('added_at')
-            
-            for item in items:
-                writer.writerow([
-                    item.stock.ticker,
-                    item.stock.company_name,
-                    item.added_at.strftime('%Y-%m-%d %H:%M:%S'),
-                    float(item.added_price),
-                    float(item.current_price),
-                    float(item.price_change),
-                    float(item.price_change_percent),
-                    item.notes,
-                    float(item.target_price) if item.target_price else '',
-                    float(item.stop_loss) if item.stop_loss else '',
-                    item.price_alert_enabled,
-                    item.news_alert_enabled
-                ])
-            
-            return output.getvalue()
+            return b''.join(WatchlistService.iter_watchlist_csv(watchlist)).decode('utf-8')
             
         except Exception as e:
             logger.error(f"Error exporting watchlist to CSV for {watchlist.name}: {str(e)}")
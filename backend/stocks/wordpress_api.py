@@ -10,6 +10,8 @@ from django.views import View
 from django.utils.decorators import method_decorator
 from django.core.paginator import Paginator
 from django.db.models import Q
+from . import columnar
+from .columnar import Column, decimal_column
 from .models import Stock, StockAlert
 from news.models import NewsArticle
 import json
@@ -30,12 +32,96 @@ def format_decimal_safe(value):
     except (ValueError, TypeError):
         return 0.0
 
+def _trend(row):
+    change = row['change_percent']
+    if change:
+        if change > 0:
+            return 'up'
+        elif change < 0:
+            return 'down'
+    return 'neutral'
+
+
+def _market_cap(row):
+    """Stored market cap, else price x shares."""
+    derived_market_cap = None
+    try:
+        derived_market_cap = compute_market_cap_fallback(row['current_price'], row['shares_available'])
+    except Exception:
+        derived_market_cap = None
+    return int(row['market_cap'] or (derived_market_cap or 0)) if (row['market_cap'] or derived_market_cap) else 0
+
+
+def _instrument_type(row):
+    return classify_instrument(row['ticker'], row['company_name'] or row['name'], row['name'])
+
+
+def _filter_for_instrument(output_row, record):
+    instrument_type = output_row.get('instrument_type') or _instrument_type(record)
+    return filter_fields_by_instrument(output_row, instrument_type)
+
+
+_MARKET_CAP_SOURCES = ('market_cap', 'current_price', 'shares_available')
+
+# Output fields of wordpress_stocks_api, in response order; shared by every output format
+WORDPRESS_STOCK_COLUMNS = columnar.ColumnSet([
+    Column('ticker'),
+    Column('symbol', lambda r: r['symbol'] or r['ticker'], ('symbol', 'ticker')),
+    Column('company_name', lambda r: r['company_name'] or r['name'] or r['ticker'], ('company_name', 'name', 'ticker')),
+    Column('exchange', lambda r: r['exchange'] or 'N/A'),
+    Column('instrument_type', _instrument_type, ('ticker', 'company_name', 'name')),
+
+    # Price data (with better fallbacks)
+    decimal_column('current_price', default=0.0),
+    decimal_column('price_change_today', default=0.0),
+    decimal_column('change_percent', default=0.0),
+
+    # Volume and market data
+    Column('volume', lambda r: int(r['volume']) if r['volume'] else 0),
+    Column('volume_today', lambda r: int(r['volume_today'] or r['volume'] or 0), ('volume_today', 'volume')),
+    Column('market_cap', _market_cap, _MARKET_CAP_SOURCES),
+    Column('market_cap_formatted', lambda r: Stock.format_market_cap(_market_cap(r)) if _market_cap(r) > 0 else 'N/A',
+           _MARKET_CAP_SOURCES),
+
+    # Financial ratios
+    decimal_column('pe_ratio', default=0.0),
+    decimal_column('dividend_yield', default=0.0),
+
+    # 52-week range
+    decimal_column('week_52_high', default=0.0),
+    decimal_column('week_52_low', default=0.0),
+
+    # Timestamps
+    Column('last_updated', lambda r: columnar.isoformat(r['last_updated'])),
+    Column('created_at', lambda r: columnar.isoformat(r['created_at'])),
+
+    # WordPress-friendly display fields
+    Column('trend', _trend, ('change_percent',)),
+    Column('formatted_price', lambda r: Stock.format_price(r['current_price']), ('current_price',)),
+    Column('formatted_change', lambda r: Stock.format_change(r['change_percent']), ('change_percent',)),
+    Column('formatted_volume', lambda r: Stock.format_volume(r['volume']), ('volume',)),
+
+    # Status indicators
+    Column('is_gaining', lambda r: (r['change_percent'] or 0) > 0, ('change_percent',)),
+    Column('is_losing', lambda r: (r['change_percent'] or 0) < 0, ('change_percent',)),
+    Column('has_volume', lambda r: bool(r['volume'] and r['volume'] > 0), ('volume',)),
+
+    # WordPress URL-friendly
+    Column('slug', lambda r: r['ticker'].lower(), ('ticker',)),
+    Column('permalink', lambda r: f"/stock/{r['ticker'].lower()}/", ('ticker',)),
+    Column('api_url', lambda r: f"/api/stocks/{r['ticker']}/", ('ticker',)),
+])
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def wordpress_stocks_api(request):
     """
     WordPress-friendly stocks API endpoint
     Returns stock data in a format optimized for WordPress consumption
+
+    ``fields=`` limits the output fields; ``output=`` (or the Accept header)
+    selects rows (default), columns, msgpack or csv.
     """
     try:
         # Get query parameters
@@ -44,6 +130,11 @@ def wordpress_stocks_api(request):
         sort_by = request.GET.get('sort', 'volume')  # volume, price, change
         search = request.GET.get('search', '')
         category = request.GET.get('category', '')  # gainers, losers, active
+        output = columnar.negotiate(request)
+        try:
+            columns = WORDPRESS_STOCK_COLUMNS.select(columnar.requested_fields(request))
+        except columnar.UnknownFieldsError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
         # Base queryset - FIXED to be more inclusive
         # Start with all stocks, then progressively filter
@@ -96,91 +187,20 @@ def wordpress_stocks_api(request):
         # Paginate results
         paginator = Paginator(stocks_queryset, limit)
         stocks_page = paginator.get_page(page)
+        bottom = (stocks_page.number - 1) * limit
+        records = stocks_queryset.values(*WORDPRESS_STOCK_COLUMNS.sources(columns))[bottom:bottom + limit]
 
-        # Format data for WordPress
-        stocks_data = []
-        for stock in stocks_page:
-            # Calculate additional WordPress-friendly fields
-            price_trend = 'neutral'
-            if stock.change_percent:
-                if stock.change_percent > 0:
-                    price_trend = 'up'
-                elif stock.change_percent < 0:
-                    price_trend = 'down'
-            
-            # Compute market cap fallback and format
-            derived_market_cap = None
-            try:
-                derived_market_cap = compute_market_cap_fallback(stock.current_price, getattr(stock, 'shares_available', None))
-            except Exception:
-                derived_market_cap = None
-            mc_val = int(stock.market_cap or (derived_market_cap or 0)) if (stock.market_cap or derived_market_cap) else 0
-            if mc_val >= 1_000_000_000_000:
-                market_cap_formatted = f"${mc_val/1e12:.2f}T"
-            elif mc_val >= 1_000_000_000:
-                market_cap_formatted = f"${mc_val/1e9:.2f}B"
-            elif mc_val >= 1_000_000:
-                market_cap_formatted = f"${mc_val/1e6:.2f}M"
-            elif mc_val > 0:
-                market_cap_formatted = f"${mc_val:,}"
-            else:
-                market_cap_formatted = 'N/A'
-            
-            instrument_type = classify_instrument(
-                stock.ticker,
-                stock.company_name or stock.name,
-                getattr(stock, 'name', None)
+        if output != columnar.ROWS:
+            # Columnar formats keep every selected column; instrument_type tells consumers which apply
+            return WORDPRESS_STOCK_COLUMNS.response(
+                output, records, columns,
+                meta={'success': True, 'current_page': stocks_page.number, 'total_pages': paginator.num_pages,
+                      'total_stocks': paginator.count},
+                filename='stocks.csv',
             )
 
-            stock_data = {
-                'ticker': stock.ticker,
-                'symbol': stock.symbol or stock.ticker,
-                'company_name': stock.company_name or stock.name or stock.ticker,
-                'exchange': stock.exchange or 'N/A',
-                'instrument_type': instrument_type,
-                
-                # Price data (with better fallbacks)
-                'current_price': format_decimal_safe(stock.current_price) or 0.0,
-                'price_change_today': format_decimal_safe(stock.price_change_today) or 0.0,
-                'change_percent': format_decimal_safe(stock.change_percent) or 0.0,
-                
-                # Volume and market data
-                'volume': int(stock.volume) if stock.volume else 0,
-                'volume_today': int(stock.volume_today or stock.volume or 0),
-                'market_cap': mc_val,
-                'market_cap_formatted': market_cap_formatted,
-                
-                # Financial ratios
-                'pe_ratio': format_decimal_safe(stock.pe_ratio) or 0.0,
-                'dividend_yield': format_decimal_safe(stock.dividend_yield) or 0.0,
-                
-                # 52-week range
-                'week_52_high': format_decimal_safe(stock.week_52_high) or 0.0,
-                'week_52_low': format_decimal_safe(stock.week_52_low) or 0.0,
-                
-                # Timestamps
-                'last_updated': stock.last_updated.isoformat() if stock.last_updated else None,
-                'created_at': stock.created_at.isoformat() if stock.created_at else None,
-                
-                # WordPress-friendly display fields
-                'trend': price_trend,
-                'formatted_price': stock.formatted_price if hasattr(stock, 'formatted_price') else f"${stock.current_price:.2f}" if stock.current_price else "$0.00",
-                'formatted_change': stock.formatted_change if hasattr(stock, 'formatted_change') else f"{stock.change_percent:+.2f}%" if stock.change_percent else "0.00%",
-                'formatted_volume': stock.formatted_volume if hasattr(stock, 'formatted_volume') else f"{stock.volume:,}" if stock.volume else "0",
-                
-                # Status indicators
-                'is_gaining': (stock.change_percent or 0) > 0,
-                'is_losing': (stock.change_percent or 0) < 0,
-                'has_volume': bool(stock.volume and stock.volume > 0),
-                
-                # WordPress URL-friendly
-                'slug': stock.ticker.lower(),
-                'permalink': f"/stock/{stock.ticker.lower()}/",
-                'api_url': f"/api/stocks/{stock.ticker}/"
-            }
-            
-            # Omit non-applicable fields for instrument type
-            stocks_data.append(filter_fields_by_instrument(stock_data, instrument_type))
+        # Format data for WordPress, omitting non-applicable fields for each instrument type
+        stocks_data = WORDPRESS_STOCK_COLUMNS.rows(records, columns, row_filter=_filter_for_instrument)
 
         return JsonResponse({
             'success': True,
@@ -0,0 +1,95 @@
+"""
+Read/write classification of views, used for transactions and routing.
+
+Views are write views (one atomic transaction per request on every primary
+alias) or read views (autocommit, and routable to replicas). The default
+follows the HTTP method: GET, HEAD and OPTIONS are reads. Decorators
+override it for views that don't fit:
+
+    @read_only_view    # e.g. a POST that only computes results
+    @write_view        # e.g. a GET that writes several related rows
+
+``transaction.non_atomic_requests`` is still honoured: such views run in
+autocommit without being treated as reads.
+
+Each request also carries a routing state: once anything in it writes, the
+rest of the request (and, via a cookie set by the middleware, the client's
+next few requests) reads from the primary.
+"""
+import contextvars
+from contextlib import contextmanager
+
+READ, WRITE = 'read', 'write'
+READ_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+_read_only = contextvars.ContextVar('db_read_only', default=False)
+_routing = contextvars.ContextVar('db_routing', default=None)
+
+
+class RoutingState:
+    """Per-request routing facts: pinned to the primary, wrote, chosen replica."""
+
+    __slots__ = ('pinned', 'wrote', 'replica')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+def read_only_view(view):
+    view._db_access = READ
+    return view
+
+
+def write_view(view):
+    view._db_access = WRITE
+    return view
+
+
+def classify(request, view) -> str:
+    access = getattr(view, '_db_access', None)
+    if access is None:
+        # DRF function views expose the wrapped handler class
+        access = getattr(getattr(view, 'cls', None), '_db_access', None)
+    if access in (READ, WRITE):
+        return access
+    return READ if request.method in READ_METHODS else WRITE
+
+
+def is_read_only() -> bool:
+    """True while handling a read view; routers may then send reads to a replica."""
+    return _read_only.get()
+
+
+@contextmanager
+def read_only(enabled=True):
+    """Mark a block (e.g. a read-only task) as safe to serve from replicas."""
+    token = _read_only.set(enabled)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+def set_read_only(enabled):
+    return _read_only.set(enabled)
+
+
+def reset_read_only(token):
+    _read_only.reset(token)
+
+
+def begin_routing(pinned=False):
+    return _routing.set(RoutingState(pinned))
+
+
+def end_routing(token):
+    state = _routing.get()
+    _routing.reset(token)
+    return state
+
+
+def routing_state():
+    """The current request's RoutingState, or None outside a request."""
+    return _routing.get()
@@ -0,0 +1,289 @@
+"""
+Process-wide database connection pools, one per database alias.
+
+Used through the ``stockscanner_django.db_pool.mysql`` engine: Django's
+connect/close on each request (and each ingestion write) become a pool
+checkout/checkin, so TCP setup, authentication and ``init_command`` only run
+when the pool grows or replaces a connection.
+
+Per-alias settings live under ``DATABASES[alias]['POOL']``:
+
+- MIN_SIZE: idle connections kept open (and opened at startup)
+- MAX_SIZE: connections open at once; further checkouts wait
+- TIMEOUT: seconds a checkout waits before raising PoolTimeout
+- MAX_LIFETIME: seconds before a connection is replaced
+- IDLE_TIMEOUT: seconds an idle connection above MIN_SIZE is kept
+- PRE_PING: ping connections idle longer than PING_INTERVAL before handing them out
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MIN_SIZE': 2,
+    'MAX_SIZE': 20,
+    'TIMEOUT': 10.0,
+    'MAX_LIFETIME': 1800.0,
+    'IDLE_TIMEOUT': 300.0,
+    'PRE_PING': True,
+    'PING_INTERVAL': 30.0,
+}
+
+
+class PoolTimeout(Exception):
+    """No connection became available within TIMEOUT seconds."""
+
+
+class _Entry:
+    __slots__ = ('conn', 'created', 'last_used', 'owner')
+
+    def __init__(self, conn, now):
+        self.conn = conn
+        self.created = now
+        self.last_used = now
+        self.owner = None
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """Bounded LIFO pool of raw DB-API connections with lifetime and liveness checks."""
+
+    def __init__(self, alias, options=None):
+        self.alias = alias
+        opts = dict(DEFAULTS, **(options or {}))
+        self.min_size = int(opts['MIN_SIZE'])
+        self.max_size = max(1, int(opts['MAX_SIZE']))
+        self.timeout = float(opts['TIMEOUT'])
+        self.max_lifetime = float(opts['MAX_LIFETIME'])
+        self.idle_timeout = float(opts['IDLE_TIMEOUT'])
+        self.pre_ping = bool(opts['PRE_PING'])
+        self.ping_interval = float(opts['PING_INTERVAL'])
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._entries = {}  # id(conn) -> _Entry for every open connection
+        self._opening = 0
+        self.checkouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.ping_failures = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+    # ----- internals (call with the lock held) -----
+
+    def _size(self):
+        return len(self._entries) + self._opening
+
+    def _expired(self, entry, now):
+        return self.max_lifetime and now - entry.created >= self.max_lifetime
+
+    def _drop(self, entry):
+        self._entries.pop(id(entry.conn), None)
+        self.discarded += 1
+        return entry.conn
+
+    def _reap_idle(self, now):
+        """Detach idle connections past IDLE_TIMEOUT (above MIN_SIZE) or MAX_LIFETIME."""
+        stale = []
+        keep = deque()
+        while self._idle:
+            entry = self._idle.popleft()  # oldest first
+            too_idle = (self.idle_timeout and now - entry.last_used >= self.idle_timeout
+                        and len(self._idle) + len(keep) >= self.min_size)
+            if too_idle or self._expired(entry, now):
+                stale.append(self._drop(entry))
+            else:
+                keep.append(entry)
+        self._idle = keep
+        return stale
+
+    def _reclaim_orphans(self):
+        """Detach connections checked out by threads that exited without closing them."""
+        idle = {id(entry) for entry in self._idle}
+        orphans = [
+            entry for entry in self._entries.values()
+            if id(entry) not in idle and entry.owner is not None and not entry.owner.is_alive()
+        ]
+        if orphans:
+            logger.warning(f"Reclaiming {len(orphans)} '{self.alias}' connections from exited threads")
+        return [self._drop(entry) for entry in orphans]
+
+    # ----- public API -----
+
+    def acquire(self, connect):
+        """Check out a connection; ``connect()`` opens a new one when the pool may grow."""
+        started = time.monotonic()
+        waited = False
+        while True:
+            entry = None
+            stale = []
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    stale.extend(self._reap_idle(now))
+                    if self._idle:
+                        entry = self._idle.pop()  # most recently used stays warm
+                        break
+                    if self._size() >= self.max_size:
+                        stale.extend(self._reclaim_orphans())
+                    if self._size() < self.max_size:
+                        self._opening += 1
+                        break
+                    remaining = self.timeout - (now - started)
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        for conn in stale:
+                            _close_quietly(conn)
+                        raise PoolTimeout(
+                            f"No '{self.alias}' connection available after {self.timeout:.1f}s "
+                            f"({self.max_size} in use)"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+            for conn in stale:
+                _close_quietly(conn)
+
+            if entry is None:
+                conn = self._open(connect)
+                break
+            if self.pre_ping and time.monotonic() - entry.last_used >= self.ping_interval:
+                try:
+                    entry.conn.ping()
+                except Exception:
+                    with self._cond:
+                        self.ping_failures += 1
+                        self._drop(entry)
+                        self._cond.notify()
+                    _close_quietly(entry.conn)
+                    continue
+            conn = entry.conn
+            break
+
+        elapsed = time.monotonic() - started
+        with self._cond:
+            entry = self._entries.get(id(conn))
+            if entry is not None:
+                entry.owner = threading.current_thread()
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+                self.wait_seconds += elapsed
+                self.max_wait = max(self.max_wait, elapsed)
+        return conn
+
+    def _open(self, connect):
+        try:
+            conn = connect()
+        except Exception:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._opening -= 1
+            self._entries[id(conn)] = _Entry(conn, time.monotonic())
+            self.created += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        """Check a connection back in, or close it when ``discard`` or past its lifetime."""
+        with self._cond:
+            entry = self._entries.get(id(conn))
+            now = time.monotonic()
+            if entry is None:
+                # Opened before a fork or by another pool; not ours to keep
+                discard = True
+            elif discard or self._expired(entry, now) or not getattr(conn, 'open', True):
+                self._drop(entry)
+                discard = True
+            else:
+                entry.last_used = now
+                entry.owner = None
+                self._idle.append(entry)
+            self._cond.notify()
+        if discard:
+            _close_quietly(conn)
+
+    def warm(self, connect):
+        """Open connections up to MIN_SIZE."""
+        while True:
+            with self._cond:
+                if self._size() >= min(self.min_size, self.max_size):
+                    return
+                self._opening += 1
+            try:
+                conn = self._open(connect)
+            except Exception as e:
+                logger.warning(f"Could not pre-open '{self.alias}' connection: {e}")
+                return
+            self.release(conn)
+
+    def close_all(self):
+        with self._cond:
+            idle = [self._drop(entry) for entry in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            _close_quietly(conn)
+
+    def stats(self):
+        with self._cond:
+            size = len(self._entries)
+            idle = len(self._idle)
+            return {
+                'size': size,
+                'idle': idle,
+                'in_use': size - idle,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'checkouts': self.checkouts,
+                'created': self.created,
+                'discarded': self.discarded,
+                'ping_failures': self.ping_failures,
+                'waits': self.waits,
+                'wait_seconds_total': round(self.wait_seconds, 4),
+                'max_wait_seconds': round(self.max_wait, 4),
+                'timeouts': self.timeouts,
+            }
+
+
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, options=None):
+    """The pool for ``alias`` in this process (forked children start with empty pools)."""
+    global _pools, _pools_pid
+    pid = os.getpid()
+    pool = _pools.get(alias) if _pools_pid == pid else None
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        if _pools_pid != pid:
+            # Inherited sockets belong to the parent; closing them would end its sessions
+            _pools, _pools_pid = {}, pid
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = ConnectionPool(alias, options)
+    return pool
+
+
+def pool_stats():
+    """Stats for every pool in this process, by alias."""
+    if _pools_pid != os.getpid():
+        return {}
+    return {alias: pool.stats() for alias, pool in list(_pools.items())}
@@ -0,0 +1,39 @@
+"""
+MySQL backend whose connections come from the process-wide pool.
+
+Django still "connects" and "closes" per request (CONN_MAX_AGE = 0), but those
+are checkouts and checkins. Connections closed inside a transaction, or after
+an error that left them unusable, are discarded instead of returned.
+"""
+import threading
+
+from django.db.backends.mysql import base as mysql_base
+
+from stockscanner_django.db_pool import get_pool
+
+
+class DatabaseWrapper(mysql_base.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict.get('POOL'))
+
+    def get_new_connection(self, conn_params):
+        connect = lambda: super(DatabaseWrapper, self).get_new_connection(conn_params)
+        pool = self.pool
+        if pool.min_size and not pool.created:
+            threading.Thread(target=pool.warm, args=(connect,), name=f'db-pool-warm-{self.alias}', daemon=True).start()
+        return pool.acquire(connect)
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # A connection still referenced by an open atomic block can't be shared
+        discard = self.in_atomic_block or (self.errors_occurred and not self.is_usable())
+        if not discard and not self.get_autocommit():
+            try:
+                self.connection.rollback()
+            except Exception:
+                discard = True
+        with self.wrap_database_errors:
+            self.pool.release(self.connection, discard=discard)
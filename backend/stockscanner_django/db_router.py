@@ -1,23 +1,224 @@
+"""
+Primary/replica routing.
+
+Writes for ``stocks``/``news`` go to the 'stocks' alias when configured, and
+everything else to 'default'. Replicas are extra aliases in DATABASES with
+``REPLICA_OF`` naming their primary:
+
+- WEIGHT: relative share of reads (default 1)
+- MAX_LAG_SECONDS: replicas further behind are skipped (default REPLICA_MAX_LAG)
+
+Reads go to a replica only while ``db_access.is_read_only()`` (read views and
+``read_only()`` blocks), outside transactions on the primary, and when the
+request isn't pinned to the primary because it, or the same client a moment
+ago, wrote. A request keeps the replica it first picked so its reads are
+consistent with each other. Lag is probed in the background every
+REPLICA_LAG_CHECK_INTERVAL seconds; until the first probe answers, or when it
+fails, the replica gets no traffic.
+"""
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from stockscanner_django.db_access import is_read_only, routing_state
+
+logger = logging.getLogger(__name__)
+
+REPLICA_MAX_LAG = float(getattr(settings, 'DB_REPLICA_MAX_LAG', 5))
+REPLICA_LAG_CHECK_INTERVAL = float(getattr(settings, 'DB_REPLICA_LAG_CHECK_INTERVAL', 5))
+# A probe that hasn't answered by then is assumed lost and may be retried
+_PROBE_STALE_AFTER = 30.0
+
+
+class _Metrics:
+    """Per-alias routing decisions and query counts/time for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: defaultdict(float))
+
+    def add(self, alias, **values):
+        with self._lock:
+            counts = self._counts[alias]
+            for key, value in values.items():
+                counts[key] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                alias: {key: (round(value, 4) if key == 'query_seconds' else int(value))
+                        for key, value in counts.items()}
+                for alias, counts in self._counts.items()
+            }
+
+
+metrics = _Metrics()
+
+
+class _QueryMeter:
+    """execute_wrapper counting queries, time and errors per alias."""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        except Exception:
+            metrics.add(self.alias, query_errors=1)
+            raise
+        finally:
+            metrics.add(self.alias, queries=1, query_seconds=time.perf_counter() - started)
+
+
+def _install_meter(sender, connection, **kwargs):
+    # The wrapper object outlives its (pooled) DB-API connections; meter it once
+    if not any(isinstance(w, _QueryMeter) for w in connection.execute_wrappers):
+        connection.execute_wrappers.append(_QueryMeter(connection.alias))
+
+
+connection_created.connect(_install_meter, dispatch_uid='db_router_query_meter')
+
+
+def _fetch_lag(alias):
+    """Seconds behind the source, or None when replication isn't running."""
+    with connections[alias].cursor() as cursor:
+        try:
+            cursor.execute('SHOW REPLICA STATUS')
+        except Exception:
+            # MySQL < 8.0.22
+            cursor.execute('SHOW SLAVE STATUS')
+        row = cursor.fetchone()
+        if row is None:
+            # Not configured as a replica (e.g. an alias for the primary itself)
+            return 0.0
+        status = dict(zip([col[0] for col in cursor.description], row))
+    lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+    return None if lag is None else float(lag)
+
+
+class _LagMonitor:
+    """Cached replica lag, refreshed by short-lived background probes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lag = {}
+        self._checked = {}
+        self._probing = {}
+
+    def lag(self, alias):
+        """Last known lag (None when unknown or replication is broken), refreshing it when due."""
+        now = time.monotonic()
+        with self._lock:
+            due = now - self._checked.get(alias, float('-inf')) >= REPLICA_LAG_CHECK_INTERVAL
+            idle = now - self._probing.get(alias, float('-inf')) >= _PROBE_STALE_AFTER
+            if due and idle:
+                self._probing[alias] = now
+                threading.Thread(target=self._probe, args=(alias,), name=f'db-lag-{alias}', daemon=True).start()
+            return self._lag.get(alias)
+
+    def _probe(self, alias):
+        try:
+            lag = _fetch_lag(alias)
+        except Exception as e:
+            logger.warning(f"Replica lag probe on '{alias}' failed: {e}")
+            lag = None
+        finally:
+            # Hand the probe's connection back to the pool
+            connections[alias].close()
+        with self._lock:
+            self._lag[alias] = lag
+            self._checked[alias] = time.monotonic()
+            self._probing.pop(alias, None)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._lag)
+
+
+lag_monitor = _LagMonitor()
+
+
 class StocksRouter:
-    """Route read/write for stock-related apps to the 'stocks' database when configured."""
+    """Route stock-related apps to the 'stocks' database when configured, and reads to replicas."""
 
     app_label_for_stocks = { 'news', 'stocks' }
 
-    def db_for_read(self, model, **hints):
+    def __init__(self):
+        databases = connections.settings
+        self.stocks_alias = 'stocks' if 'stocks' in databases else 'default'
+        self.replicas = defaultdict(list)  # primary alias -> [(alias, weight, max_lag)]
+        for alias, conf in databases.items():
+            primary = conf.get('REPLICA_OF')
+            if not primary:
+                continue
+            weight = float(conf.get('WEIGHT', 1))
+            if weight > 0:
+                self.replicas[primary].append((alias, weight, float(conf.get('MAX_LAG_SECONDS', REPLICA_MAX_LAG))))
+
+    def _primary(self, model):
         if model._meta.app_label in self.app_label_for_stocks:
-            return 'stocks'
-        return None
+            return self.stocks_alias
+        return 'default'
+
+    def _pick_replica(self, primary, state):
+        healthy = []
+        for alias, weight, max_lag in self.replicas[primary]:
+            lag = lag_monitor.lag(alias)
+            if lag is not None and lag <= max_lag:
+                healthy.append((alias, weight))
+        if not healthy:
+            return None
+        if state is not None and state.replica is not None:
+            for alias, _ in healthy:
+                if alias == state.replica:
+                    return alias
+        alias = random.choices([a for a, _ in healthy], weights=[w for _, w in healthy])[0]
+        if state is not None:
+            state.replica = alias
+        return alias
+
+    def db_for_read(self, model, **hints):
+        primary = self._primary(model)
+        alias = primary
+        if self.replicas.get(primary) and is_read_only():
+            state = routing_state()
+            # Reads inside a transaction must see that transaction's writes
+            if not (state is not None and state.pinned) and not connections[primary].in_atomic_block:
+                alias = self._pick_replica(primary, state) or primary
+        metrics.add(alias, reads=1)
+        return alias
 
     def db_for_write(self, model, **hints):
-        if model._meta.app_label in self.app_label_for_stocks:
-            return 'stocks'
-        return None
+        primary = self._primary(model)
+        state = routing_state()
+        if state is not None:
+            state.wrote = True
+            state.pinned = True
+        metrics.add(primary, writes=1)
+        return primary
 
     def allow_relation(self, obj1, obj2, **hints):
         return True
 
     def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if connections.settings[db].get('REPLICA_OF'):
+            return False
         if app_label in self.app_label_for_stocks:
-            return db == 'stocks'
+            return db == self.stocks_alias
         return db == 'default'
 
+
+def router_stats():
+    """Per-alias routing/query counters and replica lag for this process."""
+    stats = metrics.snapshot()
+    for alias, lag in lag_monitor.snapshot().items():
+        stats.setdefault(alias, {})['replica_lag_seconds'] = lag
+    return stats
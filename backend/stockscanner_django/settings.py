@@ -73,6 +73,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'stocks.middleware_metrics.RequestMetricsMiddleware',  # Per-route latency/DB/outbound histograms (keep first)
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Third-party CORS as high as possible
@@ -83,13 +84,14 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',  # Ensure request.user exists before rate limiting
+    'stocks.auth_cache.CachedAuthenticationMiddleware',  # request.user from the cached principal, before rate limiting
     'stocks.plan_middleware.PlanLimitMiddleware',  # Plan limits and API call tracking
     'stocks.plan_middleware.PlanFeatureMiddleware',  # Feature access control
     'stocks.rate_limit_middleware.APIKeyAuthenticationMiddleware',  # API key auth for backend services
     'stocks.rate_limit_middleware.RateLimitMiddleware',  # Rate limiting with free endpoint whitelist
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'stocks.middleware_transactions.TransactionRoutingMiddleware',  # Atomic write views, autocommit reads (keep last)
 ]
 
 ROOT_URLCONF = 'stockscanner_django.urls'
@@ -135,16 +137,32 @@ except Exception:
 Single-database configuration for local MySQL (root, no password).
 To use: ensure MySQL is running locally and database 'stockscanner' exists.
 """
+# Pooled MySQL backend (stockscanner_django.db_pool): Django's per-request
+# connect/close become pool checkouts, so CONN_MAX_AGE stays 0. Set
+# DB_POOL=false to fall back to the stock backend.
+DB_POOL_ENABLED = os.environ.get('DB_POOL', 'true').lower() == 'true'
+DB_POOL = {
+    'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+    'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', '20')),
+    'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+    'MAX_LIFETIME': float(os.environ.get('DB_POOL_MAX_LIFETIME', '1800')),
+    'IDLE_TIMEOUT': float(os.environ.get('DB_POOL_IDLE_TIMEOUT', '300')),
+    'PRE_PING': os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true',
+    'PING_INTERVAL': float(os.environ.get('DB_POOL_PING_INTERVAL', '30')),
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'stockscanner_django.db_pool.mysql' if DB_POOL_ENABLED else 'django.db.backends.mysql',
         'NAME': os.environ.get('DB_NAME', 'stockscanner'),
         'USER': os.environ.get('DB_USER', 'root'),
         'PASSWORD': os.environ.get('DB_PASSWORD', ''),
         'HOST': os.environ.get('DB_HOST', '127.0.0.1'),
         'PORT': os.environ.get('DB_PORT', '3306'),
         'CONN_MAX_AGE': 0,
-        'ATOMIC_REQUESTS': True,
+        # Write views get their transaction from TransactionRoutingMiddleware
+        'ATOMIC_REQUESTS': False,
+        'POOL': DB_POOL,
         'OPTIONS': {
             'charset': 'utf8mb4',
             'use_unicode': True,
@@ -154,7 +172,27 @@ DATABASES = {
     }
 }
 
-# No database routers in single-DB mode
+# Read replicas of 'default': DB_REPLICA_HOSTS="host[:port],..." with optional
+# DB_REPLICA_WEIGHTS="2,1". Read views use a replica within
+# DB_REPLICA_MAX_LAG seconds of the primary; clients that just wrote stay on
+# the primary for DB_PRIMARY_PIN_SECONDS (see stockscanner_django.db_router).
+DB_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', '5'))
+DB_REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('DB_REPLICA_LAG_CHECK_INTERVAL', '5'))
+DB_PRIMARY_PIN_SECONDS = int(os.environ.get('DB_PRIMARY_PIN_SECONDS', '10'))
+_replica_hosts = [h.strip() for h in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if h.strip()]
+_replica_weights = [w.strip() for w in os.environ.get('DB_REPLICA_WEIGHTS', '').split(',') if w.strip()]
+for _i, _host in enumerate(_replica_hosts):
+    _name, _, _port = _host.partition(':')
+    DATABASES[f'replica_{_i + 1}'] = {
+        **DATABASES['default'],
+        'HOST': _name,
+        'PORT': _port or DATABASES['default']['PORT'],
+        'REPLICA_OF': 'default',
+        'WEIGHT': float(_replica_weights[_i]) if _i < len(_replica_weights) else 1.0,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['stockscanner_django.db_router.StocksRouter']
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -292,6 +330,7 @@ REST_FRAMEWORK = {
         'anon': '100/hour',
         'user': '1000/hour',
         'burst': '60/minute',
+        'analytics_track': os.environ.get('ANALYTICS_TRACK_RATE', '60/minute'),
     }
 }
 
@@ -301,9 +340,48 @@ CACHES = {
         'LOCATION': 'stock-scanner-cache',
     }
 }
+# Optional cache shared by all workers (needs the redis package)
+REDIS_CACHE_URL = os.environ.get('REDIS_CACHE_URL', '')
+if REDIS_CACHE_URL:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_CACHE_URL,
+    }
+# Whether every worker sees the same cache. Caches that must agree across
+# workers (sessions, auth principals) are only used when this is true.
+CACHE_SHARED = CACHES['default']['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Metrics (utils.metrics): each process writes snapshots to METRICS_DIR
+# (default logs/metrics) so /metrics sums all workers and scanner runs.
+# /metrics answers "Authorization: Bearer <METRICS_TOKEN>", staff sessions and
+# METRICS_ALLOWED_IPS (empty by default). Loopback entries are ignored while
+# SECURE_PROXY_SSL_HEADER is set: behind the tunnel every client is loopback.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [
+    ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip.strip()
+]
+
+# Per-route circuit breaker (stocks.middleware_error.CircuitBreakerMiddleware).
+# SHARED publishes open circuits through the cache; enable it with a cache
+# backend that is shared between workers.
+CIRCUIT_BREAKER = {
+    'FAILURE_THRESHOLD': int(os.environ.get('CIRCUIT_BREAKER_FAILURES', '5')),
+    'OPEN_SECONDS': int(os.environ.get('CIRCUIT_BREAKER_OPEN_SECONDS', '60')),
+    'LATENCY_P95_MS': int(os.environ.get('CIRCUIT_BREAKER_P95_MS', '8000')),
+    'SHARED': os.environ.get('CIRCUIT_BREAKER_SHARED', 'false').lower() == 'true',
+}
 
-# Sessions in DB (avoid Redis)
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# Sessions in DB, read through the cache only when the cache is shared: a
+# per-process cache would keep serving a session after logout elsewhere.
+# Unmodified sessions are never re-saved (SESSION_SAVE_EVERY_REQUEST stays False)
+SESSION_ENGINE = (
+    'django.contrib.sessions.backends.cached_db' if CACHE_SHARED
+    else 'django.contrib.sessions.backends.db'
+)
+SESSION_SAVE_EVERY_REQUEST = False
 
 # Celery Configuration (using database broker instead of Redis)
 CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'db+sqlite:///celery.db')
@@ -27,7 +27,7 @@ MIDDLEWARE = [
 ]
 # Inject test user middleware immediately after auth middleware
 try:
-    _auth_index = MIDDLEWARE.index('django.contrib.auth.middleware.AuthenticationMiddleware')
+    _auth_index = MIDDLEWARE.index('stocks.auth_cache.CachedAuthenticationMiddleware')
     MIDDLEWARE.insert(_auth_index + 1, 'stocks.testing_middleware.TestUserMiddleware')
 except ValueError:
     MIDDLEWARE.insert(0, 'stocks.testing_middleware.TestUserMiddleware')
@@ -2,10 +2,12 @@ from django.contrib import admin
 from django.urls import path, include
 from core.views import homepage, health_check
 from django.views.generic import TemplateView
+from stocks.views_health import metrics_view
 
 urlpatterns = [
     path('', homepage, name='homepage'),
     path('health/', health_check, name='health_check'),
+    path('metrics', metrics_view, name='metrics'),
     path('admin/', admin.site.urls),
     path('api/', include('stocks.urls')),
     path('api/billing/', include('billing.urls')),
@@ -0,0 +1,58 @@
+from decimal import Decimal
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from stock_retrieval.columnar_transform import history_changes, quotes_to_rows
+
+
+class QuotesToRowsTests(SimpleTestCase):
+    def test_coalesces_derives_and_types_columns(self):
+        rows = quotes_to_rows([
+            {
+                'symbol': 'aapl', 'longName': 'Apple Inc.', 'fullExchangeName': 'NasdaqGS',
+                'regularMarketPrice': 110.123456, 'regularMarketPreviousClose': 100,
+                'regularMarketVolume': 2000, 'threeMonthAverageVolume': 0, 'tenDayAverageVolume': 1000,
+                'sharesOutstanding': 10, 'epsTrailingTwelveMonths': 11, 'bid': 110, 'ask': 110.5,
+                'trailingAnnualDividendYield': 0.02,
+            },
+            {'symbol': 'EMPTY', 'regularMarketPrice': 'n/a', 'marketCap': float('inf')},
+        ])
+        aapl, empty = rows
+        self.assertEqual((aapl['ticker'], aapl['company_name'], aapl['exchange']), ('AAPL', 'Apple Inc.', 'NasdaqGS'))
+        self.assertEqual(aapl['current_price'], Decimal('110.1235'))
+        self.assertEqual(aapl['price_change_today'], Decimal('10.1235'))
+        self.assertEqual(aapl['change_percent'], Decimal('10.1235'))
+        # Zero three-month average falls through to the ten-day one
+        self.assertEqual(aapl['avg_volume_3mon'], 1000)
+        self.assertEqual(aapl['dvav'], Decimal('2.0000'))
+        self.assertEqual(aapl['market_cap'], 1101)
+        self.assertEqual(aapl['pe_ratio'], Decimal('10.011223'))
+        self.assertEqual(aapl['dividend_yield'], Decimal('2.000000'))
+        self.assertEqual(aapl['bid_ask_spread'], '110.00 - 110.50')
+        self.assertIsInstance(aapl['volume'], int)
+
+        self.assertEqual(empty['exchange'], 'NASDAQ')
+        self.assertIsNone(empty['current_price'])
+        self.assertIsNone(empty['market_cap'])
+        self.assertEqual(empty['days_range'], '')
+
+    def test_values_too_large_for_their_column_become_null(self):
+        row = quotes_to_rows([{'symbol': 'BIG', 'regularMarketPrice': 1, 'priceToBook': 1e6, 'marketCap': 1e19}])[0]
+        self.assertIsNone(row['price_to_book'])
+        self.assertIsNone(row['market_cap'])
+
+    def test_empty_batch(self):
+        self.assertEqual(quotes_to_rows([]), [])
+
+
+class HistoryChangesTests(SimpleTestCase):
+    def test_lagged_deltas_per_frame(self):
+        closes = pd.DataFrame({'Close': [float(v) for v in range(1, 11)]})
+        latest, changes = history_changes([closes, None, pd.DataFrame()])
+        self.assertEqual(latest[0], 10.0)
+        self.assertEqual(changes['price_change_today'][0], 1.0)
+        self.assertEqual(changes['price_change_week'][0], 5.0)
+        self.assertAlmostEqual(changes['change_percent'][0], 100 / 9)
+        self.assertTrue(pd.isna(changes['price_change_month'][0]))
+        self.assertTrue(pd.isna(latest[1]) and pd.isna(latest[2]))
@@ -0,0 +1,148 @@
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from stockscanner_django import db_pool
+from stockscanner_django.db_pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.open = True
+        self.closed = False
+        self.pings = 0
+        self.ping_error = None
+
+    def ping(self):
+        self.pings += 1
+        if self.ping_error:
+            raise self.ping_error
+
+    def close(self):
+        self.closed = True
+        self.open = False
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.tick = 0.0
+
+    def monotonic(self):
+        self.now += self.tick
+        return self.now
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(db_pool, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.opened = []
+
+    def connect(self):
+        conn = FakeConnection()
+        self.opened.append(conn)
+        return conn
+
+    def pool(self, **options):
+        return ConnectionPool('default', dict({'MIN_SIZE': 0, 'MAX_SIZE': 2, 'TIMEOUT': 0.05}, **options))
+
+    def test_released_connections_are_reused(self):
+        pool = self.pool()
+        first = pool.acquire(self.connect)
+        pool.release(first)
+        self.assertIs(pool.acquire(self.connect), first)
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(pool.stats()['checkouts'], 2)
+
+    def test_checkout_times_out_when_the_pool_is_full(self):
+        pool = self.pool()
+        pool.acquire(self.connect)
+        pool.acquire(self.connect)
+        self.clock.tick = 0.01
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(self.connect)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiting_checkout_gets_the_released_connection(self):
+        pool = self.pool(MAX_SIZE=1, TIMEOUT=5)
+        held = pool.acquire(self.connect)
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(pool.acquire(self.connect)))
+        waiter.start()
+        while not pool._cond._waiters:
+            pass
+        pool.release(held)
+        waiter.join(5)
+        self.assertEqual(got, [held])
+        self.assertEqual(pool.stats()['waits'], 1)
+
+    def test_discarded_and_expired_connections_are_closed(self):
+        pool = self.pool(MAX_LIFETIME=60)
+        broken = pool.acquire(self.connect)
+        pool.release(broken, discard=True)
+        self.assertTrue(broken.closed)
+        old = pool.acquire(self.connect)
+        self.clock.now += 61
+        pool.release(old)
+        self.assertTrue(old.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_failed_ping_replaces_the_connection(self):
+        pool = self.pool(PING_INTERVAL=30)
+        conn = pool.acquire(self.connect)
+        pool.release(conn)
+        self.clock.now += 10
+        self.assertIs(pool.acquire(self.connect), conn)
+        self.assertEqual(conn.pings, 0)
+        pool.release(conn)
+        self.clock.now += 31
+        conn.ping_error = OSError('gone away')
+        fresh = pool.acquire(self.connect)
+        self.assertIsNot(fresh, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['ping_failures'], 1)
+
+    def test_idle_connections_above_min_size_are_reaped(self):
+        pool = self.pool(MIN_SIZE=1, IDLE_TIMEOUT=100)
+        a, b = pool.acquire(self.connect), pool.acquire(self.connect)
+        pool.release(a)
+        pool.release(b)
+        self.clock.now += 101
+        self.assertIs(pool.acquire(self.connect), b)
+        self.assertTrue(a.closed)
+        self.assertFalse(b.closed)
+
+    def test_connections_of_exited_threads_are_reclaimed(self):
+        pool = self.pool(MAX_SIZE=1)
+        worker = threading.Thread(target=pool.acquire, args=(self.connect,))
+        worker.start()
+        worker.join()
+        with self.assertLogs('stockscanner_django.db_pool', 'WARNING'):
+            conn = pool.acquire(self.connect)
+        self.assertTrue(self.opened[0].closed)
+        self.assertIs(conn, self.opened[1])
+
+    def test_warm_opens_min_size(self):
+        pool = self.pool(MIN_SIZE=2, MAX_SIZE=5)
+        pool.warm(self.connect)
+        self.assertEqual(pool.stats()['idle'], 2)
+
+
+class GetPoolTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.multiple(db_pool, _pools={}, _pools_pid=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_one_pool_per_alias_and_fresh_pools_after_fork(self):
+        pool = db_pool.get_pool('default', {'MAX_SIZE': 3})
+        self.assertIs(db_pool.get_pool('default'), pool)
+        self.assertIsNot(db_pool.get_pool('replica'), pool)
+        self.assertEqual(set(db_pool.pool_stats()), {'default', 'replica'})
+        with mock.patch.object(db_pool.os, 'getpid', return_value=-1):
+            self.assertEqual(db_pool.pool_stats(), {})
+            self.assertIsNot(db_pool.get_pool('default'), pool)
@@ -0,0 +1,62 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from stocks.models import Stock
+from stockscanner_django import db_router
+from stockscanner_django.db_access import begin_routing, end_routing, read_only, routing_state
+from stockscanner_django.db_router import StocksRouter
+
+
+class StocksRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = StocksRouter()
+        self.router.replicas = {'default': [('replica1', 1.0, 5.0), ('replica2', 1.0, 5.0)]}
+        self.lag = {'replica1': 0.5, 'replica2': 0.5}
+        patcher = mock.patch.object(db_router.lag_monitor, 'lag', side_effect=lambda alias: self.lag[alias])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        token = begin_routing()
+        self.addCleanup(end_routing, token)
+
+    def test_reads_stay_on_the_primary_outside_read_only_blocks(self):
+        self.assertEqual(self.router.db_for_read(Stock), 'default')
+
+    def test_read_only_reads_stick_to_one_healthy_replica(self):
+        with read_only():
+            first = self.router.db_for_read(Stock)
+            self.assertIn(first, ('replica1', 'replica2'))
+            self.assertEqual({self.router.db_for_read(Stock) for _ in range(20)}, {first})
+
+    def test_lagging_or_unknown_replicas_are_skipped(self):
+        self.lag.update(replica1=None, replica2=30.0)
+        with read_only():
+            self.assertEqual(self.router.db_for_read(Stock), 'default')
+        self.lag['replica2'] = 1.0
+        with read_only():
+            self.assertEqual(self.router.db_for_read(Stock), 'replica2')
+
+    def test_a_write_pins_later_reads_to_the_primary(self):
+        with read_only():
+            self.assertNotEqual(self.router.db_for_read(Stock), 'default')
+            self.assertEqual(self.router.db_for_write(Stock), 'default')
+            self.assertTrue(routing_state().wrote)
+            self.assertEqual(self.router.db_for_read(Stock), 'default')
+
+    def test_pinned_requests_read_from_the_primary(self):
+        token = begin_routing(pinned=True)
+        try:
+            with read_only():
+                self.assertEqual(self.router.db_for_read(Stock), 'default')
+        finally:
+            end_routing(token)
+
+
+class RouterTransactionTests(TestCase):
+    def test_reads_inside_a_transaction_use_the_primary(self):
+        router = StocksRouter()
+        router.replicas = {'default': [('replica1', 1.0, 5.0)]}
+        self.assertTrue(connection.in_atomic_block)
+        with mock.patch.object(db_router.lag_monitor, 'lag', return_value=0.0), read_only():
+            self.assertEqual(router.db_for_read(Stock), 'default')
@@ -0,0 +1,53 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from stock_retrieval.delta_writer import StockDeltaWriter, stock_changes_applied
+from stocks.models import Stock
+
+
+class StockDeltaWriterTests(TestCase):
+    def setUp(self):
+        self.writer = StockDeltaWriter(batch_size=2)
+        self.sent = []
+        stock_changes_applied.connect(self.record, dispatch_uid='tests.delta_writer')
+        self.addCleanup(stock_changes_applied.disconnect, dispatch_uid='tests.delta_writer')
+
+    def record(self, sender, change_set, **kwargs):
+        self.sent.append(change_set)
+
+    def test_creates_then_writes_only_moved_columns(self):
+        change_set = self.writer.write({'AAPL': {'current_price': 10, 'volume': 5}})
+        self.assertEqual(change_set.created, ['AAPL'])
+        change_set = self.writer.write({'AAPL': {'current_price': 11, 'volume': 5}})
+        self.assertEqual(change_set.updated, ['AAPL'])
+        self.assertEqual(set(change_set.changes['AAPL'].fields), {'current_price'})
+        self.assertEqual(change_set.changes['AAPL'].previous, {'current_price': Decimal('10.00')})
+        self.assertEqual(Stock.objects.get(ticker='AAPL').current_price, Decimal('11.00'))
+
+    def test_unchanged_rows_are_skipped(self):
+        self.writer.write({'AAPL': {'current_price': 10}})
+        change_set = self.writer.write({'AAPL': {'current_price': '10.00'}})
+        self.assertEqual(len(change_set), 0)
+        self.assertEqual(change_set.unchanged, 1)
+        self.assertEqual(len(self.sent), 1)
+
+    def test_edits_made_elsewhere_are_seen_on_the_next_run(self):
+        self.writer.write({'AAPL': {'current_price': 10}})
+        Stock.objects.filter(ticker='AAPL').update(current_price=Decimal('12'))
+        change_set = self.writer.write({'AAPL': {'current_price': 10}})
+        self.assertEqual(change_set.updated, ['AAPL'])
+        self.assertEqual(Stock.objects.get(ticker='AAPL').current_price, Decimal('10.00'))
+
+    def test_rows_deleted_elsewhere_are_recreated(self):
+        self.writer.write({'AAPL': {'current_price': 10}})
+        Stock.objects.filter(ticker='AAPL').delete()
+        change_set = self.writer.write({'AAPL': {'current_price': 10}})
+        self.assertEqual(change_set.created, ['AAPL'])
+        self.assertTrue(Stock.objects.filter(ticker='AAPL').exists())
+
+    def test_skip_empty_keeps_stored_values(self):
+        self.writer.write({'AAPL': {'current_price': 10, 'exchange': 'NYSE'}})
+        change_set = self.writer.write({'AAPL': {'current_price': None, 'exchange': ''}}, skip_empty=True)
+        self.assertEqual(len(change_set), 0)
+        self.assertEqual(Stock.objects.get(ticker='AAPL').exchange, 'NYSE')
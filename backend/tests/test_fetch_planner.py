@@ -0,0 +1,48 @@
+from django.test import SimpleTestCase
+
+from fast_stock_scanner import FetchTier, TieredFetchPlanner
+
+REQUIRED = ('current_price', 'volume', 'market_cap')
+
+
+class TieredFetchPlannerTests(SimpleTestCase):
+    def setUp(self):
+        self.calls = []
+
+    def tier(self, name, cost, supplies, results, requires=()):
+        def fetch(symbols, payloads):
+            self.calls.append((name, list(symbols)))
+            return {sym: dict(results[sym]) for sym in symbols if sym in results}
+        return FetchTier(name=name, cost=cost, supplies=frozenset(supplies), fetch=fetch, requires=frozenset(requires))
+
+    def test_only_gaps_reach_the_expensive_tier(self):
+        quote = self.tier('quote', 0.01, REQUIRED, {
+            'AAPL': {'current_price': 1, 'volume': 2, 'market_cap': 3},
+            'MSFT': {'current_price': 1, 'volume': 2},
+        })
+        deep = self.tier('deep', 3.0, REQUIRED, {'MSFT': {'market_cap': 9, 'volume': 0}, 'NVDA': {'current_price': 5}})
+        planner = TieredFetchPlanner([deep, quote], REQUIRED)
+        payloads = planner.run(['AAPL', 'MSFT', 'NVDA'])
+        self.assertEqual(self.calls, [('quote', ['AAPL', 'MSFT', 'NVDA']), ('deep', ['MSFT', 'NVDA'])])
+        # Deep results only fill gaps, never overwrite quote values
+        self.assertEqual(payloads['MSFT'], {'current_price': 1, 'volume': 2, 'market_cap': 9})
+        report = planner.report()
+        self.assertEqual((report['quote']['routed'], report['quote']['hits']), (3, 2))
+        self.assertEqual((report['deep']['routed'], report['deep']['hits'], report['deep']['fields_filled']), (2, 2, 2))
+
+    def test_tiers_are_skipped_when_they_cannot_help(self):
+        quote = self.tier('quote', 0.01, REQUIRED, {'AAPL': {'current_price': 1, 'volume': 2}})
+        caps = self.tier('caps', 1.0, {'market_cap'}, {'AAPL': {'market_cap': 3}}, requires={'current_price'})
+        planner = TieredFetchPlanner([quote, caps], REQUIRED, excluded={'DEAD'})
+        planner.run(['AAPL', 'NOPE', 'DEAD'])
+        # NOPE still lacks current_price, which caps requires; DEAD is never routed
+        self.assertEqual(self.calls, [('quote', ['AAPL', 'NOPE']), ('caps', ['AAPL'])])
+
+    def test_a_failing_tier_does_not_stop_the_plan(self):
+        def broken(symbols, payloads):
+            raise RuntimeError('down')
+        quote = FetchTier(name='quote', cost=0.01, supplies=frozenset(REQUIRED), fetch=broken)
+        deep = self.tier('deep', 3.0, REQUIRED, {'AAPL': {'current_price': 1, 'volume': 2, 'market_cap': 3}})
+        with self.assertLogs('fast_stock_scanner', 'ERROR'):
+            payloads = TieredFetchPlanner([quote, deep], REQUIRED).run(['AAPL'])
+        self.assertEqual(payloads['AAPL']['market_cap'], 3)
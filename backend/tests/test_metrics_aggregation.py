@@ -0,0 +1,68 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from utils import metrics
+
+DEAD_PID = 99999999
+
+
+class MetricsAggregationTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        patcher = mock.patch.object(metrics, 'METRICS_DIR', self.dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.registry = metrics.Registry()
+        self.requests = self.registry.counter('test_requests_total', 'Requests', ['route'])
+
+    def _peer(self, pid, value, age=0):
+        path = os.path.join(self.dir, f'metrics-{pid}.json')
+        family = dict(self.requests.describe(), samples=[[['home'], value]])
+        with open(path, 'w') as fh:
+            json.dump({'test_requests_total': family}, fh)
+        if age:
+            stamp = time.time() - age
+            os.utime(path, (stamp, stamp))
+        return path
+
+    def _total(self):
+        samples = self.registry.collect()['test_requests_total']['samples']
+        return sum(sample[1] for sample in samples)
+
+    def test_collect_sums_peer_snapshots(self):
+        self.requests.inc('home', amount=2)
+        self._peer(DEAD_PID, 5)
+        self.assertEqual(self._total(), 7)
+
+    def test_retired_process_counts_stay_in_the_aggregate(self):
+        self.requests.inc('home', amount=2)
+        path = self._peer(DEAD_PID, 5, age=metrics.RETENTION + 60)
+        before = self._total()
+
+        self.assertEqual(self.registry.prune(), 1)
+
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self._total(), before)
+
+    def test_prune_keeps_recent_snapshots(self):
+        path = self._peer(DEAD_PID, 5)
+        self.assertEqual(self.registry.prune(), 0)
+        self.assertTrue(os.path.exists(path))
+
+    def test_first_flush_retires_a_stale_file_under_our_pid(self):
+        self._peer(os.getpid(), 3)
+        self.requests.inc('home')
+
+        self.registry.flush()
+
+        with open(os.path.join(self.dir, metrics.RETIRED_FILE)) as fh:
+            retired = json.load(fh)
+        self.assertEqual(retired['test_requests_total']['samples'], [[['home'], 3]])
+        self.assertEqual(self._total(), 4)
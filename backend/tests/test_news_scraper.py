@@ -0,0 +1,80 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from news.models import FeedState, NewsArticle
+from news import scraper as scraper_module
+from news.scraper import YahooFinanceNewsScraper
+
+FEED = 'https://feeds.example.com/rss'
+OTHER = 'https://other.example.com/rss'
+
+
+def rss(*items):
+    body = ''.join(
+        f'<item><title>{title}</title><link>{link}</link><description>AAPL beats estimates</description>'
+        f'<pubDate>Mon, 02 Mar 2026 14:00:00 GMT</pubDate></item>'
+        for title, link in items
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>{body}</channel></rss>'.encode()
+
+
+class FakeResponse:
+    def __init__(self, status, content=b'', headers=None):
+        self.status_code = status
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+class ScraperTests(TestCase):
+    def setUp(self):
+        # Source ids are cached per process; rows from earlier tests were rolled back
+        scraper_module._source_ids.clear()
+        self.scraper = YahooFinanceNewsScraper()
+        self.http = mock.Mock()
+        self.scraper._http = lambda: self.http
+
+    def test_conditional_get_uses_stored_validators(self):
+        FeedState.objects.create(url=FEED, etag='"v1"', last_modified='Mon, 02 Mar 2026 13:00:00 GMT')
+        self.http.get.return_value = FakeResponse(304)
+        self.assertEqual(self.scraper.scrape_feeds([(FEED, 'Wire')]), [])
+        headers = self.http.get.call_args.kwargs['headers']
+        self.assertEqual(headers, {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 02 Mar 2026 13:00:00 GMT'})
+        # A 304 has nothing new to persist
+        self.assertEqual(self.scraper._feed_state_dirty, set())
+
+    def test_validators_are_saved_only_with_their_articles(self):
+        self.http.get.return_value = FakeResponse(200, rss(('Apple up', 'https://n.example.com/1')), {'ETag': '"v2"'})
+        articles = self.scraper.scrape_feeds([(FEED, 'Wire')])
+        self.assertEqual(len(articles), 1)
+        self.assertEqual(articles[0]['mentioned_tickers'], 'AAPL')
+        self.assertFalse(FeedState.objects.exists())
+        self.assertEqual(self.scraper.save_to_database(articles), 1)
+        self.assertEqual(FeedState.objects.get(url=FEED).etag, '"v2"')
+
+    def test_feeds_with_unsaved_articles_are_refetched_in_full(self):
+        self.http.get.side_effect = lambda url, **kwargs: FakeResponse(
+            200, rss(('t', f'{url}/{"x" * 600}' if url == OTHER else f'{url}/ok')), {'ETag': f'"{url}"'},
+        )
+        articles = self.scraper.scrape_feeds([(FEED, 'Wire'), (OTHER, 'Wire')])
+        self.assertEqual(self.scraper.save_to_database(articles), 1)
+        self.assertEqual(list(FeedState.objects.values_list('url', flat=True)), [FEED])
+        self.assertNotIn(OTHER, self.scraper.feed_state)
+
+    def test_save_skips_known_and_duplicate_urls(self):
+        now = timezone.now()
+        NewsArticle.objects.create(title='old', url='https://n.example.com/old', source='Wire', published_date=now, published_at=now)
+        base = {'source': 'Wire', 'published_date': now, 'sentiment_score': 0.5, 'feed_url': FEED}
+        articles = [
+            dict(base, title='a', url='https://n.example.com/old'),
+            dict(base, title='b', url='https://n.example.com/new'),
+            dict(base, title='b again', url='https://n.example.com/new'),
+            dict(base, title='', url='https://n.example.com/untitled'),
+        ]
+        self.assertEqual(self.scraper.save_to_database(articles), 1)
+        self.assertEqual(NewsArticle.objects.count(), 2)
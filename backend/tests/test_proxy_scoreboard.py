@@ -0,0 +1,77 @@
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from stock_retrieval.proxy_scoreboard import ProxyScoreboard
+
+FAST, SLOW, COOLING = 'http://fast:1', 'http://slow:1', 'http://cooling:1'
+
+
+class ProxyScoreboardTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / 'scores.sqlite3'
+
+    def board(self):
+        board = ProxyScoreboard(self.path, flush_interval=3600)
+        self.addCleanup(lambda: board._conn and board._conn.close())
+        return board
+
+    def test_rank_orders_best_first_and_cooling_last(self):
+        board = self.board()
+        board.record_success(FAST, latency=0.1)
+        board.record_success(SLOW, latency=2.0)
+        board.record_rate_limit(COOLING)
+        proxies = [SLOW, COOLING, FAST]
+        self.assertEqual(board.rank(proxies), [FAST, SLOW])
+        self.assertEqual(board.rank(proxies, include_unavailable=True), [FAST, SLOW, COOLING])
+        self.assertFalse(board.is_available(COOLING))
+
+    def test_flush_adds_deltas_instead_of_overwriting(self):
+        first, second = self.board(), self.board()
+        first.record_success(FAST, latency=0.1)
+        second.record_success(FAST, latency=0.1)
+        second.record_success(FAST, latency=0.1)
+        first.flush()
+        second.flush()
+        # A second flush with nothing new must not count anything twice
+        first.flush()
+        self.assertEqual(self.board()._scores[FAST].successes, 3)
+
+    def test_reload_keeps_unflushed_local_updates(self):
+        first, second = self.board(), self.board()
+        first.record_success(FAST)
+        first.flush()
+        second.record_failure(FAST)
+        second.reload()
+        score = second._scores[FAST]
+        self.assertEqual((score.successes, score.failures), (1, 1))
+
+    def test_cooldown_survives_a_restart(self):
+        board = self.board()
+        board.record_rate_limit(COOLING, cooldown=600)
+        board.flush()
+        self.assertFalse(self.board().is_available(COOLING))
+
+
+class SmartProxyPoolTests(SimpleTestCase):
+    def test_cooling_proxies_stay_in_the_pool_but_are_skipped(self):
+        import ultra_fast_yfinance_v3 as scanner
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        board = ProxyScoreboard(Path(tmp.name) / 'scores.sqlite3', flush_interval=3600)
+        board.record_rate_limit(COOLING)
+        with mock.patch.object(scanner, 'get_scoreboard', return_value=board), \
+                mock.patch.object(scanner.SmartProxyPool, 'load_proxies', return_value=[COOLING, FAST]):
+            pool = scanner.SmartProxyPool()
+        self.assertEqual(pool.proxies, [FAST, COOLING])
+        pool.use_direct_connection_chance = 0
+        pool.min_proxy_gap = 0
+        self.assertEqual({pool.get_next() for _ in range(10)}, {FAST})
+        board._scores[COOLING].cooldown_until = time.time() - 1
+        self.assertIn(COOLING, {pool.get_next() for _ in range(20)})
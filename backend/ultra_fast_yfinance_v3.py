@@ -34,7 +34,6 @@ import logging
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
 from queue import Queue
-from decimal import Decimal
 from typing import List, Dict, Optional, Tuple
 
 # Django setup
@@ -47,6 +46,9 @@ django.setup()
 
 from django.utils import timezone
 from stocks.models import Stock
+from stock_retrieval.delta_writer import get_delta_writer
+from stocks.market_breadth import refresh_if_changed
+from stock_retrieval.proxy_scoreboard import get_scoreboard
 import yfinance as yf
 import requests
 
@@ -331,7 +333,12 @@ class SmartProxyPool:
     """Intelligent proxy pool with health tracking and auto-disable"""
 
     def __init__(self, proxy_file: str = PROXY_FILE):
-        self.proxies = self.load_proxies(proxy_file)
+        # Persistent scoreboard: start from proxies that were healthy last run
+        self.scoreboard = get_scoreboard()
+        loaded = self.load_proxies(proxy_file)
+        self.scoreboard.register(loaded)
+        # Cooling-down proxies stay in the pool (last) and rejoin once their cooldown ends
+        self.proxies = self.scoreboard.rank(loaded, include_unavailable=True)
         self.proxy_stats = {p: {'success': 0, 'fail': 0, 'last_success': 0, 'last_used': 0, 'consecutive_fails': 0, 'request_count': 0} for p in self.proxies}
         self.current_index = 0
         self.disabled_proxies = set()
@@ -346,7 +353,8 @@ class SmartProxyPool:
         # Circuit breaker for bad proxies
         self.circuit_breakers = {}  # {proxy: until_timestamp}
         self.circuit_timeout = 300  # 5 minutes circuit breaker timeout
-        logger.info(f"[PROXY POOL] Loaded {len(self.proxies)} proxies")
+        cooling = sum(1 for proxy in self.proxies if not self.scoreboard.is_available(proxy))
+        logger.info(f"[PROXY POOL] Loaded {len(self.proxies)} proxies ({cooling} still cooling down per scoreboard)")
         logger.info(f"[PROXY POOL] Rate limit cooldown: {self.rate_limit_cooldown}s, Min proxy gap: {self.min_proxy_gap}s")
         logger.info(f"[PROXY POOL] PROACTIVE SWITCHING: Every {self.max_requests_per_proxy} requests per proxy")
         logger.info(f"[PROXY POOL] CIRCUIT BREAKER: 5-minute timeout after 5 consecutive fails")
@@ -389,7 +397,8 @@ class SmartProxyPool:
             attempts += 1
 
             # Skip disabled, rate-limited, circuit-broken, and proxies with recent consecutive failures
-            if proxy not in self.disabled_proxies and not self.is_rate_limited(proxy) and not self.is_circuit_open(proxy):
+            if (proxy not in self.disabled_proxies and not self.is_rate_limited(proxy) and not self.is_circuit_open(proxy)
+                    and self.scoreboard.is_available(proxy)):
                 stats = self.proxy_stats.get(proxy, {})
 
                 # PROACTIVE SWITCHING: Skip proxy if it has made too many requests
@@ -419,8 +428,9 @@ class SmartProxyPool:
         # All proxies exhausted or too recently used - return None (direct)
         return None
 
-    def record_success(self, proxy: Optional[str]):
+    def record_success(self, proxy: Optional[str], latency: Optional[float] = None):
         """Record successful request"""
+        self.scoreboard.record_success(proxy, latency=latency)
         if proxy and proxy in self.proxy_stats:
             self.proxy_stats[proxy]['success'] += 1
             self.proxy_stats[proxy]['last_success'] = time.time()
@@ -430,6 +440,7 @@ class SmartProxyPool:
 
     def record_failure(self, proxy: Optional[str]):
         """Record failed request and potentially disable proxy"""
+        self.scoreboard.record_failure(proxy)
         if proxy and proxy in self.proxy_stats:
             self.proxy_stats[proxy]['fail'] += 1
             self.proxy_stats[proxy]['consecutive_fails'] = self.proxy_stats[proxy].get('consecutive_fails', 0) + 1
@@ -454,6 +465,7 @@ class SmartProxyPool:
 
     def record_rate_limit(self, proxy: Optional[str]):
         """Record rate limit hit for proxy - temporarily disable it"""
+        self.scoreboard.record_rate_limit(proxy, cooldown=self.rate_limit_cooldown)
         if proxy and proxy in self.proxy_stats:
             self.rate_limited_proxies[proxy] = time.time()
             logger.warning(f"[RATE LIMIT] Proxy {proxy} hit rate limit - cooling down for {self.rate_limit_cooldown}s")
@@ -506,6 +518,7 @@ class SmartProxyPool:
             'rate_limited_proxies': len(self.rate_limited_proxies),
             'active_proxies': len(self.proxies) - len(self.disabled_proxies) - len(self.rate_limited_proxies),
             'proactive_switches': self.proactive_switches,
+            'scoreboard': self.scoreboard.summary(),
         }
 
 
@@ -601,6 +614,7 @@ class UltraFastStockUpdater:
 
             # Check burst protection
             self.check_burst()
+            request_started = time.monotonic()
 
             # Create session with proxy if provided
             if proxy:
@@ -676,7 +690,7 @@ class UltraFastStockUpdater:
 
             # Validate data
             if self.validate_stock_data(data):
-                self.proxy_pool.record_success(proxy)
+                self.proxy_pool.record_success(proxy, latency=time.monotonic() - request_started)
                 return data
             else:
                 return None
@@ -871,64 +885,53 @@ class UltraFastStockUpdater:
         successful = 0
         failed = 0
 
-        try:
-            stocks_to_update = []
-            stocks_to_create = []
-
-            # Get existing stocks
-            existing_tickers = set(
-                Stock.objects.values_list('ticker', flat=True)
-            )
-
-            for data in stock_data_list:
-                try:
-                    ticker = data['ticker']
-
-                    # Prepare stock object
-                    stock_data = {
-                        'ticker': ticker,
-                        'symbol': ticker,  # For compatibility
-                        'company_name': data.get('company_name', ticker),
-                        'name': data.get('company_name', ticker),  # For compatibility
-                        'exchange': data.get('exchange', 'UNKNOWN'),
-                        'current_price': Decimal(str(data['current_price'])) if data.get('current_price') else None,
-                        'volume': data.get('volume'),
-                        'avg_volume_3mon': data.get('avg_volume_3mon'),
-                        'market_cap': data.get('market_cap'),
-                        'pe_ratio': Decimal(str(data['pe_ratio'])) if data.get('pe_ratio') else None,
-                        'dividend_yield': Decimal(str(data['dividend_yield'])) if data.get('dividend_yield') else None,
-                        'price_change': Decimal(str(data['price_change'])) if data.get('price_change') else None,
-                        'price_change_percent': Decimal(str(data['price_change_percent'])) if data.get('price_change_percent') else None,
-                        'week_52_high': Decimal(str(data['week_52_high'])) if data.get('week_52_high') else None,
-                        'week_52_low': Decimal(str(data['week_52_low'])) if data.get('week_52_low') else None,
-                        'days_low': Decimal(str(data['days_low'])) if data.get('days_low') else None,
-                        'days_high': Decimal(str(data['days_high'])) if data.get('days_high') else None,
-                        'bid_price': Decimal(str(data['bid_price'])) if data.get('bid_price') else None,
-                        'ask_price': Decimal(str(data['ask_price'])) if data.get('ask_price') else None,
-                        'earnings_per_share': Decimal(str(data['earnings_per_share'])) if data.get('earnings_per_share') else None,
-                        'book_value': Decimal(str(data['book_value'])) if data.get('book_value') else None,
-                        'price_to_book': Decimal(str(data['price_to_book'])) if data.get('price_to_book') else None,
-                        'last_updated': timezone.now(),
-                    }
-
-                    if ticker in existing_tickers:
-                        # Update existing
-                        Stock.objects.filter(ticker=ticker).update(**stock_data)
-                        successful += 1
-                    else:
-                        # Create new
-                        Stock.objects.create(**stock_data)
-                        successful += 1
-
-                except Exception as e:
-                    logger.debug(f"[DATABASE ERROR] {data.get('ticker', 'UNKNOWN')}: {e}")
-                    failed += 1
-                    continue
+        rows = {}
+        for data in stock_data_list:
+            try:
+                ticker = data['ticker']
+
+                # Prepare stock row; the delta writer normalizes types and drops unchanged columns
+                rows[ticker] = {
+                    'symbol': ticker,  # For compatibility
+                    'company_name': data.get('company_name', ticker),
+                    'name': data.get('company_name', ticker),  # For compatibility
+                    'exchange': data.get('exchange', 'UNKNOWN'),
+                    'current_price': data.get('current_price') or None,
+                    'volume': data.get('volume'),
+                    'avg_volume_3mon': data.get('avg_volume_3mon'),
+                    'market_cap': data.get('market_cap'),
+                    'pe_ratio': data.get('pe_ratio') or None,
+                    'dividend_yield': data.get('dividend_yield') or None,
+                    'price_change': data.get('price_change') or None,
+                    'price_change_percent': data.get('price_change_percent') or None,
+                    'week_52_high': data.get('week_52_high') or None,
+                    'week_52_low': data.get('week_52_low') or None,
+                    'days_low': data.get('days_low') or None,
+                    'days_high': data.get('days_high') or None,
+                    'bid_price': data.get('bid_price') or None,
+                    'ask_price': data.get('ask_price') or None,
+                    'earnings_per_share': data.get('earnings_per_share') or None,
+                    'book_value': data.get('book_value') or None,
+                    'price_to_book': data.get('price_to_book') or None,
+                }
+            except Exception as e:
+                logger.debug(f"[DATABASE ERROR] {data.get('ticker', 'UNKNOWN')}: {e}")
+                failed += 1
 
+        try:
+            change_set = get_delta_writer().write(rows, timestamp=timezone.now())
         except Exception as e:
             logger.error(f"[DATABASE ERROR] Bulk update failed: {e}")
             return 0, len(stock_data_list)
 
+        # Rows the database rejected were retried alone and skipped; the rest are written
+        successful = len(rows) - len(change_set.failed)
+        failed += len(change_set.failed)
+        logger.info(
+            f"[DATABASE] {len(change_set.created)} created, {len(change_set.updated)} changed, "
+            f"{change_set.unchanged} unchanged ({change_set.statements} statements)"
+        )
+
         logger.info(f"[DATABASE] Updated {successful} stocks, {failed} failed")
         return successful, failed
 
@@ -1064,6 +1067,7 @@ class UltraFastStockUpdater:
 
         # Bulk update
         successful, failed = self.bulk_update_database(stock_data_list)
+        refresh_if_changed()
 
         phase_time = time.time() - phase_start
         logger.info(f"[PHASE 3] Complete: {successful} updated, {failed} failed in {phase_time:.1f}s")
@@ -1160,6 +1164,9 @@ class UltraFastStockUpdater:
         except Exception as e:
             logger.error(f"[ERROR] Update failed: {e}", exc_info=True)
             raise
+        finally:
+            # Persist proxy scores so the next run starts with known-good proxies
+            self.proxy_pool.scoreboard.flush()
 
 
 def signal_handler(signum, frame):
@@ -0,0 +1,540 @@
+"""
+Process-local metrics with Prometheus text exposition.
+
+Counters and histograms record into per-thread shards, so the hot path takes
+no lock; a snapshot folds the shards together. Web requests and the scanners
+publish through the same REGISTRY:
+
+    from utils import metrics
+    metrics.SCANNER_STAGE_SECONDS.observe(elapsed, 'fast_stock_scanner', 'fetch')
+    with metrics.SCANNER_STAGE_SECONDS.time('stock_retrieval', 'write'):
+        ...
+
+To aggregate across processes (web workers, scanner runs) every process
+writes its snapshot to METRICS_DIR every METRICS_FLUSH_INTERVAL
+seconds and at exit, and ``REGISTRY.render(aggregate=True)`` sums every
+snapshot in the directory. A process that exited more than
+METRICS_RETENTION seconds ago is folded by ``prune()`` (run by the flusher
+every METRICS_RETENTION seconds) into a retired base that stays in the sum,
+so aggregated counters never go backwards and Prometheus ``rate()`` holds.
+
+Request-scoped totals (DB time, query count, outbound HTTP time) accumulate
+on the Scope opened by ``scope()``; ``instrument_http()`` makes outbound
+calls through requests/curl_cffi report to it.
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows: snapshots are still summed, without the directory lock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Set METRICS_DIR to an empty string to keep metrics in-process only
+METRICS_DIR = os.environ.get(
+    'METRICS_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'metrics'))
+FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '10'))
+RETENTION = float(os.environ.get('METRICS_RETENTION', '3600'))
+RETIRED_FILE = 'retired.json'
+LOCK_FILE = '.lock'
+_SNAPSHOT_NAME = re.compile(r'^metrics-\d+\.json$')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, registry: 'Registry', name: str, help_text: str, labelnames: Sequence[str]):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._reset()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, dict]] = []
+        self._retired: dict = {}
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+            self.registry._ensure_flusher()
+        return shard
+
+    def _merged(self) -> dict:
+        """labels -> cell, summed over all threads; folds shards of exited threads away."""
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    self._merge_into(self._retired, dict(shard))
+            self._shards = live
+            merged: dict = {}
+            self._merge_into(merged, self._retired)
+            for _, shard in live:
+                # dict() copies atomically under the GIL while the owner keeps writing
+                self._merge_into(merged, dict(shard))
+        return merged
+
+    def _merge_into(self, target: dict, source: dict):
+        raise NotImplementedError
+
+    def samples(self) -> list:
+        raise NotImplementedError
+
+    def describe(self) -> dict:
+        return {'type': self.kind, 'help': self.help, 'labelnames': list(self.labelnames)}
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount: float = 1.0):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def _merge_into(self, target, source):
+        for labels, value in source.items():
+            target[labels] = target.get(labels, 0.0) + value
+
+    def samples(self):
+        return [[list(labels), value] for labels, value in self._merged().items()]
+
+
+class _Cell:
+    __slots__ = ('counts', 'total')
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.total = 0.0
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help_text, labelnames, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        super().__init__(registry, name, help_text, labelnames)
+
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        cell = shard.get(labels)
+        if cell is None:
+            cell = shard[labels] = _Cell(len(self.buckets) + 1)
+        # Last slot is +Inf; counts are per bucket, made cumulative on render
+        cell.counts[bisect_left(self.buckets, value)] += 1
+        cell.total += value
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def _merge_into(self, target, source):
+        for labels, cell in source.items():
+            into = target.get(labels)
+            if into is None:
+                into = target[labels] = _Cell(len(self.buckets) + 1)
+            for i, count in enumerate(list(cell.counts)):
+                into.counts[i] += count
+            into.total += cell.total
+
+    def samples(self):
+        return [[list(labels), list(cell.counts), cell.total] for labels, cell in self._merged().items()]
+
+    def describe(self):
+        return dict(super().describe(), buckets=list(self.buckets))
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._flusher_pid: Optional[int] = None
+        self._claimed_pid: Optional[int] = None
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self, name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, help_text, labelnames, buckets))
+
+    def snapshot(self) -> dict:
+        return {
+            name: dict(metric.describe(), samples=metric.samples())
+            for name, metric in list(self._metrics.items())
+        }
+
+    # ----- cross-process aggregation -----
+
+    def _path(self, pid=None) -> str:
+        return os.path.join(METRICS_DIR, f'metrics-{pid or os.getpid()}.json')
+
+    @contextmanager
+    def _dir_lock(self, exclusive: bool):
+        """flock on METRICS_DIR so folding a snapshot into the base and reading are atomic."""
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        with open(os.path.join(METRICS_DIR, LOCK_FILE), 'a') as fh:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _write_json(self, path: str, data: dict):
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump(data, fh)
+        os.replace(tmp, path)
+
+    def _retire(self, paths: Sequence[str]):
+        """Fold snapshots into the retired base and delete them; caller holds the exclusive lock."""
+        base_path = os.path.join(METRICS_DIR, RETIRED_FILE)
+        base = _load(base_path) or {}
+        for path in paths:
+            for name, family in (_load(path) or {}).items():
+                _merge_family(base, name, family)
+        self._write_json(base_path, base)
+        for path in paths:
+            os.remove(path)
+
+    def flush(self):
+        """Write this process's snapshot to METRICS_DIR (no-op when empty)."""
+        if not METRICS_DIR:
+            return
+        try:
+            path = self._path()
+            if self._claimed_pid != os.getpid():
+                # A file under our pid belongs to an earlier process; keep its counts
+                with self._dir_lock(exclusive=True):
+                    if os.path.exists(path):
+                        self._retire([path])
+                self._claimed_pid = os.getpid()
+            self._write_json(path, self.snapshot())
+        except Exception as e:
+            logger.warning(f"Could not write metrics snapshot: {e}")
+
+    def _ensure_flusher(self):
+        if not METRICS_DIR or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        last_prune = 0.0
+        while self._flusher_pid == pid:
+            time.sleep(FLUSH_INTERVAL)
+            self.flush()
+            if time.monotonic() - last_prune >= RETENTION:
+                self.prune()
+                last_prune = time.monotonic()
+
+    def _expired(self, path: str, now: float) -> bool:
+        """Snapshot (or leftover .tmp) of a process that exited more than RETENTION ago."""
+        filename = os.path.basename(path)
+        pid = filename[len('metrics-'):].split('.', 1)[0]
+        if now - os.path.getmtime(path) <= RETENTION:
+            return False
+        return not pid.isdigit() or not _pid_alive(int(pid))
+
+    def prune(self) -> int:
+        """Retire expired snapshots into the base file; returns how many were removed.
+
+        Their counts stay in the aggregate through the base, so exported
+        counters never go backwards when a process's snapshot is removed.
+        """
+        if not METRICS_DIR or not os.path.isdir(METRICS_DIR):
+            return 0
+        now = time.time()
+        expired, leftovers = [], []
+        try:
+            with self._dir_lock(exclusive=True):
+                for filename in os.listdir(METRICS_DIR):
+                    if not filename.startswith('metrics-'):
+                        continue
+                    path = os.path.join(METRICS_DIR, filename)
+                    if not self._expired(path, now):
+                        continue
+                    (expired if _SNAPSHOT_NAME.match(filename) else leftovers).append(path)
+                for path in leftovers:
+                    os.remove(path)
+                if expired:
+                    self._retire(expired)
+        except OSError as e:
+            logger.debug(f"Could not prune metrics snapshots: {e}")
+            return 0
+        removed = len(expired) + len(leftovers)
+        if removed:
+            logger.info(f"Retired {len(expired)} expired metrics snapshots")
+        return removed
+
+    def _after_fork(self):
+        # Children start from zero; the parent's counts stay in its own snapshot
+        self._flusher_pid = None
+        self._claimed_pid = None
+        for metric in list(self._metrics.values()):
+            metric._reset()
+
+    def _peer_snapshots(self) -> List[dict]:
+        """Every other process's snapshot plus the retired base, read under the shared lock."""
+        if not METRICS_DIR or not os.path.isdir(METRICS_DIR):
+            return []
+        own = os.path.basename(self._path())
+        snapshots = []
+        with self._dir_lock(exclusive=False):
+            for filename in os.listdir(METRICS_DIR):
+                if filename == own or not (filename == RETIRED_FILE or _SNAPSHOT_NAME.match(filename)):
+                    continue
+                snapshot = _load(os.path.join(METRICS_DIR, filename))
+                if snapshot is not None:
+                    snapshots.append(snapshot)
+        return snapshots
+
+    def collect(self, aggregate: bool = True) -> dict:
+        """This process's snapshot, summed with every peer snapshot when ``aggregate``."""
+        merged = self.snapshot()
+        if not aggregate:
+            return merged
+        for snapshot in self._peer_snapshots():
+            for name, family in snapshot.items():
+                _merge_family(merged, name, family)
+        return merged
+
+    def render(self, aggregate: bool = True) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for name, family in sorted(self.collect(aggregate).items()):
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            labelnames = family['labelnames']
+            for sample in sorted(family['samples'], key=lambda s: s[0]):
+                labels = list(zip(labelnames, sample[0]))
+                if family['type'] == 'counter':
+                    lines.append(f"{name}{_labels(labels)} {_number(sample[1])}")
+                    continue
+                counts, total = sample[1], sample[2]
+                running = 0
+                for bound, count in zip(family['buckets'] + ['+Inf'], counts):
+                    running += count
+                    le = bound if bound == '+Inf' else _number(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + [('le', le)])} {running}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(labels)} {running}")
+        return '\n'.join(lines) + '\n'
+
+
+def _merge_family(merged: dict, name: str, family: dict):
+    own = merged.get(name)
+    if own is None:
+        merged[name] = family
+        return
+    if own['type'] != family['type'] or own.get('buckets') != family.get('buckets') \
+            or own['labelnames'] != family['labelnames']:
+        logger.debug(f"Metric {name} differs between processes; keeping the local definition")
+        return
+    index = {tuple(sample[0]): sample for sample in own['samples']}
+    for sample in family['samples']:
+        mine = index.get(tuple(sample[0]))
+        if mine is None:
+            own['samples'].append(sample)
+            index[tuple(sample[0])] = sample
+        elif own['type'] == 'counter':
+            mine[1] += sample[1]
+        else:
+            mine[1] = [a + b for a, b in zip(mine[1], sample[1])]
+            mine[2] += sample[2]
+
+
+def _load(path: str) -> Optional[dict]:
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+    except (ValueError, OSError) as e:
+        logger.debug(f"Skipping metrics snapshot {os.path.basename(path)}: {e}")
+        return None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _number(value) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+REGISTRY = Registry()
+atexit.register(REGISTRY.flush)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=REGISTRY._after_fork)
+
+
+# ----- request scope -----
+
+class Scope:
+    """Totals for one unit of work (a request), filled in by DB and HTTP instrumentation."""
+
+    __slots__ = ('db_seconds', 'db_queries', 'outbound_seconds', 'outbound_calls')
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self.outbound_seconds = 0.0
+        self.outbound_calls = 0
+
+
+_scope = contextvars.ContextVar('metrics_scope', default=None)
+
+
+@contextmanager
+def scope():
+    current = Scope()
+    token = _scope.set(current)
+    try:
+        yield current
+    finally:
+        _scope.reset(token)
+
+
+def current_scope() -> Optional[Scope]:
+    return _scope.get()
+
+
+def record_query(seconds: float):
+    current = _scope.get()
+    if current is not None:
+        current.db_seconds += seconds
+        current.db_queries += 1
+
+
+def record_outbound(seconds: float, url: str = ''):
+    current = _scope.get()
+    if current is not None:
+        current.outbound_seconds += seconds
+        current.outbound_calls += 1
+    OUTBOUND_SECONDS.observe(seconds, urlsplit(url).hostname or 'unknown')
+
+
+def _timed_send(send):
+    def wrapper(self, request, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return send(self, request, *args, **kwargs)
+        finally:
+            record_outbound(time.perf_counter() - started, getattr(request, 'url', '') or '')
+    wrapper._metrics_wrapped = True
+    return wrapper
+
+
+def _timed_request(request):
+    def wrapper(self, method, url, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return request(self, method, url, *args, **kwargs)
+        finally:
+            record_outbound(time.perf_counter() - started, url)
+    wrapper._metrics_wrapped = True
+    return wrapper
+
+
+def instrument_http():
+    """Time every outbound call made through requests (and curl_cffi, as yfinance uses)."""
+    try:
+        from requests.adapters import HTTPAdapter
+        if not getattr(HTTPAdapter.send, '_metrics_wrapped', False):
+            HTTPAdapter.send = _timed_send(HTTPAdapter.send)
+    except ImportError:
+        pass
+    try:
+        from curl_cffi.requests import Session as CurlSession  # type: ignore
+        if not getattr(CurlSession.request, '_metrics_wrapped', False):
+            CurlSession.request = _timed_request(CurlSession.request)
+    except ImportError:
+        pass
+
+
+# ----- shared metric families -----
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Wall time per request by route.', ('route', 'method'))
+REQUEST_DB_SECONDS = REGISTRY.histogram(
+    'http_request_db_seconds', 'Database time per request by route.', ('route',))
+REQUEST_DB_QUERIES = REGISTRY.histogram(
+    'http_request_db_queries', 'Database queries per request by route.', ('route',), COUNT_BUCKETS)
+REQUEST_OUTBOUND_SECONDS = REGISTRY.histogram(
+    'http_request_outbound_seconds', 'Outbound HTTP time per request by route.', ('route',))
+RESPONSE_BYTES = REGISTRY.histogram(
+    'http_response_size_bytes', 'Response body size by route.', ('route',), BYTES_BUCKETS)
+RESPONSES = REGISTRY.counter(
+    'http_responses_total', 'Responses by route and status class.', ('route', 'status'))
+OUTBOUND_SECONDS = REGISTRY.histogram(
+    'outbound_request_duration_seconds', 'Outbound HTTP calls by target host.', ('host',))
+SCANNER_STAGE_SECONDS = REGISTRY.histogram(
+    'scanner_stage_duration_seconds', 'Scanner stage time (fetch, transform, write).',
+    ('scanner', 'stage'), STAGE_BUCKETS)
+SCANNER_ITEMS = REGISTRY.counter(
+    'scanner_items_total', 'Symbols handled per scanner stage and outcome.', ('scanner', 'stage', 'outcome'))